@@ -4,9 +4,10 @@ from contextlib import contextmanager
 from pathlib import Path
 from typing import Any, Iterable
 
-import psycopg2
 import psycopg2.extras
 
+from .services.dbpool import get_pool
+
 
 def database_url() -> str:
     # 小工具模块默认连接本地 Workbench DB；主应用也可以通过 DATABASE_URL 覆盖。
@@ -18,16 +19,10 @@ def database_url() -> str:
 
 @contextmanager
 def connect():
-    # 所有 DB 操作统一在这里提交/回滚，避免脚本型调用遗漏事务处理。
-    conn = psycopg2.connect(database_url())
-    try:
+    # 所有 DB 操作统一在这里提交/回滚，避免脚本型调用遗漏事务处理；
+    # 连接来自与 API / worker 共用的进程级连接池。
+    with get_pool(database_url()).connection() as conn:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def init_db() -> None:
@@ -18,7 +18,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from . import security
 from .routers import agent, billing, config, files, jobs, rawlogs
+from .services.agent_events import hub_stats
 from .services.artifacts import artifacts
+from .services.dbpool import pool_stats
 from .services.core import (
     db_conn,
     env_int,
@@ -63,7 +65,13 @@ def health() -> dict[str, Any]:
         with conn.cursor() as cur:
             cur.execute("SELECT 1")
             db_ok = cur.fetchone()[0] == 1
-    return {"ok": True, "db": db_ok, "artifact_store": "s3" if artifacts.enabled else "local"}
+    return {
+        "ok": True,
+        "db": db_ok,
+        "db_pool": pool_stats(),
+        "agent_events": hub_stats(),
+        "artifact_store": "s3" if artifacts.enabled else "local",
+    }
 
 
 @app.get("/api/status")
@@ -9,7 +9,7 @@ from datetime import timedelta
 from typing import Any
 
 import psycopg2.extras
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from ..services.artifacts import artifacts, billing_artifacts, content_disposition, stream_download_response
@@ -38,6 +38,7 @@ from ..services.discounts import apply_discount_rows, flatten_discounts
 from ..services.pricing import apply_pricing_rows, flatten_pricing
 from ..services.core import (
     db_conn,
+    db_session,
     dumps_json,
     fetch_all,
     fetch_one,
@@ -531,10 +532,9 @@ def insert_publish_record(cur, document_id: str, action: str, req: BillDocumentA
 # --- Schedules ---
 
 @router.get("/api/schedules")
-def list_schedules() -> dict[str, Any]:
-    with db_conn() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            rows = fetch_all(cur, "SELECT * FROM schedules ORDER BY created_at ASC")
+def list_schedules(conn=Depends(db_session)) -> dict[str, Any]:
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        rows = fetch_all(cur, "SELECT * FROM schedules ORDER BY created_at ASC")
     return {"items": rows}
 
 
@@ -569,16 +569,15 @@ def run_schedule(schedule_id: str, req: ScheduleRunRequest | None = None) -> dic
 
 
 @router.get("/api/schedule-runs")
-def list_schedule_runs() -> dict[str, Any]:
-    with db_conn() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            rows = fetch_all(cur, """
-                SELECT sr.*, s.name AS schedule_name, s.schedule_type
-                FROM schedule_runs sr
-                LEFT JOIN schedules s ON s.id = sr.schedule_id
-                ORDER BY sr.created_at DESC
-                LIMIT 100
-            """)
+def list_schedule_runs(conn=Depends(db_session)) -> dict[str, Any]:
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        rows = fetch_all(cur, """
+            SELECT sr.*, s.name AS schedule_name, s.schedule_type
+            FROM schedule_runs sr
+            LEFT JOIN schedules s ON s.id = sr.schedule_id
+            ORDER BY sr.created_at DESC
+            LIMIT 100
+        """)
     return {"items": rows}
 
 
@@ -610,29 +609,27 @@ def retry_failed_schedule_run(schedule_run_id: str) -> dict[str, Any]:
 # --- Billing batches ---
 
 @router.get("/api/billing-batches")
-def list_billing_batches() -> dict[str, Any]:
-    with db_conn() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            rows = fetch_all(cur, "SELECT * FROM billing_batches ORDER BY created_at DESC LIMIT 100")
+def list_billing_batches(conn=Depends(db_session)) -> dict[str, Any]:
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        rows = fetch_all(cur, "SELECT * FROM billing_batches ORDER BY created_at DESC LIMIT 100")
     return {"items": rows}
 
 
 @router.get("/api/billing-batches/{batch_id}")
-def get_billing_batch(batch_id: str) -> dict[str, Any]:
-    with db_conn() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            batch = fetch_one(cur, "SELECT * FROM billing_batches WHERE id = %s", (batch_id,))
-            if not batch:
-                raise HTTPException(status_code=404, detail="batch not found")
-            facts = fetch_all(cur, "SELECT * FROM billing_fact_manifests WHERE batch_id = %s ORDER BY created_at DESC", (batch_id,))
-            documents = fetch_all(cur, "SELECT * FROM bill_documents WHERE batch_id = %s ORDER BY created_at ASC", (batch_id,))
+def get_billing_batch(batch_id: str, conn=Depends(db_session)) -> dict[str, Any]:
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        batch = fetch_one(cur, "SELECT * FROM billing_batches WHERE id = %s", (batch_id,))
+        if not batch:
+            raise HTTPException(status_code=404, detail="batch not found")
+        facts = fetch_all(cur, "SELECT * FROM billing_fact_manifests WHERE batch_id = %s ORDER BY created_at DESC", (batch_id,))
+        documents = fetch_all(cur, "SELECT * FROM bill_documents WHERE batch_id = %s ORDER BY created_at ASC", (batch_id,))
     return {"batch": batch, "fact_manifests": facts, "documents": documents}
 
 
 # --- Bill documents ---
 
 @router.get("/api/bill-documents")
-def list_bill_documents(month: str | None = None, bill_type: str | None = None, status: str | None = None) -> dict[str, Any]:
+def list_bill_documents(month: str | None = None, bill_type: str | None = None, status: str | None = None, conn=Depends(db_session)) -> dict[str, Any]:
     clauses = []
     args: list[Any] = []
     if month:
@@ -645,9 +642,8 @@ def list_bill_documents(month: str | None = None, bill_type: str | None = None,
         clauses.append("status = %s")
         args.append(status)
     where = "WHERE " + " AND ".join(clauses) if clauses else ""
-    with db_conn() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            rows = fetch_all(cur, f"SELECT * FROM bill_documents {where} ORDER BY created_at DESC LIMIT 200", tuple(args))
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        rows = fetch_all(cur, f"SELECT * FROM bill_documents {where} ORDER BY created_at DESC LIMIT 200", tuple(args))
     return {"items": rows}
 
 
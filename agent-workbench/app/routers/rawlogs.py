@@ -6,6 +6,10 @@ import gzip
 import json
 import os
 import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any
 
@@ -18,6 +22,10 @@ from ..services.core import clamp_int, json_safe
 
 router = APIRouter(tags=["rawlogs"])
 
+RAWLOGS_SEARCH_MAX_OBJECTS = 2000
+RAWLOGS_SEARCH_MAX_BYTES_PER_OBJECT = 256 * 1024 * 1024
+RAWLOGS_SEARCH_CHUNK_BYTES = 1024 * 1024
+
 
 def rawlogs_default_bucket() -> str:
     return (os.getenv("WORKBENCH_RAWLOGS_S3_BUCKET") or os.getenv("ATHENA_RAWLOGS_BUCKET") or os.getenv("ATHENA_LOG_BUCKET") or os.getenv("ATHENA_RESULT_BUCKET") or "ezmodel-log").strip()
@@ -135,6 +143,116 @@ def read_rawlog_text(bucket: str, key: str, max_bytes: int) -> dict[str, Any]:
     return {"text": text, "decoded_bytes": len(raw), "object_size": content_length, "content_type": content_type, "compression": compression, "truncated": truncated or (compression is None and content_length > max_bytes)}
 
 
+def rawlogs_search_workers() -> int:
+    return clamp_int(os.getenv("WORKBENCH_RAWLOGS_SEARCH_WORKERS"), 16, 1, 64)
+
+
+def compile_rawlog_matcher(query: str) -> re.Pattern[bytes]:
+    """Match `query.lower() in line.lower()` on `bytes.lower()`-ed UTF-8 text, without decoding it.
+
+    bytes.lower() only folds ASCII, so ASCII query characters are matched
+    lowered and other cased characters as an alternation of their spellings.
+    The pattern stays case-sensitive: re.IGNORECASE loses the literal fast path.
+    """
+    parts: list[bytes] = []
+    for char in query:
+        variants = sorted({variant for variant in (char, char.lower(), char.upper()) if variant.lower() == char.lower()})
+        if char.isascii() or len(variants) == 1:
+            parts.append(re.escape(char.lower().encode("utf-8")))
+        else:
+            parts.append(b"(?:" + b"|".join(re.escape(variant.encode("utf-8").lower()) for variant in variants) + b")")
+    return re.compile(b"".join(parts))
+
+
+def _match_complete_lines(buf: bytes, lowered: bytes, end: int, line_base: int, matcher: re.Pattern[bytes], query_len: int, matches: list[dict[str, Any]], want: int) -> int:
+    """Record the first match of each line in buf[:end]; return the line number following buf[:end]."""
+    pos = counted_to = 0
+    line_number = line_base
+    while len(matches) < want:
+        found = matcher.search(lowered, pos, end)
+        if found is None:
+            break
+        line_start = buf.rfind(b"\n", 0, found.start()) + 1
+        line_end = buf.find(b"\n", found.start(), end)
+        line_end = end if line_end < 0 else line_end
+        if found.end() > line_end:
+            # The query itself spans a newline; lines are matched one at a time.
+            pos = line_end + 1
+            continue
+        line_number += buf.count(b"\n", counted_to, line_start)
+        counted_to = line_start
+        line = buf[line_start:line_end].rstrip(b"\r")
+        position = len(line[: found.start() - line_start].decode("utf-8", errors="replace"))
+        text = line.decode("utf-8", errors="replace")
+        matches.append({"line": line_number, "snippet": text[max(0, position - 90): position + query_len + 160]})
+        pos = line_end + 1
+    return line_base + buf.count(b"\n", 0, end)
+
+
+def scan_rawlog_stream(stream: Any, matcher: re.Pattern[bytes], query_len: int, max_bytes: int, want: int, stop: threading.Event | None = None) -> dict[str, Any]:
+    """Search a decompressed byte stream chunk by chunk, carrying the unfinished last line forward."""
+    matches: list[dict[str, Any]] = []
+    carry = b""
+    line_base = 1
+    decoded = 0
+    truncated = stopped = False
+    error = None
+    try:
+        while True:
+            if stop is not None and stop.is_set():
+                stopped = True
+                break
+            chunk = stream.read(min(RAWLOGS_SEARCH_CHUNK_BYTES, max_bytes + 1 - decoded))
+            if not chunk:
+                break
+            decoded += len(chunk)
+            if decoded > max_bytes:
+                chunk = chunk[: len(chunk) - (decoded - max_bytes)]
+                decoded = max_bytes
+                truncated = True
+            buf = carry + chunk
+            cut = len(buf) if truncated else buf.rfind(b"\n") + 1
+            line_base = _match_complete_lines(buf, buf.lower(), cut, line_base, matcher, query_len, matches, want)
+            carry = buf[cut:]
+            if truncated or len(matches) >= want:
+                break
+    except (OSError, EOFError, zlib.error) as exc:
+        error = str(exc)
+    if carry and not stopped and len(matches) < want:
+        _match_complete_lines(carry, carry.lower(), len(carry), line_base, matcher, query_len, matches, want)
+    return {"matches": matches, "decoded_bytes": decoded, "truncated": truncated, "stopped_early": stopped, "error": error}
+
+
+def scan_rawlog_object(client: Any, bucket: str, item: dict[str, Any], matcher: re.Pattern[bytes], query_len: int, max_bytes: int, want: int, stop: threading.Event | None = None) -> dict[str, Any]:
+    """Stream one object through gzip (when compressed) into scan_rawlog_stream and time it."""
+    key = item["key"]
+    started = time.perf_counter()
+    compression = None
+    try:
+        obj = client.get_object(Bucket=bucket, Key=key)
+        content_type = obj.get("ContentType") or "application/octet-stream"
+        body = obj["Body"]
+        compression = "gzip" if key.lower().endswith(".gz") or content_type == "application/gzip" else None
+        try:
+            stream = gzip.GzipFile(fileobj=body) if compression == "gzip" else body
+            result = scan_rawlog_stream(stream, matcher, query_len, max_bytes, want, stop)
+        finally:
+            body.close()
+        if compression == "gzip" and result["error"] and not result["decoded_bytes"]:
+            # Same fallback as the preview: a ".gz" key that is not actually gzip.
+            compression = "gzip-preview-fallback"
+            body = client.get_object(Bucket=bucket, Key=key)["Body"]
+            try:
+                result = scan_rawlog_stream(body, matcher, query_len, max_bytes, want, stop)
+            finally:
+                body.close()
+    except Exception as exc:
+        result = {"matches": [], "decoded_bytes": 0, "truncated": False, "stopped_early": False, "error": f"read rawlog object failed: {exc}"}
+    elapsed = time.perf_counter() - started
+    result.update({"key": key, "compression": compression, "elapsed_ms": round(elapsed * 1000, 1), "decoded_mb_per_s": round(result["decoded_bytes"] / 1024 / 1024 / elapsed, 2) if elapsed > 0 else None})
+    return result
+
+
 def parse_json_preview(text: str, limit: int = 100) -> dict[str, Any]:
     rows: list[dict[str, Any]] = []
     errors = 0
@@ -187,11 +305,12 @@ class RawLogsSearchRequest(BaseModel):
     limit: int = 50
     object_limit: int = 50
     max_bytes_per_object: int = 256 * 1024
+    workers: int | None = None
 
 
 @router.get("/api/rawlogs/config")
 def rawlogs_config_endpoint() -> dict[str, Any]:
-    return {"bucket": rawlogs_default_bucket(), "prefix": rawlogs_default_prefix(), "uri_template": f"s3://{rawlogs_default_bucket()}/{rawlogs_default_prefix()}/{{year}}/{{month}}/{{day}}/{{hour}}/", "max_preview_bytes": 5 * 1024 * 1024, "max_search_objects": 200}
+    return {"bucket": rawlogs_default_bucket(), "prefix": rawlogs_default_prefix(), "uri_template": f"s3://{rawlogs_default_bucket()}/{rawlogs_default_prefix()}/{{year}}/{{month}}/{{day}}/{{hour}}/", "max_preview_bytes": 5 * 1024 * 1024, "max_search_objects": RAWLOGS_SEARCH_MAX_OBJECTS, "max_search_bytes_per_object": RAWLOGS_SEARCH_MAX_BYTES_PER_OBJECT, "search_workers": rawlogs_search_workers()}
 
 
 @router.get("/api/rawlogs/objects")
@@ -228,28 +347,68 @@ def preview_rawlog_object(bucket: str | None = None, key: str | None = None, max
 
 @router.post("/api/rawlogs/search")
 def search_rawlogs(req: RawLogsSearchRequest) -> dict[str, Any]:
+    """Search a partition's objects concurrently and return the first `limit` matches in object order.
+
+    An object is only cut short once the objects listed before it already hold `limit` matches,
+    so the result does not depend on which scan finishes first.
+    """
     query = req.query.strip()
     if not query:
         raise HTTPException(status_code=400, detail="query is required")
     normalized_bucket = normalize_s3_bucket(req.bucket)
     normalized_prefix = normalize_rawlogs_prefix(req.prefix, req.year, req.month, req.day, req.hour)
     limit = clamp_int(req.limit, 50, 1, 200)
-    object_limit = clamp_int(req.object_limit, 50, 1, 200)
-    max_bytes = clamp_int(req.max_bytes_per_object, 256 * 1024, 4 * 1024, 1024 * 1024)
-    lowered_query = query.lower()
+    object_limit = clamp_int(req.object_limit, 50, 1, RAWLOGS_SEARCH_MAX_OBJECTS)
+    max_bytes = clamp_int(req.max_bytes_per_object, 256 * 1024, 4 * 1024, RAWLOGS_SEARCH_MAX_BYTES_PER_OBJECT)
+    workers = clamp_int(req.workers, rawlogs_search_workers(), 1, 64)
+    started = time.perf_counter()
+    items = iter_rawlog_objects(normalized_bucket, normalized_prefix, object_limit)
+    matcher = compile_rawlog_matcher(query)
+    client = rawlogs_client()
+    stops = [threading.Event() for _ in items]
+    counts: dict[int, int] = {}
+    counts_lock = threading.Lock()
+
+    def scan(index: int) -> dict[str, Any] | None:
+        if stops[index].is_set():
+            return None
+        result = scan_rawlog_object(client, normalized_bucket, items[index], matcher, len(query), max_bytes, limit, stops[index])
+        with counts_lock:
+            counts[index] = len(result["matches"])
+            # Once the finished leading objects hold `limit` matches, later objects cannot contribute
+            found = 0
+            for done in range(len(items)):
+                if done not in counts:
+                    break
+                found += counts[done]
+                if found >= limit:
+                    for later in stops[done + 1:]:
+                        later.set()
+                    break
+        return result
+
+    results: dict[int, dict[str, Any]] = {}
+    if items:
+        with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="rawlogs-search") as pool:
+            futures = {pool.submit(scan, index): index for index in range(len(items))}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None:
+                    results[futures[future]] = result
+    errors = [result["error"] for result in results.values() if result["error"]]
+    if results and not any(result["matches"] for result in results.values()) and len(errors) == len(results):
+        raise HTTPException(status_code=502, detail=errors[0])
+
     matches: list[dict[str, Any]] = []
-    scanned = 0
-    for item in iter_rawlog_objects(normalized_bucket, normalized_prefix, object_limit):
-        scanned += 1
-        text_payload = read_rawlog_text(normalized_bucket, item["key"], max_bytes)
-        lines = text_payload["text"].splitlines() or [text_payload["text"]]
-        for line_number, line in enumerate(lines, start=1):
-            position = line.lower().find(lowered_query)
-            if position < 0:
-                continue
-            start = max(0, position - 90)
-            end = min(len(line), position + len(query) + 160)
-            matches.append({"key": item["key"], "uri": item["uri"], "line": line_number, "snippet": line[start:end], "size": item["size"], "last_modified": item["last_modified"], "truncated_object": text_payload["truncated"]})
-            if len(matches) >= limit:
-                return {"bucket": normalized_bucket, "prefix": normalized_prefix, "query": query, "scanned_objects": scanned, "matches": matches, "truncated": True}
-    return {"bucket": normalized_bucket, "prefix": normalized_prefix, "query": query, "scanned_objects": scanned, "matches": matches, "truncated": False}
+    objects: list[dict[str, Any]] = []
+    for index in sorted(results):
+        item, result = items[index], results[index]
+        for match in result["matches"]:
+            matches.append({"key": item["key"], "uri": item["uri"], "line": match["line"], "snippet": match["snippet"], "size": item["size"], "last_modified": item["last_modified"], "truncated_object": result["truncated"]})
+        objects.append({"key": item["key"], "size": item["size"], "compression": result["compression"], "decoded_bytes": result["decoded_bytes"], "matches": len(result["matches"]), "elapsed_ms": result["elapsed_ms"], "decoded_mb_per_s": result["decoded_mb_per_s"], "truncated": result["truncated"], "stopped_early": result["stopped_early"], "error": result["error"]})
+    return {
+        "bucket": normalized_bucket, "prefix": normalized_prefix, "query": query,
+        "scanned_objects": len(results), "listed_objects": len(items), "matches": matches[:limit], "truncated": len(matches) >= limit,
+        "workers": min(workers, len(items)) if items else 0, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "decoded_bytes": sum(result["decoded_bytes"] for result in results.values()), "objects": objects,
+    }
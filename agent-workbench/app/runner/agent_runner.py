@@ -17,7 +17,7 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable
 
-from . import config, workspace
+from . import config, sandbox_sync, workspace
 from .sandbox_client import SandboxClient, SandboxError
 from .session import PersistentSession
 
@@ -286,13 +286,9 @@ def send_message(
 
     client = SandboxClient()
     sandbox_root = "/tmp/workspace"
-    _upload_runner_scripts(client, session.sandbox_id, sandbox_root)
-
-    client.write_file(
-        session.sandbox_id,
-        f"{sandbox_root}/input/conversation.jsonl",
-        conversation_path.read_bytes(),
-    )
+    # 只上传沙箱里还没有的内容：runner 脚本、未变化的对话和资料按清单跳过
+    sync_targets = _runner_script_files(sandbox_root)
+    sync_targets.append((f"{sandbox_root}/input/conversation.jsonl", conversation_path))
 
     for item in extra_input_files or []:
         rel = str(item.get("path") or "").strip().lstrip("/")
@@ -303,8 +299,16 @@ def send_message(
             data = data.encode("utf-8")
         local_target = session.dirs["input"] / rel
         local_target.parent.mkdir(parents=True, exist_ok=True)
-        local_target.write_bytes(data)
-        client.write_file(session.sandbox_id, f"{sandbox_root}/input/{rel}", data)
+        if not local_target.exists() or local_target.read_bytes() != data:
+            local_target.write_bytes(data)
+        sync_targets.append((f"{sandbox_root}/input/{rel}", local_target))
+
+    sandbox_sync.sync_files(
+        client,
+        session.sandbox_id,
+        sync_targets,
+        manifest_path=session.workdir / sandbox_sync.MANIFEST_NAME,
+    )
 
     agent = config.agent_mode()
     argv = _sandbox_agent_argv(agent, sandbox_root)
@@ -535,34 +539,34 @@ def _agent_cli_argv(agent: str, dirs: dict[str, Path]) -> list[str]:
 # 沙箱执行（OpenSandbox Lifecycle + Execd）
 # ---------------------------------------------------------------------------
 
-def _upload_workspace_to_sandbox(client: SandboxClient, sandbox_id: str, workdir: Path, dirs: dict[str, Path]) -> None:
-    """上传 input/、skills/ 以及 runner 脚本到沙箱。"""
+def _upload_workspace_to_sandbox(client: SandboxClient, sandbox_id: str, workdir: Path, dirs: dict[str, Path]) -> dict[str, int]:
+    """同步 input/、skills/ 以及 runner 脚本到沙箱（按清单增量、并发上传）。"""
     sandbox_root = "/tmp/workspace"
 
+    files: list[tuple[str, Path]] = []
     for base in ("input", "skills"):
         base_dir = dirs[base]
         for file_path in sorted(base_dir.rglob("*")):
             if file_path.is_file():
                 rel = file_path.relative_to(workdir).as_posix()
-                client.write_file(sandbox_id, f"{sandbox_root}/{rel}", file_path.read_bytes())
+                files.append((f"{sandbox_root}/{rel}", file_path))
+    files.extend(_runner_script_files(sandbox_root))
 
-    _upload_runner_scripts(client, sandbox_id, sandbox_root)
+    return sandbox_sync.sync_files(client, sandbox_id, files, manifest_path=workdir / sandbox_sync.MANIFEST_NAME)
 
 
-def _upload_runner_scripts(client: SandboxClient, sandbox_id: str, sandbox_root: str) -> None:
-    """上传 fake_agent.py 和 codingplan_driver.py 到沙箱的 /workspace/runner/。"""
+def _runner_script_files(sandbox_root: str) -> list[tuple[str, Path]]:
+    """fake_agent.py / codingplan_driver.py / claude_acp_driver.py 在沙箱 runner/ 下的目标路径。"""
     scripts = [
         ("fake_agent.py", config.fake_agent_path()),
         ("codingplan_driver.py", config.codingplan_driver_path()),
         ("claude_acp_driver.py", config.claude_acp_driver_path()),
     ]
-    for filename, local_path in scripts:
-        if local_path.exists():
-            client.write_file(
-                sandbox_id,
-                f"{sandbox_root}/runner/{filename}",
-                local_path.read_bytes(),
-            )
+    return [
+        (f"{sandbox_root}/runner/{filename}", local_path)
+        for filename, local_path in scripts
+        if local_path.exists()
+    ]
 
 
 def _run_in_sandbox(context: dict[str, Any], *, event_sink: EventSink | None) -> AgentExecutionResult:
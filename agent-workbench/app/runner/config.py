@@ -88,6 +88,26 @@ def agent_exec_timeout_seconds() -> int:
     return max(10, min(value, 7200))
 
 
+def sandbox_sync_workers() -> int:
+    """并发上传到沙箱的文件数（同时也是 HTTP 连接池大小）。"""
+    raw = os.getenv("RUNNER_SANDBOX_SYNC_WORKERS", "8")
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 8
+    return max(1, min(value, 32))
+
+
+def sandbox_sync_tar_min_files() -> int:
+    """一次同步中至少有这么多个小文件变化时打成一个 tar 包上传后在沙箱内解压；0 表示关闭。"""
+    raw = os.getenv("RUNNER_SANDBOX_SYNC_TAR_MIN_FILES", "8")
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 8
+    return max(0, min(value, 10000))
+
+
 def credential_env() -> dict[str, str]:
     """收集需要注入 agent 运行时的凭证，调用方负责仅在执行瞬间使用、不落库。"""
     env: dict[str, str] = {}
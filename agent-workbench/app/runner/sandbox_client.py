@@ -4,6 +4,9 @@
 - Lifecycle：create / get / pause / resume / delete 沙箱
 - Execd：在沙箱内执行命令、读写文件
 
+所有请求复用同一个 requests.Session（连接池，支持并发上传），
+每个沙箱的 execd endpoint 查询一次后缓存，pause / resume / delete 时失效。
+
 凭证经环境变量在 exec 时注入，绝不写入持久层。
 """
 
@@ -12,6 +15,7 @@ from __future__ import annotations
 import base64
 import json
 import os
+import threading
 import time
 from typing import Any, Callable
 from urllib.parse import urlencode, urlsplit, urlunsplit
@@ -34,12 +38,40 @@ def _requests():
 
 
 class SandboxClient:
-    def __init__(self, base_url: str | None = None, api_key: str | None = None, timeout: int = 60) -> None:
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        timeout: int = 60,
+        pool_size: int | None = None,
+    ) -> None:
         self.base_url = (base_url or config.sandbox_url()).rstrip("/")
         self.api_key = api_key or config.sandbox_api_key()
         self.timeout = timeout
+        self.pool_size = pool_size or config.sandbox_sync_workers()
         if not self.base_url:
             raise SandboxError("OPEN_SANDBOX_URL is not configured")
+        self._session = None
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, tuple[str, dict[str, str]]] = {}
+
+    def _http(self):
+        """Shared requests.Session sized for ``pool_size`` concurrent requests."""
+        with self._lock:
+            if self._session is None:
+                requests = _requests()
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def close(self) -> None:
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
 
     def _headers(self) -> dict[str, str]:
         headers = {"Content-Type": "application/json"}
@@ -53,7 +85,7 @@ class SandboxClient:
         requests = _requests()
         url = f"{self.base_url}{path}"
         try:
-            response = requests.request(
+            response = self._http().request(
                 method,
                 url,
                 headers=self._headers(),
@@ -72,6 +104,9 @@ class SandboxClient:
             return {"raw": response.text}
 
     def _execd_endpoint(self, sandbox_id: str) -> tuple[str, dict[str, str]]:
+        cached = self._endpoints.get(sandbox_id)
+        if cached is not None:
+            return cached
         result = self._request("GET", f"/sandboxes/{sandbox_id}/endpoints/44772?use_server_proxy=false")
         endpoint = str((result or {}).get("endpoint") or "").strip()
         if not endpoint:
@@ -80,7 +115,9 @@ class SandboxClient:
             endpoint = f"http://{endpoint}"
         endpoint = self._apply_execd_host_override(endpoint)
         headers = result.get("headers") if isinstance(result, dict) else None
-        return endpoint.rstrip("/"), {str(k): str(v) for k, v in (headers or {}).items()}
+        resolved = endpoint.rstrip("/"), {str(k): str(v) for k, v in (headers or {}).items()}
+        self._endpoints[sandbox_id] = resolved
+        return resolved
 
     def _apply_execd_host_override(self, endpoint: str) -> str:
         override = (os.getenv("OPEN_SANDBOX_EXECD_HOST_OVERRIDE") or "").strip()
@@ -98,7 +135,7 @@ class SandboxClient:
         headers = {"Content-Type": "application/json", **endpoint_headers}
         url = f"{base_url}{path}"
         try:
-            response = requests.request(
+            response = self._http().request(
                 method,
                 url,
                 headers=headers,
@@ -164,12 +201,15 @@ class SandboxClient:
         return self._request("GET", f"/sandboxes/{sandbox_id}")
 
     def pause_sandbox(self, sandbox_id: str) -> dict[str, Any]:
+        self._endpoints.pop(sandbox_id, None)
         return self._request("POST", f"/sandboxes/{sandbox_id}/pause")
 
     def resume_sandbox(self, sandbox_id: str) -> dict[str, Any]:
+        self._endpoints.pop(sandbox_id, None)
         return self._request("POST", f"/sandboxes/{sandbox_id}/resume")
 
     def delete_sandbox(self, sandbox_id: str) -> dict[str, Any]:
+        self._endpoints.pop(sandbox_id, None)
         return self._request("DELETE", f"/sandboxes/{sandbox_id}")
 
     # --- Execd -------------------------------------------------------------
@@ -201,7 +241,7 @@ class SandboxClient:
         stderr_chunks: list[str] = []
         returncode = 0
         try:
-            with requests.post(
+            with self._http().post(
                 url,
                 headers={"Content-Type": "application/json", **endpoint_headers},
                 data=json.dumps(payload),
@@ -270,7 +310,7 @@ class SandboxClient:
             ("file", (path.rsplit("/", 1)[-1] or "file", data, "application/octet-stream")),
         ]
         try:
-            response = requests.post(url, headers=endpoint_headers, files=files, timeout=self.timeout)
+            response = self._http().post(url, headers=endpoint_headers, files=files, timeout=self.timeout)
         except requests.RequestException as exc:
             raise SandboxError(f"POST {url} failed: {exc}") from exc
         if response.status_code >= 400:
@@ -282,7 +322,7 @@ class SandboxClient:
         base_url, endpoint_headers = self._execd_endpoint(sandbox_id)
         url = f"{base_url}/files/download?{urlencode({'path': path})}"
         try:
-            response = requests.get(url, headers=endpoint_headers, timeout=self.timeout)
+            response = self._http().get(url, headers=endpoint_headers, timeout=self.timeout)
         except requests.RequestException as exc:
             raise SandboxError(f"GET {url} failed: {exc}") from exc
         if response.status_code >= 400:
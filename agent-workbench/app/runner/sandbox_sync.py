@@ -0,0 +1,170 @@
+"""工作目录 → 沙箱的增量同步。
+
+每个会话工作目录下保存一份清单（.sandbox_manifest.json），记录已上传到某个沙箱的
+每个文件的 SHA-256、大小和 mtime：
+
+- 大小 + mtime 与清单一致的文件直接跳过，不重新计算摘要；
+- 内容摘要与清单一致的文件跳过上传（如每轮重写但内容未变的 conversation.jsonl）；
+- 其余文件通过 SandboxClient 的连接池并发上传；
+- 变化的小文件达到 RUNNER_SANDBOX_SYNC_TAR_MIN_FILES 个时打成一个 tar.gz 上传，
+  在沙箱内一次解压；解压失败时退回逐个上传。
+
+清单按 sandbox_id 区分，换了沙箱即全量上传；只记录确认上传成功的文件。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shlex
+import tarfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from . import config
+from .sandbox_client import SandboxClient, SandboxError
+
+MANIFEST_NAME = ".sandbox_manifest.json"
+TAR_MAX_FILE_BYTES = 1024 * 1024
+TAR_MAX_BUNDLE_BYTES = 16 * 1024 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path: Path | None, sandbox_id: str) -> dict[str, dict[str, Any]]:
+    if manifest_path is None or not manifest_path.exists():
+        return {}
+    try:
+        data = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("sandbox_id") != sandbox_id:
+        return {}
+    files = data.get("files")
+    return files if isinstance(files, dict) else {}
+
+
+def save_manifest(manifest_path: Path | None, sandbox_id: str, files: dict[str, dict[str, Any]]) -> None:
+    if manifest_path is None:
+        return
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_name(f"{manifest_path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"sandbox_id": sandbox_id, "files": files}, sort_keys=True), encoding="utf-8")
+    tmp.replace(manifest_path)
+
+
+def sync_files(
+    client: SandboxClient,
+    sandbox_id: str,
+    files: list[tuple[str, Path]],
+    *,
+    manifest_path: Path | None = None,
+    workers: int | None = None,
+    tar_min_files: int | None = None,
+) -> dict[str, int]:
+    """Upload ``(remote_path, local_path)`` pairs whose content the sandbox does not have yet."""
+    workers = workers or config.sandbox_sync_workers()
+    tar_min_files = config.sandbox_sync_tar_min_files() if tar_min_files is None else tar_min_files
+    manifest = load_manifest(manifest_path, sandbox_id)
+    stats = {"files": len(files), "skipped": 0, "uploaded": 0, "bundled": 0, "bytes": 0}
+
+    pending: list[tuple[str, Path, dict[str, Any]]] = []
+    for remote, local in files:
+        stat = local.stat()
+        known = manifest.get(remote)
+        if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+            stats["skipped"] += 1
+            continue
+        entry = {"sha256": file_digest(local), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if known and known.get("sha256") == entry["sha256"]:
+            manifest[remote] = entry
+            stats["skipped"] += 1
+            continue
+        pending.append((remote, local, entry))
+
+    try:
+        small = [item for item in pending if item[2]["size"] <= TAR_MAX_FILE_BYTES]
+        if tar_min_files and len(small) >= tar_min_files:
+            bundled: set[str] = set()
+            for bundle in _bundles(small):
+                if _upload_bundle(client, sandbox_id, bundle):
+                    for remote, _, entry in bundle:
+                        manifest[remote] = entry
+                        bundled.add(remote)
+                        stats["bundled"] += 1
+                        stats["bytes"] += entry["size"]
+            pending = [item for item in pending if item[0] not in bundled]
+
+        def upload(item: tuple[str, Path, dict[str, Any]]) -> tuple[str, dict[str, Any]]:
+            remote, local, entry = item
+            client.write_file(sandbox_id, remote, local.read_bytes())
+            return remote, entry
+
+        errors: list[BaseException] = []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1))) as pool:
+            futures = [pool.submit(upload, item) for item in pending]
+            for future in futures:
+                try:
+                    remote, entry = future.result()
+                except Exception as exc:
+                    errors.append(exc)
+                    continue
+                manifest[remote] = entry
+                stats["uploaded"] += 1
+                stats["bytes"] += entry["size"]
+        if errors:
+            raise errors[0]
+    finally:
+        save_manifest(manifest_path, sandbox_id, manifest)
+    return stats
+
+
+def _bundles(items: list[tuple[str, Path, dict[str, Any]]]):
+    bundle: list[tuple[str, Path, dict[str, Any]]] = []
+    size = 0
+    for item in items:
+        if bundle and size + item[2]["size"] > TAR_MAX_BUNDLE_BYTES:
+            yield bundle
+            bundle, size = [], 0
+        bundle.append(item)
+        size += item[2]["size"]
+    if bundle:
+        yield bundle
+
+
+def _upload_bundle(client: SandboxClient, sandbox_id: str, bundle: list[tuple[str, Path, dict[str, Any]]]) -> bool:
+    """Upload one tar.gz and extract it at ``/``; False means fall back to per-file uploads."""
+    buffer = io.BytesIO()
+    now = time.time()
+    with tarfile.open(fileobj=buffer, mode="w:gz", compresslevel=1) as tar:
+        for remote, local, _ in bundle:
+            data = local.read_bytes()
+            info = tarfile.TarInfo(remote.lstrip("/"))
+            info.size = len(data)
+            info.mode = 0o755
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+    archive = f"/tmp/.workbench-sync-{uuid.uuid4().hex[:12]}.tar.gz"
+    quoted = shlex.quote(archive)
+    try:
+        client.write_file(sandbox_id, archive, buffer.getvalue())
+        result = client.exec_command(
+            sandbox_id,
+            ["sh", "-c", f"tar -xzf {quoted} -C / && rm -f {quoted}"],
+            timeout=300,
+        )
+    except SandboxError:
+        return False
+    return int(result.get("returncode") or result.get("exit_code") or 0) == 0
@@ -1,6 +1,10 @@
 import json
 import time
-from datetime import datetime, timedelta, timezone
+from bisect import bisect_left
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any
 from zoneinfo import ZoneInfo
 
@@ -17,35 +21,190 @@ def log_event(event: str, payload: dict[str, Any]) -> None:
     print(json.dumps({"event": event, "at": utc_now_iso(), **payload}, ensure_ascii=False, sort_keys=True), flush=True)
 
 
-def cron_field_matches(field: str, value: int) -> bool:
-    field = field.strip()
-    if field == "*":
-        return True
-    return any(part.strip().isdigit() and int(part.strip()) == value for part in field.split(","))
+CRON_FIELDS = (
+    # name, low, high, aliases
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day", 1, 31, {}),
+    ("month", 1, 12, {name: i for i, name in enumerate(
+        ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"), start=1)}),
+    ("weekday", 0, 7, {name: i for i, name in enumerate(("SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"))}),
+)
+# A satisfiable expression fires at least once in any 28 consecutive years
+# (Feb 29 on a given weekday repeats every 28 years)
+CRON_SEARCH_YEARS = 28
 
 
-def cron_matches(expr: str, dt: datetime) -> bool:
-    parts = expr.split()
+@dataclass(frozen=True)
+class CronSpec:
+    """A parsed 5-field cron expression: the allowed values of every field, sorted.
+
+    Every field must match, day-of-month and day-of-week included, as the
+    scheduler has always evaluated stored schedules (``0 0 13 * 5`` is only
+    Friday the 13th, not Vixie cron's "the 13th or any Friday").
+    """
+
+    minutes: tuple[int, ...]
+    hours: tuple[int, ...]
+    days: tuple[int, ...]
+    months: tuple[int, ...]
+    weekdays: tuple[int, ...]  # 0 = Sunday
+
+    def day_matches(self, year: int, month: int, day: int) -> bool:
+        return day in self.days and (date(year, month, day).weekday() + 1) % 7 in self.weekdays
+
+    def matches(self, dt: datetime) -> bool:
+        return (
+            dt.minute in self.minutes
+            and dt.hour in self.hours
+            and dt.month in self.months
+            and self.day_matches(dt.year, dt.month, dt.day)
+        )
+
+
+def _parse_value(token: str, low: int, high: int, aliases: dict[str, int]) -> int:
+    token = token.strip().upper()
+    value = aliases.get(token)
+    if value is None:
+        if not token.isdigit():
+            raise ValueError(f"invalid cron value: {token!r}")
+        value = int(token)
+    if not low <= value <= high:
+        raise ValueError(f"cron value {value} out of range {low}-{high}")
+    return value
+
+
+def _parse_field(field: str, low: int, high: int, aliases: dict[str, int] | None = None) -> set[int]:
+    """Expand one cron field (``*``, ``a``, ``a-b``, ``*/s``, ``a-b/s``, ``a/s``, lists) into a set."""
+    aliases = aliases or {}
+    values: set[int] = set()
+    for part in field.split(","):
+        part = part.strip()
+        base, _, step_text = part.partition("/")
+        step = 1
+        if step_text:
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"invalid cron step: {part!r}")
+            step = int(step_text)
+        if base == "*":
+            start, stop = low, high
+        elif "-" in base:
+            first, _, last = base.partition("-")
+            start, stop = _parse_value(first, low, high, aliases), _parse_value(last, low, high, aliases)
+            if start > stop:
+                raise ValueError(f"invalid cron range: {part!r}")
+        else:
+            start = _parse_value(base, low, high, aliases)
+            stop = high if step_text else start
+        values.update(range(start, stop + 1, step))
+    return values
+
+
+@lru_cache(maxsize=512)
+def parse_cron(expr: str) -> CronSpec:
+    """Parse once per distinct expression; every schedule row with that expression shares it."""
+    parts = str(expr).split()
     if len(parts) != 5:
-        return False
-    minute, hour, day, month, weekday = parts
-    cron_weekday = (dt.weekday() + 1) % 7
-    return (
-        cron_field_matches(minute, dt.minute)
-        and cron_field_matches(hour, dt.hour)
-        and cron_field_matches(day, dt.day)
-        and cron_field_matches(month, dt.month)
-        and cron_field_matches(weekday, cron_weekday)
+        raise ValueError(f"cron expression must have 5 fields: {expr!r}")
+    fields = [_parse_field(part, low, high, aliases) for part, (_, low, high, aliases) in zip(parts, CRON_FIELDS)]
+    weekdays = fields[4]
+    if 7 in weekdays:
+        weekdays = (weekdays - {7}) | {0}
+    return CronSpec(
+        minutes=tuple(sorted(fields[0])),
+        hours=tuple(sorted(fields[1])),
+        days=tuple(sorted(fields[2])),
+        months=tuple(sorted(fields[3])),
+        weekdays=tuple(sorted(weekdays)),
     )
 
 
+@lru_cache(maxsize=64)
+def _zone(tz_name: str) -> ZoneInfo:
+    return ZoneInfo(tz_name or "UTC")
+
+
+def cron_field_matches(field: str, value: int, low: int = 0, high: int = 59) -> bool:
+    try:
+        return value in _parse_field(field, low, high)
+    except ValueError:
+        return False
+
+
+def cron_matches(expr: str, dt: datetime) -> bool:
+    try:
+        spec = parse_cron(expr)
+    except ValueError:
+        return False
+    return spec.matches(dt)
+
+
+def _first_at_least(values: tuple[int, ...], value: int) -> int | None:
+    index = bisect_left(values, value)
+    return values[index] if index < len(values) else None
+
+
+def _next_day(spec: CronSpec, year: int, month: int, day: int) -> int | None:
+    """First day >= ``day`` in this month matching day-of-month and day-of-week, or None."""
+    last = monthrange(year, month)[1]
+    for candidate in spec.days[bisect_left(spec.days, day):]:
+        if candidate > last:
+            break
+        if spec.day_matches(year, month, candidate):
+            return candidate
+    return None
+
+
+def next_local_match(spec: CronSpec, start: datetime) -> datetime:
+    """First wall-clock minute >= ``start`` (naive) matching ``spec``, field by field."""
+    year, month, day, hour, minute = start.year, start.month, start.day, start.hour, start.minute
+    while year <= start.year + CRON_SEARCH_YEARS:
+        found_month = _first_at_least(spec.months, month)
+        if found_month is None:
+            year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+            continue
+        if found_month != month:
+            month, day, hour, minute = found_month, 1, 0, 0
+        found_day = _next_day(spec, year, month, day)
+        if found_day is None:
+            month, day, hour, minute = month + 1, 1, 0, 0
+            continue
+        if found_day != day:
+            day, hour, minute = found_day, 0, 0
+        found_hour = _first_at_least(spec.hours, hour)
+        if found_hour is None:
+            day, hour, minute = day + 1, 0, 0
+            continue
+        if found_hour != hour:
+            hour, minute = found_hour, 0
+        found_minute = _first_at_least(spec.minutes, minute)
+        if found_minute is None:
+            hour, minute = hour + 1, 0
+            continue
+        return datetime(year, month, day, hour, found_minute)
+    raise ValueError("no matching time")
+
+
 def next_run_after(expr: str, tz_name: str, after_utc: datetime) -> datetime:
-    tz = ZoneInfo(tz_name or "UTC")
-    candidate = after_utc.astimezone(tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
-    for _ in range(366 * 24 * 60):
-        if cron_matches(expr, candidate):
-            return candidate.astimezone(timezone.utc)
-        candidate += timedelta(minutes=1)
+    """Next fire time strictly after ``after_utc``, as an aware UTC datetime.
+
+    Fields are evaluated on the schedule's wall clock. A wall time skipped by a
+    DST jump fires at the equivalent instant after the jump; a repeated wall
+    time fires once (its first occurrence).
+    """
+    spec = parse_cron(expr)
+    tz = _zone(tz_name)
+    local = after_utc.astimezone(tz).replace(second=0, microsecond=0, tzinfo=None) + timedelta(minutes=1)
+    for _ in range(4):
+        try:
+            found = next_local_match(spec, local)
+        except ValueError:
+            break
+        for fold in (0, 1):
+            at = found.replace(tzinfo=tz, fold=fold).astimezone(timezone.utc)
+            if at > after_utc:
+                return at
+        local = found + timedelta(minutes=1)
     raise ValueError(f"cannot find next run for cron expression: {expr}")
 
 
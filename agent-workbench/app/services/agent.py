@@ -18,6 +18,7 @@ from fastapi import HTTPException
 
 from ..runner import PersistentSession, send_message
 from ..runner import config as runner_config
+from .agent_events import get_hub
 from .artifacts import artifacts
 from .core import (
     content_type_for_filename,
@@ -971,20 +972,24 @@ def stream_agent_events_tail(
     complete_on_timeout: bool = True,
 ):
     deadline = time.monotonic() + max_wait_seconds
-    while time.monotonic() < deadline:
-        with db_conn() as conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                events = fetch_all(
-                    cur,
-                    "SELECT * FROM agent_events WHERE session_id = %s AND seq > %s ORDER BY seq ASC LIMIT 200",
-                    (session_id, last_seen_seq),
-                )
-        for event in events:
-            yield sse(event)
-            last_seen_seq = max(last_seen_seq, int(event["seq"]))
-            if event.get("event_type") in {"run.completed", "run.error"}:
-                return
-        time.sleep(0.5)
+    # Subscribe before the catch-up read so nothing committed in between is missed
+    with get_hub().subscribe(session_id) as subscription:
+        while time.monotonic() < deadline:
+            with db_conn() as conn:
+                with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                    events = fetch_all(
+                        cur,
+                        "SELECT * FROM agent_events WHERE session_id = %s AND seq > %s ORDER BY seq ASC LIMIT 200",
+                        (session_id, last_seen_seq),
+                    )
+            for event in events:
+                yield sse(event)
+                last_seen_seq = max(last_seen_seq, int(event["seq"]))
+                if event.get("event_type") in {"run.completed", "run.error"}:
+                    return
+            if len(events) < 200:
+                remaining = deadline - time.monotonic()
+                subscription.wait(last_seen_seq, min(remaining, subscription.wait_timeout()))
     if not complete_on_timeout:
         return
     with db_conn() as conn:
@@ -0,0 +1,271 @@
+"""agent_events 推送通道：Postgres LISTEN/NOTIFY → 进程内订阅队列。
+
+insert_agent_event() 在写入事件的同一事务里 pg_notify('agent_events', '<session_id>:<seq>')，
+事务提交后 Postgres 才投递通知。每个 API 进程只有一个监听线程，持有一条专用连接
+（不占连接池）执行 LISTEN，收到通知后按 session_id 把 seq 放进订阅者的内存队列。
+
+- SSE 生成器先订阅、再按 seq 补读一次，之后只在收到通知时才查库，空闲时不查库；
+- 监听连接断开时唤醒所有订阅者补读，重连期间订阅者退回 0.5 秒轮询；
+- 连接正常时订阅者仍每隔 WORKBENCH_AGENT_EVENTS_RESYNC_SECONDS 秒兜底补读一次；
+- WORKBENCH_AGENT_EVENTS_NOTIFY=0 关闭推送，完全回到轮询；
+- fork 之后子进程新建 hub，不使用父进程的监听连接。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from typing import Any, Callable
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "agent_events"
+FALLBACK_POLL_SECONDS = 0.5
+
+
+def notify_enabled() -> bool:
+    return os.getenv("WORKBENCH_AGENT_EVENTS_NOTIFY", "1").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def notify_payload(session_id: str, seq: int) -> str:
+    return f"{session_id}:{seq}"
+
+
+def parse_payload(payload: str) -> tuple[str, int] | None:
+    session_id, sep, seq = (payload or "").rpartition(":")
+    if not sep or not session_id:
+        return None
+    try:
+        return session_id, int(seq)
+    except ValueError:
+        return None
+
+
+class Subscription:
+    """One SSE stream's view of a session: a queue of announced seqs."""
+
+    def __init__(self, hub: AgentEventHub, session_id: str) -> None:
+        self.hub = hub
+        self.session_id = session_id
+        self.queue: queue.Queue[int | None] = queue.Queue()
+
+    def wait(self, after_seq: int, timeout: float) -> bool:
+        """Block until an event newer than ``after_seq`` is announced.
+
+        Returns True when the caller should query now (new event, or the
+        listener reconnected), False when ``timeout`` elapsed quietly.
+        Announcements for seqs already read are dropped.
+        """
+        deadline = time.monotonic() + max(timeout, 0.0)
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                seq = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                return False
+            if seq is None or seq > after_seq:
+                self._drain()
+                return True
+
+    def wait_timeout(self) -> float:
+        return self.hub.wait_timeout()
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class AgentEventHub:
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        enabled: bool = True,
+        resync_seconds: float = 15.0,
+        reconnect_max_seconds: float = 30.0,
+        connect: Callable[[str], Any] = psycopg2.connect,
+    ) -> None:
+        self.dsn = dsn
+        self.enabled = enabled
+        self.resync_seconds = resync_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._counters = {"notifications": 0, "dispatched": 0, "connects": 0, "errors": 0}
+
+    # -- subscribers ----------------------------------------------------------
+
+    def subscribe(self, session_id: str) -> Subscription:
+        subscription = Subscription(self, session_id)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(subscription.session_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.session_id]
+
+    def wait_timeout(self) -> float:
+        """How long a subscriber may block before re-querying on its own."""
+        return self.resync_seconds if self._connected.is_set() else FALLBACK_POLL_SECONDS
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def dispatch(self, session_id: str, seq: int | None) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(session_id, ()))
+            self._counters["dispatched"] += len(subs)
+        for subscription in subs:
+            subscription.queue.put(seq)
+
+    def wake_all(self) -> None:
+        """Make every subscriber re-query (notifications may have been missed)."""
+        with self._lock:
+            subs = [s for group in self._subscribers.values() for s in group]
+        for subscription in subs:
+            subscription.queue.put(None)
+
+    # -- metrics / lifecycle ---------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "connected": self._connected.is_set(),
+                "sessions": len(self._subscribers),
+                "subscribers": sum(len(group) for group in self._subscribers.values()),
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    # -- listener thread ----------------------------------------------------------
+
+    def _ensure_listener(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="agent-events-listener", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        backoff = FALLBACK_POLL_SECONDS
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect(self.dsn)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                with self._lock:
+                    self._counters["connects"] += 1
+                self._connected.set()
+                backoff = FALLBACK_POLL_SECONDS
+                # Events committed before LISTEN took effect were never announced
+                self.wake_all()
+                self._listen(conn)
+            except Exception as exc:
+                with self._lock:
+                    self._counters["errors"] += 1
+                logger.warning("agent_events listener disconnected: %s", exc)
+            finally:
+                self._connected.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if self._stop.is_set():
+                break
+            # Subscribers switch to fallback polling until the listener is back
+            self.wake_all()
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.reconnect_max_seconds)
+
+    def _listen(self, conn: Any) -> None:
+        last_traffic = time.monotonic()
+        while not self._stop.is_set():
+            readable, _, _ = select.select([conn], [], [], 1.0)
+            if readable:
+                conn.poll()
+                last_traffic = time.monotonic()
+            elif time.monotonic() - last_traffic >= self.resync_seconds:
+                # Idle: a cheap ping every resync interval surfaces a dead socket
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                last_traffic = time.monotonic()
+            # Either branch may have read notifications (psycopg2 queues the
+            # ones that arrive with the ping's reply), so drain every iteration
+            self._drain(conn)
+
+    def _drain(self, conn: Any) -> None:
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            parsed = parse_payload(notify.payload)
+            with self._lock:
+                self._counters["notifications"] += 1
+            if parsed is not None:
+                self.dispatch(*parsed)
+
+
+_hub: AgentEventHub | None = None
+_hub_pid = os.getpid()
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> AgentEventHub:
+    """The process-wide hub (created on first use, recreated after fork)."""
+    global _hub, _hub_pid
+    from .core import DATABASE_URL, env_int
+
+    with _hub_lock:
+        if _hub is None or os.getpid() != _hub_pid:
+            _hub = AgentEventHub(
+                DATABASE_URL,
+                enabled=notify_enabled(),
+                resync_seconds=env_int("WORKBENCH_AGENT_EVENTS_RESYNC_SECONDS", 15, minimum=1, maximum=600),
+            )
+            _hub_pid = os.getpid()
+        return _hub
+
+
+def hub_stats() -> dict[str, Any]:
+    with _hub_lock:
+        hub = _hub if os.getpid() == _hub_pid else None
+    return hub.stats() if hub is not None else {"enabled": notify_enabled(), "connected": False}
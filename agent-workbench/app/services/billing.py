@@ -277,6 +277,8 @@ def build_athena_bill_command(job: dict[str, Any], run: dict[str, Any], config:
     args.append("--detail")
     if metadata.get("customer_view") or bill_type == "customer_invoice":
         args.append("--customer-view")
+    if metadata.get("detail_format") == "parquet":
+        args.extend(["--detail-format", "parquet"])
     if metadata.get("split_customers") is False:
         args.append("--no-split-customers")
     if bill_type in {"internal_customer_bill", "channel_cost_bill", "customer_invoice"}:
@@ -543,6 +545,7 @@ def parse_split_artifact_entity_from_filename(name: str) -> tuple[str, str] | No
         or basename.endswith(".csv")
         or basename.endswith(".zip")
         or basename.endswith(".csv.zip")
+        or basename.endswith(".parquet")
     ):
         return None
     user_match = re.search(r"_user(\d+)", basename, re.I)
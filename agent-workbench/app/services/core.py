@@ -15,10 +15,12 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-import psycopg2
 import psycopg2.extras
 from fastapi import HTTPException
 
+from .agent_events import CHANNEL as AGENT_EVENTS_CHANNEL, notify_enabled, notify_payload
+from .dbpool import get_pool
+
 
 APP_ROOT = Path(__file__).resolve().parent.parent
 WORKBENCH_ROOT = APP_ROOT.parent
@@ -102,15 +104,15 @@ def checksum_config(pricing: dict[str, Any], discounts: dict[str, Any]) -> str:
 
 @contextmanager
 def db_conn():
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
+    # 从进程级连接池借出；成功提交、异常回滚的约定不变
+    with get_pool(DATABASE_URL).connection() as conn:
+        yield conn
+
+
+def db_session():
+    """FastAPI 依赖：每个请求借出一条连接，处理函数返回后提交并归还。"""
+    with db_conn() as conn:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def fetch_one(cur, query: str, args: tuple[Any, ...] = ()) -> dict[str, Any] | None:
@@ -485,7 +487,11 @@ def insert_agent_event(
         """,
         (event_id, session_id, event_type, role, content, psycopg2.extras.Json(payload or {})),
     )
-    return dict(cur.fetchone())
+    event = dict(cur.fetchone())
+    if notify_enabled():
+        # Delivered on commit, so listeners never see an event they cannot read yet
+        cur.execute("SELECT pg_notify(%s, %s)", (AGENT_EVENTS_CHANNEL, notify_payload(session_id, event["seq"])))
+    return event
 
 
 def ensure_agent_session(cur, session_id: str) -> dict[str, Any]:
@@ -0,0 +1,289 @@
+"""进程级 Postgres 连接池。
+
+API 路由、worker、scheduler 都通过 core.db_conn() 从这里借连接，
+不再每次 psycopg2.connect（TCP + 认证握手）。
+
+- 连接按 DSN 分池，池大小 / 等待超时 / 健康检查由 WORKBENCH_DB_POOL_* 配置；
+- 闲置超过 health_check_after 秒的连接借出前先 SELECT 1，坏连接直接丢弃重建；
+- 归还时事务必须已提交/回滚（IDLE），否则丢弃，不把半截事务交给下一个请求；
+- fork 之后（uvicorn workers 等）子进程建新池，不触碰父进程的 socket；
+- stats() 暴露借出等待时间、利用率等指标（/health 返回）。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 30.0,
+        health_check_after: float = 30.0,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        connect: Callable[[str], Any] = psycopg2.connect,
+    ) -> None:
+        self.dsn = dsn
+        self.maxconn = max(1, maxconn)
+        self.minconn = max(0, min(minconn, self.maxconn))
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self._connect = connect
+        self._cond = threading.Condition()
+        # (conn, created_at, idle_since), most recently returned last
+        self._idle: list[tuple[Any, float, float]] = []
+        self._created_at: dict[int, float] = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # -- checkout / return ------------------------------------------------
+
+    def getconn(self) -> Any:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            conn, created_at, idle_since, reserve = self._reserve(deadline)
+            if reserve:
+                try:
+                    conn = self._connect(self.dsn)
+                except BaseException:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._counters["created"] += 1
+                    self._created_at[id(conn)] = time.monotonic()
+            elif not self._usable(conn, created_at, idle_since):
+                self._discard(conn)
+                continue
+            self._record_wait(time.monotonic() - started)
+            return conn
+
+    def putconn(self, conn: Any, discard: bool = False) -> None:
+        now = time.monotonic()
+        with self._cond:
+            created_at = self._created_at.get(id(conn), now)
+        if (
+            discard
+            or self._closed
+            or conn.closed
+            or conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            or (self.max_lifetime and now - created_at > self.max_lifetime)
+        ):
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, created_at, now))
+            stale = self._trim_idle(now)
+            self._cond.notify()
+        for old in stale:
+            self._close_quietly(old)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection: commit on success, roll back on error, then return it."""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    # -- metrics ------------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._size - idle
+            checkouts = self._counters["checkouts"]
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "utilization": round(in_use / self.maxconn, 4),
+                "wait_ms_total": round(self._wait_total * 1000, 3),
+                "wait_ms_avg": round(self._wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                "wait_ms_max": round(self._wait_max * 1000, 3),
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    # -- internals ----------------------------------------------------------
+
+    def _reserve(self, deadline: float) -> tuple[Any, float, float, bool]:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    conn, created_at, idle_since = self._idle.pop()
+                    return conn, created_at, idle_since, False
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None, 0.0, 0.0, True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"no database connection available within {self.timeout:g}s "
+                        f"(pool max {self.maxconn}, {self._waiting} waiting)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _usable(self, conn: Any, created_at: float, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if now - idle_since < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._counters["health_check_failures"] += 1
+            return False
+
+    def _trim_idle(self, now: float) -> list[Any]:
+        # Called with the lock held; oldest idle connections sit at the front
+        stale = []
+        while (
+            self.max_idle
+            and self._idle
+            and self._size > self.minconn
+            and now - self._idle[0][2] > self.max_idle
+        ):
+            conn, _, _ = self._idle.pop(0)
+            self._size -= 1
+            self._counters["discarded"] += 1
+            self._created_at.pop(id(conn), None)
+            stale.append(conn)
+        return stale
+
+    def _record_wait(self, waited: float) -> None:
+        with self._cond:
+            self._counters["checkouts"] += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _discard(self, conn: Any) -> None:
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._counters["discarded"] += 1
+        self._close_quietly(conn)
+        self._release_slot()
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+# Pools inherited through fork: kept referenced so their sockets (shared with
+# the parent) are never closed or finalized from the child.
+_inherited: list[ConnectionPool] = []
+
+
+def pool_settings_from_env() -> dict[str, Any]:
+    from .core import env_int
+
+    return {
+        "minconn": env_int("WORKBENCH_DB_POOL_MIN", 1, minimum=0, maximum=64),
+        "maxconn": env_int("WORKBENCH_DB_POOL_MAX", 10, minimum=1, maximum=256),
+        "timeout": env_int("WORKBENCH_DB_POOL_TIMEOUT_SECONDS", 30, minimum=1, maximum=600),
+        "health_check_after": env_int("WORKBENCH_DB_POOL_HEALTHCHECK_SECONDS", 30, minimum=0, maximum=3600),
+        "max_lifetime": env_int("WORKBENCH_DB_POOL_MAX_LIFETIME_SECONDS", 1800, minimum=0, maximum=24 * 3600),
+        "max_idle": env_int("WORKBENCH_DB_POOL_MAX_IDLE_SECONDS", 300, minimum=0, maximum=24 * 3600),
+    }
+
+
+def get_pool(dsn: str) -> ConnectionPool:
+    """The process-wide pool for ``dsn`` (created on first use, recreated after fork)."""
+    global _pools_pid
+    with _pools_lock:
+        if os.getpid() != _pools_pid:
+            _inherited.extend(_pools.values())
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = ConnectionPool(dsn, **pool_settings_from_env())
+            _pools[dsn] = pool
+        return pool
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    """Metrics of every pool in this process, keyed by DSN without credentials."""
+    with _pools_lock:
+        pools = list(_pools.values()) if os.getpid() == _pools_pid else []
+    return {_redact(pool.dsn): pool.stats() for pool in pools}
+
+
+def _redact(dsn: str) -> str:
+    scheme, sep, rest = dsn.partition("://")
+    if sep and "@" in rest:
+        return f"{scheme}://{rest.rsplit('@', 1)[1]}"
+    return dsn
@@ -9,9 +9,17 @@ import io
 import os
 import re
 import sys
+import tempfile
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
+try:
+    import fcntl
+except ImportError:  # Windows: single-flight stays in-process only
+    fcntl = None
+
 if sys.stdout and sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
     sys.stdout.reconfigure(encoding="utf-8")
     sys.stderr.reconfigure(encoding="utf-8")
@@ -29,6 +37,8 @@ try:
     from cost_monitor import (
         log_query_cost as cost_log_query_cost,
         log_cache_hit as cost_log_cache_hit,
+        log_local_cache as cost_log_local_cache,
+        log_coalesced_query as cost_log_coalesced_query,
         get_total_cost,
         get_cost_summary,
         reset_tracking,
@@ -45,6 +55,12 @@ except ImportError:
     def cost_log_cache_hit(*args, **kwargs):
         pass
 
+    def cost_log_local_cache(*args, **kwargs):
+        pass
+
+    def cost_log_coalesced_query(*args, **kwargs):
+        pass
+
     def get_total_cost():
         return 0.0
 
@@ -71,6 +87,20 @@ CACHE_BUCKET = os.getenv("ATHENA_CACHE_BUCKET", RESULT_BUCKET)
 CACHE_PREFIX = os.getenv("ATHENA_CACHE_PREFIX", "athena-cache")
 REPORT_PREFIX = os.getenv("REPORT_S3_PREFIX", "billing-reports")
 
+# Local on-disk tier in front of the S3 cache. Set ATHENA_LOCAL_CACHE_MAX_MB=0
+# (or an empty ATHENA_LOCAL_CACHE_DIR) to disable it.
+LOCAL_CACHE_DIR = os.getenv(
+    "ATHENA_LOCAL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "athena-cache"),
+)
+LOCAL_CACHE_MAX_BYTES = int(float(os.getenv("ATHENA_LOCAL_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+# Cross-process single-flight lock files (one per cache key) and how long a
+# waiter blocks on another process's execution before running the query itself.
+SINGLE_FLIGHT_LOCK_DIR = os.getenv("ATHENA_SINGLE_FLIGHT_LOCK_DIR",
+                                   LOCAL_CACHE_DIR or tempfile.gettempdir())
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("ATHENA_SINGLE_FLIGHT_TIMEOUT", "1800"))
+
 AK = os.getenv("RAW_LOG_S3_ACCESS_KEY_ID", os.getenv("AWS_ACCESS_KEY_ID", ""))
 SK = os.getenv("RAW_LOG_S3_SECRET_ACCESS_KEY", os.getenv("AWS_SECRET_ACCESS_KEY", ""))
 
@@ -118,6 +148,75 @@ def _get_s3():
     return _s3_client
 
 
+# ---------------------------------------------------------------------------
+# Completion polling
+# ---------------------------------------------------------------------------
+
+# First status check happens after POLL_INITIAL_INTERVAL seconds; each later
+# wait grows by POLL_BACKOFF up to the caller's poll_interval cap. A KPI query
+# that finishes in ~1s is noticed within ~0.3s instead of a full interval.
+POLL_INITIAL_INTERVAL = float(os.getenv("ATHENA_POLL_INITIAL_INTERVAL", "0.2"))
+POLL_BACKOFF = 1.6
+_TERMINAL_STATES = ("SUCCEEDED", "FAILED", "CANCELLED")
+_BATCH_GET_LIMIT = 50  # batch_get_query_execution accepts at most 50 ids
+
+
+class _CompletionWaiter:
+    """Track a set of Athena executions until each reaches a terminal state.
+
+    Polls with exponential backoff (POLL_INITIAL_INTERVAL → max_interval) and
+    checks many executions per call via batch_get_query_execution.
+    """
+
+    def __init__(self, client, exec_ids: list[str], max_interval: float):
+        self.client = client
+        self.pending = dict.fromkeys(exec_ids)
+        self._delay = min(POLL_INITIAL_INTERVAL, max_interval)
+        self._max_interval = max_interval
+
+    def next_delay(self) -> float:
+        """Return the wait before the next status check and advance the backoff."""
+        delay = self._delay
+        self._delay = min(self._delay * POLL_BACKOFF, self._max_interval)
+        return delay
+
+    def poll(self) -> list[dict]:
+        """Check pending executions once; return the QueryExecutions that finished."""
+        ids = list(self.pending)
+        if len(ids) == 1:
+            executions = [self.client.get_query_execution(QueryExecutionId=ids[0])["QueryExecution"]]
+        else:
+            executions = []
+            for i in range(0, len(ids), _BATCH_GET_LIMIT):
+                resp = self.client.batch_get_query_execution(
+                    QueryExecutionIds=ids[i:i + _BATCH_GET_LIMIT])
+                # UnprocessedQueryExecutionIds stay pending and are retried next round
+                executions.extend(resp.get("QueryExecutions", []))
+
+        finished = []
+        for qe in executions:
+            exec_id = qe["QueryExecutionId"]
+            if exec_id in self.pending and qe["Status"]["State"] in _TERMINAL_STATES:
+                del self.pending[exec_id]
+                finished.append(qe)
+        return finished
+
+    def wait(self) -> list[dict]:
+        """Sleep for the next backoff interval, then poll."""
+        time.sleep(self.next_delay())
+        return self.poll()
+
+
+def _query_timings(qe: dict, download_ms: int) -> dict:
+    """Per-query timings: Athena queue time, engine time, and our result download."""
+    stats = qe.get("Statistics", {})
+    return {
+        "queue_ms": stats.get("QueryQueueTimeInMillis", 0),
+        "engine_ms": stats.get("EngineExecutionTimeInMillis", 0),
+        "download_ms": download_ms,
+    }
+
+
 # ---------------------------------------------------------------------------
 # Raw query execution
 # ---------------------------------------------------------------------------
@@ -125,7 +224,10 @@ def _get_s3():
 def run_query(sql: str, poll_interval: float = 1.5) -> dict:
     """Execute an Athena query and return structured results.
 
-    Returns dict with keys: headers, rows, row_count, scanned_bytes, exec_ms
+    poll_interval caps the backoff between status checks.
+
+    Returns dict with keys: headers, rows, row_count, scanned_bytes, exec_ms,
+    queue_ms, download_ms
     """
     client = _get_athena()
     resp = client.start_query_execution(
@@ -135,26 +237,29 @@ def run_query(sql: str, poll_interval: float = 1.5) -> dict:
     )
     exec_id = resp["QueryExecutionId"]
 
-    while True:
-        time.sleep(poll_interval)
-        status = client.get_query_execution(QueryExecutionId=exec_id)
-        state = status["QueryExecution"]["Status"]["State"]
-        if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
-            break
+    waiter = _CompletionWaiter(client, [exec_id], poll_interval)
+    finished = []
+    while not finished:
+        finished = waiter.wait()
+    qe = finished[0]
+    state = qe["Status"]["State"]
 
     if state != "SUCCEEDED":
-        reason = status["QueryExecution"]["Status"].get("StateChangeReason", "")
+        reason = qe["Status"].get("StateChangeReason", "")
         log_error(logger, "AthenaQueryError", f"Query {state}: {reason}",
                   query_id=exec_id, state=state)
         raise RuntimeError(f"Athena query {state}: {reason}")
 
-    stats = status["QueryExecution"]["Statistics"]
+    stats = qe["Statistics"]
     scanned = stats.get("DataScannedInBytes", 0)
     exec_ms = stats.get("EngineExecutionTimeInMillis", 0)
 
+    t0 = time.monotonic()
     headers, rows = _fetch_all_results(client, exec_id)
+    timings = _query_timings(qe, int((time.monotonic() - t0) * 1000))
 
-    log_query_complete(logger, exec_id, scanned, exec_ms, len(rows))
+    log_query_complete(logger, exec_id, scanned, exec_ms, len(rows),
+                       queue_ms=timings["queue_ms"], download_ms=timings["download_ms"])
 
     # Track query cost
     query_name = _extract_query_name(sql)
@@ -166,6 +271,8 @@ def run_query(sql: str, poll_interval: float = 1.5) -> dict:
         "row_count": len(rows),
         "scanned_bytes": scanned,
         "exec_ms": exec_ms,
+        "queue_ms": timings["queue_ms"],
+        "download_ms": timings["download_ms"],
     }
 
 
@@ -243,6 +350,11 @@ def run_query_df(sql: str, poll_interval: float = 1.5) -> pd.DataFrame:
         return pd.DataFrame()
     df = pd.DataFrame(result["rows"], columns=result["headers"])
     df = _auto_convert_types(df)
+    # Persisted with the cached Parquet, so coalesced callers can report the
+    # scan they avoided.
+    df.attrs["scanned_bytes"] = result["scanned_bytes"]
+    df.attrs["timings"] = {"queue_ms": result["queue_ms"], "engine_ms": result["exec_ms"],
+                           "download_ms": result["download_ms"]}
     return df
 
 
@@ -257,7 +369,7 @@ def _auto_convert_types(df: pd.DataFrame) -> pd.DataFrame:
 
 
 # ---------------------------------------------------------------------------
-# S3 cache layer
+# Cache layer: local disk (LRU) in front of S3
 # ---------------------------------------------------------------------------
 
 def _cache_key(sql: str) -> str:
@@ -270,6 +382,7 @@ def _infer_cache_ttl(sql: str) -> int | None:
     """Infer TTL in seconds based on the date partitions in the query.
 
     - Historical months (not current): None (permanent)
+    - Current month, only closed days (usage_compaction.is_closed): None
     - Current month but not today: 3600 (1 hour)
     - Today: 600 (10 minutes)
     - Cannot determine: 600 (10 minutes, conservative)
@@ -283,16 +396,25 @@ def _infer_cache_ttl(sql: str) -> int | None:
     month_match = re.search(r"month\s*=\s*'(\d{1,2})'", sql, re.IGNORECASE)
     day_match = re.search(r"day\s*=\s*'(\d{1,2})'", sql, re.IGNORECASE)
 
-    if not year_match or not month_match:
+    import queries
+    days = queries.query_partition_days(sql)
+    if days:
+        # Ranges may span months: the newest day read decides
+        q_year, q_month = days[-1][:4], days[-1][5:7]
+        day_match = re.match(r"\d{4}-\d{2}-(\d{2})", days[0]) if len(days) == 1 else None
+    elif not year_match or not month_match:
         return 600
-
-    q_year = year_match.group(1)
-    q_month = f"{int(month_match.group(1)):02d}"
+    else:
+        q_year = year_match.group(1)
+        q_month = f"{int(month_match.group(1)):02d}"
 
     if q_year < current_year or (q_year == current_year and q_month < current_month):
         return None  # permanent
 
     if q_year == current_year and q_month == current_month:
+        from usage_compaction import is_closed
+        if days and all(is_closed(day, now) for day in days):
+            return None  # closed days no longer change
         if day_match:
             q_day = f"{int(day_match.group(1)):02d}"
             if q_day == current_day:
@@ -304,8 +426,106 @@ def _infer_cache_ttl(sql: str) -> int | None:
     return 600
 
 
-def _cache_read(key: str, ttl: int | None) -> pd.DataFrame | None:
-    """Try to read cached result from S3. Returns None on miss."""
+def _local_cache_enabled() -> bool:
+    return bool(LOCAL_CACHE_DIR) and LOCAL_CACHE_MAX_BYTES > 0
+
+
+def _local_cache_path(key: str) -> str:
+    return os.path.join(LOCAL_CACHE_DIR, os.path.basename(key))
+
+
+def _local_cache_read(key: str, ttl: int | None) -> pd.DataFrame | None:
+    """Try to read cached result from the local disk tier. Returns None on miss.
+
+    The file mtime mirrors the S3 object's LastModified, so TTLs expire at the
+    same moment in both tiers. The atime is bumped on every hit and drives LRU
+    eviction (set explicitly since most mounts use relatime/noatime).
+    """
+    if not _local_cache_enabled():
+        return None
+    path = _local_cache_path(key)
+    try:
+        st = os.stat(path)
+    except OSError:
+        cost_log_local_cache(False)
+        return None
+
+    if ttl is not None and time.time() - st.st_mtime > ttl:
+        cost_log_local_cache(False)
+        return None
+
+    try:
+        df = pd.read_parquet(path)
+        os.utime(path, (time.time(), st.st_mtime))
+    except Exception:
+        # Truncated / evicted mid-read: drop it and fall through to S3
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        cost_log_local_cache(False)
+        return None
+
+    cost_log_local_cache(True)
+    return df
+
+
+def _local_cache_write(key: str, blob: bytes, mtime: float | None = None):
+    """Store a Parquet blob in the local tier and evict down to the size cap."""
+    if not _local_cache_enabled() or len(blob) > LOCAL_CACHE_MAX_BYTES:
+        return
+    path = _local_cache_path(key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(LOCAL_CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        now = time.time()
+        os.utime(tmp, (now, mtime if mtime is not None else now))
+        os.replace(tmp, path)
+    except OSError as e:
+        log_error(logger, "LocalCacheWriteError", str(e), cache_key=key)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return
+    _local_cache_evict()
+
+
+def _local_cache_evict():
+    """Delete least-recently-used entries until the tier fits LOCAL_CACHE_MAX_BYTES."""
+    entries = []
+    total = 0
+    try:
+        with os.scandir(LOCAL_CACHE_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(".parquet"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_atime, st.st_size, entry.path))
+                total += st.st_size
+    except OSError:
+        return
+
+    if total <= LOCAL_CACHE_MAX_BYTES:
+        return
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= LOCAL_CACHE_MAX_BYTES:
+            break
+
+
+def _cache_read_blob(key: str, ttl: int | None) -> tuple[bytes, datetime] | None:
+    """Try to fetch the raw cached Parquet bytes from S3. Returns None on miss."""
     s3 = _get_s3()
     try:
         resp = s3.head_object(Bucket=CACHE_BUCKET, Key=key)
@@ -313,43 +533,178 @@ def _cache_read(key: str, ttl: int | None) -> pd.DataFrame | None:
         # Catch all exceptions (network, ClientError, etc.) to fail fast
         return None
 
+    last_modified = resp["LastModified"]
     if ttl is not None:
-        last_modified = resp["LastModified"]
         age = (datetime.now(timezone.utc) - last_modified).total_seconds()
         if age > ttl:
             return None
 
     try:
         obj = s3.get_object(Bucket=CACHE_BUCKET, Key=key)
-        buf = io.BytesIO(obj["Body"].read())
-        return pd.read_parquet(buf)
+        return obj["Body"].read(), last_modified
     except Exception:
         return None
 
 
+def _cache_read(key: str, ttl: int | None) -> pd.DataFrame | None:
+    """Try to read cached result, local tier first, then S3. Returns None on miss.
+
+    An S3 hit is copied into the local tier so the next read stays on disk.
+    """
+    df = _local_cache_read(key, ttl)
+    if df is not None:
+        return df
+
+    hit = _cache_read_blob(key, ttl)
+    if hit is None:
+        return None
+    blob, last_modified = hit
+    try:
+        df = pd.read_parquet(io.BytesIO(blob))
+    except Exception:
+        return None
+    _local_cache_write(key, blob, last_modified.timestamp())
+    return df
+
+
 def _cache_write(key: str, df: pd.DataFrame):
-    """Write DataFrame to S3 as Parquet."""
+    """Write DataFrame as Parquet to S3 and the local tier."""
     if df.empty:
         return
     s3 = _get_s3()
     buf = io.BytesIO()
     df.to_parquet(buf, index=False, engine="pyarrow")
-    buf.seek(0)
+    blob = buf.getvalue()
     try:
-        s3.put_object(Bucket=CACHE_BUCKET, Key=key, Body=buf.getvalue(),
+        s3.put_object(Bucket=CACHE_BUCKET, Key=key, Body=blob,
                       ContentType="application/octet-stream")
         log_cache_write(logger, key, len(df))
     except Exception as e:
         log_error(logger, "CacheWriteError", str(e), cache_key=key)
+    _local_cache_write(key, blob)
+
+
+# ---------------------------------------------------------------------------
+# Single-flight: concurrent identical queries share one Athena execution
+# ---------------------------------------------------------------------------
+
+class _Flight:
+    """An in-process Athena execution that other threads can wait on."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: pd.DataFrame | None = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+_inflight: dict[str, _Flight] = {}
+_inflight_lock = threading.Lock()
+
+
+@contextmanager
+def _process_lock(key: str):
+    """Hold an exclusive flock on the key's lock file.
+
+    Yields True when another process held the lock first (so its result is
+    probably in the cache by now), False when acquired uncontended. If the
+    lock directory is unusable or the wait exceeds SINGLE_FLIGHT_TIMEOUT the
+    caller proceeds unlocked rather than blocking forever.
+    """
+    if fcntl is None or not SINGLE_FLIGHT_LOCK_DIR:
+        yield False
+        return
+    path = os.path.join(SINGLE_FLIGHT_LOCK_DIR, os.path.basename(key) + ".lock")
+    try:
+        os.makedirs(SINGLE_FLIGHT_LOCK_DIR, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        log_error(logger, "SingleFlightLockError", str(e), cache_key=key)
+        yield False
+        return
+
+    waited = False
+    locked = False
+    try:
+        deadline = time.monotonic() + SINGLE_FLIGHT_TIMEOUT
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except BlockingIOError:
+                waited = True
+                if time.monotonic() >= deadline:
+                    log_error(logger, "SingleFlightTimeout",
+                              f"gave up waiting after {SINGLE_FLIGHT_TIMEOUT:.0f}s", cache_key=key)
+                    break
+                time.sleep(0.5)
+        yield waited
+    finally:
+        if locked:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def _execute_and_cache(sql: str, key: str, ttl: int | None, query_name: str) -> pd.DataFrame:
+    """Run the query once across processes; a waiter re-checks the cache first."""
+    with _process_lock(key) as waited:
+        if waited:
+            df = _cache_read(key, ttl)
+            if df is not None:
+                cost_log_coalesced_query(query_name, int(df.attrs.get("scanned_bytes", 0)))
+                return df
+        df = run_query_df(sql)
+        if not df.empty:
+            _cache_write(key, df)
+        return df
+
+
+def _single_flight(sql: str, key: str, ttl: int | None, query_name: str) -> pd.DataFrame:
+    """Coalesce concurrent cache misses for the same key into one execution."""
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+        else:
+            flight.waiters += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        cost_log_coalesced_query(query_name, int(flight.result.attrs.get("scanned_bytes", 0)))
+        return flight.result.copy()
+
+    try:
+        df = _execute_and_cache(sql, key, ttl, query_name)
+        flight.result = df
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+            waiters = flight.waiters
+        flight.done.set()
+    # Followers copy flight.result; hand the caller its own frame to mutate.
+    return df.copy() if waiters else df
 
 
 def run_query_cached(sql: str, ttl: int | None = ..., no_cache: bool = False) -> pd.DataFrame:
-    """Execute query with S3 caching.
+    """Execute query with local-disk + S3 caching.
 
     Args:
         sql: The SQL query
         ttl: Cache TTL in seconds. None=permanent, ...=auto-infer from query
         no_cache: Skip cache entirely
+
+    Concurrent misses for the same SQL (threads in this process, or other
+    processes sharing SINGLE_FLIGHT_LOCK_DIR) wait for a single Athena
+    execution and share its result instead of each scanning again.
     """
     if os.getenv("ATHENA_E2E_MODE", "").lower() == "fixture":
         return _fixture_query(sql)
@@ -368,13 +723,9 @@ def run_query_cached(sql: str, ttl: int | None = ..., no_cache: bool = False) ->
             cost_log_cache_hit(query_name)
             return cached
         log_cache_miss(logger, key, ttl)
+        return _single_flight(sql, key, ttl, query_name)
 
-    df = run_query_df(sql)
-
-    if not no_cache and not df.empty:
-        _cache_write(key, df)
-
-    return df
+    return run_query_df(sql)
 
 
 # ---------------------------------------------------------------------------
@@ -386,6 +737,12 @@ def _fixture_dir() -> str:
 
 
 def _extract_year_month(sql: str) -> str:
+    import queries
+    days = queries.query_partition_days(sql)
+    if days:
+        # tz-shifted ranges reach into the neighbouring month: use the main one
+        months = [day[:7] for day in days]
+        return max(sorted(set(months)), key=months.count)
     match = re.search(r"year\s*=\s*'(\d{4})'.{0,80}?month\s*=\s*'(\d{2})'", sql, re.IGNORECASE | re.DOTALL)
     if match:
         return f"{match.group(1)}-{match.group(2)}"
@@ -409,7 +766,7 @@ def _fixture_usage(sql: str) -> pd.DataFrame:
     year_month = _extract_year_month(sql) or "2026-06"
     path = os.path.join(_fixture_dir(), f"usage_logs_{year_month.replace('-', '_')}.csv")
     df = pd.read_csv(path)
-    df["day_num"] = pd.to_datetime(df["day"]).dt.day
+    df["day"] = pd.to_datetime(df["day"]).dt.strftime("%Y-%m-%d")
     df["hour"] = 0
     df["username"] = df["user_id"].apply(lambda value: f"user_{int(value)}")
     df["model_name"] = df["model"]
@@ -479,14 +836,12 @@ def _fixture_query(sql: str) -> pd.DataFrame:
         result = _fixture_group(df, ["hour"])
         return result[["hour", "call_count", "total_tokens", "total_usd"]]
 
-    if "group by day, token_name, model_name" in normalized:
-        result = _fixture_group(df, ["day_num", "token_name", "model_name"])
-        result = result.rename(columns={"day_num": "day"})
+    if "group by year, month, day, token_name, model_name" in normalized:
+        result = _fixture_group(df, ["day", "token_name", "model_name"])
         return result.sort_values(["day", "token_name", "total_usd"], ascending=[True, True, False])
 
-    if "group by day" in normalized:
-        result = _fixture_group(df, ["day_num"])
-        result = result.rename(columns={"day_num": "day"})
+    if "group by year, month, day" in normalized:
+        result = _fixture_group(df, ["day"])
         return result.sort_values("day")
 
     if "group by user_id, username, channel_id, model_name" in normalized:
@@ -549,18 +904,20 @@ def run_safe_query(sql: str, no_cache: bool = False) -> pd.DataFrame:
 # ---------------------------------------------------------------------------
 
 def _wait_for_query(exec_id: str, poll_interval: float = 2.0) -> dict:
-    """Poll until query completes. Returns the QueryExecution dict."""
-    client = _get_athena()
-    while True:
-        time.sleep(poll_interval)
-        resp = client.get_query_execution(QueryExecutionId=exec_id)
-        qe = resp["QueryExecution"]
-        state = qe["Status"]["State"]
-        if state in ("SUCCEEDED", "FAILED", "CANCELLED"):
-            if state != "SUCCEEDED":
-                reason = qe["Status"].get("StateChangeReason", "")
-                raise RuntimeError(f"Athena query {state}: {reason}")
-            return qe
+    """Poll (with backoff capped at poll_interval) until query completes.
+
+    Returns the QueryExecution dict.
+    """
+    waiter = _CompletionWaiter(_get_athena(), [exec_id], poll_interval)
+    finished = []
+    while not finished:
+        finished = waiter.wait()
+    qe = finished[0]
+    state = qe["Status"]["State"]
+    if state != "SUCCEEDED":
+        reason = qe["Status"].get("StateChangeReason", "")
+        raise RuntimeError(f"Athena query {state}: {reason}")
+    return qe
 
 
 def _download_s3_csv(s3_uri: str) -> pd.DataFrame:
@@ -589,7 +946,11 @@ def run_query_s3(sql: str, poll_interval: float = 2.0) -> pd.DataFrame:
     )
     qe = _wait_for_query(resp["QueryExecutionId"], poll_interval)
     output_uri = qe["ResultConfiguration"]["OutputLocation"]
-    return _download_s3_csv(output_uri)
+    t0 = time.monotonic()
+    df = _download_s3_csv(output_uri)
+    df.attrs["scanned_bytes"] = qe["Statistics"].get("DataScannedInBytes", 0)
+    df.attrs["timings"] = _query_timings(qe, int((time.monotonic() - t0) * 1000))
+    return df
 
 
 # ---------------------------------------------------------------------------
@@ -616,9 +977,13 @@ def run_queries_parallel_iter(sqls: list[str], poll_interval: float = 3.0,
     Yields tuples of (query_index, DataFrame) in completion order.
     Downloads happen in a background thread so that the caller's processing
     (pricing, CSV write) does not block downloads of other completed queries.
+
+    All pending executions are checked with one batch_get_query_execution call
+    per round (backoff capped at poll_interval). Each DataFrame carries
+    attrs["scanned_bytes"] and attrs["timings"] (queue_ms/engine_ms/download_ms).
     """
     from collections import deque
-    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
     client = _get_athena()
     exec_ids = []
@@ -633,16 +998,24 @@ def run_queries_parallel_iter(sqls: list[str], poll_interval: float = 3.0,
             )
             exec_ids.append(resp["QueryExecutionId"])
 
-    pending = set(range(len(exec_ids)))
+    index_of = {exec_id: idx for idx, exec_id in enumerate(exec_ids)}
+    waiter = _CompletionWaiter(client, exec_ids, poll_interval)
     ready_queue: deque = deque()
     download_pool = ThreadPoolExecutor(max_workers=4)
     active_downloads = {}
 
-    def _bg_download(idx, uri):
-        df = _download_s3_csv(uri)
+    def _bg_download(idx, qe):
+        t0 = time.monotonic()
+        df = _download_s3_csv(qe["ResultConfiguration"]["OutputLocation"])
+        timings = _query_timings(qe, int((time.monotonic() - t0) * 1000))
+        scanned = qe["Statistics"].get("DataScannedInBytes", 0)
+        log_query_complete(logger, qe["QueryExecutionId"], scanned, timings["engine_ms"], len(df),
+                           queue_ms=timings["queue_ms"], download_ms=timings["download_ms"])
+        df.attrs["scanned_bytes"] = scanned
+        df.attrs["timings"] = timings
         return idx, df
 
-    while pending or active_downloads or ready_queue:
+    while waiter.pending or active_downloads or ready_queue:
         if ready_queue:
             yield ready_queue.popleft()
             continue
@@ -663,25 +1036,25 @@ def run_queries_parallel_iter(sqls: list[str], poll_interval: float = 3.0,
         if ready_queue:
             continue
 
-        if not pending:
-            time.sleep(0.1)
+        if not waiter.pending:
+            wait(active_downloads.values(), return_when=FIRST_COMPLETED)
             continue
 
-        time.sleep(poll_interval)
-        for idx in list(pending):
-            resp = client.get_query_execution(QueryExecutionId=exec_ids[idx])
-            qe = resp["QueryExecution"]
+        # Sleep until the next poll, waking early if a download finishes
+        delay = waiter.next_delay()
+        if active_downloads:
+            wait(active_downloads.values(), timeout=delay, return_when=FIRST_COMPLETED)
+        else:
+            time.sleep(delay)
+        for qe in waiter.poll():
+            idx = index_of[qe["QueryExecutionId"]]
             state = qe["Status"]["State"]
             if state == "SUCCEEDED":
-                pending.discard(idx)
-                output_uri = qe["ResultConfiguration"]["OutputLocation"]
-                active_downloads[idx] = download_pool.submit(
-                    _bg_download, idx, output_uri)
-            elif state in ("FAILED", "CANCELLED"):
+                active_downloads[idx] = download_pool.submit(_bg_download, idx, qe)
+            else:
                 reason = qe["Status"].get("StateChangeReason", "")
                 log_error(logger, "ParallelQueryError", f"Query {state}: {reason}",
                          query_index=idx, state=state, reason=reason)
-                pending.discard(idx)
                 ready_queue.append((idx, pd.DataFrame()))
 
     download_pool.shutdown(wait=False)
@@ -779,5 +1152,11 @@ def get_session_cost_summary() -> dict:
         query_count: Total number of queries
         cache_hits: Number of cache hits
         cache_hit_rate: Cache hit rate percentage
+        local_cache_hits: Hits served from the local disk tier
+        local_cache_misses: Local tier misses (fell through to S3 / Athena)
+        local_cache_hit_rate: Local tier hit rate percentage
+        coalesced_queries: Cache misses served by another in-flight execution
+        avoided_scanned_bytes: Bytes those executions scanned on their behalf
+        avoided_cost_usd: Cost of the duplicate scans avoided
     """
     return get_cost_summary()
@@ -37,6 +37,7 @@ import queries
 import report_builder
 import pricing_engine
 import cost_import
+import usage_cube
 
 # Import cost monitor for cost tracking
 try:
@@ -147,6 +148,7 @@ def cmd_bill(args):
         split_customers=split_customers,
         split_internal_customers=split_internal,
         split_channels=split_channels,
+        detail_format=getattr(args, "detail_format", "auto"),
     )
     if isinstance(result, dict):
         print(f"\n  月度账单已生成: {result['xlsx']}")
@@ -222,10 +224,15 @@ def cmd_kpi(args):
     month = args.month or _last_month()
     channel_id = getattr(args, "channel_id", None)
     user_id = getattr(args, "user_id", None)
-    df = run_query_cached(
-        queries.kpi_summary(month, channel_id=channel_id, user_id=user_id),
-        no_cache=args.no_cache,
-    )
+    if usage_cube.serves():
+        # 按日检查点：月中预览只扫描今天和仍未关闭的日
+        cube = usage_cube.load_month(month, no_cache=args.no_cache)
+        df = usage_cube.kpi_summary(usage_cube.filter_cube(cube, user_id=user_id, channel_id=channel_id))
+    else:
+        df = run_query_cached(
+            queries.kpi_summary(month, channel_id=channel_id, user_id=user_id),
+            no_cache=args.no_cache,
+        )
     if getattr(args, "json", False):
         if df.empty:
             payload = {
@@ -523,6 +530,8 @@ def build_parser():
                         help="同时导出逐条明细 CSV.zip（按天并行查询）")
     p_bill.add_argument("--customer-view", action="store_true",
                         help="客户版本：隐藏成本折扣、成本价、利润、渠道 ID 等内部数据")
+    p_bill.add_argument("--detail-format", choices=["auto", "parquet"], default="auto",
+                        help="内部版明细格式：auto=xlsx/CSV.zip（按行数），parquet=zstd Parquet（按天分 row group）")
     p_bill.add_argument("--split-customers", dest="split_customers", action="store_true", default=None,
                         help="客户版汇总账单之外，为每个客户再生成独立账单（默认：--customer-view 且未指定 --user-id 时启用）")
     p_bill.add_argument("--no-split-customers", dest="split_customers", action="store_false",
@@ -6,6 +6,7 @@
     python bill_cron.py                  # 前台运行
     python bill_cron.py --run-daily      # 立即执行一次日报
     python bill_cron.py --run-monthly    # 立即执行一次月报
+    python bill_cron.py --run-compaction # 立即压缩已关闭的日（usage_logs → Parquet）
     nohup python bill_cron.py &          # 后台运行
 """
 
@@ -26,6 +27,7 @@ import schedule
 from athena_engine import (RESULT_BUCKET, upload_to_s3 as _engine_upload,
                            generate_presigned_url, REPORT_PREFIX as _ENGINE_PREFIX)
 import report_builder
+import usage_compaction
 from logging_config import get_logger, log_report_start, log_report_complete, log_error
 
 logger = get_logger("bill_cron")
@@ -86,6 +88,29 @@ def _run_pricing_precheck():
         _log("价格一致性校验通过")
 
 
+# ---------------------------------------------------------------------------
+# Usage logs compaction job
+# ---------------------------------------------------------------------------
+
+def run_compaction(date: str = None):
+    """压缩指定日；不指定时压缩最近几天已关闭且未压缩的日。"""
+    _log(f"开始压缩 usage_logs: {date or '待压缩日'}")
+    try:
+        if date:
+            results = [usage_compaction.compact_day(date)]
+        else:
+            results = usage_compaction.compact_pending()
+    except Exception as e:
+        log_error(logger, "UsageCompactionError", f"Usage logs compaction failed: {e}",
+                  date=date)
+        _log(f"压缩失败: {e}")
+        return
+    failed = [r["day"] for r in results if "error" in r]
+    done = [r["day"] for r in results if "error" not in r]
+    _log(f"压缩完成: {', '.join(done) or '无'}"
+         + (f"；失败: {', '.join(failed)}" if failed else ""))
+
+
 # ---------------------------------------------------------------------------
 # Daily report job
 # ---------------------------------------------------------------------------
@@ -171,6 +196,9 @@ def run_monthly_report(year_month: str = None,
 # ---------------------------------------------------------------------------
 
 def _daily_job():
+    # 先压缩，日报即可读 Parquet；压缩失败不影响日报（回落到 JSON 表）
+    if usage_compaction.COMPACT_ENABLED:
+        run_compaction()
     run_daily_report()
 
 
@@ -207,7 +235,9 @@ def main():
                         help="立即执行一次日报（昨天）")
     parser.add_argument("--run-monthly", action="store_true",
                         help="立即执行一次月报（上月）")
-    parser.add_argument("--date", help="指定日报日期 YYYY-MM-DD")
+    parser.add_argument("--run-compaction", action="store_true",
+                        help="立即压缩已关闭且未压缩的日（配合 --date 重写指定日）")
+    parser.add_argument("--date", help="指定日报/压缩日期 YYYY-MM-DD")
     parser.add_argument("--month", help="指定月报月份 YYYY-MM")
     parser.add_argument("--flat-tier", action="store_true",
                         help="降档模式：分段模型强制使用低档价")
@@ -218,7 +248,9 @@ def main():
     ft = args.flat_tier or bool(args.flat_tier_since)
     fts = args.flat_tier_since
 
-    if args.run_daily:
+    if args.run_compaction:
+        run_compaction(args.date)
+    elif args.run_daily:
         run_daily_report(args.date)
     elif args.run_monthly:
         run_monthly_report(args.month, flat_tier=ft or None, flat_tier_since=fts)
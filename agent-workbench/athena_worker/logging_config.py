@@ -214,7 +214,8 @@ def log_query_start(logger: logging.Logger, query_id: str, sql_preview: str = No
 
 
 def log_query_complete(logger: logging.Logger, query_id: str,
-                      scanned_bytes: int, duration_ms: int, row_count: int):
+                      scanned_bytes: int, duration_ms: int, row_count: int,
+                      queue_ms: int | None = None, download_ms: int | None = None):
     """记录查询完成日志。
 
     Args:
@@ -223,17 +224,21 @@ def log_query_complete(logger: logging.Logger, query_id: str,
         scanned_bytes: 扫描字节数
         duration_ms: 执行耗时（毫秒）
         row_count: 返回行数
+        queue_ms: Athena 排队耗时（毫秒，可选）
+        download_ms: 结果下载耗时（毫秒，可选）
     """
-    logger.info(
-        "Athena query completed",
-        extra={
-            "query_id": query_id,
-            "event": "query_complete",
-            "scanned_bytes": scanned_bytes,
-            "duration_ms": duration_ms,
-            "row_count": row_count,
-        }
-    )
+    extra = {
+        "query_id": query_id,
+        "event": "query_complete",
+        "scanned_bytes": scanned_bytes,
+        "duration_ms": duration_ms,
+        "row_count": row_count,
+    }
+    if queue_ms is not None:
+        extra["queue_ms"] = queue_ms
+    if download_ms is not None:
+        extra["download_ms"] = download_ms
+    logger.info("Athena query completed", extra=extra)
 
 
 def log_cache_hit(logger: logging.Logger, cache_key: str, ttl: int | None = None):
@@ -332,16 +332,157 @@ def _match_discount(lookup: dict, key: str, model: str) -> float:
     return default_rate
 
 
+def _as_column(values):
+    """Series/ndarray pass through untouched (keeps Arrow-backed strings fast)."""
+    if isinstance(values, (pd.Series, pd.Index, np.ndarray)):
+        return values
+    return np.asarray(values, dtype=object)
+
+
+class _CompiledDiscountTable:
+    """Precompiled form of one discounts.json side (cost or revenue).
+
+    Each key (channel_id / user_id) is split into:
+      - exact:    model -> rate
+      - trie:     char-level trie of "prefix*" patterns
+      - wildcard: the "*" entry
+
+    `_match_discount` returns the first "prefix*" pattern in declaration order
+    (and "*" itself is such a pattern with an empty prefix), so every pattern
+    keeps its ordinal and the lowest matching ordinal wins.
+    """
+
+    def __init__(self, lookup: dict):
+        by_key = lookup.get("by_channel", lookup.get("by_user", {}))
+        self.default_rate = lookup.get("defaults", {}).get("*", 1.0)
+        self.exact: dict[str, dict[str, float]] = {}
+        self.tries: dict[str, dict] = {}
+        self.wildcard: dict[str, tuple[int, float]] = {}
+
+        for key, entry in by_key.items():
+            exact = {}
+            trie: dict = {}
+            for ordinal, (pattern, rate) in enumerate(entry.items()):
+                if pattern.startswith("_"):
+                    continue
+                exact[pattern] = rate
+                if pattern == "*":
+                    self.wildcard[key] = (ordinal, rate)
+                elif pattern.endswith("*"):
+                    node = trie
+                    for ch in pattern[:-1]:
+                        node = node.setdefault(ch, {})
+                    # Keep the first declaration if a prefix is repeated
+                    node.setdefault("", (ordinal, rate))
+            self.exact[key] = exact
+            if trie:
+                self.tries[key] = trie
+
+    def rate(self, key, model: str) -> float:
+        key_str = str(key)
+        exact = self.exact.get(key_str)
+        if exact is None:
+            return self.default_rate
+
+        if model in exact:
+            return exact[model]
+
+        best = self.wildcard.get(key_str)
+        node = self.tries.get(key_str)
+        if node is not None:
+            for ch in model:
+                node = node.get(ch)
+                if node is None:
+                    break
+                hit = node.get("")
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+        if best is not None:
+            return best[1]
+
+        return self.default_rate
+
+    def resolve(self, keys, models) -> np.ndarray:
+        """Resolve rates for aligned key/model columns.
+
+        Rows are factorized into (key, model) pair codes, each distinct pair
+        is matched once, and the rates are broadcast back by code.
+        """
+        key_codes, key_uniques = pd.factorize(_as_column(keys), use_na_sentinel=False)
+        model_codes, model_uniques = pd.factorize(_as_column(models), use_na_sentinel=False)
+        if len(key_codes) == 0:
+            return np.empty(0, dtype="float64")
+
+        n_models = len(model_uniques)
+        pair_codes, pair_uniques = pd.factorize(
+            key_codes.astype("int64") * n_models + model_codes)
+        rates = np.fromiter(
+            (self.rate(key_uniques[p // n_models], str(model_uniques[p % n_models]))
+             for p in pair_uniques),
+            dtype="float64", count=len(pair_uniques))
+        return rates[pair_codes]
+
+
+_compiled_discounts = None
+_compiled_discounts_src = None
+
+
+def _get_compiled_discounts() -> dict:
+    """Compiled cost/revenue tables, rebuilt whenever _load_discounts reloads."""
+    global _compiled_discounts, _compiled_discounts_src
+    d = _load_discounts()
+    if _compiled_discounts is None or _compiled_discounts_src is not d:
+        _compiled_discounts = {
+            "cost": _CompiledDiscountTable(d["cost_discounts"]),
+            "revenue": _CompiledDiscountTable(d["revenue_discounts"]),
+        }
+        _compiled_discounts_src = d
+    return _compiled_discounts
+
+
 def get_cost_discount(channel_id, model: str) -> float:
     """Get cost discount for a channel×model combination."""
-    d = _load_discounts()
-    return _match_discount(d["cost_discounts"], channel_id, model)
+    return _get_compiled_discounts()["cost"].rate(channel_id, model)
 
 
 def get_revenue_discount(user_id, model: str) -> float:
     """Get revenue discount for a user×model combination."""
-    d = _load_discounts()
-    return _match_discount(d["revenue_discounts"], user_id, model)
+    return _get_compiled_discounts()["revenue"].rate(user_id, model)
+
+
+def resolve_cost_discounts(channel_ids, models) -> np.ndarray:
+    """Vectorized get_cost_discount over aligned channel_id / model columns."""
+    return _get_compiled_discounts()["cost"].resolve(channel_ids, models)
+
+
+def resolve_revenue_discounts(user_ids, models) -> np.ndarray:
+    """Vectorized get_revenue_discount over aligned user_id / model columns."""
+    return _get_compiled_discounts()["revenue"].resolve(user_ids, models)
+
+
+def _discount_columns(df: pd.DataFrame, model_col: str, default_model: str,
+                      missing_key=None) -> tuple:
+    """Return (cost_discount, revenue_discount) Series for a pricing DataFrame.
+
+    A missing channel_id/user_id column resolves with `missing_key` when given,
+    otherwise the discount is 1.0.
+    """
+    if model_col in df.columns:
+        models = df[model_col]
+    else:
+        models = np.full(len(df), default_model, dtype=object)
+
+    def _resolve(key_col, resolver):
+        if key_col in df.columns:
+            keys = df[key_col]
+        elif missing_key is not None:
+            keys = np.full(len(df), missing_key, dtype=object)
+        else:
+            return pd.Series(1.0, index=df.index)
+        return pd.Series(resolver(keys, models), index=df.index)
+
+    return (_resolve("channel_id", resolve_cost_discounts),
+            _resolve("user_id", resolve_revenue_discounts))
 
 
 # ---------------------------------------------------------------------------
@@ -365,14 +506,9 @@ def apply_pricing(df: pd.DataFrame) -> pd.DataFrame:
 
     df["list_price_usd"] = df["quota"].astype(float) / QUOTA_TO_USD
 
-    df["cost_discount"] = df.apply(
-        lambda r: get_cost_discount(r.get("channel_id", 0), r.get("model_name", "")),
-        axis=1)
+    df["cost_discount"], df["revenue_discount"] = _discount_columns(
+        df, "model_name", "", missing_key=0)
     df["cost_usd"] = df["list_price_usd"] * df["cost_discount"]
-
-    df["revenue_discount"] = df.apply(
-        lambda r: get_revenue_discount(r.get("user_id", 0), r.get("model_name", "")),
-        axis=1)
     df["revenue_usd"] = df["list_price_usd"] * df["revenue_discount"]
 
     df["profit_usd"] = df["revenue_usd"] - df["cost_usd"]
@@ -433,6 +569,92 @@ def _compute_list_price_from_agg(model: str, input_tokens: float,
     return cost
 
 
+def _summary_token_array(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Summary token column as float64, `float(v or 0)` semantics (NaN kept)."""
+    if col not in df.columns:
+        return np.zeros(len(df))
+    s = df[col]
+    if s.dtype == object:
+        return np.fromiter((float(v or 0) for v in s), dtype="float64", count=len(s))
+    return s.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _summary_list_prices(df: pd.DataFrame, flat_tier: bool = False) -> tuple:
+    """Vectorized _compute_list_price_from_agg over a summary DataFrame.
+
+    Joins each distinct model_name once against its flat (or, for flat_tier
+    models when flat_tier=True, tier-0) unit prices and prices every row with
+    array math. Returns (prices, priced); rows outside `priced` keep the
+    quota-derived price: unknown, multimodal and non-flat tiered models.
+    """
+    pricing = get_pricing()
+    flat_models = get_flat_tier_models()
+    if "model_name" in df.columns:
+        codes, uniques = pd.factorize(df["model_name"], use_na_sentinel=False)
+    else:
+        codes, uniques = np.zeros(len(df), dtype="int64"), [""]
+
+    rate_table = np.full((len(uniques), len(_PRICE_COLS)), np.nan)
+    has_rates = np.zeros(len(uniques), dtype=bool)
+    for i, model in enumerate(uniques):
+        p = pricing.get(model)
+        if p is None or (isinstance(p, dict) and p.get("_type") == "multimodal"):
+            continue
+        if isinstance(p, list):
+            if not (flat_tier and model in flat_models):
+                continue
+            p = p[0]
+        rate_table[i] = [p[c] for c in _PRICE_COLS]
+        has_rates[i] = True
+    ip, op, chp, cwp, cwp_1h = rate_table[codes].T
+
+    input_tokens = _summary_token_array(df, "total_input_tokens")
+    output_tokens = _summary_token_array(df, "total_output_tokens")
+    if "total_cache_hit_tokens" in df.columns:
+        cache_hit, cw_5m, cw_1h, cw_remaining = (
+            _summary_token_array(df, c)
+            for c in ("total_cache_hit_tokens", "total_cw_5m", "total_cw_1h", "total_cw_remaining"))
+    else:
+        cache_hit = cw_5m = cw_1h = cw_remaining = np.zeros(len(df))
+
+    cw_5m_total = cw_5m + cw_remaining
+    prices = (input_tokens / 1e6 * ip
+              + output_tokens / 1e6 * op
+              + cache_hit / 1e6 * chp
+              + cw_5m_total / 1e6 * cwp
+              + cw_1h / 1e6 * cwp_1h)
+    return prices, has_rates[codes]
+
+
+def _summary_list_prices_rowwise(df: pd.DataFrame, flat_tier: bool = False) -> list:
+    """Reference per-row pricing for apply_pricing_summary (kept for equivalence tests)."""
+    has_cache = "total_cache_hit_tokens" in df.columns
+    has_image_output = "total_image_output_tokens" in df.columns
+    recalc_prices = []
+    for idx, row in df.iterrows():
+        model = row.get("model_name", "")
+        use_flat = flat_tier and model in get_flat_tier_models()
+
+        ch  = float(row.get("total_cache_hit_tokens", 0) or 0) if has_cache else 0
+        cw  = float(row.get("total_cache_write_tokens", 0) or 0) if has_cache else 0
+        c5  = float(row.get("total_cw_5m", 0) or 0) if has_cache else 0
+        c1h = float(row.get("total_cw_1h", 0) or 0) if has_cache else 0
+        cr  = float(row.get("total_cw_remaining", 0) or 0) if has_cache else 0
+        img_out = float(row.get("total_image_output_tokens", 0) or 0) if has_image_output else 0
+
+        price = _compute_list_price_from_agg(
+            model,
+            float(row["total_input_tokens"]),
+            float(row["total_output_tokens"]),
+            cache_hit=ch, cache_write=cw,
+            cw_5m=c5, cw_1h=c1h, cw_remaining=cr,
+            flat_tier=use_flat,
+            image_output_tokens=img_out)
+
+        recalc_prices.append(price)
+    return recalc_prices
+
+
 def apply_pricing_summary(df_summary: pd.DataFrame,
                           flat_tier: bool = False,
                           flat_tier_since: str = None) -> pd.DataFrame:
@@ -464,52 +686,18 @@ def apply_pricing_summary(df_summary: pd.DataFrame,
         df["list_price_usd"] = 0.0
 
     # Recalculate list price from pricing table when cache token data is available
-    has_cache = "total_cache_hit_tokens" in df.columns
     has_tokens = "total_input_tokens" in df.columns and "total_output_tokens" in df.columns
 
-    has_image_output = "total_image_output_tokens" in df.columns
-
     if has_tokens:
-        recalc_prices = []
-        for idx, row in df.iterrows():
-            model = row.get("model_name", "")
-            use_flat = flat_tier and model in get_flat_tier_models()
-
-            ch  = float(row.get("total_cache_hit_tokens", 0) or 0) if has_cache else 0
-            cw  = float(row.get("total_cache_write_tokens", 0) or 0) if has_cache else 0
-            c5  = float(row.get("total_cw_5m", 0) or 0) if has_cache else 0
-            c1h = float(row.get("total_cw_1h", 0) or 0) if has_cache else 0
-            cr  = float(row.get("total_cw_remaining", 0) or 0) if has_cache else 0
-            img_out = float(row.get("total_image_output_tokens", 0) or 0) if has_image_output else 0
-
-            price = _compute_list_price_from_agg(
-                model,
-                float(row["total_input_tokens"]),
-                float(row["total_output_tokens"]),
-                cache_hit=ch, cache_write=cw,
-                cw_5m=c5, cw_1h=c1h, cw_remaining=cr,
-                flat_tier=use_flat,
-                image_output_tokens=img_out)
-
-            recalc_prices.append(price)
-
-        for idx, price in zip(df.index, recalc_prices):
-            if price is not None:
-                df.at[idx, "list_price_usd"] = round(price, 6)
-
-    if "channel_id" in df.columns:
-        df["cost_discount"] = df.apply(
-            lambda r: get_cost_discount(r["channel_id"], r.get("model_name", "*")),
-            axis=1)
-    else:
-        df["cost_discount"] = 1.0
+        prices, priced = _summary_list_prices(df, flat_tier=flat_tier)
+        if priced.any():
+            # Python round() (not np.round) keeps values identical to the old
+            # per-row path; only the final rounding is per element.
+            list_price = df["list_price_usd"].to_numpy(dtype="float64", copy=True)
+            list_price[priced] = [round(p, 6) for p in prices[priced].tolist()]
+            df["list_price_usd"] = list_price
 
-    if "user_id" in df.columns:
-        df["revenue_discount"] = df.apply(
-            lambda r: get_revenue_discount(r["user_id"], r.get("model_name", "*")),
-            axis=1)
-    else:
-        df["revenue_discount"] = 1.0
+    df["cost_discount"], df["revenue_discount"] = _discount_columns(df, "model_name", "*")
 
     df["cost_usd"] = (df["list_price_usd"] * df["cost_discount"]).round(4)
     df["revenue_usd"] = (df["list_price_usd"] * df["revenue_discount"]).round(4)
@@ -645,7 +833,11 @@ FLAT_DF = pd.DataFrame(_FLAT_ROWS) if _FLAT_ROWS else pd.DataFrame()
 
 
 def _parse_other_batch(other_series: pd.Series) -> pd.DataFrame:
-    """Parse the 'other' JSON column, extract cache token fields."""
+    """Parse the 'other' JSON column, extract cache token fields.
+
+    Row-by-row reference implementation; recalc_from_raw uses the columnar
+    parse_other_columnar, which is tested for equivalence against this.
+    """
     try:
         import orjson as _json
         _loads = _json.loads
@@ -711,9 +903,472 @@ def _parse_other_batch(other_series: pd.Series) -> pd.DataFrame:
     return pd.DataFrame(records, index=other_series.index)
 
 
+# ---------------------------------------------------------------------------
+# Columnar `other` extraction
+# ---------------------------------------------------------------------------
+#
+# Same fields as _parse_other_batch (which stays as the reference), but each
+# chunk of JSON strings is decoded by pyarrow's JSON reader straight into typed
+# columns, projecting only the keys the requested output columns need. Chunks
+# pyarrow rejects (malformed JSON, a string where a number is expected, ...)
+# are bisected down to small slices that are decoded row by row in Python.
+
+_OTHER_KEY_TYPES = {
+    "cache_tokens": "int64",
+    "cache_creation_tokens": "int64",
+    "tiered_cache_creation_tokens_5m": "int64",
+    "cache_creation_tokens_5m": "int64",
+    "tiered_cache_creation_tokens_1h": "int64",
+    "cache_creation_tokens_1h": "int64",
+    "tiered_cache_creation_tokens_remaining": "int64",
+    "image_completion_tokens": "int64",
+    "image_output": "int64",
+    "billing_cond_multiplier": "float64",
+    "image_completion_ratio": "float64",
+    "image_ratio": "float64",
+    "actual_usage": "float64",
+    "total_tokens": "float64",
+    "duration_seconds": "float64",
+    "unit_scale": "float64",
+    "group_ratio": "float64",
+    "price_or_ratio": "float64",
+    "preconsumed_quota": "float64",
+    "actual_quota": "float64",
+    "quota_delta": "float64",
+    "tiered_input_price": "float64",
+    "tiered_output_price": "float64",
+    "tiered_cache_hit_price": "float64",
+    "tiered_cache_store_price": "float64",
+    "tiered_cache_store_price_5m": "float64",
+    "tiered_cache_store_price_1h": "float64",
+    "provider": "str",
+    "billing_event": "str",
+    "task_id": "str",
+}
+
+# output column -> (dtype, `other` keys it is derived from)
+OTHER_COLUMNS = {
+    "ch": ("int64", ("cache_tokens",)),
+    "cw": ("int64", ("cache_creation_tokens",)),
+    "cw_5m": ("int64", ("tiered_cache_creation_tokens_5m", "cache_creation_tokens_5m")),
+    "cw_1h": ("int64", ("tiered_cache_creation_tokens_1h", "cache_creation_tokens_1h")),
+    "cw_rem": ("int64", ("tiered_cache_creation_tokens_remaining", "cache_creation_tokens",
+                         "tiered_cache_creation_tokens_5m", "cache_creation_tokens_5m",
+                         "tiered_cache_creation_tokens_1h", "cache_creation_tokens_1h")),
+    "is_new": ("bool", ("tiered_cache_store_price",)),
+    "cond_mult": ("float64", ("billing_cond_multiplier",)),
+    "provider": ("str", ("provider",)),
+    "billing_event": ("str", ("billing_event",)),
+    "upstream_task_id": ("str", ("task_id",)),
+    "actual_usage": ("float64", ("actual_usage",)),
+    "total_tokens": ("float64", ("total_tokens",)),
+    "duration_seconds": ("float64", ("duration_seconds",)),
+    "unit_scale": ("float64", ("unit_scale",)),
+    "group_ratio": ("float64", ("group_ratio",)),
+    "price_or_ratio": ("float64", ("price_or_ratio",)),
+    "preconsumed_quota": ("float64", ("preconsumed_quota",)),
+    "actual_quota": ("float64", ("actual_quota",)),
+    "quota_delta": ("float64", ("quota_delta",)),
+    "ip_new": ("float64", ("tiered_input_price",)),
+    "op_new": ("float64", ("tiered_output_price",)),
+    "chp_new": ("float64", ("tiered_cache_hit_price",)),
+    "cwp_5m_new": ("float64", ("tiered_cache_store_price_5m", "tiered_cache_store_price")),
+    "cwp_1h_new": ("float64", ("tiered_cache_store_price_1h",)),
+    "img_out_tokens": ("int64", ("image_completion_tokens",)),
+    "img_out_ratio": ("float64", ("image_completion_ratio",)),
+    "img_in_tokens": ("int64", ("image_output",)),
+    "img_in_ratio": ("float64", ("image_ratio",)),
+}
+
+OTHER_CHUNK_ROWS = 250_000
+_OTHER_PY_SLICE_ROWS = 2_048
+
+
+def _empty_key_column(dtype: str, n: int) -> tuple:
+    if dtype == "int64":
+        values = np.zeros(n, dtype="int64")
+    elif dtype == "float64":
+        values = np.full(n, np.nan)
+    else:
+        values = np.full(n, None, dtype=object)
+    return values, np.zeros(n, dtype=bool)
+
+
+def _decode_other_python(strings: list, keys: list) -> dict:
+    """Row-by-row decode of `other` strings into {key: (values, valid)}."""
+    try:
+        import orjson as _json
+        _loads = _json.loads
+    except ImportError:
+        _loads = json.loads
+
+    n = len(strings)
+    out = {k: _empty_key_column(_OTHER_KEY_TYPES[k], n) for k in keys}
+    for i, s in enumerate(strings):
+        try:
+            o = _loads(s) if s else {}
+        except Exception:
+            continue
+        if not isinstance(o, dict):
+            continue
+        for k in keys:
+            if k not in o:
+                continue
+            values, valid = out[k]
+            if k == "tiered_cache_store_price":
+                # Key presence marks "new" rows even when the value is null
+                valid[i] = True
+            v = o[k]
+            if v is None:
+                continue
+            dtype = _OTHER_KEY_TYPES[k]
+            try:
+                if dtype == "int64":
+                    values[i] = int(v)
+                elif dtype == "float64":
+                    values[i] = float(v)
+                else:
+                    values[i] = v if isinstance(v, str) else str(v)
+            except (TypeError, ValueError):
+                continue
+            valid[i] = True
+    return out
+
+
+def _decode_other_arrow(arr, keys: list) -> dict:
+    """Decode a pyarrow large_string array of `other` JSON via pyarrow.json.
+
+    Raises pyarrow.ArrowInvalid when the chunk can't be decoded with the
+    expected types; the caller falls back to smaller slices.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.json as pa_json
+
+    n = len(arr)
+    large_str = pa.large_string()
+    arr = pc.fill_null(arr, "")
+    arr = pc.if_else(pc.equal(pc.binary_length(arr), 0), pa.scalar("{}", large_str), arr)
+    lines = pc.binary_join_element_wise(arr, pa.scalar("\n", large_str), pa.scalar("", large_str))
+    offsets = np.frombuffer(lines.buffers()[1], dtype="int64")[lines.offset:lines.offset + n + 1]
+    data = lines.buffers()[2][int(offsets[0]):int(offsets[-1])]
+
+    arrow_types = {"int64": pa.int64(), "float64": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(k, arrow_types[_OTHER_KEY_TYPES[k]]) for k in keys])
+    longest = int(np.diff(offsets).max())
+    table = pa_json.read_json(
+        pa.BufferReader(data),
+        read_options=pa_json.ReadOptions(block_size=max(1 << 22, 2 * longest)),
+        parse_options=pa_json.ParseOptions(explicit_schema=schema,
+                                           unexpected_field_behavior="ignore"))
+    if table.num_rows != n:
+        raise pa.ArrowInvalid(f"expected {n} JSON rows, decoded {table.num_rows}")
+
+    out = {}
+    for k in keys:
+        col = table.column(k)
+        valid = col.is_valid().to_numpy(zero_copy_only=False)
+        dtype = _OTHER_KEY_TYPES[k]
+        if dtype == "int64":
+            values = col.fill_null(0).to_numpy()
+        elif dtype == "float64":
+            values = col.to_numpy()
+        else:
+            values = col.to_numpy(zero_copy_only=False).astype(object)
+        if k == "tiered_cache_store_price":
+            # Key presence, not value, marks "new" rows (null values count too)
+            valid = valid | pc.match_substring_regex(
+                arr, r'"tiered_cache_store_price"\s*:').to_numpy(zero_copy_only=False)
+        out[k] = (np.asarray(values), np.asarray(valid, dtype=bool))
+    return out
+
+
+def _decode_other_chunk(arr, keys: list) -> dict:
+    """Arrow decode with bisecting fallback to the row-by-row Python decoder.
+
+    A row with a raw newline splits into extra JSON lines; the row-count check
+    in _decode_other_arrow turns that into ArrowInvalid like any parse error.
+    """
+    import pyarrow as pa
+
+    if len(arr) <= _OTHER_PY_SLICE_ROWS:
+        try:
+            return _decode_other_arrow(arr, keys)
+        except pa.ArrowInvalid:
+            return _decode_other_python(arr.to_pylist(), keys)
+
+    try:
+        return _decode_other_arrow(arr, keys)
+    except pa.ArrowInvalid:
+        mid = len(arr) // 2
+        left = _decode_other_chunk(arr.slice(0, mid), keys)
+        right = _decode_other_chunk(arr.slice(mid), keys)
+        return {k: (np.concatenate([left[k][0], right[k][0]]),
+                    np.concatenate([left[k][1], right[k][1]])) for k in keys}
+
+
+def _derive_other_columns(raw: dict, fields: list, n: int) -> tuple:
+    """Apply _parse_other_batch's fallbacks (`a or b or 0`, defaults) to raw keys."""
+    def val(k):
+        return raw[k][0]
+
+    def ok(k):
+        return raw[k][1]
+
+    def first_nonzero(a, b):
+        return np.where(val(a) != 0, val(a), val(b)), ok(a) | ok(b)
+
+    columns, valid = {}, {}
+    for name in fields:
+        if name == "cw_5m":
+            v, m = first_nonzero("tiered_cache_creation_tokens_5m", "cache_creation_tokens_5m")
+        elif name == "cw_1h":
+            v, m = first_nonzero("tiered_cache_creation_tokens_1h", "cache_creation_tokens_1h")
+        elif name == "cw_rem":
+            cw_5m, _ = first_nonzero("tiered_cache_creation_tokens_5m", "cache_creation_tokens_5m")
+            cw_1h, _ = first_nonzero("tiered_cache_creation_tokens_1h", "cache_creation_tokens_1h")
+            rem_key = "tiered_cache_creation_tokens_remaining"
+            v = np.where(ok(rem_key), val(rem_key),
+                         np.maximum(val("cache_creation_tokens") - cw_5m - cw_1h, 0))
+            m = ok(rem_key) | ok("cache_creation_tokens")
+        elif name == "is_new":
+            v = ok("tiered_cache_store_price").copy()
+            m = np.ones(n, dtype=bool)
+        elif name == "cond_mult":
+            raw_mult = val("billing_cond_multiplier")
+            m = ok("billing_cond_multiplier")
+            v = np.where(m & (raw_mult > 0), raw_mult, 1.0)
+        elif name == "cwp_5m_new":
+            a, b = "tiered_cache_store_price_5m", "tiered_cache_store_price"
+            use_a = ok(a) & (val(a) != 0)
+            v = np.where(use_a, val(a), val(b))
+            m = use_a | ok(b)
+        else:
+            key = OTHER_COLUMNS[name][1][0]
+            v, m = val(key), ok(key)
+            if OTHER_COLUMNS[name][0] == "str":
+                v = np.where(m, v, "").astype(object)
+        columns[name] = v
+        valid[name] = m
+    return columns, valid
+
+
+def _other_fields(fields) -> list:
+    fields = list(fields or OTHER_COLUMNS)
+    unknown = [f for f in fields if f not in OTHER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown other columns: {unknown}")
+    return fields
+
+
+def iter_other_columns(other, fields=None, chunk_rows: int = OTHER_CHUNK_ROWS):
+    """Yield (start, columns, valid) per chunk of the `other` JSON column.
+
+    columns maps each requested OTHER_COLUMNS name to a typed NumPy array
+    (int64 token counts, float64 prices/ratios with NaN for missing, bool
+    is_new, object strings); valid maps the same names to a bool mask of
+    whether the underlying key was present. Only the JSON keys needed for
+    `fields` are decoded, and no per-row dicts are built on the Arrow path.
+    """
+    fields = _other_fields(fields)
+    keys = list(dict.fromkeys(k for f in fields for k in OTHER_COLUMNS[f][1]))
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+
+    values = other if isinstance(other, pd.Series) else pd.Series(np.asarray(other, dtype=object))
+    n = len(values)
+    for start in range(0, n, chunk_rows):
+        part = values.iloc[start:start + chunk_rows]
+        if pa is not None:
+            try:
+                arr = pa.array(part, type=pa.large_string(), from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arr = pa.array([s if isinstance(s, str) else "" for s in part], type=pa.large_string())
+            raw = _decode_other_chunk(arr, keys)
+        else:
+            raw = _decode_other_python([s if isinstance(s, str) else "" for s in part], keys)
+        columns, valid = _derive_other_columns(raw, fields, len(part))
+        yield start, columns, valid
+
+
+def extract_other_columns(other, fields=None, chunk_rows: int = OTHER_CHUNK_ROWS) -> tuple:
+    """Decode the whole `other` column into ({name: array}, {name: valid_mask})."""
+    fields = _other_fields(fields)
+    n = len(other)
+    columns, valid = {}, {}
+    for name in fields:
+        dtype = OTHER_COLUMNS[name][0]
+        columns[name] = np.empty(n, dtype=object if dtype == "str" else dtype)
+        valid[name] = np.empty(n, dtype=bool)
+
+    for start, chunk_cols, chunk_valid in iter_other_columns(other, fields, chunk_rows):
+        stop = start + len(next(iter(chunk_cols.values())))
+        for name in fields:
+            columns[name][start:stop] = chunk_cols[name]
+            valid[name][start:stop] = chunk_valid[name]
+    return columns, valid
+
+
+def parse_other_columnar(other_series: pd.Series, fields=None,
+                         chunk_rows: int = OTHER_CHUNK_ROWS) -> pd.DataFrame:
+    """Columnar drop-in for _parse_other_batch (typed columns, NaN for missing)."""
+    columns, _ = extract_other_columns(other_series, fields, chunk_rows)
+    return pd.DataFrame(columns, index=other_series.index)
+
+
+_PRICE_COLS = ("ip", "op", "chp", "cwp", "cwp_1h")
+
+
+class _TierIntervals:
+    """Per-model unit prices compiled from pricing.json for array lookup.
+
+    Tier boundaries of every tiered model are laid out in one sorted int64
+    array of composite keys ``model_idx << 32 | min_k``, so a whole column
+    of (model, pt_k) pairs resolves with a single ``np.searchsorted``.
+    Tiers of a model are assumed not to overlap (first declared tier wins
+    for a repeated min_k, as with the old merge+groupby.first()).
+    """
+
+    _SHIFT = 32
+
+    def __init__(self, pricing: dict):
+        flat_rows, tier_rows, bounds, max_ks, tier_model = [], [], [], [], []
+        self.flat_index: dict[str, int] = {}
+        self.tier_model_index: dict[str, int] = {}
+        self.base_tier_index: dict[str, int] = {}
+
+        for model, p in pricing.items():
+            if not isinstance(p, list):
+                self.flat_index[model] = len(flat_rows)
+                flat_rows.append([p.get(c, np.nan) for c in _PRICE_COLS])
+                continue
+
+            model_idx = len(self.tier_model_index)
+            self.tier_model_index[model] = model_idx
+            seen_min_k = set()
+            for pos, t in sorted(enumerate(p), key=lambda it: (int(it[1]["min_k"]), it[0])):
+                min_k = int(t["min_k"])
+                if min_k in seen_min_k:
+                    continue
+                seen_min_k.add(min_k)
+                if min_k == 0:
+                    self.base_tier_index[model] = len(tier_rows)
+                bounds.append((model_idx << self._SHIFT) + min_k)
+                max_k = int(t["max_k"])
+                max_ks.append(np.inf if max_k == -1 else max_k)
+                tier_model.append(model_idx)
+                tier_rows.append([t.get(c, np.nan) for c in _PRICE_COLS])
+
+        self.flat_prices = np.asarray(flat_rows, dtype="float64").reshape(-1, len(_PRICE_COLS))
+        self.tier_prices = np.asarray(tier_rows, dtype="float64").reshape(-1, len(_PRICE_COLS))
+        self.tier_bounds = np.asarray(bounds, dtype="int64")
+        self.tier_min_k = self.tier_bounds - (np.asarray(tier_model, dtype="int64") << self._SHIFT)
+        self.tier_max_k = np.asarray(max_ks, dtype="float64")
+        self.tier_model = np.asarray(tier_model, dtype="int64")
+
+    def lookup(self, models, prompt_tokens, force_base=None) -> np.ndarray:
+        """Return a (5, n) array of ip/op/chp/cwp/cwp_1h, NaN when unpriced.
+
+        force_base: optional bool mask of rows that take the min_k == 0 tier
+        regardless of prompt size (flat-tier billing).
+        """
+        n = len(models)
+        out = np.full((len(_PRICE_COLS), n), np.nan)
+        if n == 0:
+            return out
+
+        codes, uniques = pd.factorize(_as_column(models), use_na_sentinel=False)
+        uniq_flat = np.array([self.flat_index.get(m, -1) for m in uniques], dtype="int64")
+        uniq_tier = np.array([self.tier_model_index.get(m, -1) for m in uniques], dtype="int64")
+        uniq_base = np.array([self.base_tier_index.get(m, -1) for m in uniques], dtype="int64")
+
+        flat_idx = uniq_flat[codes]
+        is_flat = flat_idx >= 0
+        if is_flat.any():
+            out[:, is_flat] = self.flat_prices[flat_idx[is_flat]].T
+
+        model_idx = uniq_tier[codes]
+        is_tiered = model_idx >= 0
+        if not is_tiered.any() or len(self.tier_bounds) == 0:
+            return out
+
+        pt = pd.to_numeric(_as_column(prompt_tokens), errors="coerce")
+        pt = np.asarray(pt, dtype="float64")
+        pt_k = np.floor_divide(np.trunc(pt), 1000)
+
+        rows = np.flatnonzero(is_tiered)
+        tier_idx = np.full(len(rows), -1, dtype="int64")
+
+        if force_base is not None:
+            base = np.asarray(force_base, dtype=bool)[rows]
+            tier_idx[base] = uniq_base[codes[rows[base]]]
+        else:
+            base = np.zeros(len(rows), dtype=bool)
+
+        search = ~base & ~np.isnan(pt_k[rows])
+        if search.any():
+            s_rows = rows[search]
+            s_pt_k = pt_k[s_rows]
+            s_model = model_idx[s_rows]
+            key = (s_model << self._SHIFT) + np.clip(s_pt_k, 0, (1 << self._SHIFT) - 1).astype("int64")
+            cand = np.searchsorted(self.tier_bounds, key, side="right") - 1
+            safe = np.maximum(cand, 0)
+            ok = ((cand >= 0)
+                  & (self.tier_model[safe] == s_model)
+                  & (s_pt_k >= self.tier_min_k[safe])
+                  & (s_pt_k < self.tier_max_k[safe]))
+            tier_idx[np.flatnonzero(search)[ok]] = cand[ok]
+
+        hit = tier_idx >= 0
+        if hit.any():
+            out[:, rows[hit]] = self.tier_prices[tier_idx[hit]].T
+        return out
+
+
+_tier_intervals = None
+_tier_intervals_src = None
+
+
+def _get_tier_intervals() -> _TierIntervals:
+    """Compiled tier table, rebuilt whenever _load_pricing reloads."""
+    global _tier_intervals, _tier_intervals_src
+    pricing = get_pricing()
+    if _tier_intervals is None or _tier_intervals_src is not pricing:
+        _tier_intervals = _TierIntervals(pricing)
+        _tier_intervals_src = pricing
+    return _tier_intervals
+
+
 def _assign_prices(df: pd.DataFrame, flat_tier: bool = False,
                    flat_tier_since_ts: int = None) -> pd.DataFrame:
-    """Assign per-row tiered prices based on model and prompt_tokens."""
+    """Assign per-row tiered prices based on model and prompt_tokens.
+
+    Rows of flat_tier models (created at/after flat_tier_since_ts when given)
+    take the lowest tier when flat_tier=True; other tiered rows are placed by
+    prompt_tokens // 1000 against the model's [min_k, max_k) boundaries.
+    """
+    df = df.copy()
+
+    force_base = None
+    if flat_tier:
+        force_base = df["model"].isin(get_flat_tier_models())
+        if flat_tier_since_ts is not None and "created_at" in df.columns:
+            force_base &= df["created_at"].astype(int) >= flat_tier_since_ts
+        force_base = force_base.to_numpy()
+
+    prices = _get_tier_intervals().lookup(df["model"], df["prompt_tokens"], force_base)
+    for j, col in enumerate(_PRICE_COLS):
+        df[col] = prices[j]
+
+    return df
+
+
+def _assign_prices_merge(df: pd.DataFrame, flat_tier: bool = False,
+                         flat_tier_since_ts: int = None) -> pd.DataFrame:
+    """Reference merge+filter+groupby tier assignment (kept for equivalence checks)."""
     df = df.copy()
     for col in ("ip", "op", "chp", "cwp", "cwp_1h"):
         df[col] = np.nan
@@ -801,7 +1456,7 @@ def recalc_from_raw(df: pd.DataFrame,
         flat_tier = True
 
     # Parse other JSON
-    other_cols = _parse_other_batch(df["other"].fillna(""))
+    other_cols = parse_other_columnar(df["other"])
     df = pd.concat([df, other_cols], axis=1)
 
     # Assign tiered prices (for non-multimodal models)
@@ -940,12 +1595,8 @@ def recalc_from_raw(df: pd.DataFrame,
     df["has_pricing"]    = df["ip"].notna() | trust_quota_mask
 
     # Apply discounts
-    df["cost_discount"] = df.apply(
-        lambda r: get_cost_discount(r.get("channel_id", 0), r.get("model", "")),
-        axis=1)
-    df["revenue_discount"] = df.apply(
-        lambda r: get_revenue_discount(r.get("user_id", 0), r.get("model", "")),
-        axis=1)
+    df["cost_discount"], df["revenue_discount"] = _discount_columns(
+        df, "model", "", missing_key=0)
 
     df["cost_usd"]    = pd.Series(price_base) * df["cost_discount"]
     df["revenue_usd"] = pd.Series(price_base) * df["revenue_discount"]
@@ -1042,6 +1693,106 @@ def cross_check(our_data: pd.DataFrame, vendor_bill: pd.DataFrame,
 # Row-level cross-check (request_id matching)
 # ---------------------------------------------------------------------------
 
+_ROW_LEVEL_MATCHED_COLS = ["request_id", "model_name", "our_quota", "vendor_quota",
+                           "quota_diff", "our_usd", "vendor_usd", "usd_diff"]
+
+
+def _matched_frame(request_ids, model_names, our_q: np.ndarray, v_q: np.ndarray) -> pd.DataFrame:
+    if not len(our_q):
+        return pd.DataFrame(columns=_ROW_LEVEL_MATCHED_COLS)
+    return pd.DataFrame({
+        "request_id": request_ids,
+        "model_name": model_names,
+        "our_quota": our_q,
+        "vendor_quota": v_q,
+        "quota_diff": our_q - v_q,
+        "our_usd": our_q / QUOTA_TO_USD,
+        "vendor_usd": v_q / QUOTA_TO_USD,
+        "usd_diff": (our_q - v_q) / QUOTA_TO_USD,
+    })
+
+
+def _str_values(col: pd.Series) -> pd.Series:
+    """col.astype(str), except missing values become "nan"/"None" like str(value)."""
+    out = col.astype(str)
+    missing = col.isna()
+    if missing.any():
+        out = out.astype(object)
+        out[missing] = col[missing].map(str)
+    return out
+
+
+def _row_level_join(ours: pd.DataFrame, vendor: pd.DataFrame):
+    """Partition collapsed request rows into matched / only-ours / only-vendor.
+
+    Request IDs from both sides are factorized together into one set of
+    integer codes (a shared categorical), and the codes are outer-merged with
+    an indicator, so each ID string is hashed once instead of probed per
+    request.
+
+    Returns (matched_df, only_ours_positions, only_vendor_positions); matched
+    rows and both position arrays follow `ours` / `vendor` row order.
+    """
+    our_ids = ours["request_id"].astype(str).reset_index(drop=True)
+    vendor_ids = vendor["request_id"].astype(str).reset_index(drop=True)
+    # First-seen code order: sorting millions of ID strings costs more than the join
+    codes, _ = pd.concat([our_ids, vendor_ids], ignore_index=True).factorize()
+    keys = pd.merge(
+        pd.DataFrame({"rid": codes[:len(our_ids)], "our_pos": np.arange(len(our_ids))}),
+        pd.DataFrame({"rid": codes[len(our_ids):], "vendor_pos": np.arange(len(vendor_ids))}),
+        on="rid", how="outer", indicator=True, sort=False)
+    side = keys["_merge"].to_numpy()
+
+    both = keys[side == "both"].sort_values("our_pos")
+    our_pos = both["our_pos"].to_numpy(dtype=np.int64)
+    vendor_pos = both["vendor_pos"].to_numpy(dtype=np.int64)
+    # Same lookups as the per-request Series.get("quota", 0) / .get("model_name", "")
+    our_q = (ours["quota"].astype(float).to_numpy()[our_pos] if "quota" in ours.columns
+             else np.zeros(len(our_pos)))
+    v_q = (vendor["quota"].astype(float).to_numpy()[vendor_pos] if "quota" in vendor.columns
+           else np.zeros(len(vendor_pos)))
+    models = (_str_values(ours["model_name"].iloc[our_pos]).to_numpy() if "model_name" in ours.columns
+              else np.full(len(our_pos), "", dtype=object))
+    matched = _matched_frame(our_ids.take(our_pos).to_numpy(), models, our_q, v_q)
+
+    only_ours = np.sort(keys.loc[side == "left_only", "our_pos"].to_numpy(dtype=np.int64))
+    only_vendor = np.sort(keys.loc[side == "right_only", "vendor_pos"].to_numpy(dtype=np.int64))
+    return matched, only_ours, only_vendor
+
+
+def _row_level_join_loop(ours: pd.DataFrame, vendor: pd.DataFrame):
+    """Reference set + per-request .loc partition (kept for equivalence checks)."""
+    our_ids = set(ours["request_id"].astype(str))
+    vendor_ids = set(vendor["request_id"].astype(str))
+
+    common_ids = our_ids & vendor_ids
+    only_our_ids = our_ids - vendor_ids
+    only_vendor_ids = vendor_ids - our_ids
+
+    ours_key = ours.set_index(ours["request_id"].astype(str))
+    vendor_key = vendor.set_index(vendor["request_id"].astype(str))
+
+    rids, models, our_qs, v_qs = [], [], [], []
+    for rid in common_ids:
+        our_row = ours_key.loc[rid]
+        v_row = vendor_key.loc[rid]
+        # Handle potential duplicates — take first
+        if isinstance(our_row, pd.DataFrame):
+            our_row = our_row.iloc[0]
+        if isinstance(v_row, pd.DataFrame):
+            v_row = v_row.iloc[0]
+        rids.append(rid)
+        models.append(str(our_row.get("model_name", "")))
+        our_qs.append(float(our_row.get("quota", 0)))
+        v_qs.append(float(v_row.get("quota", 0)))
+
+    matched = _matched_frame(rids, models, np.asarray(our_qs, dtype=float),
+                             np.asarray(v_qs, dtype=float))
+    only_ours = np.flatnonzero(ours["request_id"].astype(str).isin(only_our_ids).to_numpy())
+    only_vendor = np.flatnonzero(vendor["request_id"].astype(str).isin(only_vendor_ids).to_numpy())
+    return matched, only_ours, only_vendor
+
+
 def cross_check_row_level(our_df: pd.DataFrame,
                           vendor_df: pd.DataFrame) -> dict:
     """Cross-check at the request_id level between our data and vendor data.
@@ -1088,46 +1839,9 @@ def cross_check_row_level(our_df: pd.DataFrame,
     ours = _collapse_request_rows(ours, "billed_usd")
     vendor = _collapse_request_rows(vendor, "vendor_usd")
 
-    our_ids = set(ours["request_id"].astype(str))
-    vendor_ids = set(vendor["request_id"].astype(str))
-
-    common_ids = our_ids & vendor_ids
-    only_our_ids = our_ids - vendor_ids
-    only_vendor_ids = vendor_ids - our_ids
-
-    # Matched records — compare quota
-    ours_key = ours.set_index(ours["request_id"].astype(str))
-    vendor_key = vendor.set_index(vendor["request_id"].astype(str))
-
-    matched_rows = []
-    for rid in common_ids:
-        our_row = ours_key.loc[rid]
-        v_row = vendor_key.loc[rid]
-        # Handle potential duplicates — take first
-        if isinstance(our_row, pd.DataFrame):
-            our_row = our_row.iloc[0]
-        if isinstance(v_row, pd.DataFrame):
-            v_row = v_row.iloc[0]
-
-        our_q = float(our_row.get("quota", 0))
-        v_q = float(v_row.get("quota", 0))
-        matched_rows.append({
-            "request_id": rid,
-            "model_name": str(our_row.get("model_name", "")),
-            "our_quota": our_q,
-            "vendor_quota": v_q,
-            "quota_diff": our_q - v_q,
-            "our_usd": our_q / QUOTA_TO_USD,
-            "vendor_usd": v_q / QUOTA_TO_USD,
-            "usd_diff": (our_q - v_q) / QUOTA_TO_USD,
-        })
-
-    matched_df = pd.DataFrame(matched_rows) if matched_rows else pd.DataFrame(
-        columns=["request_id", "model_name", "our_quota", "vendor_quota",
-                 "quota_diff", "our_usd", "vendor_usd", "usd_diff"])
-
-    only_ours_df = ours[ours["request_id"].astype(str).isin(only_our_ids)].copy()
-    only_vendor_df = vendor[vendor["request_id"].astype(str).isin(only_vendor_ids)].copy()
+    matched_df, only_our_pos, only_vendor_pos = _row_level_join(ours, vendor)
+    only_ours_df = ours.iloc[only_our_pos].copy()
+    only_vendor_df = vendor.iloc[only_vendor_pos].copy()
 
     # Model-level summary
     our_model_agg = ours.groupby("model_name").agg(
@@ -1150,9 +1864,9 @@ def cross_check_row_level(our_df: pd.DataFrame,
     stats = {
         "total_our_records": len(ours),
         "total_vendor_records": len(vendor),
-        "matched_records": len(common_ids),
-        "only_ours_records": len(only_our_ids),
-        "only_vendor_records": len(only_vendor_ids),
+        "matched_records": len(matched_df),
+        "only_ours_records": len(only_ours_df),
+        "only_vendor_records": len(only_vendor_df),
         "quota_mismatched": len(mismatched),
         "our_total_usd": float(ours["billed_usd"].sum()),
         "vendor_total_usd": float(vendor["vendor_usd"].sum()),
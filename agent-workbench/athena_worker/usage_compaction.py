@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+usage_logs 日压缩 — 把已关闭的 UTC 日重写为 Parquet（ezmodel_logs.usage_logs_compact）
+
+usage_logs 是 gzip ndjson + JsonSerDe，每个账单查询都要对整天分区逐行解析
+other JSON。压缩后每天一份 Parquet：
+  - 行按 usage_logs_dedup 的列去重（与账单查询的 SELECT DISTINCT 一致）；
+  - other 中账单用到的字段抽成强类型列（queries.COMPACT_OTHER_FIELDS），
+    另有 cw_5m / cw_1h / cw_remaining 三个派生列；
+  - 分区与 usage_logs 相同（year/month/day/hour），建表见 07_*.sql。
+
+每压缩完一天写一个清单文件 {location}/_manifest/YYYY-MM-DD.json；queries.py
+只对登记过的日改读压缩表，其余日仍读 JSON 表。
+
+后端:
+  - location 为 s3://...（默认）时用 Athena UNLOAD 写出；
+  - location 为本地目录时用 pyarrow 读取 USAGE_LOGS_LOCAL_DIR 下同样布局的
+    ndjson(.gz) 并写 Parquet，供本地调试和测试。
+
+用法:
+    python usage_compaction.py --pending                 # 压缩最近几天已关闭且未压缩的日
+    python usage_compaction.py --date 2026-03-29         # 重新压缩指定日
+    python usage_compaction.py --date 2026-03-29 --print-sql
+    python usage_compaction.py --date 2026-03-29 --location /tmp/compact --source-dir /tmp/usage-logs
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import queries
+from logging_config import get_logger, log_error
+
+logger = get_logger("usage_compaction")
+
+# 开启后 queries.py 才会改读压缩表，bill_cron 日任务才会执行压缩
+COMPACT_ENABLED = os.getenv("USAGE_COMPACT_ENABLED", "0").lower() in ("1", "true", "yes")
+COMPACT_LOCATION = os.getenv("USAGE_COMPACT_LOCATION",
+                             "s3://ezmodel-log/usage-logs-compact").rstrip("/")
+# 日结束后再等这么久才算「已关闭」，给迟到的日志留时间
+COMPACT_GRACE_HOURS = float(os.getenv("USAGE_COMPACT_GRACE_HOURS", "2"))
+COMPACT_DAYS_BACK = int(os.getenv("USAGE_COMPACT_DAYS_BACK", "3"))
+COMPACT_MANIFEST_TTL = int(os.getenv("USAGE_COMPACT_MANIFEST_TTL", "300"))
+LOCAL_SOURCE_DIR = os.getenv("USAGE_LOGS_LOCAL_DIR", "")
+
+MANIFEST_DIR = "_manifest"
+
+
+# ---------------------------------------------------------------------------
+# Layout
+# ---------------------------------------------------------------------------
+
+def _parse_day(day: str) -> datetime:
+    try:
+        return datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise ValueError(f"day must be YYYY-MM-DD, got {day!r}") from None
+
+
+def _is_s3(location: str) -> bool:
+    return location.startswith("s3://")
+
+
+def _split_s3(location: str) -> tuple[str, str]:
+    bucket, _, prefix = location[len("s3://"):].partition("/")
+    return bucket, prefix.strip("/")
+
+
+def _s3_key(prefix: str, *parts: str) -> str:
+    return "/".join(p for p in (prefix, *parts) if p)
+
+
+def day_path(day: str) -> str:
+    """'2026-03-29' → '2026/03/29' (same layout as usage_logs)."""
+    return _parse_day(day).strftime("%Y/%m/%d")
+
+
+def is_closed(day: str, now: datetime = None) -> bool:
+    """True once the UTC day ended at least COMPACT_GRACE_HOURS ago."""
+    now = now or datetime.now(timezone.utc)
+    return _parse_day(day) + timedelta(days=1, hours=COMPACT_GRACE_HOURS) <= now
+
+
+def closed_days(now: datetime = None, days_back: int = None) -> list[str]:
+    """Closed UTC days within the last days_back days."""
+    now = now or datetime.now(timezone.utc)
+    days_back = COMPACT_DAYS_BACK if days_back is None else days_back
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    days = [(today - timedelta(days=back)).strftime("%Y-%m-%d")
+            for back in range(days_back, 0, -1)]
+    return [day for day in days if is_closed(day, now)]
+
+
+# ---------------------------------------------------------------------------
+# Athena backend
+# ---------------------------------------------------------------------------
+
+def compact_day_sql(day: str, location: str = None) -> str:
+    """UNLOAD one UTC day of usage_logs into {location}/YYYY/MM/DD/hour=HH/."""
+    location = (location or COMPACT_LOCATION).rstrip("/")
+    d = _parse_day(day)
+    where = queries._partition_filter(d.strftime("%Y"), d.strftime("%m"), day=d.strftime("%d"))
+    base = ",\n        ".join(queries.USAGE_LOGS_BASE_COLUMNS + ("hour",))
+    outer = ",\n    ".join(queries.USAGE_LOGS_BASE_COLUMNS
+                           + tuple(queries.compact_field_exprs()) + ("hour",))
+    return f"""
+UNLOAD (
+SELECT
+    {outer}
+FROM (
+    SELECT DISTINCT
+        {base}
+    FROM {queries.USAGE_LOGS_TABLE}
+    WHERE {where}
+)
+)
+TO '{location}/{day_path(day)}/'
+WITH (format = 'PARQUET', compression = 'ZSTD', partitioned_by = ARRAY['hour'])
+"""
+
+
+def _delete_s3_prefix(s3, bucket: str, prefix: str) -> int:
+    deleted = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if keys:
+            s3.delete_objects(Bucket=bucket, Delete={"Objects": keys, "Quiet": True})
+            deleted += len(keys)
+    return deleted
+
+
+def _compact_day_athena(day: str, location: str) -> dict:
+    from athena_engine import _get_s3, run_query
+    s3 = _get_s3()
+    bucket, prefix = _split_s3(location)
+    # UNLOAD 要求目标前缀为空；重跑时先清掉上一次的结果
+    _delete_s3_prefix(s3, bucket, _s3_key(prefix, day_path(day)) + "/")
+    result = run_query(compact_day_sql(day, location))
+    return {"scanned_bytes": result.get("scanned_bytes", 0),
+            "exec_ms": result.get("exec_ms", 0)}
+
+
+# ---------------------------------------------------------------------------
+# Local backend (pyarrow)
+# ---------------------------------------------------------------------------
+
+_BASE_TYPES = {
+    "request_id": "string", "created_at": "int64", "user_id": "int32",
+    "username": "string", "channel_id": "int32", "model_name": "string",
+    "token_name": "string", "prompt_tokens": "int32", "completion_tokens": "int32",
+    "quota": "int32", "use_time_seconds": "int32", "is_stream": "bool",
+    "ip": "string", "other": "string",
+}
+_SQL_TO_ARROW = {"BIGINT": "int64", "DOUBLE": "float64", "VARCHAR": "string"}
+_INT_RE = re.compile(r"\s*[+-]?\d+\s*")
+
+
+def _json_scalar(obj, key: str):
+    """json_extract_scalar(other, '$.key'): scalars as text, objects/arrays → None."""
+    value = obj.get(key) if isinstance(obj, dict) else None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, str)):
+        return str(value)
+    return None
+
+
+def _try_cast(text, sql_type: str):
+    """Athena TRY_CAST from varchar: unparsable → None."""
+    if text is None or sql_type == "VARCHAR":
+        return text
+    if sql_type == "BIGINT":
+        if not _INT_RE.fullmatch(text):
+            return None
+        value = int(text)
+        return value if -2**63 <= value < 2**63 else None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _other_fields(other) -> dict:
+    try:
+        obj = json.loads(other) if isinstance(other, str) else None
+    except ValueError:
+        obj = None
+    row = {key: _try_cast(_json_scalar(obj, key), sql_type)
+           for key, sql_type in queries.COMPACT_OTHER_FIELDS}
+    for name, keys in queries.COMPACT_DERIVED_FIELDS:
+        row[name] = next((row[k] for k in keys if row[k] is not None), 0)
+    return row
+
+
+def _read_ndjson(path: Path):
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            # 'ignore.malformed.json' = 'TRUE': the JsonSerDe reads a row of NULLs
+            if not isinstance(record, dict):
+                yield {}
+                continue
+            yield {str(k).lower(): v for k, v in record.items()}
+
+
+def _source_value(record: dict, column: str):
+    value = record.get(column)
+    if column == "other" and isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return value
+
+
+def _compact_day_local(day: str, location: str, source_dir: str) -> dict:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not source_dir:
+        raise ValueError("local compaction needs a source directory (USAGE_LOGS_LOCAL_DIR)")
+    schema = pa.schema(
+        [(c, _BASE_TYPES[c]) for c in queries.USAGE_LOGS_BASE_COLUMNS]
+        + [(k, _SQL_TO_ARROW[t]) for k, t in queries.COMPACT_OTHER_FIELDS]
+        + [(name, "int64") for name, _ in queries.COMPACT_DERIVED_FIELDS])
+
+    src = Path(source_dir) / day_path(day)
+    dest = Path(location) / day_path(day)
+    if dest.exists():
+        shutil.rmtree(dest)
+
+    source_rows = rows = 0
+    hours = sorted(p for p in src.iterdir() if p.is_dir()) if src.exists() else []
+    for hour_dir in hours:
+        seen = set()
+        out = []
+        for path in sorted(hour_dir.iterdir()):
+            if not path.is_file():
+                continue
+            for record in _read_ndjson(path):
+                source_rows += 1
+                base = tuple(_source_value(record, c) for c in queries.USAGE_LOGS_BASE_COLUMNS)
+                if base in seen:
+                    continue
+                seen.add(base)
+                row = dict(zip(queries.USAGE_LOGS_BASE_COLUMNS, base))
+                row.update(_other_fields(row["other"]))
+                out.append(row)
+        if not out:
+            continue
+        target = dest / f"hour={hour_dir.name}"
+        target.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pylist(out, schema=schema)
+        pq.write_table(table, target / "part-00000.parquet", compression="zstd")
+        rows += len(out)
+    return {"source_rows": source_rows, "rows": rows}
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+_manifest_lock = threading.Lock()
+_manifest_cache = {"location": None, "at": 0.0, "days": frozenset()}
+
+
+def _manifest_name(day: str) -> str:
+    return f"{day}.json"
+
+
+def _write_manifest(location: str, day: str, info: dict) -> None:
+    body = json.dumps(info, ensure_ascii=False, sort_keys=True)
+    if _is_s3(location):
+        from athena_engine import _get_s3
+        bucket, prefix = _split_s3(location)
+        _get_s3().put_object(Bucket=bucket, Key=_s3_key(prefix, MANIFEST_DIR, _manifest_name(day)),
+                             Body=body.encode("utf-8"), ContentType="application/json")
+    else:
+        path = Path(location) / MANIFEST_DIR / _manifest_name(day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+
+
+def _remove_manifest(location: str, day: str) -> None:
+    if _is_s3(location):
+        from athena_engine import _get_s3
+        bucket, prefix = _split_s3(location)
+        _get_s3().delete_object(Bucket=bucket, Key=_s3_key(prefix, MANIFEST_DIR, _manifest_name(day)))
+    else:
+        path = Path(location) / MANIFEST_DIR / _manifest_name(day)
+        if path.exists():
+            path.unlink()
+
+
+def list_compacted_days(location: str = None) -> frozenset:
+    """Days with a manifest under location (uncached)."""
+    location = (location or COMPACT_LOCATION).rstrip("/")
+    names = []
+    if _is_s3(location):
+        from athena_engine import _get_s3
+        bucket, prefix = _split_s3(location)
+        paginator = _get_s3().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=_s3_key(prefix, MANIFEST_DIR) + "/"):
+            names.extend(obj["Key"].rsplit("/", 1)[-1] for obj in page.get("Contents", []))
+    else:
+        path = Path(location) / MANIFEST_DIR
+        if path.exists():
+            names = [p.name for p in path.iterdir()]
+    return frozenset(n[:-len(".json")] for n in names
+                     if re.fullmatch(r"\d{4}-\d{2}-\d{2}\.json", n))
+
+
+def compacted_days() -> frozenset:
+    """Compacted days for query routing; empty unless USAGE_COMPACT_ENABLED.
+
+    Cached for USAGE_COMPACT_MANIFEST_TTL seconds. A failed listing routes
+    everything to the JSON table until the next refresh.
+    """
+    if not COMPACT_ENABLED:
+        return frozenset()
+    with _manifest_lock:
+        cache = _manifest_cache
+        if cache["location"] == COMPACT_LOCATION and time.monotonic() - cache["at"] < COMPACT_MANIFEST_TTL:
+            return cache["days"]
+        try:
+            days = list_compacted_days(COMPACT_LOCATION)
+        except Exception as e:
+            logger.warning("Compaction manifest listing failed",
+                           extra={"event": "compaction_manifest_error", "error": str(e)})
+            days = frozenset()
+        cache.update(location=COMPACT_LOCATION, at=time.monotonic(), days=days)
+        return days
+
+
+def _invalidate_manifest_cache() -> None:
+    with _manifest_lock:
+        _manifest_cache.update(location=None, at=0.0, days=frozenset())
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+def compact_day(day: str, location: str = None, source_dir: str = None) -> dict:
+    """(Re)compact one UTC day and register it in the manifest."""
+    _parse_day(day)
+    location = (location or COMPACT_LOCATION).rstrip("/")
+    started = time.monotonic()
+    # 先撤销登记，重写期间查询回落到 JSON 表
+    _remove_manifest(location, day)
+    _invalidate_manifest_cache()
+    if _is_s3(location):
+        stats = _compact_day_athena(day, location)
+    else:
+        stats = _compact_day_local(day, location, source_dir or LOCAL_SOURCE_DIR)
+    info = {"day": day,
+            "compacted_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            **stats}
+    _write_manifest(location, day, info)
+    _invalidate_manifest_cache()
+    logger.info("Usage logs day compacted", extra={"event": "usage_compaction", **info})
+    return info
+
+
+def compact_pending(days_back: int = None, now: datetime = None,
+                    location: str = None, source_dir: str = None) -> list[dict]:
+    """Compact closed days within days_back that have no manifest yet.
+
+    A failing day is logged and reported with an 'error' key; the others
+    still run.
+    """
+    location = (location or COMPACT_LOCATION).rstrip("/")
+    done = list_compacted_days(location)
+    results = []
+    for day in closed_days(now, days_back):
+        if day in done:
+            continue
+        try:
+            results.append(compact_day(day, location, source_dir))
+        except Exception as e:
+            log_error(logger, "UsageCompactionError", f"Compaction failed for {day}: {e}", day=day)
+            results.append({"day": day, "error": str(e)})
+    return results
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="usage_logs → Parquet 日压缩")
+    parser.add_argument("--date", help="压缩指定 UTC 日 YYYY-MM-DD（已压缩则重写）")
+    parser.add_argument("--pending", action="store_true",
+                        help="压缩最近 --days-back 天内已关闭且未压缩的日")
+    parser.add_argument("--days-back", type=int, default=None,
+                        help=f"--pending 回看天数（默认 {COMPACT_DAYS_BACK}）")
+    parser.add_argument("--location", default=None,
+                        help=f"压缩表位置，s3://... 或本地目录（默认 {COMPACT_LOCATION}）")
+    parser.add_argument("--source-dir", default=None,
+                        help="本地后端的 usage_logs 源目录（默认 USAGE_LOGS_LOCAL_DIR）")
+    parser.add_argument("--print-sql", action="store_true", help="只打印 UNLOAD SQL")
+    args = parser.parse_args()
+
+    if args.print_sql:
+        if not args.date:
+            parser.error("--print-sql 需要 --date")
+        print(compact_day_sql(args.date, args.location))
+        return
+    if args.date:
+        results = [compact_day(args.date, args.location, args.source_dir)]
+    elif args.pending:
+        results = compact_pending(args.days_back, location=args.location,
+                                  source_dir=args.source_dir)
+    else:
+        parser.error("需要 --date 或 --pending")
+    for info in results:
+        print(json.dumps(info, ensure_ascii=False, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
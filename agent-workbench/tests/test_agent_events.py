@@ -0,0 +1,246 @@
+"""Tests for LISTEN/NOTIFY agent event push (no database needed)."""
+
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import psycopg2
+
+from app.services import agent as agent_service
+from app.services.agent_events import AgentEventHub, parse_payload
+from app.services.core import insert_agent_event
+
+Notify = namedtuple("Notify", "pid channel payload")
+
+
+class FakeListenConn:
+    """Readable through a socketpair, like psycopg2's connection fileno()."""
+
+    def __init__(self):
+        self._server, self._client = socket.socketpair()
+        self.notifies: list[Notify] = []
+        self.queries: list[str] = []
+        # Notifications psycopg2 reads together with the next query's reply
+        self.pending_with_reply: list[Notify] = []
+        self.autocommit = False
+        self.broken = False
+        self.closed = 0
+
+    def fileno(self):
+        return self._client.fileno()
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, args=()):
+                conn.queries.append(query)
+                conn.notifies.extend(conn.pending_with_reply)
+                conn.pending_with_reply.clear()
+
+        return Cursor()
+
+    def send(self, payload):
+        self._server.send(payload.encode() + b"\n")
+
+    def poll(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        data = self._client.recv(65536).decode()
+        self.notifies.extend(Notify(1, "agent_events", line) for line in data.splitlines())
+
+    def close(self):
+        self.closed = 1
+        self._server.close()
+        self._client.close()
+
+
+class Factory:
+    def __init__(self):
+        self.conns: list[FakeListenConn] = []
+
+    def __call__(self, dsn):
+        conn = FakeListenConn()
+        self.conns.append(conn)
+        return conn
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def make_hub(**kwargs):
+    factory = Factory()
+    hub = AgentEventHub("postgresql://db/wb", connect=factory, **kwargs)
+    return hub, factory
+
+
+def test_payload_round_trip():
+    assert parse_payload("as-20260601-abc:42") == ("as-20260601-abc", 42)
+    assert parse_payload("weird:id:7") == ("weird:id", 7)
+    assert parse_payload("no-seq") is None
+    assert parse_payload(":5") is None
+
+
+def test_insert_publishes_session_notification():
+    class Cursor:
+        def __init__(self):
+            self.calls = []
+
+        def execute(self, query, args=()):
+            self.calls.append((query, args))
+
+        def fetchone(self):
+            return {"id": "ae-1", "session_id": "as-1", "seq": 17}
+
+    cur = Cursor()
+    event = insert_agent_event(cur, "as-1", "assistant.delta", "assistant", "hi")
+    assert event["seq"] == 17
+    assert cur.calls[-1] == ("SELECT pg_notify(%s, %s)", ("agent_events", "as-1:17"))
+
+    cur = Cursor()
+    with patch.dict("os.environ", {"WORKBENCH_AGENT_EVENTS_NOTIFY": "0"}):
+        insert_agent_event(cur, "as-1", "assistant.delta", "assistant", "hi")
+    assert len(cur.calls) == 1
+
+
+def test_listener_fans_out_to_session_subscribers():
+    hub, factory = make_hub()
+    try:
+        a1 = hub.subscribe("as-a")
+        a2 = hub.subscribe("as-a")
+        b = hub.subscribe("as-b")
+        wait_until(lambda: hub.connected)
+        assert factory.conns[0].queries == ["LISTEN agent_events"]
+        assert factory.conns[0].autocommit
+        # Connect wakes current subscribers once for a catch-up read
+        assert a1.wait(0, 1.0)
+        a2.wait(0, 0)
+        b.wait(0, 0)
+
+        started = time.monotonic()
+        factory.conns[0].send("as-a:10")
+        assert a1.wait(9, 1.0)
+        assert time.monotonic() - started < 0.05
+        assert a2.wait(9, 1.0)
+        assert not b.wait(0, 0.05)
+
+        # Announcements already read are dropped; a stale seq does not wake the stream
+        factory.conns[0].send("as-a:10")
+        assert not a1.wait(10, 0.05)
+
+        a2.close()
+        b.close()
+        assert hub.stats()["subscribers"] == 1
+        assert hub.wait_timeout() == hub.resync_seconds
+    finally:
+        hub.close()
+
+
+def test_notification_read_with_idle_ping_is_dispatched():
+    hub, factory = make_hub(resync_seconds=1)
+    try:
+        sub = hub.subscribe("as-a")
+        wait_until(lambda: hub.connected)
+        assert sub.wait(0, 1.0)
+
+        # Arrives with the SELECT 1 reply: the socket is never readable for it
+        factory.conns[0].pending_with_reply.append(Notify(1, "agent_events", "as-a:5"))
+        assert sub.wait(4, 3.0)
+        assert factory.conns[0].queries[-1] == "SELECT 1"
+        assert hub.stats()["notifications"] == 1
+    finally:
+        hub.close()
+
+
+def test_disconnect_wakes_subscribers_and_falls_back_to_polling():
+    hub, factory = make_hub(reconnect_max_seconds=0.05)
+    try:
+        sub = hub.subscribe("as-a")
+        wait_until(lambda: hub.connected)
+        assert sub.wait(0, 1.0)
+
+        factory.conns[0].broken = True
+        factory.conns[0].send("as-a:3")
+        assert sub.wait(100, 1.0)  # woken to re-query even though nothing new was announced
+        wait_until(lambda: len(factory.conns) == 2 and hub.connected)
+        assert factory.conns[0].closed
+        stats = hub.stats()
+        assert (stats["connects"], stats["errors"]) == (2, 1)
+
+        factory.conns[1].send("as-a:4")
+        assert sub.wait(3, 1.0)
+    finally:
+        hub.close()
+    assert hub.wait_timeout() == 0.5
+
+
+def test_disabled_hub_never_connects():
+    hub, factory = make_hub(enabled=False)
+    sub = hub.subscribe("as-a")
+    assert not sub.wait(0, 0.01)
+    assert factory.conns == []
+    assert sub.wait_timeout() == 0.5
+
+
+def test_tail_queries_only_when_notified():
+    hub, factory = make_hub(resync_seconds=30)
+    events: list[dict] = []
+    queries: list[int] = []
+
+    def fake_fetch_all(cur, query, args=()):
+        session_id, after = args
+        queries.append(after)
+        return [dict(e) for e in events if e["session_id"] == session_id and e["seq"] > after]
+
+    @contextmanager
+    def fake_db_conn():
+        class Conn:
+            @contextmanager
+            def cursor(self, cursor_factory=None):
+                yield None
+
+        yield Conn()
+
+    chunks: list[str] = []
+    try:
+        with patch.object(agent_service, "get_hub", lambda: hub), \
+                patch.object(agent_service, "db_conn", fake_db_conn), \
+                patch.object(agent_service, "fetch_all", fake_fetch_all):
+            thread = threading.Thread(
+                target=lambda: chunks.extend(agent_service.stream_agent_events_tail("as-a", 0, 10)),
+                daemon=True,
+            )
+            thread.start()
+            wait_until(lambda: hub.connected and len(queries) >= 2)
+            time.sleep(0.3)
+            idle_queries = len(queries)
+            assert idle_queries == 2  # catch-up read + one re-read after the listener connected
+
+            events.append({"session_id": "as-a", "seq": 5, "event_type": "assistant.delta"})
+            factory.conns[0].send("as-a:5")
+            wait_until(lambda: len(chunks) == 1)
+            events.append({"session_id": "as-a", "seq": 6, "event_type": "run.completed"})
+            factory.conns[0].send("as-a:6")
+            thread.join(timeout=2)
+            assert not thread.is_alive()
+    finally:
+        hub.close()
+
+    assert [c.split("\n", 1)[0] for c in chunks] == ["event: assistant.delta", "event: run.completed"]
+    assert queries == [0, 0, 0, 5]
+    assert hub.stats()["subscribers"] == 0
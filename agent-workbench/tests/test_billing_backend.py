@@ -61,6 +61,7 @@ def test_parse_split_entity_from_filename():
     assert parse_split_entity_from_filename("bill_2026-05_detail_user123.zip") is None
     assert parse_split_artifact_entity_from_filename("bill_2026-05_user123_detail_customer.xlsx") == ("customer", "123")
     assert parse_split_artifact_entity_from_filename("bill_2026-05_ch65_detail.csv.zip") == ("channel", "65")
+    assert parse_split_artifact_entity_from_filename("bill_2026-05_user123_detail.parquet") == ("customer", "123")
     assert parse_split_artifact_entity_from_filename("bill_2026-05_detail.csv.zip") is None
 
 
@@ -127,6 +128,25 @@ def test_build_athena_bill_command_always_requests_detail():
     assert "--detail" in command["argv"]
 
 
+def test_build_athena_bill_command_passes_parquet_detail_format():
+    from app.services.billing import build_athena_bill_command
+
+    job = {
+        "id": "job-1",
+        "bill_type": "internal_customer_bill",
+        "request_payload": {"metadata": {"detail_format": "parquet"}},
+    }
+    run = {"id": "run-1", "month": "2026-05", "bill_type": "internal_customer_bill"}
+    config = {"id": "cfg-1", "version": "local-v0"}
+
+    command = build_athena_bill_command(job, run, config, "bills/internal_customer_bill/2026/05/all/run-1")
+    assert command["argv"][command["argv"].index("--detail-format") + 1] == "parquet"
+
+    job["request_payload"] = {"metadata": {}}
+    command = build_athena_bill_command(job, run, config, "bills/internal_customer_bill/2026/05/all/run-1")
+    assert "--detail-format" not in command["argv"]
+
+
 def test_build_daily_bill_command_requests_detail():
     from app.services.billing import build_athena_bill_command
 
@@ -0,0 +1,188 @@
+"""Tests for the process-wide Postgres connection pool (no database needed)."""
+
+from __future__ import annotations
+
+import threading
+import time
+from unittest.mock import patch
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from app.services import dbpool
+from app.services.dbpool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=()):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.queries.append(query)
+        self.conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeConn:
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.closed = 0
+        self.broken = False
+        self.queries: list[str] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        if self.broken:
+            raise psycopg2.OperationalError("connection lost")
+        self.commits += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+class Factory:
+    def __init__(self):
+        self.conns: list[FakeConn] = []
+
+    def __call__(self, dsn):
+        conn = FakeConn(dsn)
+        self.conns.append(conn)
+        return conn
+
+
+def make_pool(**kwargs):
+    factory = Factory()
+    kwargs.setdefault("maxconn", 3)
+    kwargs.setdefault("timeout", 1.0)
+    return ConnectionPool("postgresql://u:secret@db:5432/wb", connect=factory, **kwargs), factory
+
+
+def test_reuses_connections_and_keeps_commit_contract():
+    pool, factory = make_pool()
+    for _ in range(5):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO t VALUES (1)")
+    assert len(factory.conns) == 1
+    assert factory.conns[0].commits == 5
+
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE t SET x = 1")
+            raise ValueError("handler failed")
+    assert factory.conns[0].rollbacks == 1
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["in_use"], stats["checkouts"]) == (1, 1, 0, 6)
+
+
+def test_waits_for_a_free_connection_then_times_out():
+    pool, factory = make_pool(maxconn=1, timeout=2.0)
+    held = pool.getconn()
+    got = []
+
+    def borrower():
+        with pool.connection() as conn:
+            got.append(conn)
+
+    thread = threading.Thread(target=borrower)
+    thread.start()
+    time.sleep(0.1)
+    assert pool.stats()["waiting"] == 1
+    pool.putconn(held)
+    thread.join(timeout=2)
+    assert got == [held]
+    assert pool.stats()["wait_ms_max"] >= 50
+
+    pool.timeout = 0.05
+    held = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["utilization"] == 1.0
+    assert len(factory.conns) == 1
+
+
+def test_broken_and_dirty_connections_are_discarded():
+    pool, factory = make_pool(health_check_after=0)
+    with pool.connection():
+        pass
+    factory.conns[0].broken = True
+    with pool.connection() as conn:
+        assert conn is factory.conns[1]
+    assert factory.conns[0].closed
+    assert pool.stats()["health_check_failures"] == 1
+
+    # Lost connection during commit: error propagates, connection is not reused
+    pool.health_check_after = 3600
+    factory.conns[1].broken = True
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection():
+            pass
+    assert factory.conns[1].closed
+
+    # Returned mid-transaction: discarded instead of handed to the next request
+    conn = pool.getconn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1")
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_idle_trim_respects_minconn_and_lifetime():
+    pool, factory = make_pool(minconn=1, max_idle=0.05, max_lifetime=60)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    time.sleep(0.1)
+    with pool.connection():
+        pass
+    assert pool.stats()["size"] == 1
+
+    pool.max_lifetime = 0.01
+    time.sleep(0.05)
+    with pool.connection() as conn:
+        pass
+    assert conn is factory.conns[-1]
+    assert sum(1 for c in factory.conns if not c.closed) == 1
+
+
+def test_process_pool_registry_recreates_after_fork():
+    factory = Factory()
+    with patch.dict(dbpool._pools, clear=True), patch.object(dbpool, "_inherited", []), \
+            patch.object(dbpool, "_pools_pid", dbpool._pools_pid):
+        with patch.object(dbpool, "pool_settings_from_env", lambda: {"connect": factory, "maxconn": 2}):
+            pool = dbpool.get_pool("postgresql://u:secret@db/wb")
+            assert dbpool.get_pool("postgresql://u:secret@db/wb") is pool
+            with pool.connection():
+                pass
+            assert list(dbpool.pool_stats()) == ["postgresql://db/wb"]
+            with patch.object(dbpool.os, "getpid", lambda: dbpool._pools_pid + 1):
+                child = dbpool.get_pool("postgresql://u:secret@db/wb")
+                assert child is not pool
+                assert dbpool._inherited == [pool]
+            assert not factory.conns[0].closed
@@ -0,0 +1,76 @@
+"""KPI preview (bill_cli kpi --json) served from the per-day usage checkpoints."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+WORKBENCH_ROOT = Path(__file__).resolve().parents[1]
+ATHENA_WORKER_ROOT = WORKBENCH_ROOT / "athena_worker"
+sys.path.insert(0, str(ATHENA_WORKER_ROOT))
+
+import bill_cli  # noqa: E402
+import usage_cube  # noqa: E402
+
+
+def _cube() -> pd.DataFrame:
+    rows = []
+    for day, user_id, channel_id, model, quota in [
+        (1, 7, 65, "m1", 500000),
+        (2, 7, 66, "m2", 250000),
+        (2, 8, 65, "m1", 1000000),
+    ]:
+        row = {c: 1 for c in usage_cube.MEASURES}
+        row.update(day=day, user_id=user_id, username=f"u{user_id}", channel_id=channel_id,
+                   token_name="default", model_name=model, total_quota=quota,
+                   total_input_tokens=100, total_output_tokens=10)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=list(usage_cube.DIMENSIONS + usage_cube.MEASURES))
+
+
+def _unexpected(*args, **kwargs):
+    raise AssertionError("unexpected call")
+
+
+def _kpi(capsys, **kwargs) -> dict:
+    args = argparse.Namespace(month="2026-05", json=True, no_cache=False,
+                              channel_id=None, user_id=None)
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    bill_cli.cmd_kpi(args)
+    return json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+
+
+def test_kpi_preview_reads_checkpoints(capsys, monkeypatch):
+    loads = []
+    monkeypatch.setattr(usage_cube, "CUBE_ENABLED", True)
+    monkeypatch.delenv("ATHENA_E2E_MODE", raising=False)
+    monkeypatch.setattr(usage_cube, "load_month", lambda month, **kw: loads.append(month) or _cube())
+    monkeypatch.setattr(bill_cli, "run_query_cached", _unexpected)
+
+    payload = _kpi(capsys)
+    assert payload == {"total_usd": 3.5, "total_calls": 3, "unique_users": 2, "unique_models": 2,
+                       "total_input_tokens": 300, "total_output_tokens": 30}
+
+    payload = _kpi(capsys, channel_id=65, user_id=8)
+    assert (payload["total_usd"], payload["total_calls"], payload["unique_users"]) == (2.0, 1, 1)
+    assert loads == ["2026-05", "2026-05"]
+
+
+def test_kpi_preview_fixture_mode_keeps_query_path(capsys, monkeypatch):
+    sqls = []
+    monkeypatch.setenv("ATHENA_E2E_MODE", "fixture")
+    monkeypatch.setattr(usage_cube, "load_month", _unexpected)
+
+    def fake_run_query_cached(sql, no_cache=False):
+        sqls.append(sql)
+        return pd.DataFrame([{"total_usd": 1.0, "total_calls": 2, "unique_users": 1, "unique_models": 1,
+                              "total_input_tokens": 3, "total_output_tokens": 4}])
+
+    monkeypatch.setattr(bill_cli, "run_query_cached", fake_run_query_cached)
+    assert _kpi(capsys, channel_id=65)["total_calls"] == 2
+    assert "channel_id = 65" in sqls[0]
@@ -0,0 +1,162 @@
+"""Tests for the parallel rawlogs search."""
+
+from __future__ import annotations
+
+import gzip
+import io
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import rawlogs
+
+
+class _FakeRawlogsS3:
+    def __init__(self, objects: dict[str, bytes]):
+        self.objects = objects
+        self.gets: list[str] = []
+        self.lock = threading.Lock()
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        client = self
+
+        class _Paginator:
+            def paginate(self, Bucket, Prefix, PaginationConfig):
+                yield {"Contents": [{"Key": key, "Size": len(body)} for key, body in client.objects.items() if key.startswith(Prefix)]}
+
+        return _Paginator()
+
+    def get_object(self, Bucket, Key, Range=None):
+        with self.lock:
+            self.gets.append(Key)
+        body = self.objects[Key]
+        return {"Body": io.BytesIO(body), "ContentLength": len(body), "ContentType": "application/octet-stream"}
+
+
+def _reference_search(text: str, query: str) -> list[tuple[int, str]]:
+    """The previous decode-and-lowercase search, applied to a whole object."""
+    found = []
+    for line_number, line in enumerate(text.splitlines() or [text], start=1):
+        position = line.lower().find(query.lower())
+        if position >= 0:
+            found.append((line_number, line[max(0, position - 90): position + len(query) + 160]))
+    return found
+
+
+def _log_lines(hour: int, count: int) -> str:
+    lines = []
+    for i in range(count):
+        marker = "Request-ID-ÄBC" if i % 37 == 5 else "ok"
+        lines.append('{"hour": %d, "i": %d, "pad": "%s", "status": "%s"}' % (hour, i, "x" * (i % 300), marker))
+        if i % 50 == 0:
+            lines.append("")
+    return "\r\n".join(lines[:10]) + "\n" + "\n".join(lines[10:]) + "\n"
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    texts = {f"llm-raw-logs/2026/05/01/03/part-{n}.jsonl.gz": _log_lines(n, 400) for n in range(6)}
+    objects = {key: gzip.compress(text.encode("utf-8")) for key, text in texts.items()}
+    objects["llm-raw-logs/2026/05/01/03/plain.jsonl"] = texts["llm-raw-logs/2026/05/01/03/part-0.jsonl.gz"].encode("utf-8")
+    objects["llm-raw-logs/2026/05/01/03/not-really.gz"] = "first line\nREQUEST-id-äbc without gzip\n".encode("utf-8")
+    client = _FakeRawlogsS3(objects)
+    monkeypatch.setattr(rawlogs, "rawlogs_client", lambda: client)
+    # Small chunks so matches straddle chunk boundaries
+    monkeypatch.setattr(rawlogs, "RAWLOGS_SEARCH_CHUNK_BYTES", 1000)
+    return client, texts
+
+
+def _search(**kwargs):
+    params = {"bucket": "logs", "year": "2026", "month": "5", "day": "1", "hour": "3", "query": "request-id-äbc", "limit": 200, "object_limit": 100, "max_bytes_per_object": 1024 * 1024}
+    params.update(kwargs)
+    return rawlogs.search_rawlogs(rawlogs.RawLogsSearchRequest(**params))
+
+
+def test_search_matches_reference_line_numbers_and_snippets(fake_s3):
+    client, texts = fake_s3
+    result = _search(limit=200, workers=4)
+
+    by_key: dict[str, list[tuple[int, str]]] = {}
+    for match in result["matches"]:
+        by_key.setdefault(match["key"], []).append((match["line"], match["snippet"]))
+    for key, text in texts.items():
+        assert by_key[key] == _reference_search(text, "request-id-äbc")[: len(by_key[key])]
+    assert by_key["llm-raw-logs/2026/05/01/03/not-really.gz"] == [(2, "REQUEST-id-äbc without gzip")]
+
+    assert result["scanned_objects"] == result["listed_objects"] == 8
+    stats = {item["key"]: item for item in result["objects"]}
+    assert stats["llm-raw-logs/2026/05/01/03/not-really.gz"]["compression"] == "gzip-preview-fallback"
+    assert stats["llm-raw-logs/2026/05/01/03/plain.jsonl"]["compression"] is None
+    assert all(item["decoded_bytes"] > 0 and item["elapsed_ms"] >= 0 and item["error"] is None for item in result["objects"])
+
+
+def test_search_stops_once_limit_is_reached(fake_s3):
+    client, texts = fake_s3
+    result = _search(limit=3, workers=1)
+
+    assert result["truncated"] is True
+    assert len(result["matches"]) == 3
+    # One worker: the first object alone satisfies the limit and the rest are never fetched
+    assert result["scanned_objects"] == 1
+    assert len(client.gets) == 1
+    first = result["objects"][0]
+    assert first["decoded_bytes"] < len(texts[first["key"]].encode("utf-8"))
+
+
+def test_search_returns_first_matches_in_object_order(fake_s3, monkeypatch):
+    client, texts = fake_s3
+    first_key = next(iter(client.objects))
+    other_done = threading.Event()
+    scan_object = rawlogs.scan_rawlog_object
+
+    def first_object_last(client, bucket, item, *args):
+        # Hold the first object back until a later one has been scanned, so it completes out of order
+        if item["key"] == first_key:
+            other_done.wait(timeout=5)
+            return scan_object(client, bucket, item, *args)
+        result = scan_object(client, bucket, item, *args)
+        other_done.set()
+        return result
+
+    monkeypatch.setattr(rawlogs, "scan_rawlog_object", first_object_last)
+    concurrent = _search(limit=3, workers=4)
+    expected = _reference_search(texts[first_key], "request-id-äbc")[:3]
+
+    assert [(m["key"], m["line"], m["snippet"]) for m in concurrent["matches"]] == [(first_key, line, snippet) for line, snippet in expected]
+    assert concurrent["truncated"] is True
+    assert concurrent["matches"] == _search(limit=3, workers=1)["matches"]
+
+
+def test_search_truncates_objects_at_max_bytes(fake_s3):
+    client, texts = fake_s3
+    result = _search(object_limit=1, max_bytes_per_object=4096)
+
+    (stats,) = result["objects"]
+    assert stats["decoded_bytes"] == 4096 and stats["truncated"] is True
+    prefix = texts[stats["key"]].encode("utf-8")[:4096].decode("utf-8", errors="replace")
+    assert [(m["line"], m["snippet"]) for m in result["matches"]] == _reference_search(prefix, "request-id-äbc")
+    assert all(m["truncated_object"] for m in result["matches"])
+
+
+def test_search_reports_s3_failure_when_every_object_fails(fake_s3, monkeypatch):
+    client, _ = fake_s3
+
+    def broken(Bucket, Key, Range=None):
+        raise RuntimeError("access denied")
+
+    monkeypatch.setattr(client, "get_object", broken)
+    with pytest.raises(HTTPException) as excinfo:
+        _search()
+    assert excinfo.value.status_code == 502
+    assert "access denied" in excinfo.value.detail
+
+
+def test_matcher_folds_case_like_str_lower():
+    def hit(query: str, line: str) -> bool:
+        return rawlogs.compile_rawlog_matcher(query).search(line.encode("utf-8").lower()) is not None
+
+    for query, line in [("Straße-ÄB", "x STRASSE-äb"), ("Straße-ÄB", "x STRAßE-äb y"), ("straße-äb", "STRAßE-ÄB"),
+                        ("[.*]", "a [.*] b"), ("[.*]", "literal"), ("ÉTÉ", "été"), ("日志", "日志 OK")]:
+        assert hit(query, line) == (query.lower() in line.lower()), (query, line)
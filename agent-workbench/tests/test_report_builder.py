@@ -9,6 +9,7 @@ import zipfile
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
 WORKBENCH_ROOT = Path(__file__).resolve().parents[1]
 ATHENA_WORKER_ROOT = WORKBENCH_ROOT / "athena_worker"
@@ -52,8 +53,12 @@ def test_bill_summary_uses_channel_cost_and_target_maps(tmp_path):
 
 def test_daily_report_writes_cost_summary_for_bill_library(tmp_path, monkeypatch):
     monkeypatch.setattr(report_builder, "COST_MONITOR_AVAILABLE", False)
-    monkeypatch.setattr(report_builder.pricing_engine, "get_cost_discount", lambda channel_id, model: 0.5)
-    monkeypatch.setattr(report_builder.pricing_engine, "get_revenue_discount", lambda user_id, model: 0.8)
+    monkeypatch.setattr(report_builder.usage_cube, "CUBE_ENABLED", False)
+    discounts = {
+        "cost_discounts": {"defaults": {"*": 0.5}, "by_channel": {}},
+        "revenue_discounts": {"defaults": {"*": 0.8}, "by_user": {}},
+    }
+    monkeypatch.setattr(report_builder.pricing_engine, "_load_discounts", lambda: discounts)
 
     def fake_run_query_cached(sql: str, no_cache: bool = False):
         if "GROUP BY user_id, username, channel_id, model_name" in sql:
@@ -127,6 +132,39 @@ def test_daily_report_writes_cost_summary_for_bill_library(tmp_path, monkeypatch
     assert payload["per_customer_summary"]["7"]["total_usd"] == 5.0
 
 
+def test_daily_report_reads_day_checkpoint(tmp_path, monkeypatch):
+    usage_cube = report_builder.usage_cube
+    monkeypatch.setattr(report_builder, "COST_MONITOR_AVAILABLE", False)
+    monkeypatch.setattr(usage_cube, "CUBE_ENABLED", True)
+    monkeypatch.delenv("ATHENA_E2E_MODE", raising=False)
+    rows = []
+    for user_id, channel_id, model, quota in [(7, 65, "m1", 500000), (8, 66, "m2", 1000000)]:
+        row = {c: 1 for c in usage_cube.MEASURES}
+        row.update(day=20, user_id=user_id, username=f"u{user_id}", channel_id=channel_id,
+                   token_name="default", model_name=model, total_quota=quota)
+        rows.append(row)
+    cube = pd.DataFrame(rows, columns=list(usage_cube.DIMENSIONS + usage_cube.MEASURES))
+    loads = []
+    monkeypatch.setattr(usage_cube, "load_month",
+                        lambda month, **kw: loads.append((month, kw["start_day"], kw["end_day"])) or cube)
+    sqls = []
+
+    def fake_run_query_cached(sql: str, no_cache: bool = False):
+        sqls.append(sql)
+        if "GROUP BY hour" in sql:
+            return pd.DataFrame({"hour": [1], "call_count": [1], "total_tokens": [2], "total_usd": [1.0]})
+        return pd.DataFrame()
+
+    monkeypatch.setattr(report_builder, "run_query_cached", fake_run_query_cached)
+    paths = report_builder.generate_daily_report("2026-06-20", str(tmp_path), write_summary=False)
+
+    assert [Path(p).name for p in paths] == [
+        "daily_report_2026-06-20.xlsx", "daily_report_2026-06-20_ch65.xlsx", "daily_report_2026-06-20_ch66.xlsx"]
+    assert loads == [("2026-06", "2026-06-20", "2026-06-20")] * 3
+    # Only the hourly sheet is queried, once per workbook
+    assert len(sqls) == 3 and all("GROUP BY hour" in sql for sql in sqls)
+
+
 def test_detail_csv_zip_writes_readable_csv(tmp_path):
     df = pd.DataFrame(
         {
@@ -189,3 +227,382 @@ def test_customer_detail_large_fallback_streams_without_aggregation(tmp_path, mo
     assert rows[0]["created_at"].startswith("2024-")
     assert rows[0]["cw_5m"] == "3.0"
     assert rows[1]["cw_5m"] == "5.0"
+
+
+def _detail_days():
+    def day(day_no: int, rows: int, start: int) -> pd.DataFrame:
+        base = 1_780_000_000 + day_no * 86_400
+        return pd.DataFrame(
+            {
+                "request_id": [f"req-{start + i}" for i in range(rows)],
+                "created_at": [base + i for i in range(rows)],
+                "user_id": [7] * rows,
+                "model_name": ["m1"] * rows,
+                "prompt_tokens": list(range(rows)),
+                "quota": [500 * (i + 1) for i in range(rows)],
+                "other": ['{"cache_tokens": 1}'] * rows,
+                "image_input_tokens": [0] * rows,
+                "billed_usd": [0.001 * (i + 1) for i in range(rows)],
+            }
+        )
+
+    d1, d2, d3 = day(1, 4, 0), day(2, 3, 100), day(3, 2, 200)
+    # Same accounting row landing in two day partitions, once with the
+    # tokens column upcast to float by a NaN elsewhere in that day.
+    dup = d1.iloc[[1]].copy()
+    d2 = pd.concat([d2, dup], ignore_index=True)
+    d2.loc[0, "prompt_tokens"] = None
+    # Exact duplicate inside one day
+    d3 = pd.concat([d3, d3.iloc[[0]]], ignore_index=True)
+    return [d1, d2, d3]
+
+
+def _run_detail_export(tmp_path, monkeypatch, streaming: bool, name: str,
+                       detail_format: str = "auto") -> str:
+    days = _detail_days()
+    out_dir = tmp_path / name
+    out_dir.mkdir()
+    monkeypatch.setattr(report_builder, "DETAIL_EXPORT_STREAMING", streaming)
+    monkeypatch.setattr(report_builder.queries, "detail_day_list",
+                        lambda *a, **k: ["2026-05-01", "2026-05-02", "2026-05-03"])
+    monkeypatch.setattr(report_builder.queries, "raw_usage_detail_daily", lambda *a, day, **k: day)
+    monkeypatch.setattr(report_builder, "_apply_detail_pricing", lambda df, **k: df)
+    # Completion order differs from day order
+    monkeypatch.setattr(
+        report_builder,
+        "run_queries_parallel_iter",
+        lambda sqls: iter([(1, days[1]), (0, days[0]), (2, days[2])]),
+    )
+    return report_builder._export_detail_csv("2026-05", str(out_dir), detail_format=detail_format)
+
+
+def _read_zip_rows(path: str) -> list[dict]:
+    with zipfile.ZipFile(path) as zf:
+        (name,) = zf.namelist()
+        with zf.open(name) as handle:
+            return list(csv.DictReader(line.decode("utf-8") for line in handle))
+
+
+def test_streaming_detail_export_matches_in_memory_csv_zip(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_builder, "DETAIL_XLSX_ROW_LIMIT", 3)
+
+    expected = _run_detail_export(tmp_path, monkeypatch, False, "memory")
+    got = _run_detail_export(tmp_path, monkeypatch, True, "stream")
+
+    assert Path(got).name == Path(expected).name == "bill_2026-05_detail.csv.zip"
+    assert sorted(Path(got).parent.iterdir()) == [Path(got)]
+
+    def normalize(rows):
+        # pd.concat upcasts prompt_tokens to float for every day; the streaming
+        # writer formats each day with its own dtype.
+        return [{**r, "prompt_tokens": r["prompt_tokens"] and str(int(float(r["prompt_tokens"])))}
+                for r in rows]
+
+    expected_rows, got_rows = _read_zip_rows(expected), _read_zip_rows(got)
+    assert len(got_rows) == 4 + 3 + 2
+    assert "image_input_tokens" not in got_rows[0]
+    assert normalize(got_rows) == normalize(expected_rows)
+
+
+def test_streaming_detail_export_small_output_is_xlsx(tmp_path, monkeypatch):
+    import openpyxl
+
+    expected = _run_detail_export(tmp_path, monkeypatch, False, "memory")
+    got = _run_detail_export(tmp_path, monkeypatch, True, "stream")
+
+    assert Path(got).name == Path(expected).name == "bill_2026-05_detail.xlsx"
+    assert sorted(Path(got).parent.iterdir()) == [Path(got)]
+
+    def cells(path):
+        ws = openpyxl.load_workbook(path, read_only=True)["Detail"]
+        return [list(row) for row in ws.iter_rows(values_only=True)]
+
+    assert cells(got) == cells(expected)
+    assert len(cells(got)) == 2 + 9
+
+
+def test_parquet_detail_export_has_fixed_schema_and_day_row_groups(tmp_path, monkeypatch):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(report_builder, "DETAIL_XLSX_ROW_LIMIT", 3)
+    expected = _read_zip_rows(_run_detail_export(tmp_path, monkeypatch, True, "csv"))
+    # Parquet always streams, even with the CSV streaming path switched off
+    got = _run_detail_export(tmp_path, monkeypatch, False, "parquet", "parquet")
+
+    assert Path(got).name == "bill_2026-05_detail.parquet"
+    assert sorted(Path(got).parent.iterdir()) == [Path(got)]
+
+    pf = pq.ParquetFile(got)
+    assert pf.schema_arrow.equals(report_builder.detail_parquet_schema(), check_metadata=True)
+    assert "image_input_tokens" not in pf.schema_arrow.names
+    assert pa.types.is_dictionary(pf.schema_arrow.field("model_name").type)
+    assert pf.metadata.row_group(0).column(pf.schema_arrow.names.index("model_name")).compression == "ZSTD"
+
+    # One row group per queried day partition, in completion order. Day 2's
+    # partition carries a day-1 row the digest set could not know about yet.
+    assert [pf.metadata.row_group(rg).num_rows for rg in range(pf.num_row_groups)] == [4, 3, 2]
+    ts_col = pf.schema_arrow.names.index("created_at")
+    ranges = []
+    for rg in range(pf.num_row_groups):
+        stats = pf.metadata.row_group(rg).column(ts_col).statistics
+        ranges.append(((stats.min - 1_780_000_000) // 86_400, (stats.max - 1_780_000_000) // 86_400))
+    assert ranges == [(1, 2), (1, 1), (3, 3)]
+
+    df = report_builder.read_detail_parquet(got)
+    assert df["request_id"].tolist() == [r["request_id"] for r in expected]
+    assert df["quota"].tolist() == [int(r["quota"]) for r in expected]
+    assert df["prompt_tokens"].isna().sum() == 1
+    assert df["username"].isna().all()
+
+    day2 = report_builder.read_detail_parquet(
+        got, columns=["request_id", "quota"],
+        start_ts=1_780_000_000 + 2 * 86_400, end_ts=1_780_000_000 + 3 * 86_400)
+    assert list(day2.columns) == ["request_id", "quota"]
+    assert day2["request_id"].tolist() == ["req-100", "req-101", "req-102"]
+    assert report_builder.read_detail_parquet(got, columns=["user_id"], start_ts=2_000_000_000).empty
+
+
+def test_parquet_detail_format_keeps_customer_view_xlsx(tmp_path):
+    stream, digests = report_builder._start_detail_stream(
+        True, str(tmp_path), "bill_2026-05_detail", "t", "parquet")
+    assert stream is None and digests is None
+    with pytest.raises(ValueError):
+        report_builder._start_detail_stream(False, str(tmp_path), "b", "t", "orc")
+
+
+def test_usage_log_digest_set_drops_rows_seen_on_earlier_days():
+    digests = report_builder._UsageLogDigestSet()
+    day1 = pd.DataFrame({"request_id": ["a", "b"], "quota": [1, 2]})
+    day2 = pd.DataFrame({"request_id": ["b", "b", "c"], "quota": [2.0, 3.0, 1.0]})
+
+    assert digests.filter(day1)["request_id"].tolist() == ["a", "b"]
+    assert digests.filter(day2)["request_id"].tolist() == ["b", "c"]
+    assert digests.filter(day2.iloc[[2]]).empty
+    assert digests.removed == 2
+
+
+# ---------------------------------------------------------------------------
+# Split-bill fan-out vs one generate_monthly_bill run per entity
+# ---------------------------------------------------------------------------
+
+_CACHE_COLS = ["total_cache_hit_tokens", "total_cache_write_tokens",
+               "total_cw_5m", "total_cw_1h", "total_cw_remaining"]
+
+
+def _split_usage_rows() -> pd.DataFrame:
+    rows = []
+    users = {7: "alpha", 8: "beta", 9: "gamma"}
+    for i in range(60):
+        uid = 7 + i % 3
+        day = 1 + i % 4
+        rows.append({
+            "request_id": f"req-{i}",
+            "created_at": 1_777_593_600 + (day - 1) * 86_400 + i,  # 2026-05-01 UTC
+            "user_id": uid,
+            "username": users[uid],
+            "channel_id": 65 + i % 2,
+            "model_name": ["m-a", "m-b", "m-c"][i % 5 % 3],
+            "token_name": ["key-1", "key-2"][i % 7 % 2],
+            "prompt_tokens": 100 + i,
+            "completion_tokens": 10 + i,
+            "quota": 1_000 * (i + 1),
+            "day": f"{day:02d}",
+        })
+    return pd.DataFrame(rows)
+
+
+class _FakeAthena:
+    """Answers the query builders from raw rows, counting every query run."""
+
+    def __init__(self, raw: pd.DataFrame):
+        self.raw = raw
+        self.sqls: list[tuple] = []
+
+    def patch(self, monkeypatch):
+        for name in ("monthly_bill_full", "daily_trend", "daily_trend_by_model"):
+            monkeypatch.setattr(report_builder.queries, name,
+                                lambda ym, _name=name, **kw: (_name, kw))
+        monkeypatch.setattr(report_builder.queries, "raw_usage_detail_daily",
+                            lambda ym, day, **kw: ("detail", {**kw, "day": day}))
+        monkeypatch.setattr(report_builder.queries, "detail_day_list",
+                            lambda *a, **k: ["2026-05-01", "2026-05-02", "2026-05-03", "2026-05-04"])
+        monkeypatch.setattr(report_builder, "run_query_cached", self.run)
+        monkeypatch.setattr(report_builder, "run_queries_parallel_iter",
+                            lambda sqls: reversed(list(enumerate(self.run(s) for s in sqls))))
+
+    def _rows(self, kw: dict) -> pd.DataFrame:
+        df = self.raw
+        if kw.get("user_id") is not None:
+            df = df[df["user_id"] == kw["user_id"]]
+        if kw.get("channel_ids"):
+            df = df[df["channel_id"].isin(kw["channel_ids"])]
+        elif kw.get("channel_id") is not None:
+            df = df[df["channel_id"] == kw["channel_id"]]
+        if kw.get("day"):
+            df = df[df["day"] == kw["day"][-2:]]
+        return df
+
+    @staticmethod
+    def _agg(df: pd.DataFrame, keys: list[str], columns: list[str]) -> pd.DataFrame:
+        out = df.groupby(keys).agg(
+            call_count=("request_id", "nunique"),
+            total_input_tokens=("prompt_tokens", "sum"),
+            total_output_tokens=("completion_tokens", "sum"),
+            total_quota=("quota", "sum"),
+        ).reset_index()
+        out["total_tokens"] = out["total_input_tokens"] + out["total_output_tokens"]
+        for col in _CACHE_COLS:
+            out[col] = 0
+        out["total_usd"] = (out["total_quota"] / 500_000).round(4)
+        return out[keys + ["call_count"] + columns + _CACHE_COLS + ["total_quota", "total_usd"]]
+
+    def run(self, sql, no_cache: bool = False) -> pd.DataFrame:
+        self.sqls.append(sql)
+        name, kw = sql
+        df = self._rows(kw)
+        entity = ["user_id", "channel_id"] if kw.get("by_entity") else []
+        io = ["total_input_tokens", "total_output_tokens"]
+        if name == "detail":
+            return df.drop(columns=["day"]).reset_index(drop=True)
+        if name == "monthly_bill_full":
+            out = self._agg(df, ["user_id", "username", "channel_id", "model_name"], io)
+            out["total_image_output_tokens"] = 0
+            out["total_image_input_tokens"] = 0
+            return out.sort_values(["user_id", "total_usd"], ascending=[True, False])
+        df = df.assign(day="2026-05-" + df["day"])
+        if name == "daily_trend":
+            return self._agg(df, ["day"] + entity, ["total_tokens"]).sort_values("day")
+        return self._agg(df, ["day"] + entity + ["token_name", "model_name"], io + ["total_tokens"]).sort_values(
+            ["day", "token_name", "total_usd"], ascending=[True, True, False])
+
+
+def _xlsx_cells(path) -> dict:
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    return {ws.title: [list(r) for r in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+
+
+@pytest.mark.parametrize("raw, expected", [("", 3), ("0", 3), ("2", 2), ("-2", 1), ("four", 3), (" 5 ", 5)])
+def test_split_bill_workers_env_is_parsed_defensively(monkeypatch, raw, expected):
+    monkeypatch.setenv("SPLIT_BILL_WORKERS", raw)
+    warnings = []
+    monkeypatch.setattr(report_builder.logger, "warning", lambda msg, **kw: warnings.append(kw["extra"]))
+
+    assert report_builder._env_workers("SPLIT_BILL_WORKERS", 3) == expected
+    assert bool(warnings) == (raw in ("-2", "four"))
+
+
+def _run_split_bill(tmp_path, monkeypatch, name: str, fan_out: bool, workers: int = 1, **kwargs):
+    discounts = {
+        "cost_discounts": {"defaults": {"*": 0.5}, "by_channel": {}},
+        "revenue_discounts": {"defaults": {"*": 0.8}, "by_user": {}},
+    }
+    monkeypatch.setattr(report_builder.pricing_engine, "_load_discounts", lambda: discounts)
+    monkeypatch.setattr(report_builder, "SPLIT_BILL_FANOUT", fan_out)
+    monkeypatch.setattr(report_builder, "SPLIT_BILL_WORKERS", workers)
+    athena = _FakeAthena(_split_usage_rows())
+    athena.patch(monkeypatch)
+    out_dir = tmp_path / name
+    result = report_builder.generate_monthly_bill("2026-05", str(out_dir), **kwargs)
+    return result, athena.sqls, out_dir
+
+
+@pytest.mark.parametrize("kwargs", [
+    dict(customer_view=True, detail=True),
+    dict(bill_type="channel_cost_bill", split_channels=True, split_internal_customers=True, detail=True),
+])
+def test_split_bill_fanout_matches_per_entity_runs(tmp_path, monkeypatch, kwargs):
+    expected, expected_sqls, expected_dir = _run_split_bill(tmp_path, monkeypatch, "ref", False, **kwargs)
+    got, got_sqls, got_dir = _run_split_bill(tmp_path, monkeypatch, "fan", True, **kwargs)
+
+    assert [Path(p).name for p in got] == [Path(p).name for p in expected]
+    entities = len(got) // 2 - 1
+    assert entities == (3 if kwargs.get("customer_view") else 2 + 3)
+    # One scan: 3 summary queries + 4 day queries, instead of that per entity too
+    assert len(got_sqls) == 3 + 4
+    assert len(expected_sqls) == (3 + 4) * (1 + entities)
+
+    for path in got:
+        name = Path(path).name
+        if name.endswith(".xlsx"):
+            assert _xlsx_cells(path) == _xlsx_cells(expected_dir / name), name
+        else:
+            assert _read_zip_rows(path) == _read_zip_rows(str(expected_dir / name)), name
+    assert json.loads((got_dir / "bill_summary.json").read_text()) == \
+        json.loads((expected_dir / "bill_summary.json").read_text())
+
+
+def test_split_bill_fanout_process_pool(tmp_path, monkeypatch):
+    got, _, _ = _run_split_bill(tmp_path, monkeypatch, "pool", True, workers=2,
+                                bill_type="internal_customer_bill", split_internal_customers=True)
+    _, _, serial_dir = _run_split_bill(tmp_path, monkeypatch, "serial", True, workers=1,
+                                            bill_type="internal_customer_bill",
+                                            split_internal_customers=True)
+    assert [Path(p).name for p in got] == [
+        "bill_2026-05.xlsx", "bill_2026-05_user7.xlsx", "bill_2026-05_user8.xlsx", "bill_2026-05_user9.xlsx"]
+    for path in got:
+        assert _xlsx_cells(path) == _xlsx_cells(serial_dir / Path(path).name)
+
+    user8 = _xlsx_cells(got[2])
+    assert [row[0] for row in user8["用户汇总"][2:-1]] == [8]
+    assert sum(row[1] for row in user8["每日趋势"][2:]) == 20
+
+
+def _cross_month_usage_logs(root: Path):
+    """DuckDB with ezmodel_logs.usage_logs over hour partitions 2026-05-15 07 … 2026-06-15 08."""
+    import gzip
+
+    duckdb = pytest.importorskip("duckdb")
+    import queries
+    import usage_compaction
+
+    for hour, request_id, quota in [("2026-05-15 07", "before", 111), ("2026-05-15 08", "r1", 1000),
+                                    ("2026-05-31 23", "r2", 2000), ("2026-06-01 00", "r3", 4000),
+                                    ("2026-06-14 07", "r4", 8000), ("2026-06-15 08", "after", 222)]:
+        created = int(pd.Timestamp(hour + ":01", tz="UTC").timestamp())
+        path = root / hour[:10].replace("-", "/") / hour[11:] / f"{request_id}.ndjson.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        row = {"request_id": request_id, "created_at": created, "user_id": 7, "username": "alpha",
+               "channel_id": 65, "model_name": "m1", "token_name": "default", "prompt_tokens": 100,
+               "completion_tokens": 20, "quota": quota, "use_time_seconds": 2, "is_stream": True,
+               "ip": "10.0.0.1", "other": "{}"}
+        with gzip.open(path, "wt", encoding="utf-8") as fh:
+            fh.write(json.dumps(row) + "\n")
+    db = duckdb.connect()
+    db.execute("CREATE SCHEMA ezmodel_logs")
+    db.execute("CREATE MACRO json_extract_scalar(j, p) AS json_extract_string(j, p)")
+    parts = r"regexp_extract(filename, '(\d{{4}})/(\d{{2}})/(\d{{2}})/(\d{{2}})/', {})"
+    duck_types = {"string": "VARCHAR", "int64": "BIGINT", "int32": "INTEGER", "bool": "BOOLEAN"}
+    columns = ", ".join(f"{c}: '{duck_types[usage_compaction._BASE_TYPES[c]]}'"
+                        for c in queries.USAGE_LOGS_BASE_COLUMNS)
+    db.execute(f"""
+        CREATE VIEW ezmodel_logs.usage_logs AS
+        SELECT * EXCLUDE (filename), {parts.format(1)} AS year, {parts.format(2)} AS month,
+               {parts.format(3)} AS day, {parts.format(4)} AS hour
+        FROM read_json('{root}/**/*.ndjson.gz', format = 'newline_delimited',
+                       columns = {{{columns}}}, filename = true)""")
+    return db
+
+
+@pytest.mark.parametrize("period, first_day_quota, detail_ids", [
+    (dict(start_time="2026-05-15 08:00", end_time="2026-06-15 07:59"), 1000, ["r1", "r2", "r3", "r4"]),
+    (dict(start_day="2026-05-15", end_day="2026-06-14"), 1111, ["before", "r1", "r2", "r3", "r4"]),
+])
+def test_cross_month_billing_period(tmp_path, monkeypatch, period, first_day_quota, detail_ids):
+    db = _cross_month_usage_logs(tmp_path / "usage-logs")
+    run = lambda sql, no_cache=False: db.execute(sql).df()  # noqa: E731
+    monkeypatch.setattr(report_builder, "COST_MONITOR_AVAILABLE", False)
+    monkeypatch.setattr(report_builder, "run_query_cached", run)
+    monkeypatch.setattr(report_builder, "run_queries_parallel_iter",
+                        lambda sqls: enumerate(run(sql) for sql in sqls))
+
+    result = report_builder.generate_monthly_bill("2026-05", str(tmp_path / "out"), detail=True, **period)
+    paths = [result] if isinstance(result, str) else result
+    trend = {row[0]: row[-2] for row in _xlsx_cells(paths[0])["每日趋势"][2:]}
+    assert trend == {"2026-05-15": first_day_quota, "2026-05-31": 2000,
+                     "2026-06-01": 4000, "2026-06-14": 8000}
+    (detail_path,) = [p for p in paths if str(p).endswith("_detail.xlsx")]
+    detail_ids_got = [row[0] for row in _xlsx_cells(detail_path)["Detail"][2:] if row[0]]
+    assert sorted(detail_ids_got) == sorted(detail_ids)
@@ -36,6 +36,8 @@ def mock_requests():
         mock_mod = MagicMock()
         m.return_value = mock_mod
         mock_mod.RequestException = Exception
+        # The client's pooled Session routes through the same mocked calls
+        mock_mod.Session.return_value = mock_mod
         yield mock_mod
 
 
@@ -135,6 +137,20 @@ class TestWriteFile:
         assert files[1][1][1] == b"hello world"
 
 
+    def test_reuses_execd_endpoint_until_lifecycle_change(self, client, mock_requests):
+        mock_requests.request.return_value = endpoint_response()
+        mock_requests.post.return_value = make_response({"ok": True})
+
+        client.write_file("sb-1", "/workspace/input/a.txt", b"a")
+        client.write_file("sb-1", "/workspace/input/b.txt", b"b")
+        assert mock_requests.request.call_count == 1
+        assert mock_requests.Session.call_count == 1
+
+        client.resume_sandbox("sb-1")
+        client.write_file("sb-1", "/workspace/input/c.txt", b"c")
+        assert mock_requests.request.call_count == 3
+
+
 class TestReadFile:
     def test_decodes_response(self, client, mock_requests):
         mock_requests.request.return_value = endpoint_response()
@@ -0,0 +1,159 @@
+"""Tests for incremental workspace sync into the sandbox (no sandbox needed)."""
+
+from __future__ import annotations
+
+import io
+import os
+import shlex
+import tarfile
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.runner import sandbox_sync, workspace
+from app.runner.agent_runner import send_message
+from app.runner.sandbox_client import SandboxError
+from app.runner.session import PersistentSession
+
+
+class FakeSandbox:
+    """Stores uploaded files; ``sh -c 'tar -xzf ...'`` really extracts the uploaded bundle."""
+
+    def __init__(self, *, write_delay: float = 0.0, fail_paths: set[str] | None = None, tar_ok: bool = True):
+        self.files: dict[str, bytes] = {}
+        self.writes: list[str] = []
+        self.commands: list[list[str]] = []
+        self.write_delay = write_delay
+        self.fail_paths = fail_paths or set()
+        self.tar_ok = tar_ok
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def write_file(self, sandbox_id, path, data):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.write_delay)
+            if path in self.fail_paths:
+                raise SandboxError(f"upload failed: {path}")
+            with self._lock:
+                self.files[path] = data
+                self.writes.append(path)
+        finally:
+            with self._lock:
+                self.active -= 1
+        return {"status": "uploaded", "path": path}
+
+    def exec_command(self, sandbox_id, argv, *, cwd=None, env=None, timeout=None, stdout_callback=None, stderr_callback=None):
+        if argv[:2] != ["sh", "-c"]:
+            return {"returncode": 0, "stdout": "", "stderr": ""}  # the agent run itself
+        self.commands.append(argv)
+        if not self.tar_ok:
+            return {"returncode": 2, "stdout": "", "stderr": "tar: not found"}
+        archive = shlex.split(argv[2])[2]  # tar -xzf <archive> -C / && ...
+        with tarfile.open(fileobj=io.BytesIO(self.files.pop(archive)), mode="r:gz") as tar:
+            for member in tar.getmembers():
+                self.files["/" + member.name] = tar.extractfile(member).read()
+        return {"returncode": 0, "stdout": "", "stderr": ""}
+
+    def list_files(self, sandbox_id, path):
+        return []
+
+
+def make_tree(root, count=5, size=100):
+    root.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(count):
+        path = root / f"f{i}.txt"
+        path.write_bytes(bytes([65 + i]) * (size + i))
+        files.append((f"/tmp/workspace/input/f{i}.txt", path))
+    return files
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    files = make_tree(tmp_path / "input")
+    manifest = tmp_path / sandbox_sync.MANIFEST_NAME
+    sandbox = FakeSandbox()
+
+    stats = sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=manifest, tar_min_files=0)
+    assert (stats["uploaded"], stats["skipped"]) == (5, 0)
+    assert sandbox.files["/tmp/workspace/input/f2.txt"] == b"C" * 102
+
+    # Nothing changed: no uploads
+    sandbox.writes.clear()
+    stats = sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=manifest, tar_min_files=0)
+    assert (stats["uploaded"], stats["skipped"], sandbox.writes) == (0, 5, [])
+
+    # Rewritten with identical bytes (new mtime): digest matches, still skipped
+    path = files[0][1]
+    path.write_bytes(path.read_bytes())
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    # Real change: only that file goes up
+    files[3][1].write_bytes(b"changed")
+    stats = sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=manifest, tar_min_files=0)
+    assert sandbox.writes == ["/tmp/workspace/input/f3.txt"]
+    assert (stats["uploaded"], stats["skipped"]) == (1, 4)
+
+    # A different sandbox starts from an empty manifest
+    other = FakeSandbox()
+    stats = sandbox_sync.sync_files(other, "sb-2", files, manifest_path=manifest, tar_min_files=0)
+    assert stats["uploaded"] == 5
+
+
+def test_uploads_run_concurrently_and_failures_are_retried(tmp_path):
+    files = make_tree(tmp_path / "input", count=8)
+    manifest = tmp_path / sandbox_sync.MANIFEST_NAME
+    sandbox = FakeSandbox(write_delay=0.05, fail_paths={"/tmp/workspace/input/f6.txt"})
+
+    with pytest.raises(SandboxError):
+        sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=manifest, workers=4, tar_min_files=0)
+    assert sandbox.peak > 1
+    assert len(sandbox.files) == 7
+
+    sandbox.fail_paths.clear()
+    sandbox.writes.clear()
+    sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=manifest, workers=4, tar_min_files=0)
+    assert sandbox.writes == ["/tmp/workspace/input/f6.txt"]
+
+
+def test_small_files_travel_as_one_tar_bundle(tmp_path):
+    files = make_tree(tmp_path / "input", count=6)
+    big = tmp_path / "input" / "bill.xlsx"
+    big.write_bytes(b"x" * (sandbox_sync.TAR_MAX_FILE_BYTES + 1))
+    files.append(("/tmp/workspace/input/bill.xlsx", big))
+    sandbox = FakeSandbox()
+
+    stats = sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=None, tar_min_files=3)
+    assert (stats["bundled"], stats["uploaded"]) == (6, 1)
+    assert len(sandbox.commands) == 1
+    assert len(sandbox.writes) == 2  # the bundle + the large file
+    for remote, local in files:
+        assert sandbox.files[remote] == local.read_bytes()
+
+    # Extraction failure falls back to per-file uploads
+    sandbox = FakeSandbox(tar_ok=False)
+    stats = sandbox_sync.sync_files(sandbox, "sb-1", files, manifest_path=None, tar_min_files=3)
+    assert (stats["bundled"], stats["uploaded"]) == (0, 7)
+    for remote, local in files:
+        assert sandbox.files[remote] == local.read_bytes()
+
+
+def test_follow_up_turn_only_uploads_what_changed(tmp_path):
+    dirs = workspace.prepare_workspace(tmp_path / "session")
+    session = PersistentSession(sandbox_id="sb-1", workdir=tmp_path / "session", dirs=dirs, context={"job": {"id": "as-1"}})
+    sandbox = FakeSandbox()
+    bill = {"path": "supplier/bill.csv", "data": b"model,cost\n" * 1000}
+
+    with patch("app.runner.agent_runner.SandboxClient", return_value=sandbox):
+        send_message(session, "先核对账单。", extra_input_files=[bill])
+        first = set(sandbox.writes)
+        sandbox.writes.clear()
+        send_message(session, "继续。", extra_input_files=[bill])
+
+    assert "/tmp/workspace/input/supplier/bill.csv" in first
+    assert "/tmp/workspace/runner/fake_agent.py" in first
+    assert sandbox.writes == ["/tmp/workspace/input/conversation.jsonl"]
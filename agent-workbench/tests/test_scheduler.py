@@ -0,0 +1,105 @@
+"""Tests for the scheduler's cron engine."""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.scheduler import cron_matches, next_run_after, parse_cron
+
+
+def scan_next_run(expr: str, tz_name: str, after_utc: datetime, limit_minutes: int = 400 * 24 * 60) -> datetime:
+    """Reference: the old minute-by-minute scan over the schedule's wall clock."""
+    tz = ZoneInfo(tz_name)
+    candidate = after_utc.astimezone(tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(limit_minutes):
+        if cron_matches(expr, candidate):
+            return candidate.astimezone(timezone.utc)
+        candidate += timedelta(minutes=1)
+    raise AssertionError(f"no match for {expr}")
+
+
+def test_parse_ranges_steps_lists_and_names():
+    spec = parse_cron("*/15 9-17/4 1,15 * *")
+    assert spec.minutes == (0, 15, 30, 45)
+    assert spec.hours == (9, 13, 17)
+    assert spec.days == (1, 15)
+    assert spec.months == tuple(range(1, 13))
+    assert spec.weekdays == tuple(range(7))
+
+    spec = parse_cron("5/20 0 * JAN-MAR,nov mon-fri,7")
+    assert spec.minutes == (5, 25, 45)
+    assert spec.months == (1, 2, 3, 11)
+    assert spec.weekdays == (0, 1, 2, 3, 4, 5)
+    assert parse_cron("5/20 0 * JAN-MAR,nov mon-fri,7") is spec
+
+    for bad in ("* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "*/0 * * * *", "5-1 * * * *", "a * * * *"):
+        with pytest.raises(ValueError):
+            parse_cron(bad)
+    assert cron_matches("not a cron", datetime(2026, 6, 1)) is False
+
+
+def test_day_of_month_and_day_of_week():
+    # Both restricted: the 1st AND a Monday, as stored schedules have always fired
+    assert cron_matches("0 9 1 * 1", datetime(2026, 6, 1, 9, 0))  # Monday the 1st
+    assert not cron_matches("0 9 1 * 1", datetime(2026, 6, 8, 9, 0))  # Monday
+    assert not cron_matches("0 9 1 * 1", datetime(2026, 7, 1, 9, 0))  # Wednesday the 1st
+    assert not cron_matches("0 9 * * 1", datetime(2026, 7, 1, 9, 0))
+    after = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert next_run_after("0 0 13 * 5", "UTC", after) == datetime(2026, 2, 13, tzinfo=timezone.utc)
+    assert next_run_after("0 0 1-7 * 0", "UTC", after) == datetime(2026, 1, 4, tzinfo=timezone.utc)
+    # Feb 29 on a Tuesday: 28 years apart
+    assert next_run_after("0 0 29 2 2", "UTC", after) == datetime(2028, 2, 29, tzinfo=timezone.utc)
+    assert next_run_after("0 0 29 2 1", "UTC", after) == datetime(2044, 2, 29, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("tz_name", ["UTC", "Asia/Shanghai"])
+def test_matches_minute_scan(tz_name):
+    rng = random.Random(7)
+    exprs = [
+        "30 3 * * *",
+        "0 6 1 * *",
+        "30 7 1 * *",
+        "*/7 */5 * * *",
+        "0 0 31 * *",
+        "15 10 * * 1-5",
+        "0 12 13 * 5",
+        "45 23 28-31 2 *",
+        "0 0 1-7 * 0",
+        "10-20/5 1 * JUN sat",
+    ]
+    for expr in exprs:
+        for _ in range(3):
+            after = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            after = after.replace(second=rng.randrange(60))
+            assert next_run_after(expr, tz_name, after) == scan_next_run(expr, tz_name, after), (expr, after)
+
+
+def test_monthly_schedule_and_leap_day():
+    after = datetime(2026, 6, 1, 3, 0, tzinfo=timezone.utc)
+    assert next_run_after("0 3 1 * *", "UTC", after) == datetime(2026, 7, 1, 3, 0, tzinfo=timezone.utc)
+    assert next_run_after("0 6 1 * *", "Asia/Shanghai", after) == datetime(2026, 6, 30, 22, 0, tzinfo=timezone.utc)
+    assert next_run_after("0 0 29 2 *", "UTC", after) == datetime(2028, 2, 29, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        next_run_after("0 0 30 2 *", "UTC", after)
+
+
+def test_dst_transitions():
+    tz = "America/New_York"
+    # 02:30 does not exist on 2026-03-08: fires at the same instant as 03:30 EDT
+    assert next_run_after("30 2 * * *", tz, datetime(2026, 3, 8, 5, 0, tzinfo=timezone.utc)) == \
+        datetime(2026, 3, 8, 7, 30, tzinfo=timezone.utc)
+    # 01:30 happens twice on 2026-11-01: fires once, then the next day
+    first = next_run_after("30 1 * * *", tz, datetime(2026, 11, 1, 4, 0, tzinfo=timezone.utc))
+    assert first == datetime(2026, 11, 1, 5, 30, tzinfo=timezone.utc)
+    assert next_run_after("30 1 * * *", tz, first) == datetime(2026, 11, 2, 6, 30, tzinfo=timezone.utc)
+    # Every wall-clock minute fires once: the repeated 01:xx hour is not replayed
+    after = datetime(2026, 11, 1, 5, 59, tzinfo=timezone.utc)  # 01:59 EDT
+    assert next_run_after("* * * * *", tz, after) == datetime(2026, 11, 1, 7, 0, tzinfo=timezone.utc)
+    assert next_run_after("* * * * *", tz, after) == scan_next_run("* * * * *", tz, after)
+    # ...but a reference instant inside the repeated hour still gets a later result
+    after = datetime(2026, 11, 1, 6, 10, tzinfo=timezone.utc)  # 01:10 EST
+    assert next_run_after("30 1 * * *", tz, after) == datetime(2026, 11, 1, 6, 30, tzinfo=timezone.utc)
@@ -1387,8 +1387,8 @@ export function useWorkbench() {
       hour: rawLogsForm.hour,
       query: rawLogsForm.query,
       limit: 80,
-      object_limit: 60,
-      max_bytes_per_object: 256 * 1024,
+      object_limit: 1000,
+      max_bytes_per_object: 64 * 1024 * 1024,
     });
     const result = await submitAction("搜索日志", "rawlogSearch", () => apiRequest<RawLogSearchResult>(endpoints.rawlogsSearch(), { method: "POST", bodyJson: payload }));
     if (result.ok) setRawLogSearchResult(result.data);
@@ -218,6 +218,7 @@ export function RawLogsPage({ wb }: { wb: WorkbenchState }) {
             <div className="rawlogs-search-summary">
               <span>{wb.rawLogSearchResult.prefix}</span>
               <strong>扫描 {wb.rawLogSearchResult.scanned_objects || 0} 个对象</strong>
+              {wb.rawLogSearchResult.elapsed_ms !== undefined ? <span>{(wb.rawLogSearchResult.elapsed_ms / 1000).toFixed(1)} 秒</span> : null}
             </div>
           ) : null}
           <div className="rawlogs-matches">
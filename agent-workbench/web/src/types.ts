@@ -317,13 +317,31 @@ export type RawLogSearchMatch = {
   truncated_object?: boolean;
 };
 
+export type RawLogSearchObjectStat = {
+  key: string;
+  size?: number;
+  compression?: string | null;
+  decoded_bytes?: number;
+  matches?: number;
+  elapsed_ms?: number;
+  decoded_mb_per_s?: number | null;
+  truncated?: boolean;
+  stopped_early?: boolean;
+  error?: string | null;
+};
+
 export type RawLogSearchResult = {
   bucket: string;
   prefix: string;
   query: string;
   scanned_objects?: number;
+  listed_objects?: number;
   matches?: RawLogSearchMatch[];
   truncated?: boolean;
+  workers?: number;
+  elapsed_ms?: number;
+  decoded_bytes?: number;
+  objects?: RawLogSearchObjectStat[];
 };
 
 export type RawLogsForm = {
@@ -0,0 +1,78 @@
+-- ============================================================
+-- Step 7: 创建 usage_logs 压缩表（Parquet，由 usage_compaction.py 每日写入）
+--
+-- 已关闭的 UTC 日按 usage_logs_dedup 的列去重后写成 Parquet，other JSON 中
+-- 账单查询用到的字段预先抽成强类型列。queries.py 对已压缩的日自动改读此表。
+--
+-- S3 路径格式: s3://ezmodel-log/usage-logs-compact/2026/03/29/hour=15/xxx.parquet
+-- 已压缩的日在 s3://ezmodel-log/usage-logs-compact/_manifest/2026-03-29.json 登记
+-- ============================================================
+CREATE EXTERNAL TABLE IF NOT EXISTS ezmodel_logs.usage_logs_compact (
+  request_id                             string    COMMENT '请求唯一标识',
+  created_at                             bigint    COMMENT '创建时间 Unix 时间戳（秒）',
+  user_id                                int       COMMENT '用户 ID',
+  username                               string    COMMENT '用户名',
+  channel_id                             int       COMMENT '渠道 ID',
+  model_name                             string    COMMENT '模型名称',
+  token_name                             string    COMMENT 'API Token 名称',
+  prompt_tokens                          int       COMMENT '输入 tokens 数',
+  completion_tokens                      int       COMMENT '输出 tokens 数',
+  quota                                  int       COMMENT '消耗额度（内部单位，÷500000=USD）',
+  use_time_seconds                       int       COMMENT '请求耗时（秒）',
+  is_stream                              boolean   COMMENT '是否流式请求',
+  ip                                     string    COMMENT '客户端 IP',
+  other                                  string    COMMENT '扩展字段 JSON（原样保留）',
+  cache_tokens                           bigint    COMMENT 'other.cache_tokens',
+  cache_creation_tokens                  bigint    COMMENT 'other.cache_creation_tokens',
+  cache_creation_tokens_5m               bigint    COMMENT 'other.cache_creation_tokens_5m',
+  cache_creation_tokens_1h               bigint    COMMENT 'other.cache_creation_tokens_1h',
+  tiered_cache_creation_tokens_5m        bigint    COMMENT 'other.tiered_cache_creation_tokens_5m',
+  tiered_cache_creation_tokens_1h        bigint    COMMENT 'other.tiered_cache_creation_tokens_1h',
+  tiered_cache_creation_tokens_remaining bigint    COMMENT 'other.tiered_cache_creation_tokens_remaining',
+  tiered_input_price                     double    COMMENT 'other.tiered_input_price',
+  tiered_output_price                    double    COMMENT 'other.tiered_output_price',
+  image_completion_tokens                bigint    COMMENT 'other.image_completion_tokens',
+  image_completion_ratio                 double    COMMENT 'other.image_completion_ratio',
+  image_output                           bigint    COMMENT 'other.image_output',
+  image_ratio                            double    COMMENT 'other.image_ratio',
+  actual_quota                           bigint    COMMENT 'other.actual_quota',
+  preconsumed_quota                      bigint    COMMENT 'other.preconsumed_quota',
+  quota_delta                            bigint    COMMENT 'other.quota_delta',
+  billing_event                          string    COMMENT 'other.billing_event',
+  task_id                                string    COMMENT 'other.task_id',
+  billing_cond_multiplier                double    COMMENT 'other.billing_cond_multiplier',
+  cw_5m                                  bigint    COMMENT 'COALESCE(tiered_cache_creation_tokens_5m, cache_creation_tokens_5m, 0)',
+  cw_1h                                  bigint    COMMENT 'COALESCE(tiered_cache_creation_tokens_1h, cache_creation_tokens_1h, 0)',
+  cw_remaining                           bigint    COMMENT 'COALESCE(tiered_cache_creation_tokens_remaining, 0)'
+)
+PARTITIONED BY (
+  `year`  string,
+  `month` string,
+  `day`   string,
+  `hour`  string
+)
+STORED AS PARQUET
+LOCATION 's3://ezmodel-log/usage-logs-compact/'
+TBLPROPERTIES (
+  'parquet.compression'                   = 'ZSTD',
+
+  'projection.enabled'                    = 'true',
+
+  'projection.year.type'                  = 'integer',
+  'projection.year.range'                 = '2024,2030',
+
+  'projection.month.type'                 = 'integer',
+  'projection.month.range'                = '1,12',
+  'projection.month.digits'              = '2',
+
+  'projection.day.type'                   = 'integer',
+  'projection.day.range'                  = '1,31',
+  'projection.day.digits'                = '2',
+
+  'projection.hour.type'                  = 'integer',
+  'projection.hour.range'                 = '0,23',
+  'projection.hour.digits'               = '2',
+
+  -- UNLOAD ... partitioned_by = ARRAY['hour'] 写出 Hive 风格的 hour=HH 目录
+  'storage.location.template'             = 's3://ezmodel-log/usage-logs-compact/${year}/${month}/${day}/hour=${hour}/'
+);
@@ -0,0 +1,128 @@
+"""
+pricing_engine 性能基准
+
+每个 (实现, 行数) 组合在独立子进程中运行，测量墙钟时间和峰值 RSS，
+避免前一次运行的内存占用干扰后一次测量。
+
+Usage:
+    python bench_pricing_engine.py assign_prices --rows 1000000 5000000 20000000
+    python bench_pricing_engine.py row_level_join --rows 100000 2000000 --impl join
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pricing_engine  # noqa: E402
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _make_usage_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    models = np.array(list(pricing_engine.get_pricing().keys()) + ["gpt-5", "deepseek-v3"])
+    return pd.DataFrame({
+        "model": pd.Categorical.from_codes(rng.integers(0, len(models), rows), models).astype(object),
+        "prompt_tokens": rng.integers(0, 400_000, rows),
+        "completion_tokens": rng.integers(0, 8_000, rows),
+        "created_at": rng.integers(1_775_000_000, 1_777_600_000, rows),
+    })
+
+
+def _make_request_frames(rows: int, seed: int = 42) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Our/vendor request-level rows: 90% shared request IDs, both sides shuffled."""
+    rng = np.random.default_rng(seed)
+    shared = rows * 9 // 10
+    ids = ("req-" + pd.Series(np.arange(2 * rows - shared)).astype(str)).to_numpy(dtype=object)
+    models = np.array(list(pricing_engine.get_pricing().keys()))
+    ours = pd.DataFrame({
+        "request_id": ids[:rows],
+        "model_name": models[rng.integers(0, len(models), rows)],
+        "quota": rng.integers(0, 2_000_000, rows),
+    })
+    vendor = pd.DataFrame({
+        "request_id": np.concatenate([ids[:shared], ids[rows:]]),
+        "model_name": models[rng.integers(0, len(models), rows)],
+        "quota": rng.integers(0, 2_000_000, rows),
+    })
+    return (ours.iloc[rng.permutation(rows)].reset_index(drop=True),
+            vendor.iloc[rng.permutation(rows)].reset_index(drop=True))
+
+
+CASES = {
+    "assign_prices": {
+        "setup": _make_usage_frame,
+        "impls": {
+            "merge": lambda df: pricing_engine._assign_prices_merge(
+                df, flat_tier=True, flat_tier_since_ts=1_776_000_000),
+            "searchsorted": lambda df: pricing_engine._assign_prices(
+                df, flat_tier=True, flat_tier_since_ts=1_776_000_000),
+        },
+    },
+    "row_level_join": {
+        "setup": _make_request_frames,
+        "impls": {
+            "loop": lambda frames: pricing_engine._row_level_join_loop(*frames),
+            "join": lambda frames: pricing_engine._row_level_join(*frames),
+        },
+    },
+}
+
+
+def _run_one(case: str, impl: str, rows: int) -> dict:
+    spec = CASES[case]
+    data = spec["setup"](rows)
+    base_rss = _rss_mb()
+    start = time.perf_counter()
+    spec["impls"][impl](data)
+    wall = time.perf_counter() - start
+    return {"wall_s": round(wall, 3), "base_rss_mb": round(base_rss, 1),
+            "peak_rss_mb": round(_rss_mb(), 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="pricing_engine 基准测试")
+    parser.add_argument("case", choices=sorted(CASES))
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000, 20_000_000])
+    parser.add_argument("--impl", nargs="+", help="只运行指定实现（默认全部）")
+    parser.add_argument("--timeout", type=int, default=1800)
+    parser.add_argument("--_child", nargs=2, metavar=("IMPL", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        print(json.dumps(_run_one(args.case, args._child[0], int(args._child[1]))))
+        return 0
+
+    impls = args.impl or list(CASES[args.case]["impls"])
+    print(f"{'rows':>12} {'impl':>14} {'wall_s':>9} {'base_rss_mb':>12} {'peak_rss_mb':>12}")
+    for rows in args.rows:
+        for impl in impls:
+            cmd = [sys.executable, __file__, args.case, "--_child", impl, str(rows)]
+            try:
+                proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"{rows:>12,} {impl:>14} {'timeout':>9}")
+                continue
+            if proc.returncode != 0:
+                # Negative return codes are signals (e.g. -9 from the OOM killer)
+                print(f"{rows:>12,} {impl:>14} {'failed':>9} rc={proc.returncode}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{rows:>12,} {impl:>14} {r['wall_s']:>9.2f} {r['base_rss_mb']:>12.1f} {r['peak_rss_mb']:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
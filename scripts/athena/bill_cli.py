@@ -37,6 +37,7 @@ import queries
 import report_builder
 import pricing_engine
 import cost_import
+import usage_cube
 
 # Import cost monitor for cost tracking
 try:
@@ -133,6 +134,7 @@ def cmd_bill(args):
         customer_view=customer_view,
         upload_s3=args.upload,
         no_cache=args.no_cache,
+        detail_format=getattr(args, "detail_format", "auto"),
     )
     if isinstance(result, dict):
         print(f"\n  月度账单已生成: {result['xlsx']}")
@@ -189,7 +191,11 @@ def cmd_channels(args):
 
 def cmd_kpi(args):
     month = args.month or _last_month()
-    df = run_query_cached(queries.kpi_summary(month), no_cache=args.no_cache)
+    if usage_cube.serves():
+        # 按日检查点：只扫描今天和仍未关闭的日
+        df = usage_cube.kpi_summary(usage_cube.load_month(month, no_cache=args.no_cache))
+    else:
+        df = run_query_cached(queries.kpi_summary(month), no_cache=args.no_cache)
     if not df.empty:
         kpi = df.iloc[0]
         print(f"\n{'='*50}")
@@ -464,6 +470,8 @@ def build_parser():
                         help="同时导出逐条明细 CSV.zip（按天并行查询）")
     p_bill.add_argument("--customer-view", action="store_true",
                         help="客户版本：隐藏成本折扣、成本价、利润、渠道 ID 等内部数据")
+    p_bill.add_argument("--detail-format", choices=["auto", "parquet"], default="auto",
+                        help="内部版明细格式：auto=xlsx/CSV.zip（按行数），parquet=zstd Parquet（按天分 row group）")
     p_bill.add_argument("--upload", action="store_true",
                         help="上传产物到 S3 并生成 presigned 下载链接（24h 有效）")
     p_bill.add_argument("-o", "--output", default=".", help="输出目录")
@@ -34,6 +34,7 @@ import queries
 import report_builder
 import pricing_engine
 import cost_import
+import usage_cube
 
 # ---------------------------------------------------------------------------
 # Page config
@@ -153,6 +154,8 @@ if use_date_range:
 
 st.sidebar.markdown("---")
 st.sidebar.caption(f"数据源: Athena `ezmodel_logs`")
+if usage_cube.serves(global_start_time, global_end_time):
+    st.sidebar.caption("概览组件: 日汇总立方体（按日增量刷新）")
 st.sidebar.caption(f"额度换算: quota ÷ 500,000 = USD")
 
 
@@ -160,8 +163,15 @@ st.sidebar.caption(f"额度换算: quota ÷ 500,000 = USD")
 # Data loading with Streamlit cache
 # ---------------------------------------------------------------------------
 
+@st.cache_data(ttl=600, show_spinner="正在加载日汇总...")
+def load_cube(ym, nc, sd=None, ed=None):
+    """概览组件共用的日汇总（usage_cube），只刷新过期的日。"""
+    return usage_cube.load_month(ym, start_day=sd, end_day=ed, no_cache=nc)
+
 @st.cache_data(ttl=600, show_spinner="正在查询 Athena...")
 def load_kpi(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
+    if usage_cube.serves(st, et):
+        return usage_cube.kpi_summary(load_cube(ym, nc, sd, ed))
     return run_query_cached(queries.kpi_summary(ym,
                                                  start_day=sd, end_day=ed,
                                                  start_time=st, end_time=et,
@@ -169,6 +179,8 @@ def load_kpi(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
 
 @st.cache_data(ttl=600, show_spinner="正在查询...")
 def load_users(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
+    if usage_cube.serves(st, et):
+        return usage_cube.bill_by_user(load_cube(ym, nc, sd, ed))
     return run_query_cached(queries.monthly_bill_by_user(ym,
                                                           start_day=sd, end_day=ed,
                                                           start_time=st, end_time=et,
@@ -176,6 +188,8 @@ def load_users(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
 
 @st.cache_data(ttl=600, show_spinner="正在查询...")
 def load_user_model(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
+    if usage_cube.serves(st, et):
+        return usage_cube.bill_by_user_model(load_cube(ym, nc, sd, ed))
     return run_query_cached(queries.monthly_bill_by_user_model(ym,
                                                                start_day=sd, end_day=ed,
                                                                start_time=st, end_time=et,
@@ -199,6 +213,8 @@ def parse_channel_ids(text: str) -> list[int]:
 
 @st.cache_data(ttl=600, show_spinner="正在查询...")
 def load_trend(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
+    if usage_cube.serves(st, et):
+        return usage_cube.daily_trend(load_cube(ym, nc, sd, ed))
     return run_query_cached(queries.daily_trend(ym,
                                                 start_day=sd, end_day=ed,
                                                 start_time=st, end_time=et,
@@ -212,6 +228,8 @@ def load_trend_tz(ym, tz_offset, nc, sd=None, ed=None, st=None, et=None):
 
 @st.cache_data(ttl=600, show_spinner="正在查询...")
 def load_models(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
+    if usage_cube.serves(st, et):
+        return usage_cube.model_ranking(load_cube(ym, nc, sd, ed))
     return run_query_cached(queries.model_ranking(ym,
                                                   start_day=sd, end_day=ed,
                                                   start_time=st, end_time=et,
@@ -219,6 +237,8 @@ def load_models(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
 
 @st.cache_data(ttl=600, show_spinner="正在查询...")
 def load_channels(ym, nc, tz_off=0.0, sd=None, ed=None, st=None, et=None):
+    if usage_cube.serves(st, et):
+        return usage_cube.channel_summary(load_cube(ym, nc, sd, ed))
     return run_query_cached(queries.channel_summary(ym,
                                                     start_day=sd, end_day=ed,
                                                     start_time=st, end_time=et,
@@ -238,10 +258,13 @@ def load_errors(ym, day, nc):
 @st.cache_data(ttl=600, show_spinner="正在查询定价数据...")
 def load_full_billing(ym, nc, flat_tier=False, flat_tier_since=None,
                       tz_off=0.0, sd=None, ed=None, st=None, et=None):
-    df = run_query_cached(queries.monthly_bill_full(ym,
-                                                     start_day=sd, end_day=ed,
-                                                     start_time=st, end_time=et,
-                                                     time_zone_offset_hours=tz_off), no_cache=nc)
+    if usage_cube.serves(st, et):
+        df = usage_cube.bill_full(load_cube(ym, nc, sd, ed))
+    else:
+        df = run_query_cached(queries.monthly_bill_full(ym,
+                                                         start_day=sd, end_day=ed,
+                                                         start_time=st, end_time=et,
+                                                         time_zone_offset_hours=tz_off), no_cache=nc)
     if not df.empty:
         df = pricing_engine.apply_pricing_summary(
             df, flat_tier=flat_tier, flat_tier_since=flat_tier_since)
@@ -311,8 +334,7 @@ with tab_trend:
                               global_start_day, global_end_day,
                               global_start_time, global_end_time)
         if not df_trend.empty:
-            df_trend["date"] = df_trend["day"].apply(
-                lambda d: f"{year_month}-{int(d):02d}")
+            df_trend["date"] = df_trend["day"]
         tz_note = ""
     else:
         df_trend = load_trend_tz(year_month, float(tz_offset), no_cache,
@@ -39,6 +39,14 @@ _total_scanned_bytes: int = 0
 _query_count: int = 0
 _cache_hits: int = 0
 
+# 本地磁盘缓存（S3 缓存前的一级缓存）命中统计
+_local_cache_hits: int = 0
+_local_cache_misses: int = 0
+
+# single-flight 合并统计：等待他人在途查询而省下的扫描
+_coalesced_queries: int = 0
+_avoided_scanned_bytes: int = 0
+
 # 查询成本明细（按查询名称分组）
 _query_costs: dict[str, dict] = {}
 
@@ -46,11 +54,16 @@ _query_costs: dict[str, dict] = {}
 def reset_tracking():
     """重置成本追踪器（用于测试或新会话）"""
     global _total_cost, _total_scanned_bytes, _query_count, _cache_hits, _query_costs
+    global _local_cache_hits, _local_cache_misses, _coalesced_queries, _avoided_scanned_bytes
     _total_cost = 0.0
     _total_scanned_bytes = 0
     _query_count = 0
     _cache_hits = 0
     _query_costs = {}
+    _local_cache_hits = 0
+    _local_cache_misses = 0
+    _coalesced_queries = 0
+    _avoided_scanned_bytes = 0
 
 
 def get_total_cost() -> float:
@@ -73,6 +86,25 @@ def get_cache_hit_count() -> int:
     return _cache_hits
 
 
+def get_local_cache_stats() -> dict:
+    """获取本地磁盘缓存命中统计"""
+    lookups = _local_cache_hits + _local_cache_misses
+    return {
+        "local_cache_hits": _local_cache_hits,
+        "local_cache_misses": _local_cache_misses,
+        "local_cache_hit_rate": round(_local_cache_hits / lookups * 100, 1) if lookups > 0 else 0,
+    }
+
+
+def get_coalesced_stats() -> dict:
+    """获取 single-flight 合并统计（避免的重复扫描）"""
+    return {
+        "coalesced_queries": _coalesced_queries,
+        "avoided_scanned_bytes": _avoided_scanned_bytes,
+        "avoided_cost_usd": round(calculate_query_cost(_avoided_scanned_bytes), 4),
+    }
+
+
 def get_query_costs() -> dict[str, dict]:
     """获取按查询名称分组的成本明细"""
     return _query_costs.copy()
@@ -88,6 +120,8 @@ def get_cost_summary() -> dict:
         "cache_hits": _cache_hits,
         "cache_misses": _query_count - _cache_hits,
         "cache_hit_rate": round(_cache_hits / _query_count * 100, 1) if _query_count > 0 else 0,
+        **get_local_cache_stats(),
+        **get_coalesced_stats(),
     }
 
 
@@ -214,6 +248,37 @@ def log_cache_hit(query_name: str, original_bytes: int = 0):
     log_query_cost(original_bytes, query_name, is_cache_hit=True)
 
 
+def log_local_cache(hit: bool):
+    """记录一次本地磁盘缓存查找结果
+
+    本地缓存命中同时也会经 log_cache_hit 计入总缓存命中；这里单独统计
+    本地层的命中 / 未命中，用于观察 dashboard 是否走纯本地读取。
+
+    Args:
+        hit: 是否命中本地缓存
+    """
+    global _local_cache_hits, _local_cache_misses
+    if hit:
+        _local_cache_hits += 1
+    else:
+        _local_cache_misses += 1
+
+
+def log_coalesced_query(query_name: str, avoided_bytes: int = 0):
+    """记录一次被合并的查询（等待同一 SQL 的在途执行，未重复扫描）
+
+    按缓存命中计入（成本 0），另外累计避免的扫描量。
+
+    Args:
+        query_name: 查询名称/描述
+        avoided_bytes: 在途执行实际扫描的字节数（即本次省下的扫描量，未知时为 0）
+    """
+    global _coalesced_queries, _avoided_scanned_bytes
+    _coalesced_queries += 1
+    _avoided_scanned_bytes += avoided_bytes
+    log_query_cost(avoided_bytes, query_name, is_cache_hit=True)
+
+
 def format_bytes(bytes_value: int) -> str:
     """格式化字节数为易读字符串
 
@@ -245,7 +310,11 @@ def print_cost_summary():
     print(f"  总查询次数:     {summary['query_count']:>12,}")
     print(f"  缓存命中:       {summary['cache_hits']:>12,}")
     print(f"  缓存命中率:     {summary['cache_hit_rate']:>12.1f}%")
+    print(f"  本地缓存命中:   {summary['local_cache_hits']:>12,} / {summary['local_cache_hits'] + summary['local_cache_misses']:,}")
     print(f"  总扫描数据量:   {format_bytes(summary['total_scanned_bytes']):>12}")
+    if summary["coalesced_queries"]:
+        print(f"  合并查询:       {summary['coalesced_queries']:>12,}"
+              f"  (避免扫描 {format_bytes(summary['avoided_scanned_bytes'])}, ${summary['avoided_cost_usd']:,.4f})")
     print(f"  预估总成本:     ${summary['total_cost_usd']:>11,.4f}")
     print(f"  单价:           ${COST_PER_TB:>11,.2f} / TB")
     print(f"{'='*60}\n")
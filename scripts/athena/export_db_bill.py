@@ -15,10 +15,7 @@
 """
 
 import argparse
-import gzip
-import json
 import os
-import re
 import sys
 from datetime import datetime, timezone, timedelta
 
@@ -28,6 +25,7 @@ import xlsxwriter
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import pricing_engine
+import sql_dump_reader
 from pricing_engine import QUOTA_TO_USD
 
 BORDER_PROPS = {"border": 1, "border_color": "#B0C4DE"}
@@ -101,66 +99,42 @@ def extract_logs_from_sql(sql_gz_path: str, channel_id: int) -> pd.DataFrame:
     """Stream-parse the SQL dump to extract logs rows for the given channel_id."""
     print(f"  Parsing SQL dump: {sql_gz_path} (channel_id={channel_id}) ...")
 
-    in_logs_section = False
-    rows = []
-    total_lines = 0
-
-    opener = gzip.open if sql_gz_path.endswith('.gz') else open
-    with opener(sql_gz_path, 'rt', encoding='utf-8', errors='replace') as f:
-        for line in f:
-            total_lines += 1
-            if total_lines % 500000 == 0:
-                print(f"    processed {total_lines:,} lines, extracted {len(rows):,} ch{channel_id} records ...")
-
-            if line.startswith("INSERT INTO `logs`"):
-                in_logs_section = True
-
-            if not in_logs_section:
-                if line.startswith("UNLOCK TABLES;") and len(rows) > 0:
-                    break
-                continue
-
-            if line.startswith("UNLOCK TABLES;"):
-                in_logs_section = False
-                break
-
-            if not line.startswith("INSERT INTO `logs`") and not line.startswith("("):
-                if line.strip() == "" or line.startswith("--") or line.startswith("/*!"):
-                    continue
-
-            ch_str = f",{channel_id},"
-            if ch_str not in line:
-                continue
-
-            _extract_tuples(line, channel_id, rows)
-
-    print(f"  Done: {total_lines:,} lines, {len(rows):,} ch{channel_id} records")
-
-    if not rows:
+    # Billing-impacting rows. Task/video flows may write a consume precharge
+    # followed by a refund/settlement adjustment; both must be included so
+    # SUM(quota) reflects the final charged amount.
+    stats = {}
+    frames = []
+    for frame in sql_dump_reader.iter_log_frames(sql_gz_path, channel_id=channel_id,
+                                                 types=(2, 6), stats=stats):
+        frames.append(frame)
+        print(f"    read {stats['bytes_read'] / 1024 / 1024:,.0f} MB, "
+              f"extracted {stats['rows']:,} ch{channel_id} records ...")
+
+    print(f"  Done: {stats.get('bytes_read', 0) / 1024 / 1024:,.1f} MB, "
+          f"{stats.get('tuples', 0):,} logs rows scanned, {stats.get('rows', 0):,} ch{channel_id} records")
+
+    if not frames:
         return pd.DataFrame()
 
-    df = pd.DataFrame(rows, columns=[
-        "id", "user_id", "created_at", "type", "content", "username",
-        "token_name", "model_name", "quota", "prompt_tokens",
-        "completion_tokens", "use_time", "is_stream", "channel_id",
-        "token_id", "group", "ip", "other", "request_id",
-    ])
+    df = pd.concat(frames, ignore_index=True)
 
     for col in ["id", "user_id", "created_at", "type", "quota", "prompt_tokens",
                 "completion_tokens", "use_time", "channel_id", "token_id"]:
         df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-    df["is_stream"] = df["is_stream"].astype(bool)
-
-    # Billing-impacting rows. Task/video flows may write a consume precharge
-    # followed by a refund/settlement adjustment; both must be included so
-    # SUM(quota) reflects the final charged amount.
-    df = df[df["type"].isin([2, 6])].copy()
+    df["is_stream"] = pd.to_numeric(df["is_stream"], errors='coerce').fillna(0).astype(bool)
+    for col in ["content", "username", "token_name", "model_name", "group", "ip",
+                "other", "request_id"]:
+        df[col] = df[col].fillna("").astype(str)
 
     return df
 
 
 def _extract_tuples(line: str, channel_id: int, rows: list):
-    """Parse MySQL INSERT VALUES(...),(...) syntax and filter by channel_id."""
+    """Parse MySQL INSERT VALUES(...),(...) syntax and filter by channel_id.
+
+    Per-character reference parser (kept for equivalence checks); the export
+    path uses sql_dump_reader.
+    """
     idx = line.find("VALUES ")
     if idx >= 0:
         data_part = line[idx + 7:]
@@ -4,6 +4,7 @@
 所有函数返回 SQL 字符串，由 athena_engine 执行。
 """
 
+import functools
 import re
 
 # ---------------------------------------------------------------------------
@@ -53,6 +54,8 @@ WITH usage_logs_dedup AS (
         is_stream,
         ip,
         other,
+        year,
+        month,
         day,
         hour
     FROM ezmodel_logs.usage_logs
@@ -61,6 +64,15 @@ WITH usage_logs_dedup AS (
 """
 
 
+def _partition_date() -> str:
+    """UTC partition date 'YYYY-MM-DD' of a usage_logs_dedup row.
+
+    Trends group on it instead of the bare day partition so that a billing
+    period running into the next month keeps its days apart.
+    """
+    return "CONCAT(year, '-', month, '-', day)"
+
+
 def _logical_call_count(alias: str = "call_count") -> str:
     """Count logical billable calls, collapsing two-stage task billing rows.
 
@@ -111,12 +123,18 @@ def _year_month(year_month: str) -> tuple[str, str]:
     return m.group(1), m.group(2)
 
 
-def _validate_end_day(end_day: str, year_month: str) -> None:
-    """Validate that end_day is a YYYY-MM-DD date within the given year_month."""
+def _validate_end_day(end_day: str, year_month: str, cross_month: bool = False) -> None:
+    """Validate that end_day is a YYYY-MM-DD date within the given year_month.
+
+    cross_month=True also accepts a later month, for periods such as the
+    15th to the 15th of next month.
+    """
     m = re.match(r"^(\d{4})-(\d{2})-(\d{2})$", end_day)
     if not m:
         raise ValueError(f"end_day must be YYYY-MM-DD, got {end_day!r}")
     ym_prefix = f"{m.group(1)}-{m.group(2)}"
+    if cross_month and ym_prefix > year_month:
+        return
     if ym_prefix != year_month:
         raise ValueError(
             f"end_day {end_day!r} is not in month {year_month!r}"
@@ -165,34 +183,375 @@ def _parse_datetime(dt_str: str, utc_offset_hours: float = 0) -> tuple[str, str,
     return year, month, day, f"{hour:02d}", int(dt.timestamp())
 
 
-def _hour_range_filter(year: str, month: str,
-                       start_day: str = None, start_hour: str = None,
-                       end_day: str = None, end_hour: str = None) -> str:
-    """Build partition WHERE clause covering [start_day/hour .. end_day/hour].
-
-    When start_hour/end_hour are provided, uses >= / <= on the hour partition
-    column (only valid when start_day == end_day; otherwise falls back to
-    day-range filter to avoid over-pruning across day boundaries).
-    """
-    parts = [f"year = {_q(year)}", f"month = {_q(month)}"]
+_PARTITION_COLUMNS = ("year", "month", "day", "hour")
 
-    same_day = (start_day and end_day and start_day == end_day)
 
-    if same_day:
-        parts.append(f"day = {_q(start_day.split('-')[2])}")
-        if start_hour:
-            parts.append(f"hour >= {_q(start_hour)}")
-        if end_hour:
-            parts.append(f"hour <= {_q(end_hour)}")
+def _utc_datetime(ts: int):
+    """Unix epoch seconds → aware UTC datetime."""
+    from datetime import datetime, timezone
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc)
+
+
+def _partition_value(dt, level: int) -> str:
+    value = (dt.year, dt.month, dt.day, dt.hour)[level]
+    return f"{value:04d}" if level == 0 else f"{value:02d}"
+
+
+def _partition_unit(dt, level: int):
+    """First and last hour of the year / month / day / hour containing dt."""
+    from datetime import timedelta
+    if level == 0:
+        first = dt.replace(month=1, day=1, hour=0)
+        following = first.replace(year=first.year + 1)
+    elif level == 1:
+        first = dt.replace(day=1, hour=0)
+        following = (first + timedelta(days=32)).replace(day=1)
+    elif level == 2:
+        first = dt.replace(hour=0)
+        following = first + timedelta(days=1)
     else:
-        if start_day:
-            parts.append(f"day >= {_q(start_day.split('-')[2])}")
-        if end_day:
-            parts.append(f"day <= {_q(end_day.split('-')[2])}")
+        return dt, dt
+    return first, following - timedelta(hours=1)
+
 
+def _partition_ranges(first, last, level: int = 0, prefix: tuple = ()) -> list[tuple]:
+    """Fewest (prefix, level, lo, hi) ranges covering the hours first..last.
+
+    prefix fixes the coarser partition columns; lo..hi is an inclusive range
+    on the column at level. Whole years / months / days collapse into one
+    range, so only the partial units at either edge go down to hours.
+    """
+    from datetime import timedelta
+    unit_first, unit_last = _partition_unit(first, level)[0], _partition_unit(last, level)[1]
+    lo, hi = _partition_value(first, level), _partition_value(last, level)
+    if level == 3 or (first == unit_first and last == unit_last):
+        return [(prefix, level, lo, hi)]
+    if lo == hi:
+        return _partition_ranges(first, last, level + 1, prefix + (lo,))
+    head = tail = []
+    if first != unit_first:
+        head_last = _partition_unit(first, level)[1]
+        head = _partition_ranges(first, head_last, level + 1, prefix + (lo,))
+        first = head_last + timedelta(hours=1)
+    if last != unit_last:
+        tail_first = _partition_unit(last, level)[0]
+        tail = _partition_ranges(tail_first, last, level + 1, prefix + (hi,))
+        last = tail_first - timedelta(hours=1)
+    middle = [(prefix, level, _partition_value(first, level), _partition_value(last, level))]
+    return head + (middle if first <= last else []) + tail
+
+
+def _partition_range_sql(prefix: tuple, level: int, lo: str, hi: str) -> str:
+    import calendar
+    parts = [f"{column} = {_q(value)}" for column, value in zip(_PARTITION_COLUMNS, prefix)]
+    column = _PARTITION_COLUMNS[level]
+    if lo == hi:
+        parts.append(f"{column} = {_q(lo)}")
+        return " AND ".join(parts)
+    if level == 0:
+        floor = ceiling = None
+    elif level == 1:
+        floor, ceiling = "01", "12"
+    elif level == 2:
+        floor, ceiling = "01", f"{calendar.monthrange(int(prefix[0]), int(prefix[1]))[1]:02d}"
+    else:
+        floor, ceiling = "00", "23"
+    if lo != floor:
+        parts.append(f"{column} >= {_q(lo)}")
+    if hi != ceiling:
+        parts.append(f"{column} <= {_q(hi)}")
     return " AND ".join(parts)
 
 
+def _partition_range_filter(start, end) -> str:
+    """Partition predicate for the UTC interval [start, end) (aware datetimes).
+
+    Reads exactly the (year, month, day, hour) partitions the interval
+    touches, as an OR of ranges when it crosses a day, month or year
+    boundary. A single range renders like _partition_filter, e.g.
+    "year = '2026' AND month = '05' AND day >= '03' AND day <= '04'".
+    """
+    from datetime import timedelta, timezone
+    first = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    last = (end.astimezone(timezone.utc) - timedelta(microseconds=1)).replace(
+        minute=0, second=0, microsecond=0)
+    if end <= start:
+        raise ValueError(f"Empty time range: {start.isoformat()} .. {end.isoformat()}")
+    ranges = [_partition_range_sql(*r) for r in _partition_ranges(first, last)]
+    if len(ranges) == 1:
+        return ranges[0]
+    return "(" + " OR ".join(f"({r})" for r in ranges) + ")"
+
+
+# ---------------------------------------------------------------------------
+# Compacted usage_logs (see usage_compaction.py)
+# ---------------------------------------------------------------------------
+
+USAGE_LOGS_TABLE = "ezmodel_logs.usage_logs"
+USAGE_LOGS_COMPACT_TABLE = "ezmodel_logs.usage_logs_compact"
+
+# usage_logs_dedup 的去重列（不含 day / hour 分区列）
+USAGE_LOGS_BASE_COLUMNS = (
+    "request_id", "created_at", "user_id", "username", "channel_id",
+    "model_name", "token_name", "prompt_tokens", "completion_tokens",
+    "quota", "use_time_seconds", "is_stream", "ip", "other",
+)
+
+# other JSON 中账单查询用到的字段 → 压缩表中的同名强类型列
+COMPACT_OTHER_FIELDS = (
+    ("cache_tokens", "BIGINT"),
+    ("cache_creation_tokens", "BIGINT"),
+    ("cache_creation_tokens_5m", "BIGINT"),
+    ("cache_creation_tokens_1h", "BIGINT"),
+    ("tiered_cache_creation_tokens_5m", "BIGINT"),
+    ("tiered_cache_creation_tokens_1h", "BIGINT"),
+    ("tiered_cache_creation_tokens_remaining", "BIGINT"),
+    ("tiered_input_price", "DOUBLE"),
+    ("tiered_output_price", "DOUBLE"),
+    ("image_completion_tokens", "BIGINT"),
+    ("image_completion_ratio", "DOUBLE"),
+    ("image_output", "BIGINT"),
+    ("image_ratio", "DOUBLE"),
+    ("actual_quota", "BIGINT"),
+    ("preconsumed_quota", "BIGINT"),
+    ("quota_delta", "BIGINT"),
+    ("billing_event", "VARCHAR"),
+    ("task_id", "VARCHAR"),
+    ("billing_cond_multiplier", "DOUBLE"),
+)
+
+# cache write 拆分：与账单查询里手写的 COALESCE 完全一致
+COMPACT_DERIVED_FIELDS = (
+    ("cw_5m", ("tiered_cache_creation_tokens_5m", "cache_creation_tokens_5m")),
+    ("cw_1h", ("tiered_cache_creation_tokens_1h", "cache_creation_tokens_1h")),
+    ("cw_remaining", ("tiered_cache_creation_tokens_remaining",)),
+)
+
+COMPACT_COLUMNS = (USAGE_LOGS_BASE_COLUMNS
+                   + tuple(name for name, _ in COMPACT_OTHER_FIELDS)
+                   + tuple(name for name, _ in COMPACT_DERIVED_FIELDS))
+
+_OTHER_FIELD_TYPES = dict(COMPACT_OTHER_FIELDS)
+
+_compacted_days_provider = None
+
+
+def set_compacted_days_provider(provider) -> None:
+    """Override where compacted days come from (callable → set of 'YYYY-MM-DD').
+
+    None restores the default, usage_compaction.compacted_days.
+    """
+    global _compacted_days_provider
+    _compacted_days_provider = provider
+
+
+def _compacted_days() -> frozenset:
+    provider = _compacted_days_provider
+    if provider is None:
+        import usage_compaction  # usage_compaction imports this module
+        provider = usage_compaction.compacted_days
+    return frozenset(provider())
+
+
+def _other_field_expr(key: str) -> str:
+    """Typed extraction of one other-JSON field, as the compaction job writes it."""
+    expr = f"json_extract_scalar(other, '$.{key}')"
+    sql_type = _OTHER_FIELD_TYPES[key]
+    if sql_type == "VARCHAR":
+        return expr
+    return f"TRY_CAST({expr} AS {sql_type})"
+
+
+def compact_field_exprs() -> list[str]:
+    """SELECT items that derive the typed compact columns from usage_logs.other."""
+    items = [f"{_other_field_expr(key)} AS {key}" for key, _ in COMPACT_OTHER_FIELDS]
+    for name, keys in COMPACT_DERIVED_FIELDS:
+        parts = ", ".join(_other_field_expr(k) for k in keys)
+        items.append(f"COALESCE({parts}, 0) AS {name}")
+    return items
+
+
+def _cast_pattern(key: str, sql_type: str = "BIGINT") -> str:
+    return (rf"CAST\(json_extract_scalar\(other,\s*'\$\.{key}'\)\s+AS\s+{sql_type}\)")
+
+
+_DERIVED_RES = [
+    (name, re.compile(r"COALESCE\(\s*" + r",\s*".join(_cast_pattern(k) for k in keys) + r",\s*0\)"))
+    for name, keys in COMPACT_DERIVED_FIELDS
+]
+_CAST_RE = re.compile(_cast_pattern(r"(\w+)", r"(BIGINT|DOUBLE)"))
+_SCALAR_RE = re.compile(r"json_extract_scalar\(other,\s*'\$\.(\w+)'\)")
+_DEDUP_CTE_RE = re.compile(
+    r"WITH usage_logs_dedup AS \(\n.*?FROM ezmodel_logs\.usage_logs\n\s*WHERE (?P<where>[^\n]*)\n\)",
+    re.S)
+_TOP_FROM_RE = re.compile(r"FROM ezmodel_logs\.usage_logs\nWHERE (?P<where>[^\n]*)\n")
+
+
+def _use_typed_columns(sql: str) -> str:
+    """Replace json_extract_scalar(other, ...) expressions with compact columns."""
+    for name, pattern in _DERIVED_RES:
+        sql = pattern.sub(name, sql)
+
+    def cast(m):
+        key, sql_type = m.group(1), m.group(2)
+        return key if _OTHER_FIELD_TYPES.get(key) == sql_type else m.group(0)
+
+    def scalar(m):
+        key = m.group(1)
+        return key if _OTHER_FIELD_TYPES.get(key) == "VARCHAR" else m.group(0)
+
+    return _SCALAR_RE.sub(scalar, _CAST_RE.sub(cast, sql))
+
+
+def _partition_range_days(where: str) -> list[str] | None:
+    """Days one AND-only partition range can read (see _partition_days)."""
+    import calendar
+    if re.search(r"\bOR\b", where, re.I):
+        return None
+    preds, lists = {}, {}
+    for column in ("year", "month", "day"):
+        preds[column] = re.findall(rf"\b{column}\s*(=|>=|<=)\s*'([^']*)'", where)
+        lists[column] = re.findall(rf"\b{column}\s+IN\s*\(([^)]*)\)", where)
+        if len(preds[column]) + len(lists[column]) != len(re.findall(rf"\b{column}\b", where)):
+            return None
+    if lists["year"] or lists["month"] or len(lists["day"]) > 1:
+        return None
+    listed = re.findall(r"'([^']*)'", lists["day"][0]) if lists["day"] else None
+    if (not all(re.fullmatch(r"\d{4}", v) for _, v in preds["year"])
+            or not all(re.fullmatch(r"\d{2}", v) for _, v in preds["month"] + preds["day"])
+            or not all(re.fullmatch(r"\d{2}", v) for v in listed or [])):
+        return None
+
+    def bounds(column, first, last):
+        for op, value in preds[column]:
+            if op in ("=", ">="):
+                first = max(first, int(value))
+            if op in ("=", "<="):
+                last = min(last, int(value))
+        return first, last
+
+    years = bounds("year", 0, 9999)
+    if years[0] == 0 or years[1] == 9999:
+        return None
+    months, days = bounds("month", 1, 12), bounds("day", 1, 31)
+    result = []
+    for year in range(years[0], years[1] + 1):
+        for month in range(months[0], months[1] + 1):
+            last = min(days[1], calendar.monthrange(year, month)[1])
+            result += [f"{year:04d}-{month:02d}-{d:02d}" for d in range(days[0], last + 1)
+                       if listed is None or f"{d:02d}" in listed]
+    return result
+
+
+def _partition_days(where: str) -> list[str] | None:
+    """UTC days ('YYYY-MM-DD') a partition predicate can read, or None if unsure.
+
+    Understands what _partition_filter / _partition_range_filter produce:
+    one AND-only range of year / month / day predicates (=, >=, <=, or a
+    day IN list), or a leading "((range) OR (range) ...)" group of them
+    followed by non-partition conditions.
+    """
+    ranges = [where]
+    if where.startswith("(("):
+        depth = 0
+        for end, char in enumerate(where):
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if depth == 0:
+                break
+        rest = where[end + 1:]
+        ranges = [r + rest for r in re.split(r"\)\s+OR\s+\(", where[2:end - 1])]
+    days = set()
+    for r in ranges:
+        found = _partition_range_days(r)
+        if found is None:
+            return None
+        days.update(found)
+    return sorted(days)
+
+
+def _day_in(days: list[str], qualified: bool = False) -> str:
+    """day IN (...) filter; qualified=True pins each day to its year / month."""
+    if not qualified:
+        return "day IN (" + ", ".join(_q(d[-2:]) for d in days) + ")"
+    months = {}
+    for d in days:
+        months.setdefault(d[:7], []).append(_q(d[-2:]))
+    return "(" + " OR ".join(
+        f"(year = {_q(ym[:4])} AND month = {_q(ym[5:])} AND day IN ({', '.join(listed)}))"
+        for ym, listed in months.items()) + ")"
+
+
+def _compact_dedup_cte(where: str, compacted: list[str], pending: list[str]) -> str:
+    """usage_logs_dedup over compacted days (Parquet) + the rest (JSON).
+
+    Both branches expose the typed compact columns, so the main query can use
+    them regardless of which table a day came from. Compacted rows were
+    de-duplicated when they were written. When the range spans several
+    months the day lists are pinned to their month.
+    """
+    qualified = len({d[:7] for d in compacted + pending}) > 1
+    columns = ",\n        ".join(COMPACT_COLUMNS + ("year", "month", "day", "hour"))
+    branches = []
+    if compacted:
+        branches.append(f"""    SELECT
+        {columns}
+    FROM {USAGE_LOGS_COMPACT_TABLE}
+    WHERE {where} AND {_day_in(compacted, qualified)}""")
+    if pending:
+        json_columns = ",\n        ".join(
+            USAGE_LOGS_BASE_COLUMNS + tuple(compact_field_exprs()) + ("year", "month", "day", "hour"))
+        branches.append(f"""    SELECT DISTINCT
+        {json_columns}
+    FROM {USAGE_LOGS_TABLE}
+    WHERE {where} AND {_day_in(pending, qualified)}""")
+    body = "\n    UNION ALL\n".join(branches)
+    return f"WITH usage_logs_dedup AS (\n{body}\n)"
+
+
+def _route_compacted(sql: str) -> str:
+    """Point a usage_logs query at usage_logs_compact for the days it covers.
+
+    usage_logs_dedup queries read compacted days from Parquet and only the
+    remaining days from the JSON table. SELECT DISTINCT detail queries switch
+    only when every day they read is compacted. Anything the partition
+    predicate parser does not understand is left untouched.
+    """
+    cte = _DEDUP_CTE_RE.search(sql)
+    match = cte or _TOP_FROM_RE.search(sql)
+    if match is None:
+        return sql
+    days = _partition_days(match.group("where"))
+    if not days:
+        return sql
+    done = _compacted_days()
+    compacted = [d for d in days if d in done]
+    if not compacted:
+        return sql
+    if cte:
+        pending = [d for d in days if d not in done]
+        head = _compact_dedup_cte(match.group("where"), compacted, pending)
+        return sql[:cte.start()] + head + _use_typed_columns(sql[cte.end():])
+    if len(compacted) < len(days):
+        return sql
+    return (_use_typed_columns(sql[:match.start()])
+            + f"FROM {USAGE_LOGS_COMPACT_TABLE}\nWHERE {match.group('where')}\n"
+            + _use_typed_columns(sql[match.end():]))
+
+
+def query_partition_days(sql: str) -> list[str] | None:
+    """UTC days a usage_logs query reads (see _partition_days), or None if unsure."""
+    match = _DEDUP_CTE_RE.search(sql) or _TOP_FROM_RE.search(sql)
+    return _partition_days(match.group("where")) if match else None
+
+
+def _compactable(builder):
+    """Decorator: route the builder's SQL through _route_compacted."""
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        return _route_compacted(builder(*args, **kwargs))
+    return wrapper
+
+
 # ---------------------------------------------------------------------------
 # A. Billing queries (usage_logs)
 # ---------------------------------------------------------------------------
@@ -200,7 +559,8 @@ def _hour_range_filter(year: str, month: str,
 def _build_time_where(year: str, month: str, year_month: str,
                       start_day: str = None, end_day: str = None,
                       start_time: str = None, end_time: str = None,
-                      time_zone_offset_hours: float = 0) -> str:
+                      time_zone_offset_hours: float = 0,
+                      cross_month: bool = False) -> str:
     """Build WHERE clause with partition pruning + optional created_at row filter.
 
     start_time / end_time: 'YYYY-MM-DD HH:MM'. When provided, they take
@@ -208,43 +568,49 @@ def _build_time_where(year: str, month: str, year_month: str,
     and the hour partition is also pruned to minimize scan cost. The
     wall-clock time is interpreted in time_zone_offset_hours.
 
+    The range must start in year_month. cross_month=True lets it end in a
+    later month (builders that do not group by the day partition).
+
     Returns (partition_where, extra_row_conditions) combined into one string.
     """
-    # Resolve effective day/hour boundaries
-    s_day = s_hour = s_ts = None
-    e_day = e_hour = e_ts = None
+    from datetime import datetime, timedelta, timezone
+    # Resolve the UTC interval [start, end); defaults to the whole month
+    start = datetime(int(year), int(month), 1, tzinfo=timezone.utc)
+    end = (start + timedelta(days=32)).replace(day=1)
+    s_ts = e_ts = None
 
     if start_time:
-        sy, sm, sd, sh, s_ts = _parse_datetime(start_time, time_zone_offset_hours)
-        s_day, s_hour = f"{sy}-{sm}-{sd}", sh
-        _validate_start_day(s_day, year_month)
+        sy, sm, sd, _sh, s_ts = _parse_datetime(start_time, time_zone_offset_hours)
+        _validate_start_day(f"{sy}-{sm}-{sd}", year_month)
+        start = _utc_datetime(s_ts)
     elif start_day:
         _validate_start_day(start_day, year_month)
-        s_day = start_day
+        start = datetime.strptime(start_day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
 
     if end_time:
-        ey, em, ed, eh, e_ts = _parse_datetime(end_time, time_zone_offset_hours)
-        e_day, e_hour = f"{ey}-{em}-{ed}", eh
-        _validate_end_day(e_day, year_month)
+        ey, em, ed, _eh, e_ts = _parse_datetime(end_time, time_zone_offset_hours)
+        _validate_end_day(f"{ey}-{em}-{ed}", year_month, cross_month=cross_month)
+        # end_time is inclusive to the minute: include all records in that minute
+        e_ts += 60
+        end = _utc_datetime(e_ts)
     elif end_day:
-        _validate_end_day(end_day, year_month)
-        e_day = end_day
+        _validate_end_day(end_day, year_month, cross_month=cross_month)
+        end = (datetime.strptime(end_day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+               + timedelta(days=1))
 
-    # Partition pruning
-    where = _hour_range_filter(year, month,
-                               start_day=s_day, start_hour=s_hour,
-                               end_day=e_day, end_hour=e_hour)
+    # Partition pruning: the UTC hours the interval touches, nothing more
+    where = _partition_range_filter(start, end)
 
     # Row-level created_at filter (only when sub-day precision is needed)
     if s_ts is not None:
         where += f" AND created_at >= {s_ts}"
     if e_ts is not None:
-        # end_time is inclusive to the minute: include all records in that minute
-        where += f" AND created_at < {e_ts + 60}"
+        where += f" AND created_at < {e_ts}"
 
     return where
 
 
+@_compactable
 def monthly_bill_by_user(year_month: str, user_id: int = None,
                          channel_id: int = None,
                          channel_ids: list[int] = None,
@@ -256,7 +622,8 @@ def monthly_bill_by_user(year_month: str, user_id: int = None,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -277,6 +644,7 @@ ORDER BY total_usd DESC
 """
 
 
+@_compactable
 def monthly_bill_by_user_model(year_month: str, user_id: int = None,
                                channel_id: int = None,
                                channel_ids: list[int] = None,
@@ -288,7 +656,8 @@ def monthly_bill_by_user_model(year_month: str, user_id: int = None,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -309,6 +678,7 @@ ORDER BY user_id, total_usd DESC
 """
 
 
+@_compactable
 def monthly_bill_full(year_month: str, user_id: int = None,
                       channel_id: int = None,
                       channel_ids: list[int] = None,
@@ -325,12 +695,15 @@ def monthly_bill_full(year_month: str, user_id: int = None,
     start_time / end_time: 'YYYY-MM-DD HH:MM' for sub-day precision;
         takes precedence over start_day / end_day when provided.
         Interpreted in time_zone_offset_hours.
+    The end may fall in a later month, e.g. a billing period from the 15th
+    08:00 to the 15th of next month 08:00.
     """
     year, month = _year_month(year_month)
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -368,6 +741,7 @@ ORDER BY user_id, total_usd DESC
 """
 
 
+@_compactable
 def daily_trend(year_month: str, user_id: int = None,
                 channel_id: int = None,
                 channel_ids: list[int] = None,
@@ -379,14 +753,15 @@ def daily_trend(year_month: str, user_id: int = None,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
     return f"""
 {_usage_logs_dedup_cte(where)}
 SELECT
-    day,
+    {_partition_date()} AS day,
     {_logical_call_count()},
     SUM(prompt_tokens + completion_tokens) AS total_tokens,
     SUM(COALESCE(CAST(json_extract_scalar(other, '$.cache_tokens') AS BIGINT), 0))
@@ -404,11 +779,12 @@ SELECT
     SUM({_postpaid_quota_expr()})       AS total_quota,
     ROUND(SUM({_postpaid_quota_expr()}) / 500000.0, 4) AS total_usd
 FROM usage_logs_dedup
-GROUP BY day
+GROUP BY year, month, day
 ORDER BY day
 """
 
 
+@_compactable
 def daily_trend_by_model(year_month: str, user_id: int = None,
                          channel_id: int = None,
                          channel_ids: list[int] = None,
@@ -420,14 +796,15 @@ def daily_trend_by_model(year_month: str, user_id: int = None,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
     return f"""
 {_usage_logs_dedup_cte(where)}
 SELECT
-    day,
+    {_partition_date()} AS day,
     token_name,
     model_name,
     {_logical_call_count()},
@@ -449,11 +826,12 @@ SELECT
     SUM({_postpaid_quota_expr()})           AS total_quota,
     ROUND(SUM({_postpaid_quota_expr()}) / 500000.0, 4) AS total_usd
 FROM usage_logs_dedup
-GROUP BY day, token_name, model_name
+GROUP BY year, month, day, token_name, model_name
 ORDER BY day, token_name, total_usd DESC
 """
 
 
+@_compactable
 def model_ranking(year_month: str,
                   start_day: str = None, end_day: str = None,
                   start_time: str = None, end_time: str = None,
@@ -462,7 +840,8 @@ def model_ranking(year_month: str,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     return f"""
 {_usage_logs_dedup_cte(where)}
 SELECT
@@ -478,6 +857,7 @@ ORDER BY total_usd DESC
 """
 
 
+@_compactable
 def channel_summary(year_month: str,
                     start_day: str = None, end_day: str = None,
                     start_time: str = None, end_time: str = None,
@@ -486,7 +866,8 @@ def channel_summary(year_month: str,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     return f"""
 {_usage_logs_dedup_cte(where)}
 SELECT
@@ -501,6 +882,7 @@ ORDER BY total_usd DESC
 """
 
 
+@_compactable
 def top_users(year_month: str, limit: int = 20) -> str:
     year, month = _year_month(year_month)
     where = _partition_filter(year, month)
@@ -520,6 +902,7 @@ LIMIT {int(limit)}
 """
 
 
+@_compactable
 def hourly_distribution(year_month: str, day: str) -> str:
     year, month = _year_month(year_month)
     where = _partition_filter(year, month, day=day)
@@ -545,27 +928,14 @@ def raw_usage_detail(start_date: str, end_date: str,
     start_date / end_date: 'YYYY-MM-DD' inclusive range.
     Generates partition filters covering all months/days in the range.
     """
-    import re as _re
-    m1 = _re.match(r"^(\d{4})-(\d{2})-(\d{2})$", start_date)
-    m2 = _re.match(r"^(\d{4})-(\d{2})-(\d{2})$", end_date)
-    if not m1 or not m2:
-        raise ValueError(f"Date format must be YYYY-MM-DD, got {start_date!r} / {end_date!r}")
-
-    sy, sm, sd = m1.group(1), m1.group(2), m1.group(3)
-    ey, em, ed = m2.group(1), m2.group(2), m2.group(3)
-
-    if sy == ey and sm == em:
-        where = (f"year = '{sy}' AND month = '{sm}' "
-                 f"AND day >= '{sd}' AND day <= '{ed}'")
-    elif sy == ey:
-        where = (f"year = '{sy}' AND "
-                 f"((month = '{sm}' AND day >= '{sd}') OR "
-                 f"(month > '{sm}' AND month < '{em}') OR "
-                 f"(month = '{em}' AND day <= '{ed}'))")
-    else:
-        where = (f"((year = '{sy}' AND ((month = '{sm}' AND day >= '{sd}') OR month > '{sm}')) OR "
-                 f"(year > '{sy}' AND year < '{ey}') OR "
-                 f"(year = '{ey}' AND ((month = '{em}' AND day <= '{ed}') OR month < '{em}')))")
+    from datetime import datetime, timedelta, timezone
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        end = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise ValueError(
+            f"Date format must be YYYY-MM-DD, got {start_date!r} / {end_date!r}") from None
+    where = _partition_range_filter(start, end + timedelta(days=1))
 
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
@@ -612,23 +982,7 @@ def usage_by_created_at_range(ts_min: int, ts_max: int,
     Derives partition filters from timestamps to enable partition pruning.
     Returns per-request data suitable for request_id-level crosscheck.
     """
-    from datetime import datetime, timezone
-
-    dt_min = datetime.fromtimestamp(ts_min, tz=timezone.utc)
-    dt_max = datetime.fromtimestamp(ts_max, tz=timezone.utc)
-
-    # Build partition filter covering all months/days in range
-    if dt_min.year == dt_max.year and dt_min.month == dt_max.month:
-        where = (f"year = '{dt_min.year}' AND month = '{dt_min.month:02d}' "
-                 f"AND day >= '{dt_min.day:02d}' AND day <= '{dt_max.day:02d}'")
-    elif dt_min.year == dt_max.year:
-        where = (f"year = '{dt_min.year}' AND "
-                 f"((month = '{dt_min.month:02d}' AND day >= '{dt_min.day:02d}') OR "
-                 f"(month > '{dt_min.month:02d}' AND month < '{dt_max.month:02d}') OR "
-                 f"(month = '{dt_max.month:02d}' AND day <= '{dt_max.day:02d}'))")
-    else:
-        where = (f"year >= '{dt_min.year}' AND year <= '{dt_max.year}'")
-
+    where = _partition_range_filter(_utc_datetime(ts_min), _utc_datetime(ts_max))
     where += f" AND created_at >= {int(ts_min)} AND created_at < {int(ts_max)}"
 
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -661,6 +1015,7 @@ ORDER BY created_at
 """
 
 
+@_compactable
 def usage_summary_by_created_at_range(ts_min: int, ts_max: int,
                                       channel_id: int = None,
                                       channel_ids: list[int] = None,
@@ -669,22 +1024,7 @@ def usage_summary_by_created_at_range(ts_min: int, ts_max: int,
 
     Used for model-level crosscheck against vendor bills.
     """
-    from datetime import datetime, timezone
-
-    dt_min = datetime.fromtimestamp(ts_min, tz=timezone.utc)
-    dt_max = datetime.fromtimestamp(ts_max, tz=timezone.utc)
-
-    if dt_min.year == dt_max.year and dt_min.month == dt_max.month:
-        where = (f"year = '{dt_min.year}' AND month = '{dt_min.month:02d}' "
-                 f"AND day >= '{dt_min.day:02d}' AND day <= '{dt_max.day:02d}'")
-    elif dt_min.year == dt_max.year:
-        where = (f"year = '{dt_min.year}' AND "
-                 f"((month = '{dt_min.month:02d}' AND day >= '{dt_min.day:02d}') OR "
-                 f"(month > '{dt_min.month:02d}' AND month < '{dt_max.month:02d}') OR "
-                 f"(month = '{dt_max.month:02d}' AND day <= '{dt_max.day:02d}'))")
-    else:
-        where = (f"year >= '{dt_min.year}' AND year <= '{dt_max.year}'")
-
+    where = _partition_range_filter(_utc_datetime(ts_min), _utc_datetime(ts_max))
     where += f" AND created_at >= {int(ts_min)} AND created_at < {int(ts_max)}"
 
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -710,6 +1050,7 @@ ORDER BY total_usd DESC
 # A2. Detail export — per-day row-level with Athena-side json_extract
 # ---------------------------------------------------------------------------
 
+@_compactable
 def raw_usage_detail_daily(year_month: str, day: str,
                            user_id: int = None, channel_id: int = None,
                            channel_ids: list[int] = None,
@@ -718,8 +1059,12 @@ def raw_usage_detail_daily(year_month: str, day: str,
 
     Returns one row per request with all fields needed for pricing.
     The 'other' JSON is NOT returned — cache tokens are extracted via json_extract.
+    day is 'DD' of year_month or a full 'YYYY-MM-DD' date (detail_day_list),
+    which may fall in a later month.
     """
     year, month = _year_month(year_month)
+    if len(day) > 2:
+        year, month, day = day.split("-")
     where = _partition_filter(year, month, day=day)
 
     if user_id is not None:
@@ -781,18 +1126,20 @@ ORDER BY created_at
 def detail_day_list(year_month: str, start_day: str = None, end_day: str = None,
                     start_time: str = None, end_time: str = None,
                     time_zone_offset_hours: float = 0) -> list[str]:
-    """Return list of day strings (01..N) for the given month.
+    """Return the dates 'YYYY-MM-DD' of the period, one per detail query.
 
+    The period defaults to year_month and must start in it; the end may run
+    into a later month (a 15th → 15th billing period).
     start_time / end_time ('YYYY-MM-DD HH:MM') take precedence over
     start_day / end_day when provided. The dates used for partition
     selection are the supplied wall-clock dates; epoch filtering elsewhere
     applies time_zone_offset_hours.
     Used by parallel detail export to generate per-day queries.
     """
-    import calendar
+    from datetime import date, timedelta
     year, month = _year_month(year_month)
-    _, ndays = calendar.monthrange(int(year), int(month))
-    first_day = 1
+    first = date(int(year), int(month), 1)
+    last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
 
     eff_start_day = start_day
     eff_end_day = end_day
@@ -806,17 +1153,18 @@ def detail_day_list(year_month: str, start_day: str = None, end_day: str = None,
 
     if eff_start_day:
         _validate_start_day(eff_start_day, year_month)
-        first_day = int(eff_start_day.split("-")[2])
+        first = date.fromisoformat(eff_start_day)
     if eff_end_day:
-        _validate_end_day(eff_end_day, year_month)
-        ndays = int(eff_end_day.split("-")[2])
-    return [f"{d:02d}" for d in range(first_day, ndays + 1)]
+        _validate_end_day(eff_end_day, year_month, cross_month=True)
+        last = date.fromisoformat(eff_end_day)
+    return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
 
 
 # ---------------------------------------------------------------------------
 # B. Anomaly detection (usage_logs)
 # ---------------------------------------------------------------------------
 
+@_compactable
 def anomaly_zero_tokens(year_month: str, day: str = None,
                         start_day: str = None, end_day: str = None,
                         start_time: str = None, end_time: str = None,
@@ -825,7 +1173,8 @@ def anomaly_zero_tokens(year_month: str, day: str = None,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     # If day is specified (legacy), override with day filter
     if day:
         where = _partition_filter(year, month, day=day)
@@ -879,6 +1228,7 @@ ORDER BY user_id, model_name, created_at
 # C. KPI summary (usage_logs)
 # ---------------------------------------------------------------------------
 
+@_compactable
 def kpi_summary(year_month: str,
                 start_day: str = None, end_day: str = None,
                 start_time: str = None, end_time: str = None,
@@ -887,7 +1237,8 @@ def kpi_summary(year_month: str,
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
                               start_time=start_time, end_time=end_time,
-                              time_zone_offset_hours=time_zone_offset_hours)
+                              time_zone_offset_hours=time_zone_offset_hours,
+                              cross_month=True)
     return f"""
 {_usage_logs_dedup_cte(where)}
 SELECT
@@ -902,6 +1253,59 @@ FROM usage_logs_dedup
 """
 
 
+@_compactable
+def usage_cube_daily(year_month: str, days: list[str]) -> str:
+    """Per-day user × channel × token × model rollup feeding usage_cube.py.
+
+    days: UTC days 'YYYY-MM-DD' of year_month to aggregate. call_count is
+    counted per cell, so a logical call is only collapsed within one day /
+    user / channel / token / model.
+    """
+    year, month = _year_month(year_month)
+    if not days:
+        raise ValueError("days must not be empty")
+    for day in days:
+        _validate_start_day(day, year_month)
+    where = _partition_filter(year, month) + " AND " + _day_in(sorted(set(days)))
+    return f"""
+{_usage_logs_dedup_cte(where)}
+SELECT
+    day,
+    user_id,
+    username,
+    channel_id,
+    token_name,
+    model_name,
+    COUNT(*)                                AS row_count,
+    {_logical_call_count()},
+    SUM(prompt_tokens)                      AS total_input_tokens,
+    SUM(completion_tokens)                  AS total_output_tokens,
+    SUM({_postpaid_quota_expr()})           AS total_quota,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.cache_tokens') AS BIGINT), 0))
+        AS total_cache_hit_tokens,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.cache_creation_tokens') AS BIGINT), 0))
+        AS total_cache_write_tokens,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.tiered_cache_creation_tokens_5m')  AS BIGINT),
+                 CAST(json_extract_scalar(other, '$.cache_creation_tokens_5m')  AS BIGINT), 0))
+        AS total_cw_5m,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.tiered_cache_creation_tokens_1h')  AS BIGINT),
+                 CAST(json_extract_scalar(other, '$.cache_creation_tokens_1h')  AS BIGINT), 0))
+        AS total_cw_1h,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.tiered_cache_creation_tokens_remaining') AS BIGINT), 0))
+        AS total_cw_remaining,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.image_completion_tokens') AS BIGINT), 0))
+        AS total_image_output_tokens,
+    SUM(COALESCE(CAST(json_extract_scalar(other, '$.image_output') AS BIGINT), 0))
+        AS total_image_input_tokens,
+    SUM(use_time_seconds)                   AS total_use_time_seconds,
+    COUNT(use_time_seconds)                 AS use_time_count,
+    SUM(CASE WHEN is_stream THEN 1 ELSE 0 END) AS stream_count
+FROM usage_logs_dedup
+GROUP BY day, user_id, username, channel_id, token_name, model_name
+ORDER BY day, user_id, channel_id, token_name, model_name
+"""
+
+
 # ---------------------------------------------------------------------------
 # D. Error analysis (error_logs — requires day)
 # ---------------------------------------------------------------------------
@@ -1003,6 +1407,17 @@ def _tz_offset_interval(offset_hours: float) -> str:
     return f"INTERVAL '{minutes}' MINUTE"
 
 
+def _local_month_bounds(year_month: str, tz_offset_hours: float):
+    """UTC [start, end) of year_month's wall-clock days at tz_offset_hours."""
+    from datetime import datetime, timedelta, timezone
+    year, month = _year_month(year_month)
+    tz = timezone(timedelta(hours=float(tz_offset_hours)))
+    start = datetime(int(year), int(month), 1, tzinfo=tz)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+@_compactable
 def monthly_bill_full_tz(year_month: str,
                          tz_offset_hours: float = 8.0,
                          user_id: int = None,
@@ -1012,10 +1427,13 @@ def monthly_bill_full_tz(year_month: str,
 
     Re-partitions records by applying tz_offset_hours to created_at, so each
     'local_date' row represents a wall-clock day in the target timezone.
+    Reads the UTC hours of the local month only, which reach into the
+    neighbouring UTC month.
     Used for timezone-shifted export / reconciliation with vendors on UTC+4, etc.
     """
-    year, month = _year_month(year_month)
-    where = _partition_filter(year, month)
+    start, end = _local_month_bounds(year_month, tz_offset_hours)
+    where = _partition_range_filter(start, end)
+    where += f" AND created_at >= {int(start.timestamp())} AND created_at < {int(end.timestamp())}"
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -1056,6 +1474,7 @@ ORDER BY local_date, user_id, total_usd DESC
 """
 
 
+@_compactable
 def daily_trend_tz(year_month: str,
                    tz_offset_hours: float = 8.0,
                    user_id: int = None,
@@ -1067,40 +1486,29 @@ def daily_trend_tz(year_month: str,
 
     start_day/end_day: 'YYYY-MM-DD' boundary in the target timezone.
     start_time/end_time: 'YYYY-MM-DD HH:MM' in the target timezone.
+    Without bounds it covers the local month.
     """
-    year, month = _year_month(year_month)
-    # Build base partition filter
-    where = _partition_filter(year, month)
+    from datetime import datetime, timedelta, timezone
+    month_start, month_end = _local_month_bounds(year_month, tz_offset_hours)
+    tz = timezone(timedelta(hours=float(tz_offset_hours)))
+    starts, ends = [], []
 
-    # Apply date/time range filters in the target timezone
-    # Convert local datetime bounds to UTC timestamps for row-level filtering
+    # Local date/time bounds -> UTC interval [start, end)
     if start_day:
-        # start_day 00:00 in target timezone -> UTC timestamp
-        from datetime import datetime, timedelta, timezone as tz
-        sy, sm, sd = start_day.split('-')
-        local_start = datetime(int(sy), int(sm), int(sd), 0, 0,
-                               tzinfo=tz(timedelta(hours=float(tz_offset_hours))))
-        start_ts = int(local_start.timestamp())
-        where += f" AND created_at >= {start_ts}"
-
+        starts.append(datetime.strptime(start_day, "%Y-%m-%d").replace(tzinfo=tz))
     if end_day:
-        # end_day 23:59:59 in target timezone -> UTC timestamp
-        from datetime import datetime, timedelta, timezone as tz
-        ey, em, ed = end_day.split('-')
-        local_end = datetime(int(ey), int(em), int(ed), 23, 59, 59,
-                              tzinfo=tz(timedelta(hours=float(tz_offset_hours))))
-        end_ts = int(local_end.timestamp())
-        where += f" AND created_at <= {end_ts}"
-
+        ends.append(datetime.strptime(end_day, "%Y-%m-%d").replace(tzinfo=tz)
+                    + timedelta(days=1))
     if start_time:
-        from datetime import datetime, timedelta, timezone as tz
-        sy, sm, sd, sh, smm = _parse_datetime(start_time, tz_offset_hours)
-        where += f" AND created_at >= {smm}"
-
+        starts.append(_utc_datetime(_parse_datetime(start_time, tz_offset_hours)[4]))
     if end_time:
-        from datetime import datetime, timedelta, timezone as tz
-        ey, em, ed, eh, e_ts = _parse_datetime(end_time, tz_offset_hours)
-        where += f" AND created_at < {e_ts + 60}"
+        # end_time is inclusive to the minute
+        ends.append(_utc_datetime(_parse_datetime(end_time, tz_offset_hours)[4] + 60))
+    start = max(starts) if starts else month_start
+    end = min(ends) if ends else month_end
+
+    where = _partition_range_filter(start, end)
+    where += f" AND created_at >= {int(start.timestamp())} AND created_at < {int(end.timestamp())}"
 
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
@@ -1132,6 +1540,7 @@ ORDER BY local_date
 """
 
 
+@_compactable
 def raw_usage_detail_daily_tz(year_month: str, local_date: str,
                               tz_offset_hours: float = 8.0,
                               user_id: int = None,
@@ -1140,7 +1549,7 @@ def raw_usage_detail_daily_tz(year_month: str, local_date: str,
                               model: str = None) -> str:
     """Row-level usage_logs for a single local-timezone date.
 
-    Computes the UTC partition day range that could contain records for the
+    Computes the UTC partition hours that could contain records for the
     given local_date under tz_offset_hours, then filters rows by
     created_at range corresponding to [local_date 00:00, local_date+1 00:00)
     in the target timezone.
@@ -1155,18 +1564,8 @@ def raw_usage_detail_daily_tz(year_month: str, local_date: str,
     ts_start = int(local_start.timestamp())
     ts_end = int(local_end.timestamp())
 
-    # UTC day range for partition pruning
-    utc_start = datetime.fromtimestamp(ts_start, tz=timezone.utc)
-    utc_end = datetime.fromtimestamp(ts_end, tz=timezone.utc)
-
-    year, month = _year_month(year_month)
-    # Use broad partition filter covering the UTC month + day range
-    where = f"year = {_q(year)} AND month = {_q(month)}"
-    day_lo = f"{utc_start.day:02d}"
-    day_hi = f"{utc_end.day:02d}"
-    if utc_start.month == utc_end.month:
-        where += f" AND day >= {_q(day_lo)} AND day <= {_q(day_hi)}"
-
+    # Exactly the UTC hours of the local day, across a month boundary if need be
+    where = _partition_range_filter(local_start, local_end)
     where += f" AND created_at >= {ts_start} AND created_at < {ts_end}"
 
     if user_id is not None:
@@ -1230,9 +1629,9 @@ def detail_day_list_tz(year_month: str,
     """Return list of local-date strings for a month under given timezone offset.
 
     Covers all local dates whose UTC footprint overlaps with the given month.
-    For UTC+8, 2026-03 covers local dates 2026-03-01 through 2026-03-31.
-    (The UTC partition for the month may miss the last few hours of the last
-    local date, but those will be caught by the previous UTC month.)
+    For UTC+8, 2026-03 covers local dates 2026-03-01 through 2026-03-31;
+    raw_usage_detail_daily_tz reads each date's UTC hours, so 2026-03-01
+    also reads the last hours of 2026-02-28.
     """
     import calendar
     from datetime import datetime, timedelta, timezone
@@ -1258,7 +1657,8 @@ def cache_hit_rate_by_user(year_month: str, user_id: int = None,
     year, month = _year_month(year_month)
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
-                              start_time=start_time, end_time=end_time)
+                              start_time=start_time, end_time=end_time,
+                              cross_month=True)
     if user_id is not None:
         where += f" AND user_id = {int(user_id)}"
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
@@ -1313,7 +1713,8 @@ def cache_hit_rate_summary(year_month: str,
     year, month = _year_month(year_month)
     where = _build_time_where(year, month, year_month,
                               start_day=start_day, end_day=end_day,
-                              start_time=start_time, end_time=end_time)
+                              start_time=start_time, end_time=end_time,
+                              cross_month=True)
     where += _channel_where(channel_id=channel_id, channel_ids=channel_ids)
     return f"""
 SELECT
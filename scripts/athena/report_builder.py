@@ -5,6 +5,7 @@ Excel 报表生成器 — 月度账单、日报、异常报告、重算报告、
 """
 
 import gzip
+import io
 import zipfile
 import os
 import sys
@@ -19,6 +20,7 @@ from athena_engine import (run_query_cached, run_queries_parallel_iter,
                           upload_and_sign, QUOTA_TO_USD, get_session_cost_summary)
 import queries
 import pricing_engine
+import usage_cube
 from logging_config import get_logger, log_report_complete, log_error
 
 logger = get_logger("report_builder")
@@ -113,6 +115,18 @@ def write_sheet(wb, title, sheet_name, headers, col_widths, data_rows, num_fmts,
 
 def _write_single_sheet(wb, title, sheet_name, headers, col_widths, data_rows,
                         num_fmts, total_row=None, total_fmts=None):
+    ws, get_fmt = _begin_sheet(wb, title, sheet_name, headers, col_widths)
+    _write_sheet_rows(ws, get_fmt, data_rows, num_fmts)
+
+    if total_row:
+        tr = len(data_rows) + 2
+        tfmts = total_fmts or num_fmts
+        for ci, (val, nf) in enumerate(zip(total_row, tfmts)):
+            ws.write(tr, ci, val, get_fmt(nf, 0, is_total=True))
+
+
+def _begin_sheet(wb, title, sheet_name, headers, col_widths):
+    """Add a worksheet with title + header rows; return (ws, get_fmt)."""
     ws = wb.add_worksheet(sheet_name)
     ws.freeze_panes(2, 0)
     ws.set_row(0, 22)
@@ -147,16 +161,22 @@ def _write_single_sheet(wb, title, sheet_name, headers, col_widths, data_rows,
                                       align="right" if nf else "left")
         return fmt_cache[key]
 
-    for ri, row_data in enumerate(data_rows):
+    return ws, get_fmt
+
+
+def _write_sheet_rows(ws, get_fmt, data_rows, num_fmts, start: int = 0) -> int:
+    """Write data rows below the header, continuing at data row `start`.
+
+    Rows are written in ascending order, so this is safe for constant_memory
+    workbooks fed one chunk at a time. Returns the next data row index.
+    """
+    ri = start
+    for row_data in data_rows:
         er = ri + 2
         for ci, (val, nf) in enumerate(zip(row_data, num_fmts)):
             ws.write(er, ci, val, get_fmt(nf, ri))
-
-    if total_row:
-        tr = len(data_rows) + 2
-        tfmts = total_fmts or num_fmts
-        for ci, (val, nf) in enumerate(zip(total_row, tfmts)):
-            ws.write(tr, ci, val, get_fmt(nf, 0, is_total=True))
+        ri += 1
+    return ri
 
 
 def _write_info_sheet(wb, ws, row, items):
@@ -339,11 +359,15 @@ def generate_monthly_bill(year_month: str, output_dir: str,
                           detail: bool = False,
                           customer_view: bool = False,
                           upload_s3: bool = False,
-                          no_cache: bool = False) -> str | list[str] | dict:
+                          no_cache: bool = False,
+                          detail_format: str = "auto") -> str | list[str] | dict:
     """Generate monthly bill Excel with xlsxwriter formatting.
 
     Uses fast aggregation queries (monthly_bill_full) with flat-tier applied
     at the summary level. For row-level precision, use generate_recalc_report.
+    The queries are exact and do not read the usage_cube checkpoints, so a
+    month-to-date bill scans every elapsed day of the range; only ranges made
+    of closed days are served from the permanent query cache.
 
     start_day / end_day: day-level boundary 'YYYY-MM-DD' (inclusive).
     start_time / end_time: 'YYYY-MM-DD HH:MM' for sub-day precision;
@@ -351,7 +375,8 @@ def generate_monthly_bill(year_month: str, output_dir: str,
         interpreted in time_zone_offset_hours.
 
     When detail=True, also exports row-level data as compressed CSV alongside
-    the summary Excel.
+    the summary Excel. detail_format="parquet" writes the internal detail as
+    zstd Parquet instead (see _export_detail_csv).
 
     When upload_s3=True, uploads all output files to S3 and returns a dict
     with local paths and presigned download URLs (24h expiry).
@@ -378,7 +403,9 @@ def generate_monthly_bill(year_month: str, output_dir: str,
     rate = exchange_rate if currency == "CNY" else 1.0
     symbol = "¥" if currency == "CNY" else "$"
 
-    # Fast aggregation queries
+    # Fast aggregation queries. Invoices stay on the exact COUNT(DISTINCT)
+    # query (closed days are cached permanently); usage_cube is for the
+    # dashboard / daily report / KPI previews only
     df_full = run_query_cached(
         queries.monthly_bill_full(year_month, user_id=user_id,
                                   channel_id=channel_id,
@@ -737,7 +764,7 @@ def generate_monthly_bill(year_month: str, output_dir: str,
     if not df_trend.empty:
         for _, r in df_trend.iterrows():
             row_data = [
-                f"{year_month}-{int(r['day']):02d}",
+                r["day"],
                 int(r["call_count"]), int(r["total_tokens"]),
             ]
             if customer_view and "total_cache_hit_tokens" in df_trend.columns:
@@ -771,7 +798,7 @@ def generate_monthly_bill(year_month: str, output_dir: str,
     if not df_trend_model.empty:
         for _, r in df_trend_model.iterrows():
             row_data = [
-                f"{year_month}-{int(r['day']):02d}",
+                r["day"],
                 r.get("token_name", ""),
                 r["model_name"],
                 int(r["call_count"]),
@@ -814,7 +841,8 @@ def generate_monthly_bill(year_month: str, output_dir: str,
                                          start_time=start_time,
                                          end_time=end_time,
                                          time_zone_offset_hours=time_zone_offset_hours,
-                                         customer_view=customer_view)
+                                         customer_view=customer_view,
+                                         detail_format=detail_format)
 
     if upload_s3:
         result = _upload_results(filepath, detail_path)
@@ -864,7 +892,8 @@ def _export_detail_csv(year_month: str, output_dir: str,
                        start_time: str = None,
                        end_time: str = None,
                        time_zone_offset_hours: float = 0,
-                       customer_view: bool = False) -> str:
+                       customer_view: bool = False,
+                       detail_format: str = "auto") -> str:
     """Export row-level detail as xlsx (customer_view) or zip-compressed CSV.
 
     customer_view=True:
@@ -873,6 +902,8 @@ def _export_detail_csv(year_month: str, output_dir: str,
       - Hides cost/profit/channel/discount columns
     customer_view=False:
       - Outputs .csv.zip (internal full-field format)
+      - detail_format="parquet": .parquet (zstd, detail_parquet_schema(),
+        one row group per queried day; read back with read_detail_parquet)
 
     start_day / end_day: day-level boundary 'YYYY-MM-DD' (inclusive).
     start_time / end_time: 'YYYY-MM-DD HH:MM' for sub-day precision,
@@ -918,39 +949,52 @@ def _export_detail_csv(year_month: str, output_dir: str,
     total_rows = 0
     days_done = 0
     all_chunks: list[pd.DataFrame] = []
+    stream, digests = _start_detail_stream(
+        customer_view, output_dir,
+        _internal_detail_base(year_month, suffix, ch_suffix, tier_suffix,
+                              from_suffix, day_suffix),
+        f"API Detail -- {year_month}{tier_suffix}{from_suffix}{day_suffix}",
+        detail_format)
 
-    for idx, df_day in run_queries_parallel_iter(sqls):
-        days_done += 1
-        if df_day.empty:
-            continue
-
-        # Sub-day row filter: trim boundary days to exact minute
-        cur_day = days[idx]  # e.g. '15'
-        cur_day_full = f"{year_month}-{cur_day}"
-        if _start_ts is not None and cur_day_full == _start_day_str:
-            df_day = df_day[df_day["created_at"] >= _start_ts]
-        if _end_ts is not None and cur_day_full == _end_day_str:
-            df_day = df_day[df_day["created_at"] < _end_ts + 60]
-
-        if df_day.empty:
-            continue
-
-        df_day = _apply_detail_pricing(df_day, flat_tier=flat_tier,
-                                       flat_tier_since=flat_tier_since)
-        total_rows += len(df_day)
-        all_chunks.append(df_day)
-
-        elapsed = time.time() - t0
-        logger.debug("Day query completed",
-                     extra={
-                         "event": "detail_day",
-                         "day": days[idx],
-                         "rows": len(df_day),
-                         "days_done": days_done,
-                         "total_days": len(sqls),
-                         "total_rows": total_rows,
-                         "elapsed_s": elapsed,
-                     })
+    try:
+        for idx, df_day in run_queries_parallel_iter(sqls):
+            days_done += 1
+            if df_day.empty:
+                continue
+
+            # Sub-day row filter: trim boundary days to exact minute
+            cur_day_full = days[idx]  # e.g. '2026-06-15'
+            if _start_ts is not None and cur_day_full == _start_day_str:
+                df_day = df_day[df_day["created_at"] >= _start_ts]
+            if _end_ts is not None and cur_day_full == _end_day_str:
+                df_day = df_day[df_day["created_at"] < _end_ts + 60]
+
+            if df_day.empty:
+                continue
+
+            df_day = _apply_detail_pricing(df_day, flat_tier=flat_tier,
+                                           flat_tier_since=flat_tier_since)
+            total_rows += len(df_day)
+            if stream is not None:
+                stream.write(digests.filter(pricing_engine.dedupe_usage_log_rows(df_day)))
+            else:
+                all_chunks.append(df_day)
+
+            elapsed = time.time() - t0
+            logger.debug("Day query completed",
+                         extra={
+                             "event": "detail_day",
+                             "day": days[idx],
+                             "rows": len(df_day),
+                             "days_done": days_done,
+                             "total_days": len(sqls),
+                             "total_rows": total_rows,
+                             "elapsed_s": elapsed,
+                         })
+    except BaseException:
+        if stream is not None:
+            stream.abort()
+        raise
 
     elapsed = time.time() - t0
 
@@ -958,23 +1002,26 @@ def _export_detail_csv(year_month: str, output_dir: str,
         logger.warning("No detail data found", extra={"event": "detail_no_data"})
         all_chunks = [pd.DataFrame()]
 
-    df_all = pd.concat(all_chunks, ignore_index=True) if all_chunks else pd.DataFrame()
-    df_all = pricing_engine.dedupe_usage_log_rows(df_all)
-
-    if customer_view:
-        df_all = pricing_engine.collapse_postpaid_detail_rows(df_all)
-        out_path = _write_detail_xlsx_customer(
-            df_all, year_month, output_dir, user_id=user_id,
-            channel_id=channel_id, channel_ids=channel_ids,
-            flat_tier=flat_tier,
-            start_day=start_time or start_day,
-            end_day=end_time or end_day,
-            tier_suffix=tier_suffix, from_suffix=from_suffix, day_suffix=day_suffix)
+    if stream is not None:
+        out_path = _finish_detail_stream(stream, digests)
     else:
-        out_path = _write_detail_csv_internal(
-            df_all, year_month, output_dir,
-            suffix=suffix, ch_suffix=ch_suffix, tier_suffix=tier_suffix,
-            from_suffix=from_suffix, day_suffix=day_suffix)
+        df_all = pd.concat(all_chunks, ignore_index=True) if all_chunks else pd.DataFrame()
+        df_all = pricing_engine.dedupe_usage_log_rows(df_all)
+
+        if customer_view:
+            df_all = pricing_engine.collapse_postpaid_detail_rows(df_all)
+            out_path = _write_detail_xlsx_customer(
+                df_all, year_month, output_dir, user_id=user_id,
+                channel_id=channel_id, channel_ids=channel_ids,
+                flat_tier=flat_tier,
+                start_day=start_time or start_day,
+                end_day=end_time or end_day,
+                tier_suffix=tier_suffix, from_suffix=from_suffix, day_suffix=day_suffix)
+        else:
+            out_path = _write_detail_csv_internal(
+                df_all, year_month, output_dir,
+                suffix=suffix, ch_suffix=ch_suffix, tier_suffix=tier_suffix,
+                from_suffix=from_suffix, day_suffix=day_suffix)
 
     size_mb = os.path.getsize(out_path) / 1024 / 1024
     logger.info("Detail export completed",
@@ -1042,7 +1089,8 @@ def _write_detail_csv_internal(df: pd.DataFrame, year_month: str,
     Uses xlsx when row count <= DETAIL_XLSX_ROW_LIMIT (500K); falls back to
     zip-compressed CSV for larger datasets where xlsx would be impractically slow.
     """
-    base = f"bill_{year_month}{suffix}{ch_suffix}{tier_suffix}{from_suffix}{day_suffix}_detail"
+    base = _internal_detail_base(year_month, suffix, ch_suffix, tier_suffix,
+                                 from_suffix, day_suffix)
 
     if df.empty or len(df) <= DETAIL_XLSX_ROW_LIMIT:
         return _write_detail_xlsx_internal(df, base, output_dir, year_month,
@@ -1068,22 +1116,12 @@ def _write_detail_xlsx_internal(df: pd.DataFrame, base: str, output_dir: str,
         wb.close()
         return xlsx_path
 
-    df = df.copy()
-    if "created_at" in df.columns:
-        df["created_at"] = (
-            pd.to_datetime(df["created_at"], unit="s", utc=True)
-            .dt.tz_convert("Asia/Shanghai")
-            .dt.strftime("%Y-%m-%d %H:%M:%S")
-        )
-
-    col_spec = [(ic, hdr, w, nf) for ic, hdr, w, nf in _INTERNAL_DETAIL_COLS
-                if ic in df.columns and ic not in _HIDDEN_IMAGE_TOKEN_COLS]
-    internal_cols = [c[0] for c in col_spec]
+    col_spec = _internal_detail_col_spec(df)
     headers    = [c[1] for c in col_spec]
     col_widths = [c[2] for c in col_spec]
     num_fmts   = [c[3] for c in col_spec]
 
-    df_out = df[internal_cols].fillna("")
+    df_out = _internal_detail_xlsx_frame(df, col_spec)
     data_rows = df_out.values.tolist()
     title = f"API Detail -- {year_month}{tier_suffix}{from_suffix}{day_suffix}"
 
@@ -1093,6 +1131,385 @@ def _write_detail_xlsx_internal(df: pd.DataFrame, base: str, output_dir: str,
     return xlsx_path
 
 
+def _internal_detail_base(year_month: str, suffix: str = "", ch_suffix: str = "",
+                          tier_suffix: str = "", from_suffix: str = "",
+                          day_suffix: str = "") -> str:
+    return f"bill_{year_month}{suffix}{ch_suffix}{tier_suffix}{from_suffix}{day_suffix}_detail"
+
+
+def _internal_detail_col_spec(df: pd.DataFrame) -> list[tuple]:
+    return [(ic, hdr, w, nf) for ic, hdr, w, nf in _INTERNAL_DETAIL_COLS
+            if ic in df.columns and ic not in _HIDDEN_IMAGE_TOKEN_COLS]
+
+
+def _internal_detail_xlsx_frame(df: pd.DataFrame, col_spec: list[tuple]) -> pd.DataFrame:
+    """Project detail rows to the internal xlsx columns (UTC+8 time, blanks for NaN)."""
+    df_out = df[[c[0] for c in col_spec]].copy()
+    if "created_at" in df_out.columns:
+        df_out["created_at"] = (
+            pd.to_datetime(df_out["created_at"], unit="s", utc=True)
+            .dt.tz_convert("Asia/Shanghai")
+            .dt.strftime("%Y-%m-%d %H:%M:%S")
+        )
+    return df_out.fillna("")
+
+
+# Set DETAIL_EXPORT_STREAMING=0 to fall back to the concat-then-write path.
+DETAIL_EXPORT_STREAMING = os.getenv("DETAIL_EXPORT_STREAMING", "1") != "0"
+
+
+class _UsageLogDigestSet:
+    """Cross-day duplicate filter over 128-bit digests of USAGE_LOG_DEDUPE_KEYS.
+
+    Remembers 16 bytes per kept row (two uint64 arrays sorted by the high
+    half) instead of the rows themselves, so a month can be deduped without
+    holding the month. Numeric key columns are hashed as float64 so a day
+    whose column came back as int64 matches a day where NaNs made it float64
+    (as pd.concat would).
+    """
+
+    _HASH_KEY_HI = "usagelogdedup-hi"
+
+    def __init__(self):
+        self._hi = np.empty(0, dtype=np.uint64)
+        self._lo = np.empty(0, dtype=np.uint64)
+        self.removed = 0
+
+    @classmethod
+    def _digests(cls, df: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        cols = {}
+        for k in keys:
+            col = df[k]
+            if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+                col = col.astype("float64")
+            cols[k] = col
+        frame = pd.DataFrame(cols)
+        hi = pd.util.hash_pandas_object(frame, index=False, hash_key=cls._HASH_KEY_HI).to_numpy()
+        lo = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        return hi, lo
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Drop rows already seen on an earlier day; remember the rest.
+
+        Expects df to be deduped within itself (dedupe_usage_log_rows).
+        """
+        keys = [c for c in pricing_engine.USAGE_LOG_DEDUPE_KEYS if c in df.columns]
+        if df.empty or not keys:
+            return df
+
+        hi, lo = self._digests(df, keys)
+        if len(self._hi):
+            # Only the first entry of an equal-hi run is compared; a second
+            # digest sharing 64 bits with a different row is astronomically
+            # unlikely and would at worst keep a duplicate, never drop a row.
+            pos = np.minimum(np.searchsorted(self._hi, hi), len(self._hi) - 1)
+            seen = (self._hi[pos] == hi) & (self._lo[pos] == lo)
+            if seen.any():
+                self.removed += int(seen.sum())
+                df = df[~seen]
+                hi, lo = hi[~seen], lo[~seen]
+
+        order = np.argsort(hi, kind="stable")
+        hi, lo = hi[order], lo[order]
+        at = np.searchsorted(self._hi, hi)
+        self._hi = np.insert(self._hi, at, hi)
+        self._lo = np.insert(self._lo, at, lo)
+        return df
+
+
+class _DetailStreamWriter:
+    """Write internal detail one day-frame at a time.
+
+    Each frame is appended to a csv.zip entry as it arrives. While the running
+    row count stays within DETAIL_XLSX_ROW_LIMIT the xlsx projection of each
+    frame is kept too, so small exports still come out as the formatted xlsx
+    (written with constant_memory); past the limit that buffer is dropped and
+    the csv.zip is the result. This is the same format choice
+    _write_detail_csv_internal makes, with memory bounded by one day plus at
+    most DETAIL_XLSX_ROW_LIMIT projected rows.
+    """
+
+    def __init__(self, base: str, output_dir: str, title: str):
+        self.zip_path = os.path.join(output_dir, base + ".csv.zip")
+        self.xlsx_path = os.path.join(output_dir, base + ".xlsx")
+        self.title = title
+        self.rows = 0
+        self.columns: list[str] | None = None
+        self._col_spec: list[tuple] | None = None
+        self._xlsx_chunks: list[pd.DataFrame] | None = []
+        self._zf = zipfile.ZipFile(self.zip_path, "w", compression=zipfile.ZIP_DEFLATED,
+                                   compresslevel=6)
+        self._text = io.TextIOWrapper(
+            self._zf.open(base + ".csv", "w", force_zip64=True),
+            encoding="utf-8", newline="")
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        header = self.columns is None
+        if header:
+            self.columns = [c for c in df.columns if c not in _HIDDEN_IMAGE_TOKEN_COLS]
+            self._col_spec = _internal_detail_col_spec(df)
+        df.reindex(columns=self.columns).to_csv(
+            self._text, index=False, header=header, lineterminator="\n")
+        self.rows += len(df)
+
+        if self._xlsx_chunks is not None:
+            if self.rows > DETAIL_XLSX_ROW_LIMIT:
+                self._xlsx_chunks = None
+            else:
+                self._xlsx_chunks.append(_internal_detail_xlsx_frame(
+                    df.reindex(columns=[c[0] for c in self._col_spec]), self._col_spec))
+
+    def _close_zip(self):
+        if self._zf is not None:
+            self._text.close()
+            self._zf.close()
+            self._zf = None
+
+    def close(self) -> str:
+        """Finish the output and return its path."""
+        self._close_zip()
+        if self._xlsx_chunks is None:
+            logger.info(
+                "Detail row count exceeds xlsx limit, using csv.zip",
+                extra={"event": "detail_format_fallback",
+                       "rows": self.rows, "limit": DETAIL_XLSX_ROW_LIMIT})
+            return self.zip_path
+
+        os.remove(self.zip_path)
+        if self.rows == 0:
+            wb = xlsxwriter.Workbook(self.xlsx_path)
+            ws = wb.add_worksheet("No Data")
+            ws.write(0, 0, "No data found for the specified period.")
+            wb.close()
+            return self.xlsx_path
+
+        # rows <= DETAIL_XLSX_ROW_LIMIT <= EXCEL_MAX_DATA_ROWS: always one sheet
+        wb = xlsxwriter.Workbook(self.xlsx_path, {"constant_memory": True})
+        ws, get_fmt = _begin_sheet(wb, self.title, "Detail",
+                                   [c[1] for c in self._col_spec],
+                                   [c[2] for c in self._col_spec])
+        num_fmts = [c[3] for c in self._col_spec]
+        ri = 0
+        while self._xlsx_chunks:
+            chunk = self._xlsx_chunks.pop(0)
+            ri = _write_sheet_rows(ws, get_fmt, chunk.values.tolist(), num_fmts, start=ri)
+        wb.close()
+        return self.xlsx_path
+
+    def abort(self):
+        """Close and delete the partial output after a failure."""
+        try:
+            self._close_zip()
+        finally:
+            for path in (self.zip_path, self.xlsx_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+# ---------------------------------------------------------------------------
+# Parquet detail format (internal view)
+# ---------------------------------------------------------------------------
+
+DETAIL_FORMATS = ("auto", "parquet")
+DETAIL_PARQUET_SCHEMA_VERSION = "1"
+
+# Arrow type per _INTERNAL_DETAIL_COLS column. created_at stays unix seconds,
+# same as the CSV; "dict" columns become dictionary<int32, string> and read
+# back as pandas categoricals.
+_DETAIL_PARQUET_TYPES = {
+    "request_id": "string",
+    "created_at": "int64",
+    "user_id": "int64",
+    "username": "dict",
+    "channel_id": "int64",
+    "model_name": "dict",
+    "token_name": "dict",
+    "prompt_tokens": "int64",
+    "completion_tokens": "int64",
+    "cache_hit_tokens": "int64",
+    "cache_write_tokens": "int64",
+    "cw_5m": "int64",
+    "cw_1h": "int64",
+    "cw_remaining": "int64",
+    "quota": "int64",
+    "billed_usd": "float64",
+    "expected_usd": "float64",
+    "list_price_usd": "float64",
+    "cost_discount": "float64",
+    "cost_usd": "float64",
+    "revenue_discount": "float64",
+    "revenue_usd": "float64",
+    "profit_usd": "float64",
+    "use_time_seconds": "int64",
+    "is_stream": "bool",
+    "tiered_ip": "float64",
+    "tiered_op": "float64",
+}
+
+# Parquet dictionary pages for the low-cardinality model/user/channel columns
+_DETAIL_PARQUET_DICT_COLS = ["user_id", "username", "channel_id", "model_name", "token_name"]
+
+
+def detail_parquet_schema():
+    """Fixed Arrow schema of Parquet detail exports, in _INTERNAL_DETAIL_COLS order."""
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(),
+             "bool": pa.bool_(), "dict": pa.dictionary(pa.int32(), pa.string())}
+    fields = [pa.field(ic, types[_DETAIL_PARQUET_TYPES[ic]])
+              for ic, _hdr, _w, _nf in _INTERNAL_DETAIL_COLS
+              if ic not in _HIDDEN_IMAGE_TOKEN_COLS]
+    return pa.schema(fields, metadata={
+        "detail_schema_version": DETAIL_PARQUET_SCHEMA_VERSION,
+        "created_at_unit": "unix_seconds",
+    })
+
+
+def _detail_arrow_column(col: pd.Series | None, typ, rows: int):
+    import pyarrow as pa
+
+    if col is None:
+        return pa.nulls(rows, typ)
+    if pa.types.is_dictionary(typ) or pa.types.is_string(typ):
+        values = pa.array(col.where(col.isna(), col.astype(str)), type=pa.string(),
+                          from_pandas=True)
+        return values.dictionary_encode() if pa.types.is_dictionary(typ) else values
+    if pa.types.is_boolean(typ):
+        if not pd.api.types.is_bool_dtype(col):
+            col = col.where(col.isna(), col.astype(str).str.lower().isin(("true", "1", "1.0")))
+        return pa.array(col, type=pa.bool_(), from_pandas=True)
+    values = pa.array(pd.to_numeric(col, errors="coerce"), from_pandas=True)
+    return values.cast(typ, safe=False)
+
+
+def _detail_arrow_table(df: pd.DataFrame, schema):
+    """Project a detail frame onto the fixed schema; absent columns are all-null."""
+    import pyarrow as pa
+
+    return pa.Table.from_arrays(
+        [_detail_arrow_column(df[f.name] if f.name in df.columns else None, f.type, len(df))
+         for f in schema],
+        schema=schema)
+
+
+class _DetailParquetWriter:
+    """Write internal detail as zstd Parquet, one row group per day-frame.
+
+    Same write/close/abort interface as _DetailStreamWriter. Row groups never
+    span two days, so readers can skip whole days via created_at statistics.
+    """
+
+    def __init__(self, base: str, output_dir: str):
+        import pyarrow.parquet as pq
+
+        self.path = os.path.join(output_dir, base + ".parquet")
+        self.schema = detail_parquet_schema()
+        self.rows = 0
+        self._writer = pq.ParquetWriter(
+            self.path, self.schema, compression="zstd",
+            use_dictionary=_DETAIL_PARQUET_DICT_COLS, write_statistics=True)
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        self._writer.write_table(_detail_arrow_table(df, self.schema), row_group_size=len(df))
+        self.rows += len(df)
+
+    def close(self) -> str:
+        """Finish the output and return its path."""
+        self._writer.close()
+        return self.path
+
+    def abort(self):
+        """Close and delete the partial output after a failure."""
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def iter_detail_parquet(path: str, columns: list[str] = None,
+                        start_ts: int = None, end_ts: int = None):
+    """Yield a Parquet detail export one row group (one day) at a time.
+
+    columns: project to these columns only (default: all).
+    start_ts / end_ts: unix-second window [start_ts, end_ts); row groups
+    outside it are skipped using created_at statistics without being read.
+    """
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    ts_idx = names.index("created_at")
+    bounded = start_ts is not None or end_ts is not None
+    read_cols = list(columns) if columns is not None else names
+    if bounded and "created_at" not in read_cols:
+        read_cols = read_cols + ["created_at"]
+
+    for rg in range(pf.num_row_groups):
+        stats = pf.metadata.row_group(rg).column(ts_idx).statistics
+        if bounded and stats is not None and stats.has_min_max:
+            if start_ts is not None and stats.max < start_ts:
+                continue
+            if end_ts is not None and stats.min >= end_ts:
+                continue
+        df = pf.read_row_group(rg, columns=read_cols).to_pandas()
+        if bounded:
+            keep = pd.Series(True, index=df.index)
+            if start_ts is not None:
+                keep &= df["created_at"] >= start_ts
+            if end_ts is not None:
+                keep &= df["created_at"] < end_ts
+            df = df[keep]
+            if columns is not None and "created_at" not in columns:
+                df = df.drop(columns=["created_at"])
+        yield df
+
+
+def read_detail_parquet(path: str, columns: list[str] = None,
+                        start_ts: int = None, end_ts: int = None) -> pd.DataFrame:
+    """Load a Parquet detail export (see iter_detail_parquet for arguments)."""
+    import pyarrow.parquet as pq
+
+    chunks = [df for df in iter_detail_parquet(path, columns, start_ts, end_ts) if not df.empty]
+    if chunks:
+        return pd.concat(chunks, ignore_index=True)
+    schema = pq.read_schema(path)
+    empty = schema.empty_table()
+    return empty.select(list(columns) if columns is not None else schema.names).to_pandas()
+
+
+def _start_detail_stream(customer_view: bool, output_dir: str, base: str, title: str,
+                         detail_format: str = "auto"):
+    """Return (writer, digest set) for a streaming internal export, else (None, None).
+
+    Customer view stays on the in-memory path: collapse_postpaid_detail_rows
+    merges rows sharing a request_id across days and the per-day aggregate
+    sheet needs every row. detail_format="parquet" only affects the internal
+    view and always streams.
+    """
+    if detail_format not in DETAIL_FORMATS:
+        raise ValueError(f"unsupported detail_format: {detail_format}")
+    if customer_view:
+        return None, None
+    if detail_format == "parquet":
+        return _DetailParquetWriter(base, output_dir), _UsageLogDigestSet()
+    if not DETAIL_EXPORT_STREAMING:
+        return None, None
+    return _DetailStreamWriter(base, output_dir, title), _UsageLogDigestSet()
+
+
+def _finish_detail_stream(stream, digests: _UsageLogDigestSet) -> str:
+    if digests.removed:
+        logger.warning(
+            "Dropped duplicate usage log rows across days",
+            extra={"event": "usage_log_dedup", "removed_rows": digests.removed})
+    return stream.close()
+
+
 def _write_detail_csv_zip(df: pd.DataFrame, base: str, output_dir: str) -> str:
     """Write internal detail as zip-compressed CSV (fallback for large datasets)."""
     import io as _io
@@ -1462,10 +1879,17 @@ def generate_daily_report(date: str, output_dir: str,
     year_month = f"{parts[0]}-{parts[1]}"
     day = parts[2]
 
-    df_models = run_query_cached(queries.model_ranking(year_month), no_cache=no_cache)
-    df_users = run_query_cached(queries.monthly_bill_by_user(year_month), no_cache=no_cache)
     df_hourly = run_query_cached(queries.hourly_distribution(year_month, day), no_cache=no_cache)
-    df_kpi = run_query_cached(queries.kpi_summary(year_month), no_cache=no_cache)
+    # Month-to-date sections: stored days + a scan of the still-open ones
+    if usage_cube.serves():
+        cube = usage_cube.load_month(year_month, no_cache=no_cache)
+        df_models = usage_cube.model_ranking(cube)
+        df_users = usage_cube.bill_by_user(cube)
+        df_kpi = usage_cube.kpi_summary(cube)
+    else:
+        df_models = run_query_cached(queries.model_ranking(year_month), no_cache=no_cache)
+        df_users = run_query_cached(queries.monthly_bill_by_user(year_month), no_cache=no_cache)
+        df_kpi = run_query_cached(queries.kpi_summary(year_month), no_cache=no_cache)
 
     wb = xlsxwriter.Workbook(filepath)
 
@@ -1798,7 +2222,8 @@ def generate_tz_offset_export(year_month: str, output_dir: str,
                               detail: bool = False,
                               customer_view: bool = False,
                               upload_s3: bool = False,
-                              no_cache: bool = False) -> str | list[str] | dict:
+                              no_cache: bool = False,
+                              detail_format: str = "auto") -> str | list[str] | dict:
     """Generate monthly bill with dates re-partitioned by timezone offset.
 
     Unlike generate_monthly_bill which uses UTC partition boundaries,
@@ -2113,7 +2538,8 @@ def generate_tz_offset_export(year_month: str, output_dir: str,
             channel_ids=channel_ids,
             flat_tier=flat_tier,
             flat_tier_since=flat_tier_since,
-            customer_view=customer_view)
+            customer_view=customer_view,
+            detail_format=detail_format)
 
     if upload_s3:
         return _upload_results(filepath, detail_path)
@@ -2131,7 +2557,8 @@ def _export_detail_csv_tz(year_month: str, output_dir: str,
                           model: str = None,
                           flat_tier: bool = False,
                           flat_tier_since: str = None,
-                          customer_view: bool = False) -> str:
+                          customer_view: bool = False,
+                          detail_format: str = "auto") -> str:
     """Export row-level detail with dates partitioned by timezone offset."""
     tz_label = f"utc{float(tz_offset_hours):+g}"
     suffix = f"_user{user_id}" if user_id else ""
@@ -2156,28 +2583,41 @@ def _export_detail_csv_tz(year_month: str, output_dir: str,
     total_rows = 0
     days_done = 0
     all_chunks: list[pd.DataFrame] = []
+    stream, digests = _start_detail_stream(
+        customer_view, output_dir,
+        _internal_detail_base(year_month, suffix, ch_suffix, tier_suffix, f"_{tz_label}"),
+        f"API Detail -- {year_month}{tier_suffix}_{tz_label}",
+        detail_format)
+
+    try:
+        for idx, df_day in run_queries_parallel_iter(sqls):
+            days_done += 1
+            if df_day.empty:
+                continue
 
-    for idx, df_day in run_queries_parallel_iter(sqls):
-        days_done += 1
-        if df_day.empty:
-            continue
-
-        df_day = _apply_detail_pricing(df_day, flat_tier=flat_tier,
-                                       flat_tier_since=flat_tier_since)
-        total_rows += len(df_day)
-        all_chunks.append(df_day)
-
-        elapsed = time.time() - t0
-        logger.debug("Day query completed (timezone)",
-                     extra={
-                         "event": "detail_tz_day",
-                         "local_date": local_dates[idx],
-                         "rows": len(df_day),
-                         "days_done": days_done,
-                         "total_days": len(sqls),
-                         "total_rows": total_rows,
-                         "elapsed_s": elapsed,
-                     })
+            df_day = _apply_detail_pricing(df_day, flat_tier=flat_tier,
+                                           flat_tier_since=flat_tier_since)
+            total_rows += len(df_day)
+            if stream is not None:
+                stream.write(digests.filter(pricing_engine.dedupe_usage_log_rows(df_day)))
+            else:
+                all_chunks.append(df_day)
+
+            elapsed = time.time() - t0
+            logger.debug("Day query completed (timezone)",
+                         extra={
+                             "event": "detail_tz_day",
+                             "local_date": local_dates[idx],
+                             "rows": len(df_day),
+                             "days_done": days_done,
+                             "total_days": len(sqls),
+                             "total_rows": total_rows,
+                             "elapsed_s": elapsed,
+                         })
+    except BaseException:
+        if stream is not None:
+            stream.abort()
+        raise
 
     elapsed = time.time() - t0
 
@@ -2185,22 +2625,25 @@ def _export_detail_csv_tz(year_month: str, output_dir: str,
         logger.warning("No detail data found (timezone)", extra={"event": "detail_tz_no_data"})
         all_chunks = [pd.DataFrame()]
 
-    df_all = pd.concat(all_chunks, ignore_index=True) if all_chunks else pd.DataFrame()
-    df_all = pricing_engine.dedupe_usage_log_rows(df_all)
-
-    if customer_view:
-        df_all = pricing_engine.collapse_postpaid_detail_rows(df_all)
-        out_path = _write_detail_xlsx_customer(
-            df_all, year_month, output_dir, user_id=user_id,
-            channel_id=channel_id, channel_ids=channel_ids,
-            flat_tier=flat_tier,
-            tier_suffix=tier_suffix, from_suffix=f"_{tz_label}",
-            day_suffix=cv_suffix)
+    if stream is not None:
+        out_path = _finish_detail_stream(stream, digests)
     else:
-        out_path = _write_detail_csv_internal(
-            df_all, year_month, output_dir,
-            suffix=suffix, ch_suffix=ch_suffix, tier_suffix=tier_suffix,
-            from_suffix=f"_{tz_label}", day_suffix="")
+        df_all = pd.concat(all_chunks, ignore_index=True) if all_chunks else pd.DataFrame()
+        df_all = pricing_engine.dedupe_usage_log_rows(df_all)
+
+        if customer_view:
+            df_all = pricing_engine.collapse_postpaid_detail_rows(df_all)
+            out_path = _write_detail_xlsx_customer(
+                df_all, year_month, output_dir, user_id=user_id,
+                channel_id=channel_id, channel_ids=channel_ids,
+                flat_tier=flat_tier,
+                tier_suffix=tier_suffix, from_suffix=f"_{tz_label}",
+                day_suffix=cv_suffix)
+        else:
+            out_path = _write_detail_csv_internal(
+                df_all, year_month, output_dir,
+                suffix=suffix, ch_suffix=ch_suffix, tier_suffix=tier_suffix,
+                from_suffix=f"_{tz_label}", day_suffix="")
 
     size_mb = os.path.getsize(out_path) / 1024 / 1024
     logger.info("Detail export completed (timezone)",
@@ -42,6 +42,7 @@ SQL_FILES = [
     ("02_create_usage_logs_table.sql", "创建 usage_logs 表"),
     ("03_create_raw_logs_table.sql",   "创建 raw_logs 表"),
     ("04_create_error_logs_table.sql", "创建 error_logs 表"),
+    ("07_create_usage_logs_compact_table.sql", "创建 usage_logs_compact 表"),
 ]
 
 
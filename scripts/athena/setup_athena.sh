@@ -67,6 +67,7 @@ run_query "01_create_database.sql"          "创建数据库 ezmodel_logs"
 run_query "02_create_usage_logs_table.sql"   "创建 usage_logs 表"
 run_query "03_create_raw_logs_table.sql"     "创建 raw_logs 表"
 run_query "04_create_error_logs_table.sql"   "创建 error_logs 表"
+run_query "07_create_usage_logs_compact_table.sql" "创建 usage_logs_compact 表"
 
 echo "============================================"
 echo "  全部完成！"
@@ -0,0 +1,263 @@
+"""
+MySQL 备份（.sql / .sql.gz）流式读取器
+
+按固定大小的缓冲区解压读取 mysqldump 输出，只定位目标表的
+``INSERT INTO `logs` VALUES`` 语句，用预编译的字节正则拆分元组。
+channel_id / created_at / type / id 过滤在字符串反转义之前完成，
+只有命中的行才会解码为 Python 值。
+
+同时供 export_db_bill（刊例价账单）和 scripts/import_sql_to_sqlite.py
+（SQLite 导入）使用:
+
+    for rows in iter_log_row_batches(path, min_id=max_id):      # list[tuple]
+        conn.executemany(...)
+    for frame in iter_log_frames(path, channel_id=38, types=(2, 6)):  # DataFrame
+        ...
+
+前提（与 mysqldump 的输出一致）: 字符串内的换行总是被转义为 ``\\n``，
+因此一个元组不会跨行，``;`` + 换行只出现在语句末尾。
+"""
+
+import gzip
+import re
+
+import pandas as pd
+
+LOGS_COLUMNS = [
+    "id", "user_id", "created_at", "type", "content", "username",
+    "token_name", "model_name", "quota", "prompt_tokens",
+    "completion_tokens", "use_time", "is_stream", "channel_id",
+    "token_id", "group", "ip", "other", "request_id",
+]
+
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_BATCH_ROWS = 50_000
+
+# A single SQL value: quoted string (backslash or doubled-quote escapes), or a
+# bare token (number / NULL). Possessive quantifiers keep the scan linear.
+_FIELD = rb"(?:'(?:[^'\\]++|\\.|'')*+'|[^,'()]*+)"
+_TUPLE_RE = re.compile(rb"\((" + _FIELD + rb"(?:," + _FIELD + rb")*+)\)", re.S)
+_FIELD_RE = re.compile(rb"(" + _FIELD + rb"),", re.S)
+_STMT_END_RE = re.compile(rb";[ \t]*\r?\n")
+_UNLOCK_RE = re.compile(rb"^UNLOCK TABLES;", re.M)
+_UNESCAPE_RE = re.compile(rb"\\(.)|''", re.S)
+_UNESCAPES = {
+    b"0": b"\0", b"b": b"\b", b"n": b"\n", b"r": b"\r", b"t": b"\t", b"Z": b"\x1a",
+}
+
+
+def _insert_header_re(table: str):
+    return re.compile(
+        rb"^INSERT INTO `" + re.escape(table.encode()) + rb"`(?: \([^)]*\))? VALUES[ \t]*",
+        re.M)
+
+
+def _open_dump(path: str):
+    return gzip.open(path, "rb") if str(path).endswith(".gz") else open(path, "rb")
+
+
+def iter_insert_segments(path: str, table: str = "logs",
+                         chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                         stats: dict = None):
+    """Yield raw VALUES byte segments of ``INSERT INTO `table``` statements.
+
+    The dump is read ``chunk_bytes`` at a time and cut at the last newline, so
+    every segment holds whole tuples. Reading stops at the ``UNLOCK TABLES``
+    that closes the table's section. ``stats`` (optional) receives
+    ``bytes_read`` and ``statements``.
+    """
+    header_re = _insert_header_re(table)
+    if stats is not None:
+        stats.setdefault("bytes_read", 0)
+        stats.setdefault("statements", 0)
+
+    in_insert = False
+    seen_table = False
+    carry = b""
+    with _open_dump(path) as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if stats is not None:
+                stats["bytes_read"] += len(chunk)
+            if chunk:
+                data = carry + chunk
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = data
+                    continue
+                buf, carry = data[:cut], data[cut:]
+            else:
+                buf, carry = carry, b""
+                if not buf:
+                    return
+
+            pos = 0
+            n = len(buf)
+            while pos < n:
+                if in_insert:
+                    end = _STMT_END_RE.search(buf, pos)
+                    stop = end.start() if end else n
+                    if stop > pos:
+                        yield buf[pos:stop]
+                    if not end:
+                        break
+                    in_insert = False
+                    pos = end.end()
+                    continue
+                header = header_re.search(buf, pos)
+                if seen_table and _UNLOCK_RE.search(buf, pos, header.start() if header else n):
+                    return
+                if header is None:
+                    break
+                in_insert = seen_table = True
+                if stats is not None:
+                    stats["statements"] += 1
+                pos = header.end()
+
+            if not chunk:
+                return
+
+
+def _unescape_sub(m) -> bytes:
+    ch = m.group(1)
+    if ch is None:
+        return b"'"
+    return _UNESCAPES.get(ch, ch)
+
+
+def decode_value(token: bytes):
+    """Convert one raw SQL value to ``None`` / ``int`` / ``float`` / ``str``."""
+    if token[:1] == b"'":
+        body = token[1:-1]
+        if b"\\" in body or b"''" in body:
+            body = _UNESCAPE_RE.sub(_unescape_sub, body)
+        return body.decode("utf-8", errors="replace")
+    token = token.strip()
+    if token == b"NULL" or not token:
+        return None
+    try:
+        return int(token)
+    except ValueError:
+        try:
+            return float(token)
+        except ValueError:
+            return token.decode("utf-8", errors="replace")
+
+
+def _int_field(token: bytes):
+    try:
+        return int(token)
+    except ValueError:
+        return None
+
+
+def parse_values_segment(segment: bytes, columns=LOGS_COLUMNS, channel_id=None,
+                         types=None, start_ts=None, end_ts=None, min_id=None,
+                         stats: dict = None) -> list:
+    """Split one VALUES segment into decoded row tuples.
+
+    Filters run on the raw tokens before any string is unescaped:
+    ``channel_id`` (int or iterable), ``types`` (iterable),
+    ``start_ts <= created_at < end_ts`` and ``id > min_id``. Tuples whose
+    field count differs from ``columns`` are counted as ``malformed``.
+    """
+    ncols = len(columns)
+    col_pos = {c: i for i, c in enumerate(columns)}
+    if channel_id is not None:
+        channels = {int(channel_id)} if isinstance(channel_id, int) else {int(c) for c in channel_id}
+        # Cheap substring pre-check; a channel never sits in the first or last column
+        needle = re.compile(b",(?:" + b"|".join(b"%d" % c for c in channels) + b"),").search
+    else:
+        channels = needle = None
+    type_set = {int(t) for t in types} if types is not None else None
+    ch_i = col_pos.get("channel_id")
+    ts_i = col_pos.get("created_at")
+    type_i = col_pos.get("type")
+    id_i = col_pos.get("id")
+
+    rows = []
+    tuples = malformed = filtered = 0
+    for m in _TUPLE_RE.finditer(segment):
+        tuples += 1
+        body = m.group(1)
+        if needle is not None and needle(body) is None:
+            filtered += 1
+            continue
+        fields = _FIELD_RE.findall(body + b",")
+        if len(fields) != ncols:
+            malformed += 1
+            continue
+        if channels is not None and _int_field(fields[ch_i]) not in channels:
+            filtered += 1
+            continue
+        if type_set is not None and _int_field(fields[type_i]) not in type_set:
+            filtered += 1
+            continue
+        if start_ts is not None or end_ts is not None:
+            ts = _int_field(fields[ts_i])
+            if ts is None or (start_ts is not None and ts < start_ts) or (end_ts is not None and ts >= end_ts):
+                filtered += 1
+                continue
+        if min_id is not None:
+            row_id = _int_field(fields[id_i])
+            if row_id is not None and row_id <= min_id:
+                filtered += 1
+                continue
+        rows.append(tuple(decode_value(f) for f in fields))
+
+    if stats is not None:
+        stats["tuples"] = stats.get("tuples", 0) + tuples
+        stats["rows"] = stats.get("rows", 0) + len(rows)
+        stats["filtered"] = stats.get("filtered", 0) + filtered
+        stats["malformed"] = stats.get("malformed", 0) + malformed
+    return rows
+
+
+def parse_segment_job(segment: bytes, filters: dict):
+    """Process-pool entry point: ``(rows, stats)`` for one segment."""
+    stats = {}
+    rows = parse_values_segment(segment, stats=stats, **filters)
+    return rows, stats
+
+
+def iter_log_row_batches(path: str, table: str = "logs", columns=LOGS_COLUMNS,
+                         batch_rows: int = DEFAULT_BATCH_ROWS,
+                         chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                         stats: dict = None, **filters):
+    """Yield lists of up to ``batch_rows`` decoded row tuples (for executemany).
+
+    ``filters`` are passed to :func:`parse_values_segment`.
+    """
+    batch = []
+    for segment in iter_insert_segments(path, table=table, chunk_bytes=chunk_bytes, stats=stats):
+        batch.extend(parse_values_segment(segment, columns=columns, stats=stats, **filters))
+        while len(batch) >= batch_rows:
+            yield batch[:batch_rows]
+            batch = batch[batch_rows:]
+    if batch:
+        yield batch
+
+
+def rows_to_frame(rows: list, columns=LOGS_COLUMNS) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def iter_log_frames(path: str, table: str = "logs", columns=LOGS_COLUMNS,
+                    batch_rows: int = DEFAULT_BATCH_ROWS,
+                    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                    stats: dict = None, **filters):
+    """Same as :func:`iter_log_row_batches`, one DataFrame per batch."""
+    for rows in iter_log_row_batches(path, table=table, columns=columns, batch_rows=batch_rows,
+                                     chunk_bytes=chunk_bytes, stats=stats, **filters):
+        yield rows_to_frame(rows, columns)
+
+
+def read_logs_frame(path: str, table: str = "logs", columns=LOGS_COLUMNS,
+                    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                    stats: dict = None, **filters) -> pd.DataFrame:
+    """Read every matching row into one DataFrame (empty frame keeps ``columns``)."""
+    frames = list(iter_log_frames(path, table=table, columns=columns,
+                                  chunk_bytes=chunk_bytes, stats=stats, **filters))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
@@ -0,0 +1,250 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import athena_engine
+import cost_monitor
+
+
+class _FakeS3:
+    """Dict-backed stand-in for the S3 client calls used by the cache layer."""
+
+    def __init__(self):
+        self.objects = {}
+        self.gets = 0
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise KeyError(Key)
+        return {"LastModified": self.objects[Key][1]}
+
+    def get_object(self, Bucket, Key):
+        self.gets += 1
+        return {"Body": io.BytesIO(self.objects[Key][0])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[Key] = (Body, datetime.now(timezone.utc))
+
+
+class LocalCacheTierTest(unittest.TestCase):
+    SQL = "SELECT 1 AS x FROM usage_logs WHERE year = '2020' AND month = '01'"
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.s3 = _FakeS3()
+        self.athena_calls = 0
+
+        def fake_query(sql):
+            self.athena_calls += 1
+            return pd.DataFrame({"x": [1, 2, 3]})
+
+        self._patches = [
+            mock.patch.object(athena_engine, "LOCAL_CACHE_DIR", self.dir),
+            mock.patch.object(athena_engine, "LOCAL_CACHE_MAX_BYTES", 10 * 1024 * 1024),
+            mock.patch.object(athena_engine, "_get_s3", lambda: self.s3),
+            mock.patch.object(athena_engine, "run_query_df", fake_query),
+        ]
+        for p in self._patches:
+            p.start()
+        cost_monitor.reset_tracking()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        cost_monitor.reset_tracking()
+
+    def test_miss_populates_both_tiers_then_local_hit(self):
+        df = athena_engine.run_query_cached(self.SQL)
+        self.assertEqual(self.athena_calls, 1)
+        key = athena_engine._cache_key(self.SQL)
+        self.assertIn(key, self.s3.objects)
+        self.assertTrue(os.path.exists(athena_engine._local_cache_path(key)))
+
+        again = athena_engine.run_query_cached(self.SQL)
+        pd.testing.assert_frame_equal(df, again)
+        self.assertEqual(self.athena_calls, 1)
+        self.assertEqual(self.s3.gets, 0)
+
+        summary = cost_monitor.get_cost_summary()
+        self.assertEqual(summary["local_cache_hits"], 1)
+        self.assertEqual(summary["local_cache_misses"], 1)
+
+    def test_s3_hit_is_copied_locally_with_s3_mtime(self):
+        key = athena_engine._cache_key(self.SQL)
+        buf = io.BytesIO()
+        pd.DataFrame({"x": [7]}).to_parquet(buf, index=False)
+        modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.s3.objects[key] = (buf.getvalue(), modified)
+
+        df = athena_engine.run_query_cached(self.SQL)
+        self.assertEqual(df["x"].tolist(), [7])
+        self.assertEqual(self.athena_calls, 0)
+        path = athena_engine._local_cache_path(key)
+        self.assertEqual(os.stat(path).st_mtime, modified.timestamp())
+
+        athena_engine.run_query_cached(self.SQL)
+        self.assertEqual(self.s3.gets, 1)
+
+    def test_expired_local_entry_falls_through(self):
+        key = athena_engine._cache_key("q")
+        athena_engine._local_cache_write(key, b"stale", mtime=time.time() - 7200)
+        self.assertIsNone(athena_engine._local_cache_read(key, ttl=3600))
+
+    def test_lru_eviction_keeps_recently_read(self):
+        blobs = {}
+        for name in ("a", "b", "c"):
+            buf = io.BytesIO()
+            pd.DataFrame({"v": range(200)}).to_parquet(buf, index=False)
+            blobs[name] = buf.getvalue()
+        size = len(blobs["a"])
+
+        with mock.patch.object(athena_engine, "LOCAL_CACHE_MAX_BYTES", size * 2):
+            athena_engine._local_cache_write("p/a.parquet", blobs["a"])
+            athena_engine._local_cache_write("p/b.parquet", blobs["b"])
+            # Make "a" older than "b", then read it so it becomes most recent
+            os.utime(athena_engine._local_cache_path("p/a.parquet"), (1, 1))
+            os.utime(athena_engine._local_cache_path("p/b.parquet"), (2, 2))
+            self.assertIsNotNone(athena_engine._local_cache_read("p/a.parquet", None))
+            athena_engine._local_cache_write("p/c.parquet", blobs["c"])
+
+        remaining = sorted(os.listdir(self.dir))
+        self.assertEqual(remaining, ["a.parquet", "c.parquet"])
+
+    def test_disabled_when_cap_is_zero(self):
+        with mock.patch.object(athena_engine, "LOCAL_CACHE_MAX_BYTES", 0):
+            athena_engine.run_query_cached(self.SQL)
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class SingleFlightTest(unittest.TestCase):
+    SQL = "SELECT 1 AS x FROM usage_logs WHERE year = '2020' AND month = '02'"
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.s3 = _FakeS3()
+        self.athena_calls = 0
+        self.release = threading.Event()
+
+        def fake_query(sql):
+            self.athena_calls += 1
+            self.release.wait(5)
+            df = pd.DataFrame({"x": [1, 2, 3]})
+            df.attrs["scanned_bytes"] = 4096
+            return df
+
+        self._patches = [
+            mock.patch.object(athena_engine, "LOCAL_CACHE_DIR", self.dir),
+            mock.patch.object(athena_engine, "SINGLE_FLIGHT_LOCK_DIR", self.dir),
+            mock.patch.object(athena_engine, "_get_s3", lambda: self.s3),
+            mock.patch.object(athena_engine, "run_query_df", fake_query),
+        ]
+        for p in self._patches:
+            p.start()
+        cost_monitor.reset_tracking()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        cost_monitor.reset_tracking()
+
+    def _run_concurrently(self, n):
+        results = [None] * n
+
+        def worker(i):
+            results[i] = athena_engine.run_query_cached(self.SQL)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+        for t in threads:
+            t.start()
+        # Let every thread miss the cache and join the in-flight execution
+        deadline = time.monotonic() + 5
+        key = athena_engine._cache_key(self.SQL)
+        while time.monotonic() < deadline:
+            flight = athena_engine._inflight.get(key)
+            if flight is not None and flight.waiters == n - 1:
+                break
+            time.sleep(0.01)
+        self.release.set()
+        for t in threads:
+            t.join(5)
+        return results
+
+    def test_concurrent_threads_share_one_execution(self):
+        results = self._run_concurrently(4)
+        self.assertEqual(self.athena_calls, 1)
+        for df in results:
+            self.assertEqual(df["x"].tolist(), [1, 2, 3])
+        self.assertEqual(len({id(df) for df in results}), 4)
+
+        summary = cost_monitor.get_cost_summary()
+        self.assertEqual(summary["coalesced_queries"], 3)
+        self.assertEqual(summary["avoided_scanned_bytes"], 3 * 4096)
+        self.assertEqual(athena_engine._inflight, {})
+
+    def test_followers_see_leader_error(self):
+        def failing(sql):
+            self.athena_calls += 1
+            self.release.wait(5)
+            raise RuntimeError("Athena query FAILED: boom")
+
+        with mock.patch.object(athena_engine, "run_query_df", failing):
+            errors = []
+
+            def worker():
+                try:
+                    athena_engine.run_query_cached(self.SQL)
+                except RuntimeError as e:
+                    errors.append(str(e))
+
+            threads = [threading.Thread(target=worker) for _ in range(3)]
+            for t in threads:
+                t.start()
+            time.sleep(0.2)
+            self.release.set()
+            for t in threads:
+                t.join(5)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(athena_engine._inflight, {})
+
+    def test_waiter_on_process_lock_reads_cache(self):
+        key = athena_engine._cache_key(self.SQL)
+        other = threading.Event()
+
+        def other_process():
+            # A second open file description conflicts like another process would
+            with athena_engine._process_lock(key) as waited:
+                self.assertFalse(waited)
+                other.set()
+                time.sleep(0.3)
+                df = pd.DataFrame({"x": [9]})
+                df.attrs["scanned_bytes"] = 1024
+                athena_engine._cache_write(key, df)
+
+        t = threading.Thread(target=other_process)
+        t.start()
+        other.wait(5)
+        self.release.set()
+        df = athena_engine._execute_and_cache(self.SQL, key, None, "q")
+        t.join(5)
+
+        self.assertEqual(df["x"].tolist(), [9])
+        self.assertEqual(self.athena_calls, 0)
+        self.assertEqual(cost_monitor.get_cost_summary()["avoided_scanned_bytes"], 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
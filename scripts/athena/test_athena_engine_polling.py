@@ -0,0 +1,112 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import athena_engine
+
+
+class _FakeAthena:
+    """Athena client whose executions finish after a scripted number of polls."""
+
+    def __init__(self, polls_until_done: dict[str, int], failed=()):
+        self.remaining = dict(polls_until_done)
+        self.failed = set(failed)
+        self.single_calls = 0
+        self.batch_calls = []
+
+    def _execution(self, exec_id):
+        left = self.remaining[exec_id]
+        self.remaining[exec_id] = left - 1
+        if left > 1:
+            state = "RUNNING"
+        else:
+            state = "FAILED" if exec_id in self.failed else "SUCCEEDED"
+        return {
+            "QueryExecutionId": exec_id,
+            "Status": {"State": state, "StateChangeReason": "boom"},
+            "Statistics": {"DataScannedInBytes": 1000, "QueryQueueTimeInMillis": 40,
+                           "EngineExecutionTimeInMillis": 900},
+            "ResultConfiguration": {"OutputLocation": f"s3://bucket/{exec_id}.csv"},
+        }
+
+    def start_query_execution(self, QueryString, **kwargs):
+        return {"QueryExecutionId": QueryString}
+
+    def get_query_execution(self, QueryExecutionId):
+        self.single_calls += 1
+        return {"QueryExecution": self._execution(QueryExecutionId)}
+
+    def batch_get_query_execution(self, QueryExecutionIds):
+        self.batch_calls.append(list(QueryExecutionIds))
+        return {"QueryExecutions": [self._execution(i) for i in QueryExecutionIds],
+                "UnprocessedQueryExecutionIds": []}
+
+
+class CompletionWaiterTest(unittest.TestCase):
+    def test_backoff_starts_fast_and_caps(self):
+        with mock.patch.object(athena_engine, "POLL_INITIAL_INTERVAL", 0.2):
+            waiter = athena_engine._CompletionWaiter(None, ["q"], max_interval=1.5)
+            delays = [round(waiter.next_delay(), 3) for _ in range(7)]
+        self.assertEqual(delays[0], 0.2)
+        self.assertEqual(delays, sorted(delays))
+        self.assertEqual(delays[-1], 1.5)
+
+    def test_wait_for_query_polls_until_done(self):
+        client = _FakeAthena({"q": 3})
+        sleeps = []
+        with mock.patch.object(athena_engine, "_get_athena", lambda: client), \
+                mock.patch.object(athena_engine.time, "sleep", sleeps.append):
+            qe = athena_engine._wait_for_query("q", poll_interval=2.0)
+        self.assertEqual(qe["Status"]["State"], "SUCCEEDED")
+        self.assertEqual(client.single_calls, 3)
+        self.assertLess(sum(sleeps), 2.0)
+
+    def test_wait_for_query_raises_on_failure(self):
+        client = _FakeAthena({"q": 1}, failed={"q"})
+        with mock.patch.object(athena_engine, "_get_athena", lambda: client), \
+                mock.patch.object(athena_engine.time, "sleep", lambda s: None):
+            with self.assertRaises(RuntimeError):
+                athena_engine._wait_for_query("q")
+
+    def test_batches_respect_api_limit(self):
+        ids = [f"q{i}" for i in range(120)]
+        client = _FakeAthena({i: 2 for i in ids})
+        waiter = athena_engine._CompletionWaiter(client, ids, max_interval=1.0)
+        self.assertEqual(waiter.poll(), [])
+        self.assertEqual([len(b) for b in client.batch_calls], [50, 50, 20])
+        self.assertEqual(len(waiter.poll()), 120)
+        self.assertEqual(waiter.pending, {})
+
+
+class ParallelIterTest(unittest.TestCase):
+    def test_yields_every_query_with_timings(self):
+        sqls = [f"day{i}" for i in range(5)]
+        client = _FakeAthena({sql: i + 1 for i, sql in enumerate(sqls)}, failed={"day3"})
+
+        def fake_download(uri):
+            return pd.DataFrame({"uri": [uri]})
+
+        with mock.patch.object(athena_engine, "_get_athena", lambda: client), \
+                mock.patch.object(athena_engine, "_download_s3_csv", fake_download), \
+                mock.patch.object(athena_engine, "POLL_INITIAL_INTERVAL", 0.001):
+            results = dict(athena_engine.run_queries_parallel_iter(sqls, poll_interval=0.01))
+
+        self.assertEqual(sorted(results), list(range(5)))
+        self.assertTrue(results[3].empty)
+        self.assertEqual(results[4]["uri"].tolist(), ["s3://bucket/day4.csv"])
+        self.assertEqual(results[0].attrs["scanned_bytes"], 1000)
+        self.assertEqual(results[0].attrs["timings"]["queue_ms"], 40)
+        self.assertEqual(results[0].attrs["timings"]["engine_ms"], 900)
+        self.assertIn("download_ms", results[0].attrs["timings"])
+        # One status call per round for all pending queries, not one per query
+        self.assertEqual(len(client.batch_calls) + client.single_calls, 5)
+        self.assertEqual(len(client.batch_calls[0]), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pricing_engine
+
+
+def _request_frames(n_ours: int, n_vendor: int, overlap: int, seed: int = 9):
+    """Two shuffled request-level frames sharing `overlap` request IDs, of
+    which the first 7 (when shared) disagree on quota."""
+    rng = np.random.default_rng(seed)
+    models = np.array(["claude-opus-4-6", "gpt-5", "gemini-2.5-pro", "seedance"], dtype=object)
+    ids = ("req-" + pd.Series(np.arange(n_ours + n_vendor - overlap)).astype(str)).to_numpy(dtype=object)
+    our_quota = rng.integers(0, 2_000_000, n_ours)
+    vendor_quota = np.concatenate([our_quota[:overlap], rng.integers(0, 2_000_000, n_vendor - overlap)])
+    vendor_quota[:min(overlap, 7)] += 500
+
+    ours = pd.DataFrame({
+        "request_id": ids[:n_ours],
+        "model_name": rng.choice(models, n_ours),
+        "quota": our_quota,
+    })
+    vendor = pd.DataFrame({
+        "request_id": np.concatenate([ids[:overlap], ids[n_ours:]]),
+        "model_name": rng.choice(models, n_vendor),
+        "quota": vendor_quota,
+    })
+    ours = ours.iloc[rng.permutation(n_ours)].reset_index(drop=True)
+    vendor = vendor.iloc[rng.permutation(n_vendor)].reset_index(drop=True)
+    return ours, vendor
+
+
+class RowLevelJoinTest(unittest.TestCase):
+    def _assert_same_partition(self, ours, vendor):
+        got, got_ours, got_vendor = pricing_engine._row_level_join(ours, vendor)
+        ref, ref_ours, ref_vendor = pricing_engine._row_level_join_loop(ours, vendor)
+
+        self.assertEqual(list(got.columns), list(ref.columns))
+        ref = ref.sort_values("request_id").reset_index(drop=True)
+        got_sorted = got.sort_values("request_id").reset_index(drop=True)
+        pd.testing.assert_frame_equal(got_sorted, ref, check_dtype=False)
+        np.testing.assert_array_equal(got_ours, ref_ours)
+        np.testing.assert_array_equal(got_vendor, ref_vendor)
+        return got
+
+    def test_matches_loop_reference(self):
+        ours, vendor = _request_frames(3000, 2500, 1800)
+        ours.loc[5, "quota"] = np.nan
+        ours.loc[6, "model_name"] = None
+        got = self._assert_same_partition(ours, vendor)
+        # Matched rows follow our row order
+        positions = pd.Series(range(len(ours)), index=ours["request_id"])
+        self.assertTrue(positions.loc[got["request_id"]].is_monotonic_increasing)
+
+    def test_mixed_id_types_and_missing_columns(self):
+        ours = pd.DataFrame({"request_id": [1, 2, "3", 4], "quota": [10, 20, 30, 40]})
+        vendor = pd.DataFrame({"request_id": ["2", 3, 5], "model_name": ["a", "b", "c"]})
+        got = self._assert_same_partition(ours, vendor)
+        self.assertEqual(got["request_id"].tolist(), ["2", "3"])
+        self.assertEqual(got["model_name"].tolist(), ["", ""])
+        self.assertEqual(got["vendor_quota"].tolist(), [0.0, 0.0])
+
+    def test_empty_sides_keep_schema(self):
+        ours, vendor = _request_frames(50, 40, 0)
+        for a, b in ((ours, vendor), (ours.iloc[:0], vendor), (ours, vendor.iloc[:0])):
+            got = self._assert_same_partition(a, b)
+            self.assertTrue(got.empty)
+            self.assertEqual(list(got.columns), pricing_engine._ROW_LEVEL_MATCHED_COLS)
+
+    def test_cross_check_row_level_collapses_multi_row_requests(self):
+        ours = pd.DataFrame({
+            "request_id": ["a", "a", "b", "c"],
+            "model_name": ["video", "video", "gpt-5", "gpt-5"],
+            "quota": [134400, -20737, 1000, 500],
+        })
+        vendor = pd.DataFrame({
+            "request_id": ["a", "b", "d"],
+            "model_name": ["video", "gpt-5", "gpt-5"],
+            "quota": [113663, 900, 700],
+        })
+        result = pricing_engine.cross_check_row_level(ours, vendor)
+        stats = result["stats"]
+        self.assertEqual((stats["matched_records"], stats["only_ours_records"],
+                          stats["only_vendor_records"], stats["quota_mismatched"]), (2, 1, 1, 1))
+        matched = result["matched"].set_index("request_id")
+        self.assertEqual(matched.loc["a", "quota_diff"], 0.0)
+        self.assertEqual(matched.loc["b", "quota_diff"], 100.0)
+        self.assertEqual(result["only_ours"]["request_id"].tolist(), ["c"])
+        self.assertEqual(result["only_vendor"]["request_id"].tolist(), ["d"])
+        self.assertEqual(list(result["only_ours"].columns), ["request_id", "quota", "billed_usd", "model_name"])
+
+    def test_large_input(self):
+        n = 2_000_000
+        ours, vendor = _request_frames(n, n - 150_000, n - 300_000, seed=1)
+        start = time.perf_counter()
+        result = pricing_engine.cross_check_row_level(ours, vendor)
+        elapsed = time.perf_counter() - start
+
+        stats = result["stats"]
+        self.assertEqual(stats["matched_records"], n - 300_000)
+        self.assertEqual(stats["only_ours_records"], 300_000)
+        self.assertEqual(stats["only_vendor_records"], 150_000)
+        self.assertEqual(stats["quota_mismatched"], 7)
+        # The per-request loop took minutes at this size; the join is seconds.
+        self.assertLess(elapsed, 60, f"cross_check_row_level took {elapsed:.1f}s for {n:,} rows")
+
+
+if __name__ == "__main__":
+    unittest.main()
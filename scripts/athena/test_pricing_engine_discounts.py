@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pricing_engine
+
+
+DISCOUNTS = {
+    "_version": "test",
+    "cost_discounts": {
+        "defaults": {"*": 0.9},
+        "by_channel": {
+            "25": {"*": 0.35, "_name": "MateCloud"},
+            "26": {"claude-opus-*": 0.5, "claude-*": 0.4, "gpt-4o": 0.7, "_name": "mixed"},
+            "27": {"*": 0.6, "claude-*": 0.3},
+            "28": {"claude-*": 0.45, "claude-opus-*": 0.2},
+            "29": {"gemini-2.5-pro": 0.8},
+        },
+    },
+    "revenue_discounts": {
+        "defaults": {"*": 1.0},
+        "by_user": {
+            "174": {"_name": "prefixes", "claude-*": 0.85, "gemini-*": 0.9, "gpt-*": 0.95},
+            "7": {"*": 0.8},
+            "8": {"claude-sonnet-4-6": 0.75, "*": 0.92},
+        },
+    },
+}
+
+MODELS = [
+    "claude-opus-4-6", "claude-sonnet-4-6", "claude-haiku-4-5-20251001",
+    "gpt-4o", "gpt-5", "gemini-2.5-pro", "gemini-3-flash", "deepseek-v3",
+    "claude-", "claude", "", "*",
+]
+
+
+class CompiledDiscountTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(DISCOUNTS, f)
+        self._old_env = os.environ.get("DISCOUNTS_JSON")
+        os.environ["DISCOUNTS_JSON"] = self.path
+        pricing_engine._discounts_cache = None
+
+    def tearDown(self):
+        if self._old_env is None:
+            os.environ.pop("DISCOUNTS_JSON", None)
+        else:
+            os.environ["DISCOUNTS_JSON"] = self._old_env
+        pricing_engine._discounts_cache = None
+        os.unlink(self.path)
+
+    def test_scalar_lookup_matches_reference(self):
+        for key in ("25", "26", "27", "28", "29", "999", 25, 26, 999):
+            for model in MODELS:
+                expected = pricing_engine._match_discount(DISCOUNTS["cost_discounts"], key, model)
+                self.assertEqual(pricing_engine.get_cost_discount(key, model), expected, (key, model))
+        for key in ("174", "7", "8", "1", 174, 8):
+            for model in MODELS:
+                expected = pricing_engine._match_discount(DISCOUNTS["revenue_discounts"], key, model)
+                self.assertEqual(pricing_engine.get_revenue_discount(key, model), expected, (key, model))
+
+    def test_vectorized_resolution_matches_reference(self):
+        rng = np.random.default_rng(7)
+        channels = rng.choice([25, 26, 27, 28, 29, 30], size=5000)
+        users = rng.choice([174, 7, 8, 9], size=5000)
+        models = rng.choice(MODELS, size=5000)
+
+        cost = pricing_engine.resolve_cost_discounts(pd.Series(channels), pd.Series(models))
+        revenue = pricing_engine.resolve_revenue_discounts(pd.Series(users), pd.Series(models))
+        expected_cost = [pricing_engine._match_discount(DISCOUNTS["cost_discounts"], c, m)
+                         for c, m in zip(channels, models)]
+        expected_revenue = [pricing_engine._match_discount(DISCOUNTS["revenue_discounts"], u, m)
+                            for u, m in zip(users, models)]
+        np.testing.assert_array_equal(cost, np.asarray(expected_cost, dtype=float))
+        np.testing.assert_array_equal(revenue, np.asarray(expected_revenue, dtype=float))
+
+    def test_compiled_tables_reload_with_discounts_file(self):
+        self.assertEqual(pricing_engine.get_cost_discount(25, "claude-opus-4-6"), 0.35)
+
+        updated = json.loads(json.dumps(DISCOUNTS))
+        updated["cost_discounts"]["by_channel"]["25"]["*"] = 0.3
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(updated, f)
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 5))
+
+        self.assertEqual(pricing_engine.get_cost_discount(25, "claude-opus-4-6"), 0.3)
+        np.testing.assert_array_equal(
+            pricing_engine.resolve_cost_discounts([25, 26], ["gpt-5", "claude-opus-4-6"]),
+            [0.3, 0.5])
+
+    def test_apply_pricing_summary_discount_columns(self):
+        df = pd.DataFrame({
+            "user_id": [174, 7, 1],
+            "channel_id": [26, 27, 404],
+            "model_name": ["claude-opus-4-6", "gpt-5", "deepseek-v3"],
+            "total_usd": [10.0, 20.0, 30.0],
+        })
+        out = pricing_engine.apply_pricing_summary(df)
+        self.assertEqual(out["cost_discount"].tolist(), [0.5, 0.6, 0.9])
+        self.assertEqual(out["revenue_discount"].tolist(), [0.85, 0.8, 1.0])
+        self.assertEqual(out["cost_usd"].tolist(), [5.0, 12.0, 27.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
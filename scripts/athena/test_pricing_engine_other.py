@@ -0,0 +1,98 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pricing_engine
+
+
+OTHER_CORPUS = [
+    "",
+    None,
+    "{}",
+    "not json",
+    '{"cache_tokens": 12',
+    json.dumps({"cache_tokens": 1200, "cache_creation_tokens": 300}),
+    json.dumps({"cache_tokens": 0, "cache_creation_tokens": 500,
+                "cache_creation_tokens_5m": 200, "cache_creation_tokens_1h": 100}),
+    json.dumps({"cache_creation_tokens": 900, "tiered_cache_creation_tokens_5m": 0,
+                "cache_creation_tokens_5m": 400, "tiered_cache_creation_tokens_1h": 250,
+                "tiered_cache_creation_tokens_remaining": 17}),
+    json.dumps({"cache_creation_tokens": 100, "cache_creation_tokens_5m": 300}),
+    json.dumps({"tiered_cache_store_price": 3.75, "tiered_input_price": 3, "tiered_output_price": 15,
+                "tiered_cache_hit_price": 0.3, "tiered_cache_store_price_1h": 6}),
+    json.dumps({"tiered_cache_store_price": None, "tiered_cache_store_price_5m": 0}),
+    json.dumps({"tiered_cache_store_price": 7.5, "tiered_cache_store_price_5m": 6.25}),
+    json.dumps({"billing_cond_multiplier": 1.5}),
+    json.dumps({"billing_cond_multiplier": 0}),
+    json.dumps({"billing_cond_multiplier": -2}),
+    json.dumps({"billing_cond_multiplier": "1.25"}),
+    json.dumps({"billing_cond_multiplier": "bad"}),
+    json.dumps({"provider": "service-inference", "billing_event": "video_task_settlement",
+                "task_id": "mvt-1", "actual_usage": 40594, "duration_seconds": 4,
+                "unit_scale": 0.000001, "group_ratio": 1, "price_or_ratio": 5.6,
+                "preconsumed_quota": 134400, "actual_quota": 113663, "quota_delta": -20737,
+                "total_tokens": 40594}),
+    json.dumps({"image_completion_tokens": 1290, "image_completion_ratio": 24,
+                "image_output": 560, "image_ratio": 2, "nested": {"cache_tokens": 5}}),
+    json.dumps({"cache_tokens": 5, "note": "line\nbreak"}),
+    '{"cache_tokens": 7,\n "cache_creation_tokens": 3}',
+    json.dumps({"model_ratio": 1.5, "frt": 1200, "admin_info": {"use_channel": ["65"]}}),
+]
+
+
+def _assert_frames_equivalent(test, ref: pd.DataFrame, got: pd.DataFrame):
+    test.assertEqual(list(ref.columns), list(got.columns))
+    for col in ref.columns:
+        kind = pricing_engine.OTHER_COLUMNS[col][0]
+        if kind == "str":
+            test.assertEqual(ref[col].fillna("").tolist(), got[col].tolist(), col)
+        elif kind == "bool":
+            test.assertEqual(ref[col].astype(bool).tolist(), got[col].tolist(), col)
+        else:
+            np.testing.assert_array_equal(
+                pd.to_numeric(ref[col], errors="coerce").to_numpy(dtype=float),
+                got[col].to_numpy(dtype=float), err_msg=col)
+
+
+class OtherColumnarTest(unittest.TestCase):
+    def test_matches_reference_parser(self):
+        series = pd.Series(OTHER_CORPUS * 3, index=range(10, 10 + 3 * len(OTHER_CORPUS)))
+        ref = pricing_engine._parse_other_batch(series.fillna(""))
+        # String billing_cond_multiplier values are coerced by both parsers; the
+        # reference keeps other raw values untouched, so compare numerically.
+        got = pricing_engine.parse_other_columnar(series, chunk_rows=7)
+        _assert_frames_equivalent(self, ref, got)
+        self.assertTrue(got.index.equals(series.index))
+
+    def test_large_chunk_with_bad_rows_matches_reference(self):
+        rng = np.random.default_rng(3)
+        rows = list(rng.choice(np.array(OTHER_CORPUS[5:], dtype=object), size=6000))
+        rows[17] = "{broken"
+        rows[4500] = json.dumps({"cache_tokens": "12"})
+        series = pd.Series(rows)
+        ref = pricing_engine._parse_other_batch(series)
+        got = pricing_engine.parse_other_columnar(series)
+        _assert_frames_equivalent(self, ref, got)
+
+    def test_projection_and_types(self):
+        series = pd.Series(OTHER_CORPUS[5:10])
+        columns, valid = pricing_engine.extract_other_columns(series, fields=["ch", "ip_new", "cw_rem"])
+        self.assertEqual(set(columns), {"ch", "ip_new", "cw_rem"})
+        self.assertEqual(columns["ch"].dtype, np.int64)
+        self.assertEqual(columns["ip_new"].dtype, np.float64)
+        self.assertEqual(columns["ch"].tolist(), [1200, 0, 0, 0, 0])
+        self.assertEqual(valid["ch"].tolist(), [True, True, False, False, False])
+        self.assertEqual(columns["cw_rem"].tolist(), [300, 200, 17, 0, 0])
+
+        with self.assertRaises(ValueError):
+            pricing_engine.extract_other_columns(series, fields=["nope"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pricing_engine
+
+
+def _summary_frame(n: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    models = list(pricing_engine.get_pricing().keys()) + ["unpriced-model"]
+    df = pd.DataFrame({
+        "user_id": rng.integers(1, 200, n),
+        "channel_id": rng.integers(20, 70, n),
+        "model_name": rng.choice(models, n),
+        "total_quota": rng.integers(0, 50_000_000, n),
+        "total_input_tokens": rng.integers(0, 5_000_000_000, n),
+        "total_output_tokens": rng.integers(0, 50_000_000, n),
+        "total_cache_hit_tokens": rng.integers(0, 9_000_000_000, n).astype(float),
+        "total_cache_write_tokens": rng.integers(0, 90_000_000, n),
+        "total_cw_5m": rng.integers(0, 40_000_000, n),
+        "total_cw_1h": rng.integers(0, 40_000_000, n),
+        "total_cw_remaining": rng.integers(0, 10_000_000, n),
+        "total_image_output_tokens": rng.integers(0, 1_000_000, n),
+    })
+    df.loc[3, "total_cache_hit_tokens"] = np.nan
+    return df
+
+
+def _reference_list_price(df: pd.DataFrame, flat_tier: bool) -> pd.Series:
+    expected = df["total_quota"].astype(float) / pricing_engine.QUOTA_TO_USD
+    prices = pricing_engine._summary_list_prices_rowwise(df, flat_tier=flat_tier)
+    for idx, price in zip(df.index, prices):
+        if price is not None:
+            expected.at[idx] = round(price, 6)
+    return expected
+
+
+class SummaryPricingTest(unittest.TestCase):
+    def _assert_identical(self, df, **kwargs):
+        out = pricing_engine.apply_pricing_summary(df, **kwargs)
+        flat_tier = kwargs.get("flat_tier", False) or bool(kwargs.get("flat_tier_since"))
+        expected = _reference_list_price(df, flat_tier)
+        np.testing.assert_array_equal(out["list_price_usd"].to_numpy(), expected.to_numpy())
+
+    def test_matches_rowwise_pricing(self):
+        self._assert_identical(_summary_frame(3000))
+
+    def test_matches_rowwise_pricing_flat_tier(self):
+        self._assert_identical(_summary_frame(3000), flat_tier=True)
+        self._assert_identical(_summary_frame(500), flat_tier_since="2026-03-01")
+
+    def test_without_cache_columns(self):
+        df = _summary_frame(200).drop(columns=["total_cache_hit_tokens", "total_cw_5m"])
+        self._assert_identical(df)
+
+    def test_fallbacks_keep_quota_price(self):
+        df = pd.DataFrame({
+            "model_name": ["claude-opus-4-6", "claude-opus-4-5-20251101", "unpriced-model"],
+            "total_quota": [500_000, 1_000_000, 1_500_000],
+            "total_input_tokens": [1_000_000, 1_000_000, 1_000_000],
+            "total_output_tokens": [0, 0, 0],
+        })
+        out = pricing_engine.apply_pricing_summary(df, flat_tier=True)
+        # flat_tier model → tier 0; non-flat tiered and unknown models → quota
+        self.assertEqual(out["list_price_usd"].tolist(), [5.0, 2.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pricing_engine
+
+
+def _usage_frame(n: int, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    models = list(pricing_engine.get_pricing().keys()) + ["unknown-model"]
+    return pd.DataFrame({
+        "model": rng.choice(models, size=n),
+        "prompt_tokens": rng.choice([0, 999, 1000, 199_999, 200_000, 350_000, 5_000], size=n),
+        "created_at": rng.integers(1_770_000_000, 1_780_000_000, size=n),
+    }, index=rng.permutation(n) + 100)
+
+
+class TierAssignmentTest(unittest.TestCase):
+    def _assert_same(self, **kwargs):
+        df = _usage_frame(4000)
+        got = pricing_engine._assign_prices(df, **kwargs)
+        ref = pricing_engine._assign_prices_merge(df, **kwargs)
+        for col in pricing_engine._PRICE_COLS:
+            np.testing.assert_array_equal(got[col].to_numpy(dtype=float),
+                                          ref[col].to_numpy(dtype=float), err_msg=col)
+
+    def test_matches_merge_reference(self):
+        self._assert_same()
+
+    def test_matches_merge_reference_flat_tier(self):
+        self._assert_same(flat_tier=True)
+
+    def test_matches_merge_reference_flat_tier_since(self):
+        self._assert_same(flat_tier=True, flat_tier_since_ts=1_775_000_000)
+
+    def test_tier_boundaries(self):
+        df = pd.DataFrame({
+            "model": ["claude-opus-4-6"] * 3,
+            "prompt_tokens": [199_999, 200_000, 1_500_000],
+        })
+        out = pricing_engine._assign_prices(df)
+        self.assertEqual(out["ip"].tolist(), [5, 10, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import athena_engine
+import queries
+import report_builder
+import usage_cube
+from test_usage_compaction import _duckdb_usage_logs, _row, _write_source, duckdb
+
+
+SPAN_START = datetime(2023, 11, 1, tzinfo=timezone.utc)
+SPAN_END = datetime(2025, 4, 1, tzinfo=timezone.utc)
+CST = timezone(timedelta(hours=8))
+
+
+def _utc(*args, tz=timezone.utc):
+    return datetime(*args, tzinfo=tz)
+
+
+def _hours(start, end):
+    """Hour partitions ('YYYY-MM-DD HH') that overlap [start, end)."""
+    hour = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    found = []
+    while hour < end:
+        found.append(hour.strftime("%Y-%m-%d %H"))
+        hour += timedelta(hours=1)
+    return found
+
+
+class PartitionPredicateTest(unittest.TestCase):
+    """Evaluate the partition predicates over every hour partition of the span."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = sqlite3.connect(":memory:")
+        cls.db.execute("CREATE TABLE parts (year TEXT, month TEXT, day TEXT, hour TEXT)")
+        cls.db.executemany("INSERT INTO parts VALUES (?, ?, ?, ?)",
+                           [(h[:4], h[5:7], h[8:10], h[11:13])
+                            for h in _hours(SPAN_START, SPAN_END)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    def _scanned(self, where):
+        partitions = where.split(" AND created_at")[0]
+        rows = self.db.execute(f"SELECT year, month, day, hour FROM parts WHERE {partitions}")
+        return sorted(f"{y}-{m}-{d} {h}" for y, m, d, h in rows)
+
+    def assertScansExactly(self, where, start, end):
+        expected = _hours(start, end)
+        self.assertEqual(self._scanned(where), expected, where)
+        self.assertEqual(queries._partition_days(where),
+                         sorted({h[:10] for h in expected}), where)
+
+    def test_intervals_scan_only_their_hours(self):
+        cases = [
+            (_utc(2024, 5, 3), _utc(2024, 5, 4)),                 # one day
+            (_utc(2024, 5, 3, 8), _utc(2024, 5, 3, 18)),          # hours of one day
+            (_utc(2024, 5, 3, 8, 30), _utc(2024, 5, 4, 2, 1)),    # across midnight
+            (_utc(2024, 5, 15, 8), _utc(2024, 6, 15, 8)),         # billing period
+            (_utc(2024, 2, 28, 20), _utc(2024, 3, 1, 4)),         # leap day
+            (_utc(2023, 12, 31, 16), _utc(2024, 1, 1, 16)),       # across the year
+            (_utc(2023, 11, 1), _utc(2025, 4, 1)),                # whole span
+            (_utc(2024, 1, 1), _utc(2025, 1, 1)),                 # whole year
+            (_utc(2024, 7, 1), _utc(2024, 8, 1)),                 # whole month
+            (_utc(2024, 7, 9, 23, 59), _utc(2024, 7, 10)),        # one minute
+        ]
+        for start, end in cases:
+            self.assertScansExactly(queries._partition_range_filter(start, end), start, end)
+
+    def test_random_intervals(self):
+        rng = random.Random(25)
+        span = int((SPAN_END - SPAN_START).total_seconds())
+        for _ in range(200):
+            a, b = sorted(rng.sample(range(span), 2))
+            start, end = SPAN_START + timedelta(seconds=a), SPAN_START + timedelta(seconds=b)
+            self.assertScansExactly(queries._partition_range_filter(start, end), start, end)
+
+    def test_ranges_are_collapsed(self):
+        where = queries._partition_range_filter(_utc(2024, 5, 15, 8), _utc(2024, 6, 15, 8))
+        self.assertEqual(where.count(" OR "), 3)
+        self.assertEqual(queries._partition_range_filter(_utc(2024, 7, 1), _utc(2024, 8, 1)),
+                         "year = '2024' AND month = '07'")
+        self.assertEqual(queries._partition_range_filter(_utc(2024, 7, 3), _utc(2024, 8, 1)),
+                         "year = '2024' AND month = '07' AND day >= '03'")
+        with self.assertRaises(ValueError):
+            queries._partition_range_filter(_utc(2024, 7, 3), _utc(2024, 7, 3))
+
+    def test_builders(self):
+        ts = lambda dt: int(dt.timestamp())
+        cases = [
+            # Local wall-clock range: partitions follow the UTC hours
+            (queries._build_time_where("2024", "05", "2024-05",
+                                       start_time="2024-05-03 00:00", end_time="2024-05-04 23:59",
+                                       time_zone_offset_hours=8),
+             _utc(2024, 5, 3, tz=CST), _utc(2024, 5, 5, tz=CST)),
+            (queries._build_time_where("2024", "05", "2024-05",
+                                       start_time="2024-05-15 08:00", end_time="2024-06-15 07:59",
+                                       cross_month=True),
+             _utc(2024, 5, 15, 8), _utc(2024, 6, 15, 8)),
+            (queries._build_time_where("2024", "05", "2024-05", start_day="2024-05-10"),
+             _utc(2024, 5, 10), _utc(2024, 6, 1)),
+            (queries.raw_usage_detail("2023-12-30", "2024-01-02"),
+             _utc(2023, 12, 30), _utc(2024, 1, 3)),
+            (queries.usage_by_created_at_range(ts(_utc(2024, 2, 29, 22)), ts(_utc(2024, 3, 1, 1))),
+             _utc(2024, 2, 29, 22), _utc(2024, 3, 1, 1)),
+            (queries.raw_usage_detail_daily_tz("2024-03", "2024-03-01", tz_offset_hours=8),
+             _utc(2024, 3, 1, tz=CST), _utc(2024, 3, 2, tz=CST)),
+            (queries.monthly_bill_full_tz("2024-03", tz_offset_hours=-5.5),
+             _utc(2024, 3, 1, tz=timezone(timedelta(hours=-5.5))),
+             _utc(2024, 4, 1, tz=timezone(timedelta(hours=-5.5)))),
+            (queries.daily_trend_tz("2024-03", tz_offset_hours=8, start_day="2024-03-10"),
+             _utc(2024, 3, 10, tz=CST), _utc(2024, 4, 1, tz=CST)),
+        ]
+        for sql, start, end in cases:
+            where = sql.split("WHERE ", 1)[-1].split("\n")[0]
+            self.assertScansExactly(where, start, end)
+            if "created_at" in where:
+                self.assertIn(f"created_at >= {ts(start)}", where)
+                self.assertIn(f"created_at < {ts(end)}", where)
+
+    def test_end_month_is_validated(self):
+        with self.assertRaises(ValueError):
+            queries.monthly_bill_full("2024-05", start_day="2024-05-15", end_day="2024-04-30")
+        with self.assertRaises(ValueError):
+            queries.daily_trend("2024-05", start_day="2024-06-01", end_day="2024-06-14")
+        for builder in (queries.monthly_bill_full, queries.daily_trend, queries.daily_trend_by_model):
+            sql = builder("2024-05", start_day="2024-05-15", end_day="2024-06-14")
+            self.assertIn("(year = '2024' AND month = '06' AND day <= '14')", sql)
+
+    def test_cache_ttl_uses_newest_month(self):
+        now = datetime.now(timezone.utc)
+        first = (now.replace(day=1) - timedelta(days=1)).replace(day=20, hour=0, minute=0)
+        sql = queries.monthly_bill_full(first.strftime("%Y-%m"),
+                                        start_day=first.strftime("%Y-%m-%d"),
+                                        end_day=now.strftime("%Y-%m-%d"))
+        self.assertEqual(athena_engine._infer_cache_ttl(sql), 3600)
+
+
+
+@unittest.skipIf(duckdb is None, "duckdb not installed")
+class CrossMonthBillTest(unittest.TestCase):
+    """A 15th 08:00 → next 15th billing period, run end to end in DuckDB."""
+
+    # (partition hour, request_id, quota); the period is 2026-05-15 08:00 → 2026-06-15 08:00 UTC
+    ROWS = [
+        ("2026-05-15 07", "before", 111),
+        ("2026-05-15 08", "r1", 1000),
+        ("2026-05-31 23", "r2", 2000),
+        ("2026-06-01 00", "r3", 4000),
+        ("2026-06-14 07", "r4", 8000),
+        ("2026-06-15 08", "after", 222),
+    ]
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        src = self.dir / "usage-logs"
+        for hour, request_id, quota in self.ROWS:
+            created = int(datetime.strptime(hour, "%Y-%m-%d %H").replace(
+                tzinfo=timezone.utc).timestamp()) + 60
+            _write_source(src, hour[:10], hour[11:], f"{request_id}.ndjson.gz",
+                          [_row(request_id, created, quota=quota)])
+        self.db = _duckdb_usage_logs(src)
+        usage_cube._closed_frames.clear()
+
+    def tearDown(self):
+        self.db.close()
+        usage_cube._closed_frames.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _df(self, sql, no_cache=False):
+        return athena_engine._auto_convert_types(self.db.execute(sql).df())
+
+    def _trend_sheet(self, **period):
+        import openpyxl
+        with mock.patch.object(report_builder, "run_query_cached", self._df), \
+                mock.patch.object(report_builder, "COST_MONITOR_AVAILABLE", False):
+            path = report_builder.generate_monthly_bill("2026-05", str(self.dir / "out"), **period)
+        rows = list(openpyxl.load_workbook(path, read_only=True)["每日趋势"].iter_rows(values_only=True))
+        return {r[0]: r[-2] for r in rows if r[0] and str(r[0]).startswith("2026-")}
+
+    def test_time_range_bill(self):
+        trend = self._trend_sheet(start_time="2026-05-15 08:00", end_time="2026-06-15 07:59")
+        self.assertEqual(trend, {"2026-05-15": 1000, "2026-05-31": 2000,
+                                 "2026-06-01": 4000, "2026-06-14": 8000})
+
+    def test_day_range_bill(self):
+        trend = self._trend_sheet(start_day="2026-05-15", end_day="2026-06-14")
+        self.assertEqual(trend, {"2026-05-15": 1111, "2026-05-31": 2000,
+                                 "2026-06-01": 4000, "2026-06-14": 8000})
+
+    def test_detail_export(self):
+        import openpyxl
+        for period, expected in [
+                (dict(start_time="2026-05-15 08:00", end_time="2026-06-15 07:59"), ["r1", "r2", "r3", "r4"]),
+                (dict(start_day="2026-05-15", end_day="2026-06-14"), ["before", "r1", "r2", "r3", "r4"])]:
+            self.assertIn("2026-06-01", queries.detail_day_list("2026-05", **period))
+            with mock.patch.object(report_builder, "run_queries_parallel_iter",
+                                   lambda sqls: enumerate(self._df(sql) for sql in sqls)):
+                path = report_builder._export_detail_csv("2026-05", str(self.dir), **period)
+            rows = openpyxl.load_workbook(path, read_only=True)["Detail"].iter_rows(values_only=True)
+            got = [r[0] for r in list(rows)[2:] if r[0]]
+            self.assertEqual(sorted(got), sorted(expected), period)
+
+    def test_cube_spans_the_period(self):
+        period = dict(start_day="2026-05-15", end_day="2026-06-14")
+        with mock.patch.object(athena_engine, "run_query_df", self._df):
+            cube = usage_cube.load_month("2026-05", now=datetime(2026, 7, 1, tzinfo=timezone.utc),
+                                         location=str(self.dir / "cube"), **period)
+        for builder, widget in [("daily_trend", "daily_trend"), ("monthly_bill_full", "bill_full"),
+                                ("daily_trend_by_model", "daily_trend_by_model")]:
+            expected = self._df(getattr(queries, builder).__wrapped__("2026-05", **period))
+            pd.testing.assert_frame_equal(getattr(usage_cube, widget)(cube).reset_index(drop=True),
+                                          expected, check_dtype=False, obj=builder)
+        self.assertEqual(list(usage_cube.daily_trend(cube)["day"]),
+                         ["2026-05-15", "2026-05-31", "2026-06-01", "2026-06-14"])
+
+
+if __name__ == "__main__":
+    unittest.main()
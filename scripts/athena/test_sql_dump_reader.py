@@ -0,0 +1,217 @@
+import gzip
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import export_db_bill
+import sql_dump_reader
+
+_HERE = Path(__file__).resolve().parent
+
+
+def _sql_str(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n") + "'"
+
+
+def _log_tuple(i: int, rng) -> str:
+    channel = int(rng.choice([38, 5, 138, 383]))
+    log_type = int(rng.choice([2, 2, 2, 6, 1, 5]))
+    other = '{"cache_tokens":%d,"admin_info":{"use_channel":["%d"]}}' % (i % 97, channel)
+    content = "" if i % 11 else "it's (a), test\nline"
+    fields = [
+        str(i), str(1 + i % 13), str(1_772_000_000 + i * 60), str(log_type),
+        _sql_str(content), _sql_str(f"user{i % 13}"), _sql_str("tok,en"),
+        _sql_str(["claude-opus-4-6", "gpt-5", "gemini-2.5-pro"][i % 3]),
+        str(i * 37 % 90_000), str(i * 11 % 5000), str(i % 700), str(i % 9), str(i % 2),
+        str(channel), str(i % 5), _sql_str("default"), "NULL" if i % 4 else _sql_str("1.2.3.4"),
+        _sql_str(other), _sql_str(f"req-{i}"),
+    ]
+    return "(" + ",".join(fields) + ")"
+
+
+def _dump_text(n: int, multiline: bool = False, seed: int = 4) -> str:
+    rng = np.random.default_rng(seed)
+    tuples = [_log_tuple(i, rng) for i in range(1, n + 1)]
+    lines = [
+        "-- MySQL dump 10.13",
+        "/*!40101 SET NAMES utf8mb4 */;",
+        "DROP TABLE IF EXISTS `logs`;",
+        "CREATE TABLE `logs` (",
+        "  `id` bigint(20) NOT NULL AUTO_INCREMENT,",
+        "  `channel_id` bigint(20) DEFAULT NULL",
+        ") ENGINE=InnoDB;",
+        "LOCK TABLES `channels` WRITE;",
+        "INSERT INTO `channels` VALUES (1,38,1772000000,2,'x'),(2,38,1772000000,2,'y');",
+        "UNLOCK TABLES;",
+        "LOCK TABLES `logs` WRITE;",
+    ]
+    for start in range(0, n, 40):
+        group = tuples[start:start + 40]
+        if multiline:
+            lines.append("INSERT INTO `logs` VALUES")
+            lines.append(",\n".join(group) + ";")
+        else:
+            lines.append("INSERT INTO `logs` VALUES " + ",".join(group) + ";")
+    lines += [
+        "UNLOCK TABLES;",
+        "LOCK TABLES `logs_archive` WRITE;",
+        "INSERT INTO `logs` VALUES " + _log_tuple(n + 1, rng) + ";",
+        "UNLOCK TABLES;",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _load_importer():
+    spec = importlib.util.spec_from_file_location("import_sql_to_sqlite", _HERE.parent / "import_sql_to_sqlite.py")
+    importer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(importer)
+    return importer
+
+
+def _reference_rows(text: str, channel_id: int) -> list:
+    """The previous line-by-line export path (before type filtering)."""
+    rows = []
+    section = text.split("LOCK TABLES `logs` WRITE;", 1)[1].split("UNLOCK TABLES;", 1)[0]
+    for line in section.splitlines():
+        if f",{channel_id}," in line:
+            export_db_bill._extract_tuples(line, channel_id, rows)
+    return rows
+
+
+class SqlDumpReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _logs_db(self, name: str) -> str:
+        db = str(Path(self.tmp.name) / name)
+        conn = sqlite3.connect(db)
+        cols = ", ".join(f"`{c}`" for c in sql_dump_reader.LOGS_COLUMNS)
+        conn.execute(f"CREATE TABLE logs ({cols}, PRIMARY KEY (`id`))")
+        conn.execute("CREATE INDEX idx_logs_channel_created ON logs (channel_id, created_at)")
+        conn.commit()
+        conn.close()
+        return db
+
+    def _write(self, text: str, name: str = "dump.sql.gz") -> str:
+        path = str(Path(self.tmp.name) / name)
+        data = text.encode("utf-8")
+        if name.endswith(".gz"):
+            data = gzip.compress(data)
+        Path(path).write_bytes(data)
+        return path
+
+    def test_matches_reference_parser_across_chunk_boundaries(self):
+        text = _dump_text(700)
+        path = self._write(text)
+        expected = _reference_rows(text, 38)
+        self.assertGreater(len(expected), 100)
+        for chunk_bytes in (97, 4096, sql_dump_reader.DEFAULT_CHUNK_BYTES):
+            stats = {}
+            df = sql_dump_reader.read_logs_frame(path, channel_id=38, chunk_bytes=chunk_bytes, stats=stats)
+            self.assertEqual(len(df), len(expected))
+            self.assertEqual(df["request_id"].tolist(), [r[18] for r in expected])
+            self.assertEqual(df["content"].tolist(), [r[4] for r in expected])
+            self.assertEqual(df["quota"].tolist(), [int(r[8]) for r in expected])
+            self.assertEqual(df["ip"].fillna("").tolist(), [r[16] for r in expected])
+            self.assertEqual(df["other"].tolist(), [r[17] for r in expected])
+            # The logs_archive section after UNLOCK TABLES is never read
+            self.assertEqual((stats["statements"], stats["tuples"], stats["malformed"]), (18, 700, 0))
+
+    def test_filters_are_pushed_down(self):
+        text = _dump_text(500, multiline=True)
+        path = self._write(text, "dump.sql")
+        full = sql_dump_reader.read_logs_frame(path)
+        self.assertEqual(len(full), 500)
+
+        got = sql_dump_reader.read_logs_frame(path, channel_id=[38, 5], types=(2, 6),
+                                              start_ts=1_772_006_000, end_ts=1_772_020_000, min_id=150)
+        want = full[full["channel_id"].isin([38, 5]) & full["type"].isin([2, 6])
+                    & (full["created_at"] >= 1_772_006_000) & (full["created_at"] < 1_772_020_000)
+                    & (full["id"] > 150)]
+        self.assertEqual(got["id"].tolist(), want["id"].tolist())
+        self.assertTrue(len(got) > 0)
+
+    def test_decode_value_unescapes_mysql_strings(self):
+        cases = {
+            b"NULL": None, b"42": 42, b"-7": -7, b"1.5": 1.5,
+            b"'plain'": "plain", b"''": "",
+            rb"'it\'s'": "it's", b"'it''s'": "it's",
+            rb"'a\\nb'": "a\\nb", rb"'a\nb\tc\r\0'": "a\nb\tc\r\0",
+            rb"'q\"x\Z'": 'q"x\x1a', "'日志'".encode(): "日志",
+        }
+        for raw, want in cases.items():
+            self.assertEqual(sql_dump_reader.decode_value(raw), want, raw)
+
+        segment = rb"(1,'a,(b)',NULL,'x\'),(y'),(2,'',3,'c''d')"
+        rows = sql_dump_reader.parse_values_segment(segment, columns=["a", "b", "c", "d"])
+        self.assertEqual(rows, [(1, "a,(b)", None, "x'),(y"), (2, "", 3, "c'd")])
+
+    def test_export_and_sqlite_import_share_the_reader(self):
+        text = _dump_text(300)
+        path = self._write(text)
+        df = export_db_bill.extract_logs_from_sql(path, 38)
+        expected = [r for r in _reference_rows(text, 38) if r[3] in ("2", "6")]
+        self.assertEqual(df["id"].tolist(), [int(r[0]) for r in expected])
+        self.assertEqual(df["ip"].tolist(), [r[16] for r in expected])
+        self.assertEqual(df["is_stream"].tolist(), [r[12] == "1" for r in expected])
+
+        importer = _load_importer()
+        db = self._logs_db("logs.db")
+        conn = sqlite3.connect(db)
+        conn.execute("INSERT INTO logs (id) VALUES (120)")
+        conn.commit()
+        conn.close()
+
+        importer.import_to_sqlite(path, db)
+        conn = sqlite3.connect(db)
+        count, min_new, max_id = conn.execute("SELECT COUNT(*), MIN(id) FILTER (WHERE id > 120), MAX(id) FROM logs").fetchone()
+        content = conn.execute("SELECT content FROM logs WHERE id = 121").fetchone()[0]
+        conn.close()
+        self.assertEqual((count, min_new, max_id), (181, 121, 300))
+        self.assertEqual(content, "it's (a), test\nline")
+
+    def test_parallel_import_matches_serial_and_keeps_incremental_skip(self):
+        importer = _load_importer()
+        path = self._write(_dump_text(900))
+        serial_db, parallel_db = self._logs_db("serial.db"), self._logs_db("parallel.db")
+        for db in (serial_db, parallel_db):
+            conn = sqlite3.connect(db)
+            conn.execute("INSERT INTO logs (id, content) VALUES (400, 'kept')")
+            conn.commit()
+            conn.close()
+
+        importer.import_to_sqlite(path, serial_db, workers=1, chunk_bytes=5000)
+        stats = importer.import_to_sqlite(path, parallel_db, workers=2, chunk_bytes=5000)
+        self.assertEqual((stats["tuples"], stats["rows"], stats["filtered"]), (900, 500, 400))
+        self.assertGreater(stats["bytes_read"], 0)
+
+        def dump(db):
+            conn = sqlite3.connect(db)
+            rows = conn.execute("SELECT * FROM logs ORDER BY id").fetchall()
+            indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall()
+            conn.close()
+            return rows, indexes
+
+        serial_rows, serial_indexes = dump(serial_db)
+        parallel_rows, parallel_indexes = dump(parallel_db)
+        self.assertEqual(parallel_rows, serial_rows)
+        self.assertEqual(len(parallel_rows), 501)
+        self.assertEqual(parallel_rows[0][4], "kept")
+        self.assertEqual(parallel_indexes, [("idx_logs_channel_created",)])
+        self.assertEqual(serial_indexes, parallel_indexes)
+
+        # Re-importing the same dump finds nothing newer than MAX(id)
+        again = importer.import_to_sqlite(path, parallel_db, workers=2, chunk_bytes=5000)
+        self.assertEqual((again["rows"], again["filtered"]), (0, 900))
+
+
+if __name__ == "__main__":
+    unittest.main()
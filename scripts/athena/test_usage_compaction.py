@@ -0,0 +1,395 @@
+import gzip
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import queries
+import usage_compaction
+
+try:
+    import duckdb
+except ImportError:  # optional: SQL equivalence checks run only when installed
+    duckdb = None
+
+
+DAY = "2026-05-03"
+
+
+def _row(request_id, created_at, user_id=7, channel_id=3, model="claude-sonnet-4", quota=1000,
+         other=None, **extra):
+    row = {
+        "request_id": request_id, "created_at": created_at, "user_id": user_id,
+        "username": f"u{user_id}", "channel_id": channel_id, "model_name": model,
+        "token_name": "default", "token_id": 1, "group": "default",
+        "prompt_tokens": 100, "completion_tokens": 20, "quota": quota, "content": "",
+        "use_time_seconds": 2, "is_stream": True, "ip": "10.0.0.1",
+        "other": json.dumps(other or {}),
+    }
+    row.update(extra)
+    return row
+
+
+def _write_source(root: Path, day: str, hour: str, name: str, rows, junk: str = ""):
+    path = root / day.replace("-", "/") / hour / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps(row) + "\n")
+        fh.write(junk)
+
+
+def _sample_source(root: Path):
+    base = int(datetime(2026, 5, 3, tzinfo=timezone.utc).timestamp())
+    h0 = [
+        _row("r1", base + 10, other={"cache_tokens": 40, "cache_creation_tokens": 30,
+                                      "cache_creation_tokens_5m": 20, "cache_creation_tokens_1h": 10}),
+        _row("r2", base + 20, other={"tiered_cache_creation_tokens_5m": 5, "cache_creation_tokens_5m": 99,
+                                      "tiered_cache_creation_tokens_remaining": 3,
+                                      "tiered_input_price": 3.0, "tiered_output_price": "15.5",
+                                      "billing_cond_multiplier": "1.25"}),
+        _row("r3", base + 30, model="seedance-1", quota=500,
+             other={"billing_event": "video_task_settlement", "actual_quota": 800, "task_id": 12345,
+                    "billing_cond_multiplier": "bad"}),
+        _row("r4", base + 40, model="seedance-1", quota=700,
+             other={"billing_event": "video_task_preconsume", "preconsumed_quota": 700}),
+    ]
+    # r1 delivered twice (second object), plus a malformed line
+    _write_source(root, DAY, "00", "a.ndjson.gz", h0)
+    _write_source(root, DAY, "00", "b.ndjson.gz", h0[:1], junk="{not json\n")
+    h5 = [
+        _row("r5", base + 5 * 3600, user_id=8, channel_id=4, model="gpt-image-1",
+             other={"image_completion_tokens": 400, "image_completion_ratio": 2,
+                    "image_output": 50, "image_ratio": 1.5, "cache_tokens": "12"}),
+        _row("r6", base + 5 * 3600 + 9, user_id=8, channel_id=4, quota=0,
+             other={"cache_tokens": 0, "task_id": "t-9"}),
+    ]
+    _write_source(root, DAY, "05", "a.ndjson.gz", h5)
+    # Next day: left as JSON in the partial-compaction checks
+    _write_source(root, "2026-05-04", "01", "a.ndjson.gz", [
+        _row("r7", base + 86400 + 3600, other={"cache_tokens": 7, "cache_creation_tokens_1h": 4}),
+        _row("r7", base + 86400 + 3600, other={"cache_tokens": 7, "cache_creation_tokens_1h": 4}),
+    ])
+
+
+def _duckdb_usage_logs(src: Path, dest: Path = None):
+    """DuckDB connection with ezmodel_logs.usage_logs (+ usage_logs_compact) views."""
+    db = duckdb.connect()
+    db.execute("CREATE SCHEMA ezmodel_logs")
+    db.execute("CREATE MACRO json_extract_scalar(j, p) AS json_extract_string(j, p)")
+    parts = r"regexp_extract(filename, '(\d{{4}})/(\d{{2}})/(\d{{2}})/(?:hour=)?(\d{{2}})/', {})"
+    duck_types = {"string": "VARCHAR", "int64": "BIGINT", "int32": "INTEGER", "bool": "BOOLEAN"}
+    columns = ", ".join(f"{c}: '{duck_types[usage_compaction._BASE_TYPES[c]]}'"
+                        for c in queries.USAGE_LOGS_BASE_COLUMNS)
+    db.execute(f"""
+        CREATE VIEW ezmodel_logs.usage_logs AS
+        SELECT * EXCLUDE (filename), {parts.format(1)} AS year, {parts.format(2)} AS month,
+               {parts.format(3)} AS day, {parts.format(4)} AS hour
+        FROM read_json('{src}/**/*.ndjson.gz', format = 'newline_delimited',
+                       columns = {{{columns}}}, filename = true, ignore_errors = true)""")
+    if dest is not None:
+        db.execute(f"""
+            CREATE VIEW ezmodel_logs.usage_logs_compact AS
+            SELECT * EXCLUDE (filename), {parts.format(1)} AS year, {parts.format(2)} AS month,
+                   {parts.format(3)} AS day
+            FROM read_parquet('{dest}/**/*.parquet', hive_partitioning = true,
+                              hive_types = {{'hour': VARCHAR}}, filename = true)""")
+    return db
+
+
+class LocalCompactionTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.src = self.dir / "usage-logs"
+        self.dest = self.dir / "compact"
+        _sample_source(self.src)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_compacts_day_into_typed_hour_partitions(self):
+        info = usage_compaction.compact_day(DAY, str(self.dest), str(self.src))
+        self.assertEqual((info["source_rows"], info["rows"]), (8, 7))
+
+        files = sorted(p.relative_to(self.dest).as_posix() for p in self.dest.rglob("*.parquet"))
+        self.assertEqual(files, ["2026/05/03/hour=00/part-00000.parquet",
+                                 "2026/05/03/hour=05/part-00000.parquet"])
+        table = pq.read_table(self.dest / "2026/05/03/hour=00/part-00000.parquet")
+        self.assertEqual(table.column_names, list(queries.COMPACT_COLUMNS))
+        self.assertEqual(str(table.schema.field("tiered_input_price").type), "double")
+        self.assertEqual(str(table.schema.field("cw_5m").type), "int64")
+        rows = {r["request_id"]: r for r in table.to_pylist()}
+        self.assertEqual((rows["r1"]["cache_tokens"], rows["r1"]["cw_5m"], rows["r1"]["cw_1h"]),
+                         (40, 20, 10))
+        self.assertEqual((rows["r2"]["cw_5m"], rows["r2"]["cw_remaining"], rows["r2"]["cw_1h"]),
+                         (5, 3, 0))
+        self.assertEqual((rows["r2"]["tiered_output_price"], rows["r2"]["billing_cond_multiplier"]),
+                         (15.5, 1.25))
+        self.assertEqual((rows["r3"]["billing_event"], rows["r3"]["actual_quota"], rows["r3"]["task_id"]),
+                         ("video_task_settlement", 800, "12345"))
+        self.assertIsNone(rows["r3"]["billing_cond_multiplier"])
+        self.assertIsNone(rows["r3"]["cache_tokens"])
+        later = {r["request_id"]: r for r in
+                 pq.read_table(self.dest / "2026/05/03/hour=05/part-00000.parquet").to_pylist()}
+        self.assertEqual((later["r5"]["cache_tokens"], later["r5"]["image_completion_ratio"]), (12, 2.0))
+        self.assertEqual((later["r6"]["cache_tokens"], later["r6"]["task_id"]), (0, "t-9"))
+        # The malformed line reads as an all-NULL row, like the JsonSerDe
+        self.assertIsNone(rows[None]["created_at"])
+
+        manifest = json.loads((self.dest / "_manifest" / f"{DAY}.json").read_text())
+        self.assertEqual((manifest["day"], manifest["rows"]), (DAY, 7))
+        self.assertEqual(usage_compaction.list_compacted_days(str(self.dest)), {DAY})
+
+        # Re-running rewrites the day instead of appending
+        usage_compaction.compact_day(DAY, str(self.dest), str(self.src))
+        self.assertEqual(len(list(self.dest.rglob("*.parquet"))), 2)
+
+    def test_pending_compacts_only_closed_days_once(self):
+        calls = []
+        real = usage_compaction._compact_day_local
+
+        def spy(day, location, source_dir):
+            calls.append(day)
+            if day == "2026-05-02":
+                raise OSError("boom")
+            return real(day, location, source_dir)
+
+        with mock.patch.object(usage_compaction, "COMPACT_GRACE_HOURS", 2), \
+                mock.patch.object(usage_compaction, "_compact_day_local", spy):
+            early = datetime(2026, 5, 5, 1, 0, tzinfo=timezone.utc)
+            self.assertEqual(usage_compaction.closed_days(early, 3), ["2026-05-02", "2026-05-03"])
+            results = usage_compaction.compact_pending(3, early, str(self.dest), str(self.src))
+            self.assertEqual([r["day"] for r in results], ["2026-05-02", DAY])
+            self.assertIn("error", results[0])
+            self.assertEqual(usage_compaction.list_compacted_days(str(self.dest)), {DAY})
+
+            later = datetime(2026, 5, 5, 2, 0, tzinfo=timezone.utc)
+            calls.clear()
+            usage_compaction.compact_pending(3, later, str(self.dest), str(self.src))
+            self.assertEqual(calls, ["2026-05-02", "2026-05-04"])
+
+    def test_routing_provider_reads_manifest_when_enabled(self):
+        usage_compaction.compact_day(DAY, str(self.dest), str(self.src))
+        with mock.patch.object(usage_compaction, "COMPACT_LOCATION", str(self.dest)):
+            usage_compaction._invalidate_manifest_cache()
+            with mock.patch.object(usage_compaction, "COMPACT_ENABLED", False):
+                self.assertEqual(usage_compaction.compacted_days(), frozenset())
+            with mock.patch.object(usage_compaction, "COMPACT_ENABLED", True):
+                self.assertEqual(usage_compaction.compacted_days(), {DAY})
+                shutil.rmtree(self.dest / "_manifest")
+                self.assertEqual(usage_compaction.compacted_days(), {DAY})  # cached
+                usage_compaction._invalidate_manifest_cache()
+                self.assertEqual(usage_compaction.compacted_days(), frozenset())
+        usage_compaction._invalidate_manifest_cache()
+
+
+class TryCastTest(unittest.TestCase):
+    def test_matches_athena_try_cast(self):
+        fields = usage_compaction._other_fields(json.dumps({
+            "cache_tokens": 1.5, "cache_creation_tokens": " 42 ", "actual_quota": True,
+            "tiered_input_price": "x", "image_ratio": 2, "billing_event": {"nested": 1},
+            "task_id": False}))
+        self.assertEqual((fields["cache_tokens"], fields["cache_creation_tokens"], fields["actual_quota"]),
+                         (None, 42, None))
+        self.assertEqual((fields["tiered_input_price"], fields["image_ratio"]), (None, 2.0))
+        self.assertEqual((fields["billing_event"], fields["task_id"]), (None, "false"))
+        self.assertEqual((fields["cw_5m"], fields["cw_1h"], fields["cw_remaining"]), (0, 0, 0))
+        self.assertIsNone(usage_compaction._other_fields("not json")["cache_tokens"])
+        self.assertIsNone(usage_compaction._other_fields(None)["billing_event"])
+
+
+class _FakePaginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(k for k in self.s3.objects if k.startswith(Prefix))
+        yield {"Contents": [{"Key": k} for k in keys]}
+
+
+class _FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.ops = []
+
+    def get_paginator(self, name):
+        return _FakePaginator(self)
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+        self.ops.append(("delete_objects", len(Delete["Objects"])))
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[Key] = Body
+        self.ops.append(("put", Key))
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+        self.ops.append(("delete", Key))
+
+
+class AthenaCompactionTest(unittest.TestCase):
+    def test_unload_replaces_day_and_registers_manifest(self):
+        import athena_engine
+        s3 = _FakeS3()
+        s3.objects = {"usage-logs-compact/2026/05/03/hour=00/old.parquet": b"",
+                      "usage-logs-compact/_manifest/2026-05-03.json": b"{}",
+                      "usage-logs-compact/2026/05/30/hour=00/keep.parquet": b""}
+        sqls = []
+
+        def fake_run_query(sql):
+            sqls.append(sql)
+            s3.ops.append(("unload", None))
+            return {"scanned_bytes": 123, "exec_ms": 45}
+
+        with mock.patch.object(athena_engine, "_get_s3", lambda: s3), \
+                mock.patch.object(athena_engine, "run_query", fake_run_query):
+            info = usage_compaction.compact_day(DAY, "s3://ezmodel-log/usage-logs-compact")
+
+        self.assertEqual(s3.ops, [("delete", "usage-logs-compact/_manifest/2026-05-03.json"),
+                                  ("delete_objects", 1),
+                                  ("unload", None),
+                                  ("put", "usage-logs-compact/_manifest/2026-05-03.json")])
+        self.assertIn("usage-logs-compact/2026/05/30/hour=00/keep.parquet", s3.objects)
+        self.assertEqual(info["scanned_bytes"], 123)
+
+        sql = sqls[0]
+        self.assertIn("TO 's3://ezmodel-log/usage-logs-compact/2026/05/03/'", sql)
+        self.assertIn("partitioned_by = ARRAY['hour']", sql)
+        self.assertIn("WHERE year = '2026' AND month = '05' AND day = '03'", sql)
+        self.assertIn("SELECT DISTINCT", sql)
+        for column in queries.COMPACT_COLUMNS:
+            self.assertRegex(sql, rf"\b{column}\b")
+        self.assertTrue(sql.split("FROM (")[0].rstrip().endswith("hour"))
+
+        with mock.patch.object(athena_engine, "_get_s3", lambda: s3):
+            self.assertEqual(usage_compaction.list_compacted_days("s3://ezmodel-log/usage-logs-compact"),
+                             {DAY})
+
+
+_CTE_BUILDERS = [
+    ("monthly_bill_by_user", {}),
+    ("monthly_bill_by_user_model", {}),
+    ("monthly_bill_full", {"user_id": 7}),
+    ("daily_trend", {}),
+    ("daily_trend_by_model", {}),
+    ("model_ranking", {}),
+    ("channel_summary", {}),
+    ("kpi_summary", {}),
+]
+
+
+class RoutingTest(unittest.TestCase):
+    def tearDown(self):
+        queries.set_compacted_days_provider(None)
+
+    def _route(self, days):
+        queries.set_compacted_days_provider(lambda: days)
+
+    def test_untouched_without_compacted_days(self):
+        self._route(set())
+        for name, kwargs in _CTE_BUILDERS:
+            builder = getattr(queries, name)
+            sql = builder("2026-05", start_day="2026-05-02", end_day="2026-05-04", **kwargs)
+            self.assertEqual(sql, builder.__wrapped__("2026-05", start_day="2026-05-02",
+                                                      end_day="2026-05-04", **kwargs), name)
+
+    def test_fully_compacted_range_reads_only_parquet(self):
+        self._route({"2026-05-02", "2026-05-03", "2026-05-04"})
+        for name, kwargs in _CTE_BUILDERS:
+            sql = getattr(queries, name)("2026-05", start_day="2026-05-02", end_day="2026-05-04", **kwargs)
+            self.assertIn("FROM ezmodel_logs.usage_logs_compact", sql, name)
+            self.assertNotIn("FROM ezmodel_logs.usage_logs\n", sql, name)
+            self.assertNotIn("json_extract_scalar", sql, name)
+            self.assertIn("day IN ('02', '03', '04')", sql, name)
+
+        sql = queries.raw_usage_detail_daily("2026-05", "03", channel_ids=[4, 3])
+        self.assertIn("FROM ezmodel_logs.usage_logs_compact\nWHERE year = '2026'", sql)
+        self.assertNotIn("json_extract_scalar", sql)
+
+    def test_partially_compacted_range_unions_json_days(self):
+        self._route({"2026-05-03"})
+        sql = queries.monthly_bill_full("2026-05", start_day="2026-05-02", end_day="2026-05-04")
+        self.assertIn("UNION ALL", sql)
+        self.assertIn("FROM ezmodel_logs.usage_logs_compact", sql)
+        self.assertIn("AND day IN ('03')", sql)
+        self.assertIn("AND day IN ('02', '04')", sql)
+        main = sql.split("FROM usage_logs_dedup")[0].split("\n)\n", 1)[1]
+        self.assertNotIn("json_extract_scalar", main)
+        # Detail queries switch only when every day they read is compacted
+        self.assertIn("FROM ezmodel_logs.usage_logs\n",
+                      queries.raw_usage_detail_daily("2026-05", "04"))
+
+    def test_unparsed_or_non_distinct_queries_are_left_alone(self):
+        self._route({f"2026-05-{d:02d}" for d in range(1, 32)})
+        for sql in (queries.hourly_distribution("2026-05", "3"),
+                    queries.cache_hit_rate_by_user("2026-05"),
+                    queries.duplicate_billing("2026-05")):
+            self.assertNotIn("usage_logs_compact", sql)
+        self.assertIn("usage_logs_compact", queries.top_users("2026-05"))
+        self.assertNotIn("usage_logs_compact", queries.top_users("2026-06"))
+
+    def test_cross_month_range_pins_days_to_their_month(self):
+        self._route({"2026-05-01"})
+        sql = queries.usage_summary_by_created_at_range(
+            int(datetime(2026, 4, 30, 20, tzinfo=timezone.utc).timestamp()),
+            int(datetime(2026, 5, 2, tzinfo=timezone.utc).timestamp()))
+        self.assertIn("AND ((year = '2026' AND month = '05' AND day IN ('01')))", sql)
+        self.assertIn("AND ((year = '2026' AND month = '04' AND day IN ('30')))", sql)
+
+
+@unittest.skipIf(duckdb is None, "duckdb not installed")
+class DuckDBEquivalenceTest(unittest.TestCase):
+    """Run the Athena SQL in DuckDB over the JSON source and the compacted Parquet."""
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        src, dest = self.dir / "usage-logs", self.dir / "compact"
+        _sample_source(src)
+        usage_compaction.compact_day(DAY, str(dest), str(src))
+        self.db = _duckdb_usage_logs(src, dest)
+
+    def tearDown(self):
+        self.db.close()
+        queries.set_compacted_days_provider(None)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _rows(self, sql):
+        return sorted(self.db.execute(sql).fetchall(), key=repr)
+
+    def test_routed_queries_match_json_queries(self):
+        cases = [
+            ("monthly_bill_full", ("2026-05",), {"start_day": "2026-05-03", "end_day": "2026-05-04"}),
+            ("monthly_bill_by_user_model", ("2026-05",), {"start_day": "2026-05-03", "end_day": "2026-05-04"}),
+            ("daily_trend", ("2026-05",), {"start_day": "2026-05-03", "end_day": "2026-05-04"}),
+            ("kpi_summary", ("2026-05",), {"start_time": "2026-05-03 00:00", "end_time": "2026-05-03 04:59"}),
+            ("raw_usage_detail_daily", ("2026-05", "03"), {}),
+            ("usage_summary_by_created_at_range",
+             (int(datetime(2026, 4, 30, 20, tzinfo=timezone.utc).timestamp()),
+              int(datetime(2026, 5, 3, 6, tzinfo=timezone.utc).timestamp())), {}),
+            ("monthly_bill_full", ("2026-05",), {"start_time": "2026-05-03 00:00",
+                                                 "end_time": "2026-05-03 12:59",
+                                                 "time_zone_offset_hours": 8}),
+        ]
+        for name, args, kwargs in cases:
+            builder = getattr(queries, name)
+            expected = self._rows(builder.__wrapped__(*args, **kwargs))
+            self.assertTrue(expected, name)
+            queries.set_compacted_days_provider(lambda: {DAY})
+            routed = builder(*args, **kwargs)
+            self.assertIn("usage_logs_compact", routed, name)
+            self.assertEqual(self._rows(routed), expected, name)
+            queries.set_compacted_days_provider(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
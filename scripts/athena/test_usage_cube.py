@@ -0,0 +1,214 @@
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import athena_engine
+import queries
+import usage_compaction
+import usage_cube
+from test_usage_compaction import _duckdb_usage_logs, _sample_source, duckdb
+
+
+NOW = datetime(2026, 5, 5, 10, 0, tzinfo=timezone.utc)
+
+
+def _days_in(sql: str) -> list[str]:
+    listed = re.search(r"\bday IN \(([^)]*)\)", sql).group(1)
+    return re.findall(r"'(\d{2})'", listed)
+
+
+def _fake_cube(sql: str) -> pd.DataFrame:
+    """One cube row per requested day."""
+    rows = []
+    for day in _days_in(sql):
+        row = {c: 1 for c in usage_cube.MEASURES}
+        row.update(day=int(day), user_id=7, username="u7", channel_id=3, token_name="default",
+                   model_name="claude-sonnet-4", total_quota=500000)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=list(usage_cube.DIMENSIONS + usage_cube.MEASURES))
+
+
+class RefreshTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.location = str(self.dir / "cube")
+        self.sql = []
+        usage_cube._closed_frames.clear()
+
+    def tearDown(self):
+        usage_cube._closed_frames.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _load(self, now=NOW, **kwargs):
+        def fake_run_query_df(sql):
+            self.sql.append(sql)
+            return _fake_cube(sql)
+        with mock.patch.object(athena_engine, "run_query_df", fake_run_query_df), \
+                mock.patch.object(usage_compaction, "COMPACT_GRACE_HOURS", 2):
+            return usage_cube.load_month("2026-05", now=now, location=self.location, **kwargs)
+
+    def test_closed_days_are_built_once(self):
+        cube = self._load()
+        self.assertEqual(len(self.sql), 1)
+        self.assertEqual(_days_in(self.sql[0]), ["01", "02", "03", "04", "05"])
+        self.assertEqual(sorted(cube["day"]), [f"2026-05-0{d}" for d in range(1, 6)])
+
+        # Narrower range, same process or a fresh one: no new query
+        cube = self._load(start_day="2026-05-03", end_day="2026-05-04")
+        self.assertEqual(sorted(cube["day"]), ["2026-05-03", "2026-05-04"])
+        usage_cube._closed_frames.clear()
+        self._load()
+        self.assertEqual(len(self.sql), 1)
+
+        # Only today expires after USAGE_CUBE_OPEN_TTL
+        self._load(now=NOW + timedelta(seconds=usage_cube.CUBE_OPEN_TTL))
+        self.assertEqual(len(self.sql), 2)
+        self.assertEqual(_days_in(self.sql[1]), ["05"])
+
+        # Once today closes it is rebuilt one last time, then left alone
+        later = datetime(2026, 5, 6, 3, 0, tzinfo=timezone.utc)
+        self._load(now=later)
+        self.assertEqual(_days_in(self.sql[2]), ["05", "06"])
+        self._load(now=later, end_day="2026-05-05")
+        self.assertEqual(len(self.sql), 3)
+
+        # no_cache rebuilds the requested days only
+        self._load(now=later, start_day="2026-05-02", end_day="2026-05-03", no_cache=True)
+        self.assertEqual(_days_in(self.sql[3]), ["02", "03"])
+
+    def test_checkpoints_are_keyed_by_version(self):
+        self._load(end_day="2026-05-02")
+        self.assertTrue((Path(self.location) / f"v{usage_cube.CUBE_VERSION}" / "2026/05/01.parquet").exists())
+        with mock.patch.object(usage_cube, "CUBE_VERSION", "changed"):
+            self._load(end_day="2026-05-02")
+        self.assertEqual(len(self.sql), 2)
+        self.assertEqual(_days_in(self.sql[1]), ["01", "02"])
+        self._load(end_day="2026-05-02")
+        self.assertEqual(len(self.sql), 2)
+
+    def test_empty_days_are_recorded(self):
+        def fake_run_query_df(sql):
+            self.sql.append(sql)
+            return pd.DataFrame()
+        with mock.patch.object(athena_engine, "run_query_df", fake_run_query_df):
+            cube = usage_cube.load_month("2026-04", now=NOW, location=self.location)
+            self.assertTrue(cube.empty)
+            usage_cube.load_month("2026-04", now=NOW, location=self.location)
+        self.assertEqual(len(self.sql), 1)
+        kpi = usage_cube.kpi_summary(cube).iloc[0]
+        self.assertEqual((kpi["total_calls"], kpi["total_usd"]), (0, 0.0))
+
+    def test_serves_day_granularity_only(self):
+        with mock.patch.object(usage_cube, "CUBE_ENABLED", True):
+            self.assertTrue(usage_cube.serves(None, None))
+            self.assertFalse(usage_cube.serves("2026-05-01 00:00", "2026-05-02 23:59"))
+        with mock.patch.object(usage_cube, "CUBE_ENABLED", False):
+            self.assertFalse(usage_cube.serves(None, None))
+        with mock.patch.object(usage_cube, "CUBE_ENABLED", True), \
+                mock.patch.dict("os.environ", {"ATHENA_E2E_MODE": "fixture"}):
+            self.assertFalse(usage_cube.serves(None, None))
+
+    def test_monthly_bill_uses_exact_queries(self):
+        import report_builder
+        sql = []
+        with mock.patch.object(usage_cube, "CUBE_ENABLED", True), \
+                mock.patch.object(usage_cube, "load_month", side_effect=AssertionError("cube read")), \
+                mock.patch.object(report_builder, "run_query_cached",
+                                  lambda q, **kw: sql.append(q) or pd.DataFrame()):
+            report_builder.generate_monthly_bill("2026-05", str(self.dir), end_day="2026-05-04")
+        self.assertEqual(len(sql), 3)
+        self.assertIn("COUNT(DISTINCT", sql[0])
+
+
+class CacheTtlTest(unittest.TestCase):
+    def test_closed_days_of_current_month_are_permanent(self):
+        now = datetime.now(timezone.utc)
+        ym = now.strftime("%Y-%m")
+        today = now.strftime("%Y-%m-%d")
+        self.assertEqual(athena_engine._infer_cache_ttl(queries.kpi_summary(ym)), 3600)
+        self.assertEqual(athena_engine._infer_cache_ttl(
+            queries.kpi_summary(ym, start_day=today, end_day=today)), 600)
+        if now.day > 2:
+            closed = f"{ym}-01"
+            self.assertIsNone(athena_engine._infer_cache_ttl(
+                queries.kpi_summary(ym, start_day=closed, end_day=closed)))
+            self.assertIsNone(athena_engine._infer_cache_ttl(
+                queries.usage_cube_daily(ym, [closed])))
+
+
+@unittest.skipIf(duckdb is None, "duckdb not installed")
+class DuckDBEquivalenceTest(unittest.TestCase):
+    """Widgets derived from the cube match the widget SQL run in DuckDB."""
+
+    WIDGETS = [
+        ("kpi_summary", "kpi_summary"),
+        ("monthly_bill_by_user", "bill_by_user"),
+        ("monthly_bill_by_user_model", "bill_by_user_model"),
+        ("monthly_bill_full", "bill_full"),
+        ("daily_trend", "daily_trend"),
+        ("daily_trend_by_model", "daily_trend_by_model"),
+        ("model_ranking", "model_ranking"),
+        ("channel_summary", "channel_summary"),
+    ]
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        src = self.dir / "usage-logs"
+        _sample_source(src)
+        self.db = _duckdb_usage_logs(src)
+        usage_cube._closed_frames.clear()
+
+    def tearDown(self):
+        self.db.close()
+        usage_cube._closed_frames.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _df(self, sql):
+        return athena_engine._auto_convert_types(self.db.execute(sql).df())
+
+    def _normalized(self, df):
+        df = df.reset_index(drop=True)
+        return df.sort_values(list(df.columns), kind="mergesort").reset_index(drop=True)
+
+    def test_widgets_match_sql(self):
+        ranges = [{}, {"start_day": "2026-05-03", "end_day": "2026-05-03"},
+                  {"start_day": "2026-05-04"}]
+        with mock.patch.object(athena_engine, "run_query_df", self._df):
+            for kwargs in ranges:
+                cube = usage_cube.load_month("2026-05", now=NOW,
+                                             location=str(self.dir / "cube"), **kwargs)
+                for builder, widget in self.WIDGETS:
+                    expected = self._df(getattr(queries, builder).__wrapped__("2026-05", **kwargs))
+                    derived = getattr(usage_cube, widget)(cube)
+                    self.assertEqual(list(derived.columns), list(expected.columns), builder)
+                    pd.testing.assert_frame_equal(
+                        self._normalized(derived), self._normalized(expected),
+                        check_dtype=False, obj=f"{builder} {kwargs}")
+
+    def test_filtered_bills_match_sql(self):
+        filters = [{"user_id": 8}, {"channel_id": 3}, {"channel_ids": [3, 4], "user_id": 7}]
+        widgets = [("monthly_bill_full", "bill_full"), ("daily_trend", "daily_trend"),
+                   ("daily_trend_by_model", "daily_trend_by_model")]
+        with mock.patch.object(athena_engine, "run_query_df", self._df):
+            cube = usage_cube.load_month("2026-05", now=NOW, location=str(self.dir / "cube"))
+        for kwargs in filters:
+            for builder, widget in widgets:
+                expected = self._df(getattr(queries, builder).__wrapped__("2026-05", **kwargs))
+                self.assertFalse(expected.empty, builder)
+                derived = getattr(usage_cube, widget)(usage_cube.filter_cube(cube, **kwargs))
+                pd.testing.assert_frame_equal(
+                    self._normalized(derived), self._normalized(expected),
+                    check_dtype=False, obj=f"{builder} {kwargs}")
+
+
+if __name__ == "__main__":
+    unittest.main()
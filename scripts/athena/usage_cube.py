@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+usage_logs 日汇总立方体 — 仪表盘概览组件与月初至今预览的按日检查点
+
+概览页的 KPI、用户账单、用户×模型、每日趋势、模型排行、渠道汇总、利润分析，
+以及日报的月初至今部分、KPI 预览，原本各自对整月的行做一次 Athena GROUP BY。这里改为
+每个 UTC 日物化一份 day × user × channel × token × model 的汇总
+（queries.usage_cube_daily），存成 Parquet：
+
+    {location}/v{CUBE_VERSION}/YYYY/MM/DD.parquet
+    {location}/v{CUBE_VERSION}/YYYY/MM/_index.json   # day → {built_at, closed, rows}
+
+CUBE_VERSION 是汇总 SQL 与列定义的摘要：口径（去重、后付费额度、缓存拆分等）
+一变就换目录，旧检查点不会混入新口径。
+
+各组件由 pandas 从立方体派生，列名、取整和排序与对应 SQL 一致。增量刷新规则：
+  - 已关闭的日（usage_compaction.is_closed）构建一次后不再查询，视为不可变；
+  - 未关闭的日超过 USAGE_CUBE_OPEN_TTL 秒重建；
+  - 一次刷新把所有过期日合并成一条 Athena 查询。
+所以切换日期范围只读本地/S3 的 Parquet；月中预览只扫描今天和仍未关闭的日。
+
+限制：call_count 按单元格（日/用户/渠道/模型）去重后相加，跨单元格的同一
+request_id 会各算一次，所以对外账单（report_builder.generate_monthly_bill）
+始终走精确的 COUNT(DISTINCT) 查询，不读立方体；带时分精度
+（start_time / end_time）的请求也不走立方体。
+因此「只计算新的一天」只适用于仪表盘、日报和 KPI 预览：月初至今的账单仍扫描
+区间内已过的每一天，只有全部落在已关闭日上的账单查询会被永久缓存
+（athena_engine._infer_cache_ttl）。要让账单也增量计算，需要按日保存能精确
+合并 call_count 的粒度（每个单元格的逻辑调用 ID 集合），目前没有做。
+agent-workbench 的 e2e 夹具模式（ATHENA_E2E_MODE=fixture）只模拟
+run_query_cached，此时也不走立方体。
+
+用法:
+    python usage_cube.py --month 2026-03                 # 刷新整月（只查过期的日）
+    python usage_cube.py --month 2026-03 --start-day 2026-03-01 --end-day 2026-03-07
+    python usage_cube.py --month 2026-03 --rebuild       # 忽略已有结果重建
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import queries
+from usage_compaction import _is_s3, _s3_key, _split_s3, is_closed
+from logging_config import get_logger
+
+logger = get_logger("usage_cube")
+
+CUBE_ENABLED = os.getenv("USAGE_CUBE_ENABLED", "1").lower() in ("1", "true", "yes")
+CUBE_LOCATION = os.getenv("USAGE_CUBE_LOCATION", "s3://ezmodel-log/usage-cube").rstrip("/")
+# 未关闭日（今天、刚结束的昨天）的重建间隔
+CUBE_OPEN_TTL = int(os.getenv("USAGE_CUBE_OPEN_TTL", "600"))
+
+INDEX_NAME = "_index.json"
+QUOTA_PER_USD = 500000.0
+
+DIMENSIONS = ("day", "user_id", "username", "channel_id", "token_name", "model_name")
+MEASURES = (
+    "row_count", "call_count",
+    "total_input_tokens", "total_output_tokens", "total_quota",
+    "total_cache_hit_tokens", "total_cache_write_tokens",
+    "total_cw_5m", "total_cw_1h", "total_cw_remaining",
+    "total_image_output_tokens", "total_image_input_tokens",
+    "total_use_time_seconds", "use_time_count", "stream_count",
+)
+
+# 检查点口径版本：汇总 SQL（未改写到压缩表的原文）+ 列定义
+CUBE_VERSION = hashlib.sha256(
+    (queries.usage_cube_daily.__wrapped__("2000-01", ["2000-01-01"])
+     + repr(DIMENSIONS + MEASURES)).encode("utf-8")).hexdigest()[:12]
+
+_lock = threading.Lock()
+# 已关闭日的立方体不会再变，进程内常驻：{(location, version, day): DataFrame}
+_closed_frames: dict = {}
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+def _month_dir(year_month: str) -> str:
+    year, month = queries._year_month(year_month)
+    return f"v{CUBE_VERSION}/{year}/{month}"
+
+
+def _read_bytes(location: str, relpath: str) -> bytes | None:
+    if _is_s3(location):
+        from athena_engine import _get_s3
+        bucket, prefix = _split_s3(location)
+        s3 = _get_s3()
+        try:
+            return s3.get_object(Bucket=bucket, Key=_s3_key(prefix, relpath))["Body"].read()
+        except s3.exceptions.NoSuchKey:
+            return None
+    path = Path(location) / relpath
+    return path.read_bytes() if path.exists() else None
+
+
+def _write_bytes(location: str, relpath: str, body: bytes) -> None:
+    if _is_s3(location):
+        from athena_engine import _get_s3
+        bucket, prefix = _split_s3(location)
+        _get_s3().put_object(Bucket=bucket, Key=_s3_key(prefix, relpath), Body=body)
+        return
+    path = Path(location) / relpath
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(body)
+    tmp.replace(path)
+
+
+def _read_index(location: str, year_month: str) -> dict:
+    body = _read_bytes(location, f"{_month_dir(year_month)}/{INDEX_NAME}")
+    if not body:
+        return {}
+    try:
+        index = json.loads(body)
+    except ValueError:
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _write_index(location: str, year_month: str, index: dict) -> None:
+    body = json.dumps(index, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    _write_bytes(location, f"{_month_dir(year_month)}/{INDEX_NAME}", body)
+
+
+def _day_relpath(day: str) -> str:
+    return f"v{CUBE_VERSION}/{day[:4]}/{day[5:7]}/{day[8:]}.parquet"
+
+
+def _empty_cube() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(DIMENSIONS + MEASURES))
+
+
+def _write_day(location: str, day: str, frame: pd.DataFrame) -> None:
+    buffer = io.BytesIO()
+    frame.reset_index(drop=True).to_parquet(buffer, index=False)
+    _write_bytes(location, _day_relpath(day), buffer.getvalue())
+
+
+def _read_day(location: str, day: str) -> pd.DataFrame:
+    body = _read_bytes(location, _day_relpath(day))
+    if body is None:
+        return _empty_cube()
+    return pd.read_parquet(io.BytesIO(body))
+
+
+# ---------------------------------------------------------------------------
+# Refresh
+# ---------------------------------------------------------------------------
+
+def month_days(year_month: str, start_day: str = None, end_day: str = None,
+               now: datetime = None) -> list[str]:
+    """UTC days within [start_day, end_day], up to today.
+
+    The range defaults to year_month and must start in it; end_day may run
+    into a later month (a billing period from the 15th to the 14th).
+    """
+    year, month = queries._year_month(year_month)
+    if start_day:
+        queries._validate_start_day(start_day, year_month)
+    if end_day:
+        queries._validate_end_day(end_day, year_month, cross_month=True)
+    now = now or datetime.now(timezone.utc)
+    today = now.strftime("%Y-%m-%d")
+    first = datetime(int(year), int(month), 1)
+    day = datetime.strptime(start_day, "%Y-%m-%d") if start_day else first
+    last = (datetime.strptime(end_day, "%Y-%m-%d") if end_day
+            else (first + timedelta(days=31)).replace(day=1) - timedelta(days=1))
+    days = []
+    while day <= last:
+        text = day.strftime("%Y-%m-%d")
+        if text > today:
+            break
+        days.append(text)
+        day += timedelta(days=1)
+    return days
+
+
+def _by_month(days: list[str]) -> dict[str, list[str]]:
+    months = {}
+    for day in days:
+        months.setdefault(day[:7], []).append(day)
+    return months
+
+
+def _is_stale(entry: dict | None, day: str, now: datetime) -> bool:
+    if not entry:
+        return True
+    if entry.get("closed"):
+        return False
+    if is_closed(day, now):
+        return True
+    try:
+        built = datetime.strptime(entry["built_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return True
+    return (now - built).total_seconds() >= CUBE_OPEN_TTL
+
+
+def refresh(year_month: str, days: list[str], no_cache: bool = False,
+            now: datetime = None, location: str = None) -> list[str]:
+    """Rebuild the stale days among days with one Athena query; returns them."""
+    import athena_engine
+    location = (location or CUBE_LOCATION).rstrip("/")
+    now = now or datetime.now(timezone.utc)
+    with _lock:
+        index = _read_index(location, year_month)
+        stale = [d for d in days if no_cache or _is_stale(index.get(d), d, now)]
+        if not stale:
+            return []
+        started = time.monotonic()
+        df = athena_engine.run_query_df(queries.usage_cube_daily(year_month, stale))
+        scanned = df.attrs.get("scanned_bytes", 0)
+        if df.empty:
+            df = _empty_cube()
+        built_at = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        by_day = {int(d): frame for d, frame in df.groupby("day")} if len(df) else {}
+        for day in stale:
+            frame = by_day.get(int(day[8:]), df.iloc[0:0])
+            _write_day(location, day, frame)
+            closed = is_closed(day, now)
+            index[day] = {"built_at": built_at, "closed": closed, "rows": int(len(frame))}
+            if closed:
+                _closed_frames[(location, CUBE_VERSION, day)] = frame.reset_index(drop=True)
+            else:
+                _closed_frames.pop((location, CUBE_VERSION, day), None)
+        _write_index(location, year_month, index)
+    logger.info("Usage cube refreshed", extra={
+        "event": "usage_cube_refresh", "year_month": year_month, "days": len(stale),
+        "rows": int(len(df)), "scanned_bytes": scanned,
+        "duration_ms": int((time.monotonic() - started) * 1000)})
+    return stale
+
+
+def load_month(year_month: str, start_day: str = None, end_day: str = None,
+               no_cache: bool = False, now: datetime = None,
+               location: str = None) -> pd.DataFrame:
+    """Cube rows for [start_day, end_day] (see month_days), refreshing stale days first.
+
+    The day column of the result is the full date 'YYYY-MM-DD', as in
+    queries.daily_trend, so a range running into the next month stays apart.
+    """
+    location = (location or CUBE_LOCATION).rstrip("/")
+    days = month_days(year_month, start_day, end_day, now)
+    if not days:
+        return _empty_cube()
+    for month_key, listed in _by_month(days).items():
+        refresh(month_key, listed, no_cache=no_cache, now=now, location=location)
+    frames = []
+    for day in days:
+        frame = _closed_frames.get((location, CUBE_VERSION, day))
+        if frame is None:
+            frame = _read_day(location, day)
+            if is_closed(day, now):
+                _closed_frames[(location, CUBE_VERSION, day)] = frame
+        if len(frame):
+            frames.append(frame.assign(day=day))
+    if not frames:
+        return _empty_cube()
+    return pd.concat(frames, ignore_index=True)
+
+
+def serves(start_time: str = None, end_time: str = None) -> bool:
+    """Whether a request can be answered from the cube (day granularity only)."""
+    if os.getenv("ATHENA_E2E_MODE", "").lower() == "fixture":
+        return False
+    return CUBE_ENABLED and start_time is None and end_time is None
+
+
+def filter_cube(cube: pd.DataFrame, user_id: int = None, channel_id: int = None,
+                channel_ids: list[int] = None) -> pd.DataFrame:
+    """Same row filters as the builders' user_id / _channel_where arguments."""
+    if user_id is not None:
+        cube = cube[cube["user_id"] == int(user_id)]
+    ids = sorted({int(x) for x in channel_ids or [] if x is not None})
+    if ids:
+        cube = cube[cube["channel_id"].isin(ids)]
+    elif channel_id is not None:
+        cube = cube[cube["channel_id"] == int(channel_id)]
+    return cube.reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# Widgets (same columns / rounding / order as the queries.py builders)
+# ---------------------------------------------------------------------------
+
+def _round(values, digits: int):
+    """ROUND as in Trino: half away from zero."""
+    scale = 10.0 ** digits
+    values = np.asarray(values, dtype="float64")
+    return np.sign(values) * np.floor(np.abs(values) * scale + 0.5) / scale
+
+
+def _usd(quota, digits: int):
+    return _round(quota / QUOTA_PER_USD, digits)
+
+
+def _group(cube: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    # min_count=1: a group of NULLs sums to NULL, as in SQL
+    return cube.groupby(keys, dropna=False, sort=False)[list(MEASURES)].sum(min_count=1).reset_index()
+
+
+def _sort(df: pd.DataFrame, by: list[str], ascending: list[bool]) -> pd.DataFrame:
+    return df.sort_values(by, ascending=ascending, kind="mergesort").reset_index(drop=True)
+
+
+def kpi_summary(cube: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame([{
+        "total_calls": int(cube["row_count"].sum()),
+        "unique_users": int(cube["user_id"].nunique()),
+        "unique_models": int(cube["model_name"].nunique()),
+        "total_input_tokens": int(cube["total_input_tokens"].sum()),
+        "total_output_tokens": int(cube["total_output_tokens"].sum()),
+        "total_quota": int(cube["total_quota"].sum()),
+        "total_usd": float(_usd(cube["total_quota"].sum(), 2)),
+    }])
+
+
+def bill_by_user(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.monthly_bill_by_user"""
+    df = _group(cube, ["user_id", "username"])
+    df["total_tokens"] = df["total_input_tokens"] + df["total_output_tokens"]
+    df["total_usd"] = _usd(df["total_quota"], 4)
+    df = df[["user_id", "username", "call_count", "total_input_tokens",
+             "total_output_tokens", "total_tokens", "total_quota", "total_usd"]]
+    return _sort(df, ["total_usd"], [False])
+
+
+def bill_by_user_model(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.monthly_bill_by_user_model"""
+    df = _group(cube, ["user_id", "username", "model_name"])
+    df["total_usd"] = _usd(df["total_quota"], 4)
+    df = df[["user_id", "username", "model_name", "call_count", "total_input_tokens",
+             "total_output_tokens", "total_quota", "total_usd"]]
+    return _sort(df, ["user_id", "total_usd"], [True, False])
+
+
+def bill_full(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.monthly_bill_full"""
+    df = _group(cube, ["user_id", "username", "channel_id", "model_name"])
+    df["total_usd"] = _usd(df["total_quota"], 4)
+    df = df[["user_id", "username", "channel_id", "model_name", "call_count",
+             "total_input_tokens", "total_output_tokens", "total_quota", "total_usd",
+             "total_cache_hit_tokens", "total_cache_write_tokens",
+             "total_cw_5m", "total_cw_1h", "total_cw_remaining",
+             "total_image_output_tokens", "total_image_input_tokens"]]
+    return _sort(df, ["user_id", "total_usd"], [True, False])
+
+
+def daily_trend(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.daily_trend"""
+    df = _group(cube, ["day"])
+    df["total_tokens"] = df["total_input_tokens"] + df["total_output_tokens"]
+    df["total_usd"] = _usd(df["total_quota"], 4)
+    df = df[["day", "call_count", "total_tokens", "total_cache_hit_tokens",
+             "total_cache_write_tokens", "total_cw_5m", "total_cw_1h",
+             "total_cw_remaining", "total_quota", "total_usd"]]
+    return _sort(df, ["day"], [True])
+
+
+def daily_trend_by_model(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.daily_trend_by_model"""
+    df = _group(cube, ["day", "token_name", "model_name"])
+    df["total_tokens"] = df["total_input_tokens"] + df["total_output_tokens"]
+    df["total_usd"] = _usd(df["total_quota"], 4)
+    df = df[["day", "token_name", "model_name", "call_count", "total_input_tokens",
+             "total_output_tokens", "total_tokens", "total_cache_hit_tokens",
+             "total_cache_write_tokens", "total_cw_5m", "total_cw_1h",
+             "total_cw_remaining", "total_quota", "total_usd"]]
+    return _sort(df, ["day", "token_name", "total_usd"], [True, True, False])
+
+
+def model_ranking(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.model_ranking"""
+    df = _group(cube, ["model_name"])
+    df["total_tokens"] = df["total_input_tokens"] + df["total_output_tokens"]
+    df["total_usd"] = _usd(df["total_quota"], 2)
+    latency = df["total_use_time_seconds"] / df["use_time_count"].replace(0, np.nan)
+    df["avg_latency_sec"] = _round(latency, 1)
+    df["stream_pct"] = _round(df["stream_count"] * 100.0 / df["row_count"], 1)
+    df = df[["model_name", "call_count", "total_tokens", "total_usd",
+             "avg_latency_sec", "stream_pct"]]
+    return _sort(df, ["total_usd"], [False])
+
+
+def channel_summary(cube: pd.DataFrame) -> pd.DataFrame:
+    """queries.channel_summary"""
+    grouped = cube.groupby("channel_id", dropna=False, sort=False)
+    df = grouped[["call_count", "total_quota"]].sum(min_count=1)
+    df["model_count"] = grouped["model_name"].nunique()
+    df["user_count"] = grouped["user_id"].nunique()
+    df = df.reset_index()
+    df["total_usd"] = _usd(df["total_quota"], 2)
+    df = df[["channel_id", "call_count", "model_count", "user_count", "total_usd"]]
+    return _sort(df, ["total_usd"], [False])
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="usage_logs 日汇总立方体刷新")
+    parser.add_argument("--month", required=True, help="YYYY-MM")
+    parser.add_argument("--start-day", default=None, help="YYYY-MM-DD（含）")
+    parser.add_argument("--end-day", default=None, help="YYYY-MM-DD（含）")
+    parser.add_argument("--rebuild", action="store_true", help="忽略已有结果，全部重建")
+    parser.add_argument("--location", default=None,
+                        help=f"立方体位置，s3://... 或本地目录（默认 {CUBE_LOCATION}）")
+    args = parser.parse_args()
+
+    days = month_days(args.month, args.start_day, args.end_day)
+    rebuilt = []
+    for month_key, listed in _by_month(days).items():
+        rebuilt += refresh(month_key, listed, no_cache=args.rebuild, location=args.location)
+    print(json.dumps({"month": args.month, "days": len(days), "rebuilt": rebuilt},
+                     ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,187 +1,166 @@
 """
 从 MySQL SQL 备份（.sql.gz）中解析 logs 表数据并导入 SQLite。
-一次性读入内存 + 正则定位 INSERT 块 + Python 状态机拆分行（与第一轮相同逻辑）。
+使用 athena/sql_dump_reader 流式读取：按固定缓冲区解压、字节正则拆分元组，
+id 增量过滤在反转义之前完成，内存占用与备份大小无关。
+
+并行模式（--workers N，默认 CPU 数）: 主进程切分 INSERT 语句片段，
+N 个子进程解析为行批次，单一写连接按大事务写入；写入期间暂时删除
+logs 上的二级索引、放宽 PRAGMA，结束后重建索引。
+
+用法:
+    python import_sql_to_sqlite.py [--db dump.sql.gz] [--sqlite logs.db] [--workers 8]
 """
-import gzip
-import re
+import argparse
+import os
 import sqlite3
+import sys
 import time
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "athena"))
+from sql_dump_reader import (DEFAULT_CHUNK_BYTES, LOGS_COLUMNS, iter_insert_segments,
+                             parse_segment_job, parse_values_segment)
 
 SQL_GZ_PATH = "e:/new-api/data/new-api_2026032513132199gwf.sql.gz"
 SQLITE_PATH = "e:/new-api/scripts/logs_analysis.db"
 
+COMMIT_EVERY_ROWS = 500_000
+PROGRESS_EVERY_SECONDS = 10.0
 
-def unescape_mysql_string(s):
-    return (s
-            .replace("\\'", "'")
-            .replace('\\"', '"')
-            .replace("\\\\", "\\")
-            .replace("\\n", "\n")
-            .replace("\\r", "\r")
-            .replace("\\t", "\t")
-            .replace("\\0", "\0"))
+_PARSE_STAT_KEYS = ("tuples", "rows", "filtered", "malformed")
 
 
-def parse_value(token):
-    token = token.strip()
-    if token == 'NULL':
-        return None
-    if token.startswith("'") and token.endswith("'"):
-        return unescape_mysql_string(token[1:-1])
-    try:
-        if '.' in token:
-            return float(token)
-        return int(token)
-    except ValueError:
-        return token
-
-
-def split_values_row(row_str):
-    fields = []
-    current = []
-    in_string = False
-    escape = False
-    for c in row_str:
-        if escape:
-            current.append(c)
-            escape = False
-        elif c == '\\' and in_string:
-            current.append(c)
-            escape = True
-        elif c == "'" and not in_string:
-            in_string = True
-            current.append(c)
-        elif c == "'" and in_string:
-            in_string = False
-            current.append(c)
-        elif c == ',' and not in_string:
-            fields.append(''.join(current).strip())
-            current = []
-        else:
-            current.append(c)
-    if current:
-        fields.append(''.join(current).strip())
-    return fields
-
-
-def parse_rows_from_values(values_str):
-    rows = []
-    depth = 0
-    in_string = False
-    escape = False
-    start = -1
-    i = 0
-    while i < len(values_str):
-        c = values_str[i]
-        if escape:
-            escape = False
-        elif c == '\\' and in_string:
-            escape = True
-        elif c == "'" and not in_string:
-            in_string = True
-        elif c == "'" and in_string:
-            in_string = False
-        elif c == '(' and not in_string:
-            if depth == 0:
-                start = i + 1
-            depth += 1
-        elif c == ')' and not in_string:
-            depth -= 1
-            if depth == 0 and start >= 0:
-                rows.append(values_str[start:i])
-                start = -1
-        i += 1
-    return rows
-
-
-def find_logs_insert_block(gz_path):
-    print(f"[*] 读取 {gz_path} ...")
-    with gzip.open(gz_path, 'rt', encoding='utf-8', errors='replace') as f:
-        content = f.read()
-
-    print("[*] 定位 logs INSERT 块 ...")
-    lock_idx = content.find("LOCK TABLES `logs` WRITE")
-    if lock_idx < 0:
-        print("[!] 未找到 logs 表数据块")
-        return []
+def _merge_stats(stats, part):
+    for key in _PARSE_STAT_KEYS:
+        stats[key] = stats.get(key, 0) + part.get(key, 0)
 
-    unlock_idx = content.find("UNLOCK TABLES", lock_idx)
-    logs_block = content[lock_idx:unlock_idx]
-    print(f"[*] logs 数据块大小: {len(logs_block)/1024/1024:.1f} MB")
 
-    insert_pattern = re.compile(r"INSERT INTO `logs` VALUES\s*(.+?);", re.DOTALL)
-    matches = insert_pattern.findall(logs_block)
-    print(f"[*] 找到 {len(matches)} 个 INSERT 语句")
-    return matches
+def iter_parsed_segments(gz_path, min_id, workers=1, chunk_bytes=DEFAULT_CHUNK_BYTES, stats=None):
+    """Yield row lists in dump order, parsed in-process or by ``workers`` processes.
 
+    At most ``2 * workers`` segments are in flight, so memory stays bounded
+    whatever the dump size.
+    """
+    stats = {} if stats is None else stats
+    segments = iter_insert_segments(gz_path, chunk_bytes=chunk_bytes, stats=stats)
+    if workers <= 1:
+        for segment in segments:
+            yield parse_values_segment(segment, min_id=min_id, stats=stats)
+        return
 
-def import_to_sqlite(gz_path, sqlite_path):
-    conn = sqlite3.connect(sqlite_path)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for segment in segments:
+            pending.append(pool.submit(parse_segment_job, segment, {"min_id": min_id}))
+            if len(pending) >= 2 * workers:
+                rows, part = pending.popleft().result()
+                _merge_stats(stats, part)
+                yield rows
+        while pending:
+            rows, part = pending.popleft().result()
+            _merge_stats(stats, part)
+            yield rows
+
+
+def _drop_secondary_indexes(conn):
+    """Drop explicit indexes on logs and return their CREATE statements."""
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'logs' AND sql IS NOT NULL").fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in indexes]
+
+
+def import_to_sqlite(gz_path, sqlite_path, workers=1, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                     defer_indexes=True):
+    conn = sqlite3.connect(sqlite_path, isolation_level=None)
     conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA synchronous=NORMAL")
     cur = conn.cursor()
 
     cur.execute("SELECT MAX(id) FROM logs")
     max_existing_id = cur.fetchone()[0] or 0
     print(f"[*] SQLite 中现有最大 id: {max_existing_id:,}")
 
-    insert_blocks = find_logs_insert_block(gz_path)
-    if not insert_blocks:
-        print("[!] 没有找到数据，退出")
-        conn.close()
-        return
-
-    total_inserted = 0
-    total_skipped = 0
-    total_rows = 0
-
-    print("[*] 开始解析并导入 ...")
+    # Bulk-load settings; synchronous is restored once the load finishes
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+
+    index_sqls = []
+    if defer_indexes:
+        conn.execute("BEGIN")
+        index_sqls = _drop_secondary_indexes(conn)
+        conn.execute("COMMIT")
+        if index_sqls:
+            print(f"[*] 暂时删除 {len(index_sqls)} 个索引，导入后重建")
+
+    mode = f"{workers} 个解析进程" if workers > 1 else "单进程"
+    print(f"[*] 流式读取 {gz_path} ({mode}) ...")
+    stats = {}
+    insert_sql = f"INSERT OR REPLACE INTO logs VALUES ({','.join('?' * len(LOGS_COLUMNS))})"
     t0 = time.time()
+    last_report = t0
+    pending_rows = 0
 
-    for block_idx, values_str in enumerate(insert_blocks):
-        rows = parse_rows_from_values(values_str)
-
-        batch = []
-        for row_str in rows:
-            fields = split_values_row(row_str)
-            if len(fields) != 19:
-                continue
-
-            total_rows += 1
-
-            try:
-                row_id = int(fields[0].strip())
-            except ValueError:
-                row_id = 0
+    def report(tag):
+        elapsed = max(time.time() - t0, 1e-9)
+        mb = stats.get("bytes_read", 0) / 1024 / 1024
+        print(f"  {tag}: 已读 {mb:,.0f} MB, 已解析 {stats.get('tuples', 0):,} 行, "
+              f"导入 {stats.get('rows', 0):,}, 跳过 {stats.get('filtered', 0):,} "
+              f"({elapsed:.1f}s, {stats.get('tuples', 0) / elapsed:,.0f} rows/s, {mb / elapsed:,.1f} MB/s)")
 
-            if row_id <= max_existing_id:
-                total_skipped += 1
-                continue
-
-            batch.append([parse_value(f) for f in fields])
+    try:
+        conn.execute("BEGIN")
+        for rows in iter_parsed_segments(gz_path, max_existing_id, workers=workers,
+                                         chunk_bytes=chunk_bytes, stats=stats):
+            if rows:
+                cur.executemany(insert_sql, rows)
+                pending_rows += len(rows)
+            if pending_rows >= COMMIT_EVERY_ROWS:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN")
+                pending_rows = 0
+            if time.time() - last_report >= PROGRESS_EVERY_SECONDS:
+                report("进度")
+                last_report = time.time()
+        conn.execute("COMMIT")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if index_sqls:
+            t_idx = time.time()
+            conn.execute("BEGIN")
+            for sql in index_sqls:
+                conn.execute(sql)
+            conn.execute("COMMIT")
+            print(f"[*] 重建 {len(index_sqls)} 个索引 ({time.time() - t_idx:.1f}s)")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.close()
 
-        if batch:
-            cur.executemany(
-                "INSERT OR REPLACE INTO logs VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-                batch
-            )
-            total_inserted += len(batch)
+    if not stats.get("statements"):
+        print("[!] 未找到 logs 表数据块")
+    if stats.get("malformed"):
+        print(f"[!] 列数不符的行: {stats['malformed']:,}")
 
-        if (block_idx + 1) % 10 == 0 or block_idx == len(insert_blocks) - 1:
-            conn.commit()
-            elapsed = time.time() - t0
-            print(f"  块 {block_idx+1}/{len(insert_blocks)}: "
-                  f"已解析 {total_rows:,} 行, 导入 {total_inserted:,}, 跳过 {total_skipped:,} "
-                  f"({elapsed:.1f}s)")
+    print()
+    report("[完成]")
+    return stats
 
-    conn.commit()
-    conn.close()
 
-    elapsed = time.time() - t0
-    print(f"\n[完成] 总计解析 {total_rows:,} 行, 导入 {total_inserted:,} 条新记录, "
-          f"跳过 {total_skipped:,} 条已存在记录, 耗时 {elapsed:.1f}s")
+def main():
+    parser = argparse.ArgumentParser(description="Import logs rows from a MySQL dump into SQLite")
+    parser.add_argument("--db", default=SQL_GZ_PATH, help="SQL backup path (.sql.gz or .sql)")
+    parser.add_argument("--sqlite", default=SQLITE_PATH, help="SQLite database with a logs table")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Parser processes (1 = parse in the writer process)")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="Keep logs indexes during the load instead of rebuilding them afterwards")
+    args = parser.parse_args()
+    import_to_sqlite(args.db, args.sqlite, workers=args.workers,
+                     defer_indexes=not args.keep_indexes)
 
 
 if __name__ == "__main__":
-    import_to_sqlite(SQL_GZ_PATH, SQLITE_PATH)
+    main()
@@ -0,0 +1,73 @@
+"""
+usage_parser 微基准: extract_usage（SSE 嗅探 + 反向扫描）对比 extract_usage_full（全量合并）
+
+记录由 fixtures/sse 语料放大而来: 在内容块区域重复插入 delta，模拟长输出流。
+
+Usage:
+    python bench_usage_parser.py
+    python bench_usage_parser.py --chunks 50 2000 20000 --records 500
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import usage_parser  # noqa: E402
+
+_FIXTURES = Path(__file__).resolve().parent / "fixtures" / "sse"
+
+
+def _inflate(body: str, chunks: int) -> str:
+    """Repeat the first content delta line ``chunks`` times (keeps usage chunks intact)."""
+    lines = body.split("\n")
+    for i, line in enumerate(lines):
+        if line.startswith("data:") and ('"text_delta"' in line or '"content":"' in line
+                                         or '"delta":{"text"' in line):
+            sep = "\r\n" if line.endswith("\r") else "\n\n"
+            filler = (line.rstrip("\r") + sep) * chunks
+            return "\n".join(lines[:i]) + "\n" + filler + "\n".join(lines[i:])
+    return body
+
+
+def make_records(chunks: int, count: int) -> list:
+    corpus = [p.read_text(encoding="utf-8") for p in sorted(_FIXTURES.glob("*.txt"))]
+    bodies = [_inflate(body, chunks) for body in corpus]
+    return [{"response_body": bodies[i % len(bodies)], "status_code": 200} for i in range(count)]
+
+
+def _rate(fn, records, min_seconds=1.0):
+    n = 0
+    t0 = time.perf_counter()
+    while True:
+        for rec in records:
+            fn(rec)
+        n += len(records)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_seconds:
+            return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE usage extraction (records/sec)")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[20, 500, 5000],
+                        help="Content deltas inserted per stream")
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--min-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'avg KB':>8} {'full rec/s':>12} {'fast rec/s':>12} {'speedup':>8}")
+    for chunks in args.chunks:
+        records = make_records(chunks, args.records)
+        for rec in records:
+            assert usage_parser.extract_usage(rec) == usage_parser.extract_usage_full(rec)
+        avg_kb = sum(len(r["response_body"]) for r in records) / len(records) / 1024
+        full = _rate(usage_parser.extract_usage_full, records, args.min_seconds)
+        fast = _rate(usage_parser.extract_usage, records, args.min_seconds)
+        print(f"{chunks:>8} {avg_kb:>8.1f} {full:>12,.0f} {fast:>12,.0f} {fast / full:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
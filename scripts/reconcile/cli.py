@@ -42,9 +42,11 @@ def parse_args():
     p.add_argument("--workers", type=int, default=10,
                    help="并发下载线程数，默认 10")
     p.add_argument("--processes", type=int, default=0,
-                   help="并发进程数，默认 0（禁用；建议大量小文件时设置为 CPU 核数）")
-    p.add_argument("--process-threads", type=int, default=4,
-                   help="每个进程内部的下载线程数，默认 4")
+                   help="解压/解析进程数，默认 0（主线程解析，与下载重叠；大量文件时建议设置为 CPU 核数）")
+    p.add_argument("--max-pending", type=int, default=0,
+                   help="流水线在途文件数上限（背压），默认 0 按线程/进程数自动估算")
+    # 旧参数：下载已统一由 --workers 线程完成，保留以兼容已有命令行
+    p.add_argument("--process-threads", type=int, default=4, help=argparse.SUPPRESS)
     p.add_argument("--cache-dir", type=str, default=".cache",
                    help="本地缓存目录，缓存已下载的 S3 文件（默认 .cache）")
     p.add_argument("--no-cache", action="store_true",
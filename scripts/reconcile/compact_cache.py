@@ -0,0 +1,199 @@
+"""
+压缩日缓存（compacted day）
+
+首次解析某个 S3 前缀/日期的原始日志时，把已提取的字段（request_id、模型、
+渠道、用户、状态码、token 明细、错误分类等）按列写入
+``<cache_dir>/_compacted/<kind>/<prefix>/YYYY/MM/DD.arrow``（Arrow IPC 文件）。
+之后同一天的对账直接 memory-map 该文件，不再解压、orjson 解析响应体。
+文件不压缩，数值列直接来自映射的缓冲区，交给调用方的是 numpy 列。
+
+文件元数据记录当天对象列表（key + ETag + 大小）的指纹；S3 列表变化（当天
+仍在写入的新对象、同名对象被重新上传）或格式版本变化时视为失效并重新生成。
+只有当天所有对象都成功读取时才落盘。
+
+未安装 pyarrow 时全部退化为空操作（始终走原始解析路径）。
+"""
+
+import hashlib
+import os
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+from usage_parser import extract_usage
+
+COMPACT_DIR = "_compacted"
+COMPACT_VERSION = "2"
+
+USAGE_TOKEN_FIELDS = [
+    "input_tokens", "output_tokens", "cache_read_tokens", "cache_creation_tokens",
+    "cache_creation_5m_tokens", "cache_creation_1h_tokens", "web_search_requests",
+]
+
+
+def usage_schema():
+    """Schema of the ``usage`` kind (reconcile / db_checks)."""
+    return pa.schema(
+        [
+            ("request_id", pa.string()),
+            ("created_at", pa.string()),
+            ("model", pa.string()),
+            ("channel_id", pa.int64()),
+            ("channel_name", pa.string()),
+            ("user_id", pa.int64()),
+            ("status_code", pa.int64()),
+            ("usage_ok", pa.bool_()),
+            ("error_class", pa.string()),
+        ]
+        + [(name, pa.int64()) for name in USAGE_TOKEN_FIELDS]
+    )
+
+
+def as_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def usage_columns(records):
+    """Extract the ``usage`` kind columns from raw records (one extract_usage each)."""
+    cols = {name: [] for name in ("request_id", "created_at", "model", "channel_id", "channel_name",
+                                  "user_id", "status_code", "usage_ok", "error_class")}
+    for name in USAGE_TOKEN_FIELDS:
+        cols[name] = []
+    for rec in records:
+        usage, fail_reason = extract_usage(rec)
+        cols["request_id"].append(rec.get("request_id", "") or "")
+        cols["created_at"].append(rec.get("created_at", "") or "")
+        cols["model"].append(rec.get("model", "unknown"))
+        cols["channel_id"].append(as_int(rec.get("channel_id", 0)))
+        cols["channel_name"].append(rec.get("channel_name"))
+        cols["user_id"].append(as_int(rec.get("user_id", 0)))
+        cols["status_code"].append(as_int(rec.get("status_code", 0)))
+        cols["usage_ok"].append(usage is not None)
+        cols["error_class"].append(fail_reason)
+        for name in USAGE_TOKEN_FIELDS:
+            cols[name].append(usage.get(name, 0) if usage is not None else 0)
+    return cols
+
+
+def column_count(cols):
+    return len(next(iter(cols.values()))) if cols else 0
+
+
+def concat_columns(batches):
+    """Concatenate column dicts with the same fields ({} when there are none)."""
+    batches = [cols for cols in batches if column_count(cols)]
+    if not batches:
+        return {}
+    if len(batches) == 1:
+        return batches[0]
+    return {name: [v for cols in batches for v in cols[name]] for name in batches[0]}
+
+
+def usage_from_columns(cols, i):
+    """Rebuild the normalize_usage() dict of row ``i`` (None if unparseable)."""
+    if not cols["usage_ok"][i]:
+        return None
+    return {name: int(cols[name][i]) for name in USAGE_TOKEN_FIELDS}
+
+
+def compact_path(cache_dir, kind, s3_prefix):
+    return os.path.join(cache_dir, COMPACT_DIR, kind, s3_prefix.strip("/") + ".arrow")
+
+
+def keys_fingerprint(keys):
+    """sha256 of the day's objects: key strings or ``(key, etag, size)`` entries.
+
+    ETag and size make a re-uploaded object (same key) invalidate the day.
+    """
+    digest = hashlib.sha256()
+    entries = [(k, "", "") if isinstance(k, str) else tuple(k) for k in keys]
+    for key, etag, size in sorted(entries, key=lambda e: e[0]):
+        digest.update(f"{key}\t{etag or ''}\t{'' if size is None else size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_compacted(cache_dir, kind, s3_prefix, keys, schema_fn):
+    """Memory-map the compacted day, or None when missing / stale / unreadable.
+
+    The file is uncompressed IPC, so the returned table's buffers point into
+    the mapping rather than onto the heap. ``keys`` are the day's object
+    keys or ``(key, etag, size)`` entries (see :func:`keys_fingerprint`);
+    ``schema_fn`` returns the kind's schema (e.g. :func:`usage_schema`).
+    """
+    if pa is None or not cache_dir:
+        return None
+    path = compact_path(cache_dir, kind, s3_prefix)
+    if not os.path.exists(path):
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        meta = reader.schema.metadata or {}
+        if (meta.get(b"compact_version") != COMPACT_VERSION.encode()
+                or meta.get(b"keys_sha256") != keys_fingerprint(keys).encode()
+                or not reader.schema.remove_metadata().equals(schema_fn())):
+            return None
+        return reader.read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def table_columns(table):
+    """Arrow table → dict of numpy columns (Python lists without numpy).
+
+    Numeric columns are read from the mapped buffers (one concatenation when
+    the day was written in several batches); only string columns become
+    Python objects. Index values are numpy scalars: wrap them in int() before
+    they reach output rows.
+    """
+    try:
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    except ImportError:  # pragma: no cover - pyarrow without numpy
+        return {name: table.column(name).to_pylist() for name in table.column_names}
+
+
+class CompactDayWriter:
+    """Append per-object column batches; ``commit`` publishes the day atomically."""
+
+    def __init__(self, cache_dir, kind, s3_prefix, keys, schema):
+        self.path = compact_path(cache_dir, kind, s3_prefix)
+        self.tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.schema = schema.with_metadata({
+            "compact_version": COMPACT_VERSION,
+            "kind": kind,
+            "keys_sha256": keys_fingerprint(keys),
+            "key_count": str(len(keys)),
+        })
+        self.rows = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Uncompressed on purpose: readers memory-map the buffers as-is
+        self._writer = pa.ipc.new_file(self.tmp_path, self.schema)
+
+    def write(self, cols):
+        n = column_count(cols)
+        if not n:
+            return
+        self._writer.write_batch(pa.RecordBatch.from_pydict(cols, schema=self.schema))
+        self.rows += n
+
+    def commit(self):
+        self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def open_writer(cache_dir, kind, s3_prefix, keys, schema_fn):
+    """A CompactDayWriter, or None when caching is disabled or pyarrow is missing."""
+    if pa is None or not cache_dir or not keys:
+        return None
+    return CompactDayWriter(cache_dir, kind, s3_prefix, keys, schema_fn())
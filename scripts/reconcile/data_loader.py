@@ -38,7 +38,8 @@ def _get_thread_client(region, endpoint):
     return client
 
 
-def list_s3_objects(s3, bucket, prefix):
+def list_s3_entries(s3, bucket, prefix):
+    """``(key, etag, size)`` for every object under prefix."""
     objects = []
     token = None
     while True:
@@ -47,14 +48,18 @@ def list_s3_objects(s3, bucket, prefix):
             kw["ContinuationToken"] = token
         resp = s3.list_objects_v2(**kw)
         for obj in resp.get("Contents", []):
-            objects.append(obj["Key"])
+            objects.append((obj["Key"], obj.get("ETag"), obj.get("Size")))
         if not resp.get("IsTruncated"):
             break
         token = resp["NextContinuationToken"]
     return objects
 
 
-def _parse_gzip_data(raw):
+def list_s3_objects(s3, bucket, prefix):
+    return [key for key, _, _ in list_s3_entries(s3, bucket, prefix)]
+
+
+def parse_gzip_data(raw):
     data = gzip.decompress(raw)
     records = []
     for line in data.decode("utf-8", errors="replace").strip().split("\n"):
@@ -71,12 +76,13 @@ def _get_cache_path(cache_dir, key):
     return os.path.join(cache_dir, key)
 
 
-def download_and_parse(s3, bucket, key, cache_dir=None):
+def fetch_raw(s3, bucket, key, cache_dir=None):
+    """Raw (still gzipped) object bytes, from the local cache when present."""
     if cache_dir:
         cache_path = _get_cache_path(cache_dir, key)
         if os.path.exists(cache_path):
             with open(cache_path, "rb") as f:
-                return _parse_gzip_data(f.read())
+                return f.read()
 
     resp = s3.get_object(Bucket=bucket, Key=key)
     raw = resp["Body"].read()
@@ -87,7 +93,11 @@ def download_and_parse(s3, bucket, key, cache_dir=None):
         with open(cache_path, "wb") as f:
             f.write(raw)
 
-    return _parse_gzip_data(raw)
+    return raw
+
+
+def download_and_parse(s3, bucket, key, cache_dir=None):
+    return parse_gzip_data(fetch_raw(s3, bucket, key, cache_dir=cache_dir))
 
 
 def prioritize_cached_keys(keys, cache_dir=None):
@@ -109,6 +119,6 @@ def download_one(region, endpoint, bucket, key, cache_dir=None):
         cache_path = _get_cache_path(cache_dir, key)
         if os.path.exists(cache_path):
             with open(cache_path, "rb") as f:
-                return _parse_gzip_data(f.read())
+                return parse_gzip_data(f.read())
     client = _get_thread_client(region, endpoint)
     return download_and_parse(client, bucket, key, cache_dir=cache_dir)
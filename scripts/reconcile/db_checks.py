@@ -321,8 +321,8 @@ def run_raw_detail_cross_check(
         print(f"错误: DB 文件不存在: {db_path}", file=sys.stderr)
         sys.exit(1)
 
-    from data_loader import download_and_parse, get_s3_client, list_s3_objects
-    from usage_parser import extract_usage
+    import compact_cache
+    from data_loader import download_and_parse, get_s3_client, list_s3_entries
 
     date_obj = datetime.strptime(date_str, "%Y-%m-%d")
     day_start = int(date_obj.timestamp())
@@ -364,9 +364,11 @@ def run_raw_detail_cross_check(
     keys = []
     if not use_cache_only:
         s3 = get_s3_client(region, endpoint)
-        keys = list_s3_objects(s3, bucket, s3_prefix)
+        entries = list_s3_entries(s3, bucket, s3_prefix)
+        keys = [k for k, _, _ in entries]
     else:
         keys = [k for k, _ in cached_entries]
+        entries = keys
 
     raw_counter = Counter()
     raw_req_samples = defaultdict(list)
@@ -375,55 +377,82 @@ def run_raw_detail_cross_check(
     raw_parse_fail = 0
     raw_download_fail = 0
 
-    total_keys = len(keys)
-    t0 = datetime.now()
-    if total_keys:
-        print(f"      开始扫描原始明细文件: {total_keys:,} 个")
-    for idx, key in enumerate(keys, 1):
-        records = None
-        if use_cache_only:
-            cache_path = os.path.join(cache_dir, key) if cache_dir else None
-            if not cache_path or not os.path.exists(cache_path):
-                raw_download_fail += 1
-                continue
-            records = _parse_cached_gzip_file(cache_path)
-        else:
-            try:
-                records = download_and_parse(s3, bucket, key, cache_dir=cache_dir)
-            except Exception:
-                raw_download_fail += 1
-                continue
-        for rec in records:
+    def _consume_columns(cols):
+        nonlocal raw_total, raw_usage_ok, raw_parse_fail
+        created_at = cols["created_at"]
+        request_ids = cols["request_id"]
+        for i in range(compact_cache.column_count(cols)):
             raw_total += 1
-            usage, _ = extract_usage(rec)
-            if usage is None:
+            if not cols["usage_ok"][i]:
                 raw_parse_fail += 1
                 continue
             raw_usage_ok += 1
 
-            ts = _parse_raw_created_at_to_epoch(rec.get("created_at"))
+            ts = _parse_raw_created_at_to_epoch(created_at[i])
             if ts is None:
                 continue
             key_tuple = (
-                rec.get("user_id", 0),
-                rec.get("model", "unknown"),
-                usage.get("input_tokens", 0),
-                usage.get("output_tokens", 0),
+                int(cols["user_id"][i]),
+                cols["model"][i],
+                int(cols["input_tokens"][i]),
+                int(cols["output_tokens"][i]),
                 ts // bucket_sec,
             )
             raw_counter[key_tuple] += 1
-            rid = rec.get("request_id", "")
+            rid = request_ids[i]
             if rid and len(raw_req_samples[key_tuple]) < 3:
                 raw_req_samples[key_tuple].append(rid)
-        if idx % 200 == 0 or idx == total_keys:
-            elapsed = (datetime.now() - t0).total_seconds()
-            speed = idx / elapsed if elapsed > 0 else 0.0
-            print(
-                f"      进度: {idx:,}/{total_keys:,} 文件 "
-                f"({idx / max(total_keys, 1) * 100:.1f}%), "
-                f"{speed:.1f} 文件/s",
-                flush=True,
-            )
+
+    total_keys = len(keys)
+    t0 = datetime.now()
+    scan_keys = keys
+    compact_writer = None
+    compacted = compact_cache.load_compacted(cache_dir, "usage", s3_prefix, entries, compact_cache.usage_schema)
+    if compacted is not None:
+        print(f"      压缩缓存命中: {compacted.num_rows:,} 条原始记录")
+        _consume_columns(compact_cache.table_columns(compacted))
+        scan_keys = []
+    else:
+        if total_keys:
+            print(f"      开始扫描原始明细文件: {total_keys:,} 个")
+        compact_writer = compact_cache.open_writer(cache_dir, "usage", s3_prefix, entries, compact_cache.usage_schema)
+    try:
+        for idx, key in enumerate(scan_keys, 1):
+            records = None
+            if use_cache_only:
+                cache_path = os.path.join(cache_dir, key) if cache_dir else None
+                if not cache_path or not os.path.exists(cache_path):
+                    raw_download_fail += 1
+                    continue
+                records = _parse_cached_gzip_file(cache_path)
+            else:
+                try:
+                    records = download_and_parse(s3, bucket, key, cache_dir=cache_dir)
+                except Exception:
+                    raw_download_fail += 1
+                    continue
+            cols = compact_cache.usage_columns(records)
+            if compact_writer is not None:
+                compact_writer.write(cols)
+            _consume_columns(cols)
+            if idx % 200 == 0 or idx == total_keys:
+                elapsed = (datetime.now() - t0).total_seconds()
+                speed = idx / elapsed if elapsed > 0 else 0.0
+                print(
+                    f"      进度: {idx:,}/{total_keys:,} 文件 "
+                    f"({idx / max(total_keys, 1) * 100:.1f}%), "
+                    f"{speed:.1f} 文件/s",
+                    flush=True,
+                )
+    except BaseException:
+        if compact_writer is not None:
+            compact_writer.abort()
+        raise
+    if compact_writer is not None:
+        if raw_download_fail:
+            compact_writer.abort()
+        else:
+            compact_writer.commit()
 
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
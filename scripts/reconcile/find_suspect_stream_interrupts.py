@@ -27,6 +27,7 @@ from datetime import datetime, timedelta
 
 import boto3
 
+import compact_cache
 
 NORMAL_END_EVENTS = {
     "done",
@@ -119,8 +120,20 @@ def parse_args():
         default=None,
         help="导出用户/来源归纳 CSV",
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=".cache",
+        help="本地缓存目录（相对脚本目录），存放按天压缩的特征文件，默认 .cache",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="禁用压缩缓存，每次重新解析")
     parser.add_argument("--verbose", action="store_true")
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.no_cache:
+        args.cache_dir = None
+    elif not os.path.isabs(args.cache_dir):
+        args.cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), args.cache_dir)
+    return args
 
 
 def get_s3_client(region, endpoint):
@@ -135,7 +148,8 @@ def get_s3_client(region, endpoint):
     return boto3.client("s3", **kwargs)
 
 
-def list_s3_objects(s3, bucket, prefix):
+def list_s3_entries(s3, bucket, prefix):
+    """``(key, etag, size)`` for every object under prefix."""
     objects = []
     token = None
     while True:
@@ -144,7 +158,7 @@ def list_s3_objects(s3, bucket, prefix):
             kwargs["ContinuationToken"] = token
         resp = s3.list_objects_v2(**kwargs)
         for obj in resp.get("Contents", []):
-            objects.append(obj["Key"])
+            objects.append((obj["Key"], obj.get("ETag"), obj.get("Size")))
         if not resp.get("IsTruncated"):
             break
         token = resp["NextContinuationToken"]
@@ -367,56 +381,50 @@ def match_filters(record, user_ids=None, channel_ids=None, models=None):
     return True
 
 
-def detect_suspect(record, args):
-    if not request_stream_flag(record):
-        return None
+def _empty_stream_meta():
+    return {
+        "has_sse_data": False,
+        "has_done_marker": False,
+        "has_usage": False,
+        "has_error": False,
+        "normal_end": False,
+        "content_chunks": 0,
+        "data_events": 0,
+        "json_parse_errors": 0,
+        "finish_reasons": set(),
+    }
 
-    status_code = int(record.get("status_code") or 0)
-    if status_code and status_code >= 400:
-        return None
 
+def stream_features(record):
+    """与阈值参数无关的判定特征（也是压缩缓存 stream 类型的一行）。
+
+    base_score / base_reasons 不含 --truncation-threshold 的扣分；
+    只有 base_score > 0 的行保留 response_error / body_preview 文本。
+    """
+    status_code = compact_cache.as_int(record.get("status_code") or 0)
     body = record.get("response_body", "") or ""
     response_error = record.get("response_error", "") or ""
+    is_stream = request_stream_flag(record)
+    eligible = is_stream and not (status_code and status_code >= 400)
 
     score = 0
     reasons = []
-    if response_error:
-        score += 3
-        reasons.append("response_error 非空")
-
-    if not body:
-        score += 3
-        reasons.append("stream 请求响应体为空")
-        meta = {
-            "has_sse_data": False,
-            "has_done_marker": False,
-            "has_usage": False,
-            "has_error": False,
-            "normal_end": False,
-            "content_chunks": 0,
-            "data_events": 0,
-            "json_parse_errors": 0,
-            "finish_reasons": set(),
-        }
-    else:
-        if not looks_like_sse(body):
+    meta = _empty_stream_meta()
+    if eligible:
+        if response_error:
+            score += 3
+            reasons.append("response_error 非空")
+
+        if not body:
+            score += 3
+            reasons.append("stream 请求响应体为空")
+        elif not looks_like_sse(body):
             score += 2
             reasons.append("stream 请求但响应体不像 SSE")
-            meta = {
-                "has_sse_data": False,
-                "has_done_marker": False,
-                "has_usage": False,
-                "has_error": False,
-                "normal_end": False,
-                "content_chunks": 0,
-                "data_events": 0,
-                "json_parse_errors": 0,
-                "finish_reasons": set(),
-            }
         else:
             meta = inspect_stream_response(body)
             if meta["has_error"]:
-                return None
+                eligible = False
 
             if not meta["normal_end"]:
                 score += 2
@@ -438,8 +446,69 @@ def detect_suspect(record, args):
                 score += 1
                 reasons.append("SSE 片段存在 JSON 解析失败")
 
-    body_len = len(body)
-    possible_truncation = body_len >= args.truncation_threshold
+    keep_text = eligible and score > 0
+    return {
+        "request_id": record.get("request_id", "") or "",
+        "created_at": record.get("created_at", "") or "",
+        "user_id": compact_cache.as_int(record.get("user_id", 0)),
+        "channel_id": compact_cache.as_int(record.get("channel_id", 0)),
+        "channel_name": record.get("channel_name", "") or "",
+        "path": record.get("path", "") or "",
+        "model": record.get("model", "") or "",
+        "status_code": status_code,
+        "is_stream": is_stream,
+        "eligible": eligible,
+        "base_score": score,
+        "base_reasons": " | ".join(reasons),
+        "response_error": shorten_text(response_error, 160) if keep_text else "",
+        "body_len": len(body),
+        "body_preview": shorten_text(body, 200) if keep_text else "",
+        "has_done_marker": meta["has_done_marker"],
+        "has_usage": meta["has_usage"],
+        "normal_end": meta["normal_end"],
+        "content_chunks": meta["content_chunks"],
+        "data_events": meta["data_events"],
+        "json_parse_errors": meta["json_parse_errors"],
+        "finish_reasons": ",".join(sorted(meta["finish_reasons"])),
+    }
+
+
+def stream_schema():
+    """压缩缓存 stream 类型的 Arrow schema（字段与 stream_features 一致）。"""
+    pa = compact_cache.pa
+    return pa.schema([
+        ("request_id", pa.string()),
+        ("created_at", pa.string()),
+        ("user_id", pa.int64()),
+        ("channel_id", pa.int64()),
+        ("channel_name", pa.string()),
+        ("path", pa.string()),
+        ("model", pa.string()),
+        ("status_code", pa.int64()),
+        ("is_stream", pa.bool_()),
+        ("eligible", pa.bool_()),
+        ("base_score", pa.int64()),
+        ("base_reasons", pa.string()),
+        ("response_error", pa.string()),
+        ("body_len", pa.int64()),
+        ("body_preview", pa.string()),
+        ("has_done_marker", pa.bool_()),
+        ("has_usage", pa.bool_()),
+        ("normal_end", pa.bool_()),
+        ("content_chunks", pa.int64()),
+        ("data_events", pa.int64()),
+        ("json_parse_errors", pa.int64()),
+        ("finish_reasons", pa.string()),
+    ])
+
+
+def score_suspect(features, args):
+    if not features["eligible"]:
+        return None
+
+    score = features["base_score"]
+    reasons = features["base_reasons"].split(" | ") if features["base_reasons"] else []
+    possible_truncation = features["body_len"] >= args.truncation_threshold
     if possible_truncation:
         score -= 1
         reasons.append("响应体较长，可能因日志截断误判")
@@ -448,33 +517,38 @@ def detect_suspect(record, args):
         return None
 
     return {
-        "request_id": record.get("request_id", ""),
-        "created_at": record.get("created_at", ""),
-        "user_id": record.get("user_id", 0),
-        "source": build_source_label(record),
-        "channel_id": record.get("channel_id", 0),
-        "channel_name": record.get("channel_name", ""),
-        "path": record.get("path", ""),
-        "model": record.get("model", ""),
-        "status_code": status_code,
+        "request_id": features["request_id"],
+        "created_at": features["created_at"],
+        "user_id": features["user_id"],
+        "source": build_source_label(features),
+        "channel_id": features["channel_id"],
+        "channel_name": features["channel_name"],
+        "path": features["path"],
+        "model": features["model"],
+        "status_code": features["status_code"],
         "score": score,
         "reasons": " | ".join(dict.fromkeys(reasons)),
-        "response_error": shorten_text(response_error, 160),
-        "has_done_marker": meta["has_done_marker"],
-        "has_usage": meta["has_usage"],
-        "normal_end": meta["normal_end"],
-        "content_chunks": meta["content_chunks"],
-        "data_events": meta["data_events"],
-        "json_parse_errors": meta["json_parse_errors"],
-        "finish_reasons": ",".join(sorted(meta["finish_reasons"])),
+        "response_error": features["response_error"],
+        "has_done_marker": features["has_done_marker"],
+        "has_usage": features["has_usage"],
+        "normal_end": features["normal_end"],
+        "content_chunks": features["content_chunks"],
+        "data_events": features["data_events"],
+        "json_parse_errors": features["json_parse_errors"],
+        "finish_reasons": features["finish_reasons"],
         "possible_truncation": possible_truncation,
-        "body_preview": shorten_text(body, 200),
+        "body_preview": features["body_preview"],
     }
 
 
+def detect_suspect(record, args):
+    return score_suspect(stream_features(record), args)
+
+
 def collect_suspects_for_date(s3, args, date_str):
     prefix = f"{args.prefix}/{datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y/%m/%d')}/"
-    keys = list_s3_objects(s3, args.bucket, prefix)
+    entries = list_s3_entries(s3, args.bucket, prefix)
+    keys = [key for key, _, _ in entries]
     if args.verbose:
         print(f"[{date_str}] 匹配到 {len(keys)} 个对象")
 
@@ -488,31 +562,60 @@ def collect_suspects_for_date(s3, args, date_str):
     filtered_out = 0
     download_errors = 0
 
-    with ThreadPoolExecutor(max_workers=args.workers) as pool:
-        future_map = {
-            pool.submit(download_and_parse, s3, args.bucket, key): key
-            for key in keys
-        }
-        for future in as_completed(future_map):
-            key = future_map[future]
-            try:
-                records = future.result()
-            except Exception as exc:
-                download_errors += 1
-                if args.verbose:
-                    print(f"[{date_str}] 下载失败 {key}: {exc}")
+    def scan(feature_rows):
+        nonlocal total_records, stream_records, filtered_out
+        for features in feature_rows:
+            total_records += 1
+            if not match_filters(features, user_ids, channel_ids, models):
+                filtered_out += 1
                 continue
+            if features["is_stream"]:
+                stream_records += 1
+            suspect = score_suspect(features, args)
+            if suspect:
+                suspects.append(suspect)
+
+    cache_dir = getattr(args, "cache_dir", None)
+    scan_keys = keys
+    compact_writer = None
+    compacted = compact_cache.load_compacted(cache_dir, "stream", prefix, entries, stream_schema)
+    if compacted is not None:
+        if args.verbose:
+            print(f"[{date_str}] 压缩缓存命中: {compacted.num_rows} 条记录")
+        scan(compacted.to_pylist())
+        scan_keys = []
+    else:
+        compact_writer = compact_cache.open_writer(cache_dir, "stream", prefix, entries, stream_schema)
 
-            for record in records:
-                total_records += 1
-                if not match_filters(record, user_ids, channel_ids, models):
-                    filtered_out += 1
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            future_map = {
+                pool.submit(download_and_parse, s3, args.bucket, key): key
+                for key in scan_keys
+            }
+            for future in as_completed(future_map):
+                key = future_map[future]
+                try:
+                    records = future.result()
+                except Exception as exc:
+                    download_errors += 1
+                    if args.verbose:
+                        print(f"[{date_str}] 下载失败 {key}: {exc}")
                     continue
-                if request_stream_flag(record):
-                    stream_records += 1
-                suspect = detect_suspect(record, args)
-                if suspect:
-                    suspects.append(suspect)
+
+                feature_rows = [stream_features(record) for record in records]
+                if compact_writer is not None and feature_rows:
+                    compact_writer.write({name: [row[name] for row in feature_rows] for name in feature_rows[0]})
+                scan(feature_rows)
+    except BaseException:
+        if compact_writer is not None:
+            compact_writer.abort()
+        raise
+    if compact_writer is not None:
+        if download_errors:
+            compact_writer.abort()
+        else:
+            compact_writer.commit()
 
     return {
         "date": date_str,
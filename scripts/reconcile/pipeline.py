@@ -0,0 +1,114 @@
+"""
+对账流水线引擎: S3 拉取 → 解压 → 解析 → 聚合
+
+    拉取线程池 (I/O) ──► 待解析批次 ──► 解析进程池 (CPU) 或主线程 ──► consume()
+          ▲                                                          │
+          └──────────── 在途对象数 ≤ max_pending（背压）◄───────────┘
+
+- 拉取阶段只返回原始字节，解压和解析都在解析阶段完成；
+- 已拉取的对象按 batch_objects / batch_bytes 合批提交，解析进程空闲时
+  立即提交未满的批次，避免等待；
+- 在途对象（已提交拉取、尚未 consume）数量受 max_pending 限制，
+  内存占用与当天对象总数无关；
+- processes <= 1 时解析在主线程执行，仍与后台拉取重叠。
+
+job 必须是模块级函数（可被 pickle），签名为 ``job(blobs, *job_args)``，
+其中 blobs 为 ``[(key, raw_bytes), ...]``。
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+DEFAULT_BATCH_OBJECTS = 32
+DEFAULT_BATCH_BYTES = 8 * 1024 * 1024
+
+
+def default_max_pending(fetch_workers, processes, batch_objects=DEFAULT_BATCH_OBJECTS):
+    """Enough in-flight objects to keep every fetch thread and parse process busy."""
+    return max(2 * fetch_workers, 2 * batch_objects * max(processes, 1))
+
+
+def run_pipeline(keys, fetch, job, consume, on_error, job_args=(), fetch_workers=8, processes=0,
+                 max_pending=0, batch_objects=DEFAULT_BATCH_OBJECTS, batch_bytes=DEFAULT_BATCH_BYTES):
+    """Run ``fetch(key)`` on I/O threads and ``job(blobs, *job_args)`` on worker processes.
+
+    ``consume(result, batch_keys)`` and ``on_error(key, exc)`` always run on the
+    calling thread. A failed fetch, or a job that raises, reports ``on_error``
+    for each affected key; the pipeline keeps going.
+    """
+    fetch_workers = max(1, fetch_workers)
+    use_processes = processes and processes > 1
+    max_pending = max(max_pending or default_max_pending(fetch_workers, processes, batch_objects), 1)
+    key_iter = iter(keys)
+    fetching = {}
+    parsing = {}
+    batch = []
+    state = {"in_flight": 0, "batch_bytes": 0, "exhausted": False}
+
+    def submit_fetches():
+        while not state["exhausted"] and state["in_flight"] < max_pending:
+            key = next(key_iter, None)
+            if key is None:
+                state["exhausted"] = True
+                break
+            fetching[fetch_pool.submit(fetch, key)] = key
+            state["in_flight"] += 1
+
+    def flush():
+        if not batch:
+            return
+        blobs = list(batch)
+        batch.clear()
+        state["batch_bytes"] = 0
+        batch_keys = [key for key, _ in blobs]
+        if use_processes:
+            parsing[parse_pool.submit(job, blobs, *job_args)] = batch_keys
+            return
+        try:
+            result = job(blobs, *job_args)
+        except Exception as e:
+            state["in_flight"] -= len(batch_keys)
+            for key in batch_keys:
+                on_error(key, e)
+            return
+        state["in_flight"] -= len(batch_keys)
+        consume(result, batch_keys)
+
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers)
+    parse_pool = ProcessPoolExecutor(max_workers=processes) if use_processes else None
+    try:
+        submit_fetches()
+        while fetching or parsing or batch:
+            if batch and (not fetching or not use_processes or len(parsing) < processes):
+                flush()
+                submit_fetches()
+                continue
+            done, _ = wait(list(fetching) + list(parsing), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    key = fetching.pop(future)
+                    try:
+                        raw = future.result()
+                    except Exception as e:
+                        state["in_flight"] -= 1
+                        on_error(key, e)
+                        continue
+                    batch.append((key, raw))
+                    state["batch_bytes"] += len(raw)
+                    if len(batch) >= batch_objects or state["batch_bytes"] >= batch_bytes:
+                        flush()
+                else:
+                    batch_keys = parsing.pop(future)
+                    state["in_flight"] -= len(batch_keys)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        for key in batch_keys:
+                            on_error(key, e)
+                        continue
+                    consume(result, batch_keys)
+            submit_fetches()
+    finally:
+        # Normal exit has nothing left; on error, don't wait for queued downloads
+        fetch_pool.shutdown(cancel_futures=True)
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
@@ -1,18 +1,18 @@
 import sys
 import time
 from collections import Counter, defaultdict
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
 
+import compact_cache
 from costing import calc_cost, calc_web_search_cost
 from data_loader import (
-    download_and_parse,
-    download_one,
-    get_s3_client,
-    list_s3_objects,
+    fetch_raw,
+    list_s3_entries,
+    parse_gzip_data,
     prioritize_cached_keys,
 )
-from usage_parser import extract_usage
+from pipeline import run_pipeline
 
 
 def get_group_key(record, usage, group_by):
@@ -127,6 +127,19 @@ def build_detail_row(date_str, record, model, usage, ws_count, cost, group_key):
 def process_records(records, date_str, pricing_cfg, group_by,
                     filter_user_ids=None, filter_models=None, filter_channel_ids=None,
                     time_from=None, time_to=None, collect_details=True):
+    return process_usage_columns(
+        compact_cache.usage_columns(records), date_str, pricing_cfg, group_by,
+        filter_user_ids=filter_user_ids, filter_models=filter_models,
+        filter_channel_ids=filter_channel_ids, time_from=time_from, time_to=time_to,
+        collect_details=collect_details,
+    )
+
+
+def process_usage_columns(cols, date_str, pricing_cfg, group_by,
+                          filter_user_ids=None, filter_models=None, filter_channel_ids=None,
+                          time_from=None, time_to=None, collect_details=True):
+    """Aggregate already-extracted usage columns (compact_cache.usage_columns /
+    a compacted day) into group stats and detail rows."""
     models_pricing = pricing_cfg.get("models", {})
     web_search_cfg = pricing_cfg.get("web_search", {})
     user_id_set = set(filter_user_ids) if filter_user_ids else None
@@ -135,14 +148,19 @@ def process_records(records, date_str, pricing_cfg, group_by,
 
     stats = defaultdict(new_stat_bucket)
     details = []
-    total_records = len(records)
+    total_records = compact_cache.column_count(cols)
     filtered_out = 0
     parse_failures = 0
     error_categories = Counter()
 
-    for rec in records:
+    created_at = cols["created_at"] if total_records else []
+    user_ids = cols["user_id"] if total_records else []
+    channel_ids = cols["channel_id"] if total_records else []
+    models = cols["model"] if total_records else []
+
+    for i in range(total_records):
         if time_from or time_to:
-            ts = rec.get("created_at", "")
+            ts = created_at[i]
             if ts:
                 if time_from and ts < time_from:
                     filtered_out += 1
@@ -151,24 +169,34 @@ def process_records(records, date_str, pricing_cfg, group_by,
                     filtered_out += 1
                     continue
 
-        if user_id_set and rec.get("user_id", 0) not in user_id_set:
+        if user_id_set and user_ids[i] not in user_id_set:
             filtered_out += 1
             continue
-        if channel_id_set and rec.get("channel_id", 0) not in channel_id_set:
+        if channel_id_set and channel_ids[i] not in channel_id_set:
             filtered_out += 1
             continue
 
-        model = rec.get("model", "unknown")
+        model = models[i]
         if model_set and model not in model_set:
             filtered_out += 1
             continue
 
-        usage, fail_reason = extract_usage(rec)
+        usage = compact_cache.usage_from_columns(cols, i)
         if usage is None:
             parse_failures += 1
-            error_categories[fail_reason] += 1
+            error_categories[cols["error_class"][i]] += 1
             continue
 
+        rec = {
+            "request_id": cols["request_id"][i],
+            "model": model,
+            "channel_id": int(channel_ids[i]),
+            "user_id": int(user_ids[i]),
+            "status_code": int(cols["status_code"][i]),
+            "created_at": created_at[i],
+        }
+        if cols["channel_name"][i] is not None:
+            rec["channel_name"] = cols["channel_name"][i]
         model_pricing = models_pricing.get(model)
         group_key = get_group_key(rec, usage, group_by)
         s = stats[group_key]
@@ -179,7 +207,7 @@ def process_records(records, date_str, pricing_cfg, group_by,
         s["cache_creation_tokens"] += usage["cache_creation_tokens"]
         s["web_search_calls"] += usage.get("web_search_requests", 0)
 
-        if rec.get("status_code", 200) >= 400:
+        if rec["status_code"] >= 400:
             s["errors"] += 1
 
         if model_pricing:
@@ -201,71 +229,52 @@ def process_records(records, date_str, pricing_cfg, group_by,
     return stats, details, total_records, parse_failures, filtered_out, error_categories
 
 
-def _chunk_keys(keys, chunk_size):
-    for i in range(0, len(keys), chunk_size):
-        yield keys[i:i + chunk_size]
+DETAIL_FIELDS = [
+    "date", "request_id", "model", "channel_id", "channel_name", "user_id", "status_code",
+    "input_tokens", "output_tokens", "cache_read_tokens", "cache_creation_tokens",
+    "cache_5m_tokens", "cache_1h_tokens", "web_search_calls", "cost_usd", "group_key",
+]
 
 
-def _process_key_batch(region, endpoint, bucket, keys, cache_dir, date_str, pricing_cfg, group_by,
-                       filter_user_ids=None, filter_models=None, filter_channel_ids=None,
-                       time_from=None, time_to=None, collect_details=True, download_workers=1):
-    stats = defaultdict(new_stat_bucket)
-    details = []
-    total_records = 0
-    filtered_out = 0
-    parse_failures = 0
-    error_categories = Counter()
-    download_errors = 0
+def details_to_columns(rows):
+    """build_detail_row() dicts → dict of lists (one pickle entry per field, not per row)."""
+    return {field: [row[field] for row in rows] for field in DETAIL_FIELDS}
 
-    def merge_batch(records):
-        nonlocal total_records, filtered_out, parse_failures
-        batch = process_records(
-            records, date_str, pricing_cfg, group_by,
-            filter_user_ids=filter_user_ids, filter_models=filter_models,
-            filter_channel_ids=filter_channel_ids, time_from=time_from, time_to=time_to,
-            collect_details=collect_details,
-        )
-        batch_stats, batch_details, batch_total, batch_parse_failures, batch_filtered_out, batch_errors = batch
-        merge_stats(stats, batch_stats)
-        if collect_details and batch_details:
-            details.extend(batch_details)
-        total_records += batch_total
-        filtered_out += batch_filtered_out
-        parse_failures += batch_parse_failures
-        error_categories.update(batch_errors)
-
-    if len(keys) <= 1 or download_workers <= 1:
-        client = get_s3_client(region, endpoint)
-        for key in keys:
-            try:
-                records = download_and_parse(client, bucket, key, cache_dir=cache_dir)
-            except Exception:
-                download_errors += 1
-                continue
-            merge_batch(records)
-    else:
-        actual_workers = min(download_workers, len(keys))
-        with ThreadPoolExecutor(max_workers=actual_workers) as pool:
-            future_to_key = {
-                pool.submit(download_one, region, endpoint, bucket, key, cache_dir): key
-                for key in keys
-            }
-            for future in as_completed(future_to_key):
-                try:
-                    records = future.result()
-                except Exception:
-                    download_errors += 1
-                    continue
-                merge_batch(records)
 
+def columns_to_details(cols):
+    n = compact_cache.column_count(cols)
+    values = [cols[field] for field in DETAIL_FIELDS]
+    return [dict(zip(DETAIL_FIELDS, row)) for row in zip(*values)] if n else []
+
+
+def parse_object_batch(blobs, options):
+    """Pipeline parse stage: gunzip + parse + extract usage + aggregate ``(key, raw)`` blobs.
+
+    Returns pre-merged stat buckets plus columnar batches: the usage columns
+    (for the compacted day, when ``options["return_columns"]``) and detail
+    rows as columns when ``options["columnar_details"]``.
+    """
+    batches = []
+    failed = []
+    for key, raw in blobs:
+        try:
+            records = parse_gzip_data(raw)
+        except Exception as e:
+            failed.append((key, str(e)))
+            continue
+        batches.append(compact_cache.usage_columns(records))
+    cols = compact_cache.concat_columns(batches)
+    stats, details, total_records, parse_failures, filtered_out, error_categories = process_usage_columns(
+        cols, options["date_str"], options["pricing_cfg"], options["group_by"], **options["filters"])
     return {
         "stats": {k: dict(v) for k, v in stats.items()},
-        "details": details,
+        "details": details_to_columns(details) if options["columnar_details"] else details,
+        "columns": cols if options["return_columns"] else None,
         "total_records": total_records,
         "filtered_out": filtered_out,
         "parse_failures": parse_failures,
         "error_categories": dict(error_categories),
-        "download_errors": download_errors,
+        "failed": failed,
     }
 
 
@@ -273,14 +282,37 @@ def process_date(s3, bucket, prefix, date_str, pricing_cfg, group_by, verbose,
                  filter_user_ids=None, filter_models=None, filter_channel_ids=None,
                  workers=10, region="", endpoint="", cache_dir=None,
                  time_from=None, time_to=None, processes=0, collect_details=True,
-                 process_threads=4):
+                 max_pending=0):
+    """Reconcile one day: compacted-day hit, or the fetch → parse → aggregate pipeline.
+
+    ``workers`` fetch threads download raw objects; ``processes`` > 1 moves
+    gunzip/parse/aggregation to worker processes (otherwise the calling thread
+    parses while downloads continue). ``max_pending`` bounds objects in flight
+    (0 = pipeline.default_max_pending).
+    """
     dt = datetime.strptime(date_str, "%Y-%m-%d")
     s3_prefix = f"{prefix}/{dt.strftime('%Y/%m/%d')}/"
 
-    keys = list_s3_objects(s3, bucket, s3_prefix)
+    entries = list_s3_entries(s3, bucket, s3_prefix)
+    keys = [key for key, _, _ in entries]
     if verbose:
         print(f"  [{date_str}] 找到 {len(keys)} 个文件")
 
+    filters = dict(
+        filter_user_ids=filter_user_ids, filter_models=filter_models,
+        filter_channel_ids=filter_channel_ids, time_from=time_from, time_to=time_to,
+        collect_details=collect_details,
+    )
+
+    t0 = time.time()
+    compacted = compact_cache.load_compacted(cache_dir, "usage", s3_prefix, entries, compact_cache.usage_schema)
+    if compacted is not None:
+        result = process_usage_columns(compact_cache.table_columns(compacted), date_str, pricing_cfg,
+                                       group_by, **filters)
+        if verbose:
+            print(f"  [{date_str}] 压缩缓存命中: {compacted.num_rows:,} 条记录, {time.time() - t0:.1f}s")
+        return result
+
     stats = defaultdict(new_stat_bucket)
     details = []
     total_records = 0
@@ -289,132 +321,67 @@ def process_date(s3, bucket, prefix, date_str, pricing_cfg, group_by, verbose,
     error_categories = Counter()
     download_errors = 0
 
-    t0 = time.time()
     keys, cache_hits = prioritize_cached_keys(keys, cache_dir=cache_dir)
     if verbose and cache_hits:
         print(f"  [{date_str}] 缓存命中: {cache_hits}/{len(keys)} 文件")
         print(f"  [{date_str}] 已按缓存优先排序")
     progress = ProgressBar(len(keys), date_str)
+    compact_writer = compact_cache.open_writer(cache_dir, "usage", s3_prefix, entries, compact_cache.usage_schema)
+
+    parse_processes = min(processes, len(keys)) if processes and processes > 1 and len(keys) > 1 else 0
+    fetch_workers = max(1, min(workers, len(keys)))
+    options = {
+        "date_str": date_str,
+        "pricing_cfg": pricing_cfg,
+        "group_by": group_by,
+        "filters": filters,
+        "return_columns": compact_writer is not None,
+        "columnar_details": parse_processes > 1,
+    }
+    if verbose and len(keys) > 1:
+        print(f"  [{date_str}] 流水线: {fetch_workers} 下载线程, "
+              + (f"{parse_processes} 解析进程" if parse_processes else "主线程解析"))
+
+    def on_error(key, exc):
+        nonlocal download_errors
+        download_errors += 1
+        if verbose:
+            print(f"    下载失败 {key}: {exc}")
+        progress.update(completed=1, failures=1)
 
-    def merge_result(result):
-        nonlocal total_records, filtered_out, parse_failures, download_errors
+    def consume(result, batch_keys):
+        nonlocal total_records, filtered_out, parse_failures
+        if compact_writer is not None and result["columns"]:
+            compact_writer.write(result["columns"])
         merge_stats(stats, result["stats"])
         if collect_details and result["details"]:
-            details.extend(result["details"])
+            batch_details = result["details"]
+            details.extend(columns_to_details(batch_details) if options["columnar_details"] else batch_details)
         total_records += result["total_records"]
         filtered_out += result["filtered_out"]
         parse_failures += result["parse_failures"]
         error_categories.update(result["error_categories"])
-        download_errors += result.get("download_errors", 0)
-
-    if len(keys) <= 1:
-        for key in keys:
-            try:
-                records = download_and_parse(s3, bucket, key, cache_dir=cache_dir)
-            except Exception as e:
-                download_errors += 1
-                if verbose:
-                    print(f"    下载失败 {key}: {e}")
-                progress.update(completed=1, failures=1)
-                continue
-            batch = process_records(
-                records, date_str, pricing_cfg, group_by,
-                filter_user_ids=filter_user_ids, filter_models=filter_models,
-                filter_channel_ids=filter_channel_ids, time_from=time_from, time_to=time_to,
-                collect_details=collect_details,
-            )
-            b_stats, b_details, b_total, b_parse, b_filtered, b_errors = batch
-            merge_stats(stats, b_stats)
-            if collect_details and b_details:
-                details.extend(b_details)
-            total_records += b_total
-            filtered_out += b_filtered
-            parse_failures += b_parse
-            error_categories.update(b_errors)
-            progress.update(completed=1)
-    elif processes and processes > 1:
-        actual_processes = min(processes, len(keys))
-        chunk_size = max(200, min(1000, len(keys) // (actual_processes * 4) or 1))
-        if verbose:
-            print(f"  [{date_str}] 多进程处理: {actual_processes} 进程, 每进程 {process_threads} 下载线程, 分块 {chunk_size} 文件")
-        with ProcessPoolExecutor(max_workers=actual_processes) as pool:
-            future_to_count = {
-                pool.submit(
-                    _process_key_batch,
-                    region, endpoint, bucket, key_batch, cache_dir, date_str, pricing_cfg, group_by,
-                    filter_user_ids, filter_models, filter_channel_ids,
-                    time_from, time_to, collect_details, process_threads,
-                ): len(key_batch)
-                for key_batch in _chunk_keys(keys, chunk_size)
-            }
-            for future in as_completed(future_to_count):
-                batch_count = future_to_count[future]
-                try:
-                    result = future.result()
-                    merge_result(result)
-                    progress.update(completed=batch_count, failures=result.get("download_errors", 0))
-                except Exception as e:
-                    download_errors += batch_count
-                    if verbose:
-                        print(f"    分块处理失败: {e}")
-                    progress.update(completed=batch_count, failures=batch_count)
-    elif workers <= 1:
-        for key in keys:
-            try:
-                records = download_and_parse(s3, bucket, key, cache_dir=cache_dir)
-            except Exception as e:
-                download_errors += 1
-                if verbose:
-                    print(f"    下载失败 {key}: {e}")
-                progress.update(completed=1, failures=1)
-                continue
-            batch = process_records(
-                records, date_str, pricing_cfg, group_by,
-                filter_user_ids=filter_user_ids, filter_models=filter_models,
-                filter_channel_ids=filter_channel_ids, time_from=time_from, time_to=time_to,
-                collect_details=collect_details,
-            )
-            b_stats, b_details, b_total, b_parse, b_filtered, b_errors = batch
-            merge_stats(stats, b_stats)
-            if collect_details and b_details:
-                details.extend(b_details)
-            total_records += b_total
-            filtered_out += b_filtered
-            parse_failures += b_parse
-            error_categories.update(b_errors)
-            progress.update(completed=1)
-    else:
-        actual_workers = min(workers, len(keys))
-        with ThreadPoolExecutor(max_workers=actual_workers) as pool:
-            future_to_key = {
-                pool.submit(download_one, region, endpoint, bucket, key, cache_dir): key
-                for key in keys
-            }
-            for future in as_completed(future_to_key):
-                key = future_to_key[future]
-                try:
-                    records = future.result()
-                except Exception as e:
-                    download_errors += 1
-                    if verbose:
-                        print(f"    下载失败 {key}: {e}")
-                    progress.update(completed=1, failures=1)
-                    continue
-                batch = process_records(
-                    records, date_str, pricing_cfg, group_by,
-                    filter_user_ids=filter_user_ids, filter_models=filter_models,
-                    filter_channel_ids=filter_channel_ids, time_from=time_from, time_to=time_to,
-                    collect_details=collect_details,
-                )
-                b_stats, b_details, b_total, b_parse, b_filtered, b_errors = batch
-                merge_stats(stats, b_stats)
-                if collect_details and b_details:
-                    details.extend(b_details)
-                total_records += b_total
-                filtered_out += b_filtered
-                parse_failures += b_parse
-                error_categories.update(b_errors)
-                progress.update(completed=1)
+        for key, err in result["failed"]:
+            on_error(key, err)
+        progress.update(completed=len(batch_keys) - len(result["failed"]))
+
+    try:
+        run_pipeline(keys, partial(fetch_raw, s3, bucket, cache_dir=cache_dir), parse_object_batch,
+                     consume, on_error, job_args=(options,), fetch_workers=fetch_workers,
+                     processes=parse_processes, max_pending=max_pending)
+    except BaseException:
+        if compact_writer is not None:
+            compact_writer.abort()
+        raise
+
+    if compact_writer is not None:
+        # A day is only compacted when every object was read
+        if download_errors:
+            compact_writer.abort()
+        else:
+            compact_writer.commit()
+            if verbose:
+                print(f"  [{date_str}] 已写入压缩缓存: {compact_writer.rows:,} 条记录")
 
     elapsed = time.time() - t0
     progress.close()
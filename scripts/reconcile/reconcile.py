@@ -128,7 +128,7 @@ def _run_reconcile(args):
     if args.workers > 1:
         print(f"  并发下载: {args.workers} 线程")
     if args.processes > 1:
-        print(f"  并发处理: {args.processes} 进程")
+        print(f"  并发解析: {args.processes} 进程")
     if not collect_details:
         print("  明细导出: 已关闭（仅控制台汇总，减少内存占用）")
 
@@ -140,7 +140,7 @@ def _run_reconcile(args):
             workers=args.workers, region=args.region, endpoint=args.endpoint,
             cache_dir=cache_dir, time_from=time_from, time_to=time_to,
             processes=args.processes, collect_details=collect_details,
-            process_threads=args.process_threads,
+            max_pending=args.max_pending,
         )
         grand_total_records += total_records
         grand_parse_failures += parse_failures
@@ -0,0 +1,220 @@
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import compact_cache
+import data_loader
+import db_checks
+import find_suspect_stream_interrupts as fssi
+import processor
+from cli import load_pricing
+
+_HERE = Path(__file__).resolve().parent
+PREFIX = "llm-raw-logs"
+DATE = "2026-03-10"
+DAY_PREFIX = f"{PREFIX}/2026/03/10/"
+
+
+def _sse(*chunks, done=True):
+    lines = [f"data: {json.dumps(c)}" for c in chunks]
+    if done:
+        lines.append("data: [DONE]")
+    return "\n\n".join(lines)
+
+
+def _record(i):
+    model = ["claude-sonnet-4-6", "gpt-4o", "unpriced-model"][i % 3]
+    kind = i % 6
+    if kind == 0:
+        body = json.dumps({"usage": {"input_tokens": 1000 + i, "output_tokens": 50,
+                                     "cache_read_input_tokens": 200,
+                                     "cache_creation": {"ephemeral_5m_input_tokens": 30}}})
+    elif kind == 1:
+        body = _sse({"choices": [{"delta": {"content": "hi"}}]},
+                    {"choices": [{"delta": {}, "finish_reason": "stop"}],
+                     "usage": {"prompt_tokens": 300 + i, "completion_tokens": 9}})
+    elif kind == 2:
+        body = _sse({"choices": [{"delta": {"content": "partial"}}]}, done=False)
+    elif kind == 3:
+        body = json.dumps({"error": {"type": "rate_limit_error", "message": "rate limit hit"}})
+    elif kind == 4:
+        body = ""
+    else:
+        body = _sse({"type": "message_start", "message": {"usage": {"input_tokens": 250_000 + i}}},
+                    {"type": "message_delta", "usage": {"output_tokens": 77}},
+                    {"type": "message_stop"})
+    return {
+        "request_id": f"req-{i}",
+        "created_at": f"2026-03-10T{i % 24:02d}:{i % 60:02d}:00Z",
+        "model": model,
+        "channel_id": 10 + i % 4,
+        "channel_name": f"ch-{i % 4}",
+        "user_id": 100 + i % 5,
+        "status_code": 429 if kind == 3 else 200,
+        "path": "/v1/chat/completions",
+        "request_body": json.dumps({"stream": kind in (1, 2, 4, 5)}),
+        "response_body": body,
+        "response_error": "upstream reset" if i % 17 == 0 else "",
+    }
+
+
+class _FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.gets = 0
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys=1000, ContinuationToken=None):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        return {"Contents": [{"Key": k, "ETag": f'"{hash(self.objects[k]) & 0xffff:x}"',
+                              "Size": len(self.objects[k])} for k in keys],
+                "IsTruncated": False}
+
+    def get_object(self, Bucket, Key):
+        self.gets += 1
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+def _objects(n_objects=5, per_object=40):
+    objects = {}
+    for o in range(n_objects):
+        lines = [json.dumps(_record(o * per_object + i)) for i in range(per_object)]
+        objects[f"{DAY_PREFIX}part-{o}.jsonl.gz"] = gzip.compress("\n".join(lines).encode())
+    return objects
+
+
+class CompactCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = self.tmp.name
+        self.s3 = _FakeS3(_objects())
+        self.pricing = load_pricing(str(_HERE / "pricing.json"))
+
+    def _process(self, **kwargs):
+        return processor.process_date(self.s3, "bucket", PREFIX, DATE, self.pricing, "model", False,
+                                      cache_dir=self.cache_dir, workers=kwargs.pop("workers", 1), **kwargs)
+
+    def test_process_date_second_run_reads_compacted_day(self):
+        for kwargs in ({}, {"filter_user_ids": [101, 103], "time_from": "2026-03-10T05:00:00"}):
+            compact = compact_cache.compact_path(self.cache_dir, "usage", DAY_PREFIX)
+            if os.path.exists(compact):
+                os.remove(compact)
+            first = self._process(**kwargs)
+            self.assertTrue(os.path.exists(compact))
+            self.s3.gets = 0
+            second = self._process(workers=4, **kwargs)
+            self.assertEqual(self.s3.gets, 0)
+            stats1, details1, *rest1 = first
+            stats2, details2, *rest2 = second
+            self.assertEqual(set(stats1), set(stats2))
+            for group, bucket in stats1.items():
+                for field, value in bucket.items():
+                    # Per-object partial sums vs one pass over the day
+                    self.assertAlmostEqual(value, stats2[group][field], places=9, msg=(group, field))
+            self.assertEqual(rest1, rest2)
+            self.assertEqual(sorted(details1, key=lambda d: d["request_id"]),
+                             sorted(details2, key=lambda d: d["request_id"]))
+
+        _, _, *cached = self._process()
+        _, _, *direct = processor.process_records(list(map(_record, range(200))), DATE, self.pricing, "model")
+        self.assertEqual(cached, direct)
+        self.assertEqual(cached[0], 200)
+        self.assertIn("rate_limit_error: 速率限制", cached[3])
+
+    def test_new_object_invalidates_compacted_day(self):
+        self._process()
+        self.s3.objects[f"{DAY_PREFIX}part-late.jsonl.gz"] = gzip.compress(json.dumps(_record(999)).encode())
+        self.s3.gets = 0
+        _, _, total, *_ = self._process()
+        self.assertEqual(total, 201)
+        # Only the new object is fetched; the others come from the raw .gz cache
+        self.assertEqual(self.s3.gets, 1)
+        entries = data_loader.list_s3_entries(self.s3, "bucket", DAY_PREFIX)
+        compact = compact_cache.load_compacted(self.cache_dir, "usage", DAY_PREFIX,
+                                               entries, compact_cache.usage_schema)
+        self.assertEqual(compact.num_rows, 201)
+
+    def test_reuploaded_object_invalidates_compacted_day(self):
+        self._process()
+        self.s3.objects[f"{DAY_PREFIX}part-0.jsonl.gz"] = gzip.compress(json.dumps(_record(999)).encode())
+        load = lambda: compact_cache.load_compacted(
+            self.cache_dir, "usage", DAY_PREFIX, data_loader.list_s3_entries(self.s3, "bucket", DAY_PREFIX),
+            compact_cache.usage_schema)
+        self.assertIsNone(load())
+        self._process()
+        self.assertIsNotNone(load())
+
+    def test_compacted_day_is_mapped_not_decompressed(self):
+        self._process()
+        entries = data_loader.list_s3_entries(self.s3, "bucket", DAY_PREFIX)
+        before = compact_cache.pa.total_allocated_bytes()
+        compact = compact_cache.load_compacted(self.cache_dir, "usage", DAY_PREFIX, entries,
+                                               compact_cache.usage_schema)
+        self.assertEqual(compact.num_rows, 200)
+        self.assertEqual(compact_cache.pa.total_allocated_bytes(), before)
+        cols = compact_cache.table_columns(compact)
+        self.assertEqual(cols["input_tokens"].dtype.kind, "i")
+        self.assertEqual(len(cols["request_id"]), compact.num_rows)
+
+    def test_failed_download_does_not_publish(self):
+        del self.s3.objects[f"{DAY_PREFIX}part-2.jsonl.gz"]
+        self.s3.objects[f"{DAY_PREFIX}part-2.jsonl.gz"] = b"not gzip"
+        self._process()
+        compact = compact_cache.compact_path(self.cache_dir, "usage", DAY_PREFIX)
+        self.assertFalse(os.path.exists(compact))
+        self.assertEqual(os.listdir(os.path.dirname(compact)), [])
+
+    def test_stream_suspects_match_with_and_without_cache(self):
+        args = SimpleNamespace(prefix=PREFIX, bucket="bucket", workers=2, verbose=False,
+                               user_id=None, channel_id=None, model=None, min_score=3,
+                               truncation_threshold=900000, cache_dir=self.cache_dir)
+        with mock.patch.object(fssi, "download_and_parse",
+                               lambda s3, bucket, key: data_loader.download_and_parse(s3, bucket, key)):
+            first = fssi.collect_suspects_for_date(self.s3, args, DATE)
+            self.s3.gets = 0
+            second = fssi.collect_suspects_for_date(self.s3, args, DATE)
+        self.assertEqual(self.s3.gets, 0)
+        key = lambda s: s["request_id"]
+        self.assertEqual(sorted(first["suspects"], key=key), sorted(second["suspects"], key=key))
+        self.assertEqual({k: v for k, v in first.items() if k != "suspects"},
+                         {k: v for k, v in second.items() if k != "suspects"})
+        self.assertTrue(first["suspects"])
+
+        expected = [fssi.detect_suspect(rec, args) for rec in map(_record, range(200))]
+        self.assertEqual(sorted((s for s in expected if s), key=key), sorted(first["suspects"], key=key))
+
+    def test_raw_detail_cross_check_uses_compacted_day(self):
+        db_path = os.path.join(self.cache_dir, "logs.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE logs (id INTEGER, user_id INTEGER, created_at INTEGER, type INTEGER, "
+                     "model_name TEXT, quota INTEGER, prompt_tokens INTEGER, completion_tokens INTEGER)")
+        conn.commit()
+        conn.close()
+
+        def run():
+            out = io.StringIO()
+            with mock.patch.object(sys, "stdout", out), \
+                    mock.patch("data_loader.get_s3_client", lambda region, endpoint: self.s3):
+                db_checks.run_raw_detail_cross_check(db_path, DATE, "bucket", PREFIX, "", "",
+                                                     cache_dir=self.cache_dir)
+            return [line for line in out.getvalue().splitlines() if line.strip().startswith("原始记录")]
+
+        first = run()
+        self.s3.gets = 0
+        second = run()
+        self.assertEqual(self.s3.gets, 0)
+        self.assertEqual(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
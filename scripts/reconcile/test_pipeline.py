@@ -0,0 +1,102 @@
+import gzip
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pipeline
+import processor
+from cli import load_pricing
+from test_compact_cache import DATE, DAY_PREFIX, PREFIX, _FakeS3, _objects, _record
+
+_HERE = Path(__file__).resolve().parent
+
+
+def _sum_job(blobs, scale):
+    if any(raw == b"boom" for _, raw in blobs):
+        raise ValueError("boom")
+    return sum(len(raw) for _, raw in blobs) * scale
+
+
+class PipelineTest(unittest.TestCase):
+    def test_backpressure_bounds_objects_in_flight(self):
+        lock = threading.Lock()
+        state = {"outstanding": 0, "peak": 0}
+        consumed = []
+
+        def fetch(key):
+            with lock:
+                state["outstanding"] += 1
+                state["peak"] = max(state["peak"], state["outstanding"])
+            return b"x" * key
+
+        def consume(result, batch_keys):
+            time.sleep(0.002)  # slow aggregation: fetch threads must stall
+            with lock:
+                state["outstanding"] -= len(batch_keys)
+            consumed.extend(batch_keys)
+
+        pipeline.run_pipeline(range(1, 201), fetch, _sum_job, consume, self.fail, job_args=(1,),
+                              fetch_workers=8, max_pending=12, batch_objects=4)
+        self.assertEqual(sorted(consumed), list(range(1, 201)))
+        self.assertLessEqual(state["peak"], 12)
+        self.assertEqual(state["outstanding"], 0)
+
+    def test_errors_are_reported_per_key(self):
+        for processes in (0, 2):
+            results, errors = [], []
+
+            def fetch(key):
+                if key == 3:
+                    raise OSError("fetch failed")
+                return b"boom" if key == 7 else b"ok"
+
+            pipeline.run_pipeline(range(10), fetch, _sum_job, lambda r, k: results.append((r, k)),
+                                  lambda key, exc: errors.append(key), job_args=(10,),
+                                  fetch_workers=3, processes=processes, batch_objects=1)
+            self.assertEqual(sorted(errors), [3, 7])
+            self.assertEqual(sorted(k for _, keys in results for k in keys), [0, 1, 2, 4, 5, 6, 8, 9])
+            self.assertEqual(sum(r for r, _ in results), 8 * 2 * 10)
+
+
+class ProcessDatePipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.pricing = load_pricing(str(_HERE / "pricing.json"))
+
+    def _run(self, s3, **kwargs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            return processor.process_date(s3, "bucket", PREFIX, DATE, self.pricing, "channel", False,
+                                          cache_dir=cache_dir, **kwargs)
+
+    def test_modes_match_direct_processing(self):
+        objects = _objects(n_objects=12, per_object=25)
+        objects[f"{DAY_PREFIX}part-bad.jsonl.gz"] = b"not gzip"
+        objects[f"{DAY_PREFIX}part-empty.jsonl.gz"] = gzip.compress(b"")
+        records = [_record(i) for i in range(300)]
+        want_stats, want_details, *want_rest = processor.process_records(
+            records, DATE, self.pricing, "channel", filter_models=["gpt-4o", "claude-sonnet-4-6"])
+
+        for kwargs in ({"workers": 1}, {"workers": 4}, {"workers": 4, "processes": 2, "max_pending": 5},
+                       {"workers": 2, "processes": 3, "collect_details": False}):
+            s3 = _FakeS3(objects)
+            stats, details, total, parse_failures, filtered_out, errors = self._run(
+                s3, filter_models=["gpt-4o", "claude-sonnet-4-6"], **kwargs)
+            self.assertEqual(s3.gets, len(objects))
+            self.assertEqual([total, parse_failures, filtered_out, errors], want_rest)
+            self.assertEqual(set(stats), set(want_stats))
+            for group, bucket in want_stats.items():
+                for field, value in bucket.items():
+                    self.assertAlmostEqual(stats[group][field], value, places=9, msg=(kwargs, group, field))
+            if kwargs.get("collect_details", True):
+                key = lambda d: d["request_id"]
+                self.assertEqual(sorted(details, key=key), sorted(want_details, key=key))
+            else:
+                self.assertEqual(details, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
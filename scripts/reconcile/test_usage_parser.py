@@ -0,0 +1,102 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import usage_parser
+
+_FIXTURES = Path(__file__).resolve().parent / "fixtures" / "sse"
+
+
+def _corpus():
+    return {p.name: p.read_text(encoding="utf-8") for p in sorted(_FIXTURES.glob("*.txt"))}
+
+
+def _outcome(fn, record):
+    try:
+        return fn(record)
+    except Exception as exc:  # the reference raises on malformed chunks; so must the scanner
+        return type(exc)
+
+
+class UsageParserTest(unittest.TestCase):
+    def assertSameAsFull(self, body, status_code=200, msg=None):
+        record = {"response_body": body, "status_code": status_code}
+        self.assertEqual(_outcome(usage_parser.extract_usage, record),
+                         _outcome(usage_parser.extract_usage_full, record), msg)
+
+    def test_fixture_corpus_matches_full_merge(self):
+        corpus = _corpus()
+        self.assertGreaterEqual(len(corpus), 10)
+        for name, body in corpus.items():
+            for status_code in (200, 429, 500):
+                self.assertSameAsFull(body, status_code, name)
+                self.assertSameAsFull("\n\n" + body, status_code, name)
+            # Truncated uploads and concatenated retries
+            for cut in range(0, len(body), max(len(body) // 40, 1)):
+                self.assertSameAsFull(body[:cut], msg=(name, cut))
+            self.assertSameAsFull(body + body, msg=name)
+
+    def test_known_totals(self):
+        corpus = _corpus()
+
+        def usage(name):
+            return usage_parser.extract_usage({"response_body": corpus[name], "status_code": 200})
+
+        got, err = usage("anthropic_cache_1h_web_search.txt")
+        self.assertIsNone(err)
+        self.assertEqual(got, {
+            "input_tokens": 12, "output_tokens": 912, "cache_read_tokens": 151000,
+            "cache_creation_tokens": 20480, "cache_creation_5m_tokens": 480,
+            "cache_creation_1h_tokens": 20000, "web_search_requests": 2,
+        })
+        got, _ = usage("openai_include_usage.txt")
+        self.assertEqual((got["input_tokens"], got["output_tokens"]), (4211, 233))
+        got, _ = usage("bedrock_invocation_metrics.txt")
+        self.assertEqual((got["input_tokens"], got["output_tokens"], got["cache_read_tokens"],
+                          got["cache_creation_tokens"]), (3000, 64, 1024, 512))
+        self.assertEqual(usage("openai_no_usage.txt"), (None, "unknown_error"))
+        self.assertEqual(usage("anthropic_midstream_error.txt")[0]["input_tokens"], 900)
+        self.assertEqual(usage("json_openai_error.txt"), (None, "rate_limit_error: 速率限制"))
+        self.assertEqual(usage_parser.classify_error_response(corpus["anthropic_midstream_error.txt"], 200),
+                         "overloaded_error: 服务过载")
+
+    def test_only_usage_bearing_chunks_are_decoded(self):
+        corpus = _corpus()
+        payloads = usage_parser._usage_payloads(corpus["openai_include_usage.txt"])
+        self.assertEqual(len(payloads), 1)
+        self.assertIn('"prompt_tokens":4211', payloads[0])
+        # message_start, message_delta, message_stop (with metrics), in stream order
+        payloads = usage_parser._usage_payloads(corpus["bedrock_invocation_metrics.txt"])
+        self.assertEqual([p[9:22] for p in payloads], ['message_start', 'message_delta', 'message_stop"'])
+        # Escaped "usage" inside content text never matches
+        self.assertEqual(usage_parser._usage_payloads('data: {"delta":{"text":"\\"usage\\": 5"}}\n'), [])
+
+    def test_sniff_and_edge_cases(self):
+        self.assertTrue(usage_parser.looks_like_sse("event: message_start\ndata: {}"))
+        self.assertTrue(usage_parser.looks_like_sse("\n: keep-alive\n\ndata: {}"))
+        self.assertFalse(usage_parser.looks_like_sse('{"usage": {"input_tokens": 1}}'))
+        self.assertFalse(usage_parser.looks_like_sse("  [1, 2]"))
+        for body in (
+            "",
+            "data: [DONE]",
+            'data: {"usage":{"input_tokens":5}}\r\ndata: {"usage":{"input_tokens":3,"output_tokens":2}}',
+            'data: {"usage":{"input_tokens":5}}\ndata: [1, "usage"]\n',
+            'data: {"usage":{"input_tokens":5}}\ndata: "usage"\n',
+            'data: {"usage":{"input_tokens":5}}\ndata: {"usage": null, "message": {"usage": {"output_tokens": 9}}}',
+            'data: {"usage":{"input_tokens":5,"cache_creation":{"ephemeral_1h_input_tokens":2}}}\n'
+            'data: {"usage":{"cache_creation":7}}',
+            'data: {"usage":{"input_tokens":0}}\ndata: {"usage":{}}\ndata: {"usage":false}',
+            'event: x\n  data:   {"usage":{"prompt_tokens":11}}   \n',
+            'data: {"usage":null}\ndata: {"amazon-bedrock-invocationMetrics":{"inputTokenCount":4}}',
+            'data: {"usage":"n/a","amazon-bedrock-invocationMetrics":[]}',
+            '{"usage": null, "error": {"type": "invalid_request_error", "message": "bad"}}',
+            'data: {"error":{"type":"overloaded_error","message":"Overloaded"}}',
+        ):
+            for status_code in (0, 200, 502):
+                self.assertSameAsFull(body, status_code, body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,12 @@
 import orjson
 
+# SSE field names that can open a stream; none of them can start a JSON document
+_SSE_PREFIXES = ("data:", "event:", "id:", "retry:", ":")
+_SNIFF_CHARS = 64
+_USAGE_KEY = '"usage"'
+_BEDROCK_KEY = '"amazon-bedrock-invocationMetrics"'
+_JSON_WS = " \t\r"
+
 
 def classify_error_response(body, status_code):
     error_type = ""
@@ -19,6 +26,9 @@ def classify_error_response(body, status_code):
                 payload += next_line
                 j += 1
             i = j
+            # Chunks without an "error" key cannot set error_type; skip decoding them
+            if '"error"' not in payload:
+                continue
             try:
                 d = orjson.loads(payload)
                 err = d.get("error", {})
@@ -78,6 +88,15 @@ def _shorten_error_msg(msg):
 
 
 def extract_usage(record):
+    return _extract_usage(record, fast=True)
+
+
+def extract_usage_full(record):
+    """Reference: whole-body orjson attempt + full SSE merge (kept for equivalence checks)."""
+    return _extract_usage(record, fast=False)
+
+
+def _extract_usage(record, fast):
     body = record.get("response_body", "")
     status_code = record.get("status_code", 0)
 
@@ -86,24 +105,99 @@ def extract_usage(record):
             return None, f"http_{status_code}_empty_body"
         return None, "empty_response_body"
 
-    try:
-        obj = orjson.loads(body)
-        usage = obj.get("usage")
-        if usage:
-            return normalize_usage(usage), None
-        if obj.get("error"):
-            return None, classify_error_response(body, status_code)
-    except orjson.JSONDecodeError:
-        pass
-
-    result = extract_usage_from_sse(body)
+    # An SSE stream can never be valid JSON: skip the doomed multi-MB orjson.loads
+    if not (fast and looks_like_sse(body)):
+        try:
+            obj = orjson.loads(body)
+            usage = obj.get("usage")
+            if usage:
+                return normalize_usage(usage), None
+            if obj.get("error"):
+                return None, classify_error_response(body, status_code)
+        except orjson.JSONDecodeError:
+            pass
+
+    result = scan_sse_usage(body) if fast else extract_usage_from_sse(body)
     if result is not None:
         return result, None
 
     return None, classify_error_response(body, status_code)
 
 
+def looks_like_sse(body):
+    return body[:_SNIFF_CHARS].lstrip().startswith(_SSE_PREFIXES)
+
+
+def _is_null_value(text, pos):
+    """True when ``text[pos:]`` is ``: null`` (the key's value is JSON null)."""
+    n = len(text)
+    while pos < n and text[pos] in _JSON_WS:
+        pos += 1
+    if pos >= n or text[pos] != ":":
+        return False
+    pos += 1
+    while pos < n and text[pos] in _JSON_WS:
+        pos += 1
+    return text.startswith("null", pos)
+
+
+def _usage_payloads(text):
+    """``data:`` payloads that may carry usage, scanned backwards from the end.
+
+    Only lines holding a ``"usage"`` key with a non-null value or Bedrock
+    invocation metrics are returned (in stream order); content deltas and
+    OpenAI's per-chunk ``"usage":null`` are never decoded.
+    """
+    payloads = []
+    usage_at = text.rfind(_USAGE_KEY)
+    bedrock_at = text.rfind(_BEDROCK_KEY)
+    while usage_at >= 0 or bedrock_at >= 0:
+        if usage_at > bedrock_at:
+            hit = usage_at
+            after = hit + len(_USAGE_KEY)
+            if text.startswith(":null", after) or _is_null_value(text, after):
+                usage_at = text.rfind(_USAGE_KEY, 0, hit + len(_USAGE_KEY) - 1)
+                continue
+        else:
+            hit = bedrock_at
+        start = text.rfind("\n", 0, hit) + 1
+        stop = text.find("\n", hit)
+        line = text[start:stop if stop >= 0 else len(text)].strip()
+        if line.startswith("data:"):
+            payloads.append(line[len("data:"):].strip())
+        if usage_at >= start:
+            usage_at = text.rfind(_USAGE_KEY, 0, start)
+        if bedrock_at >= start:
+            bedrock_at = text.rfind(_BEDROCK_KEY, 0, start)
+    payloads.reverse()
+    return payloads
+
+
+def scan_sse_usage(text):
+    """Same result as :func:`extract_usage_from_sse`, decoding only usage-bearing chunks.
+
+    Values are max-merged across chunks (Anthropic splits usage between
+    message_start and message_delta), so every candidate is still merged in
+    stream order. Falls back to the full merge if a candidate is not a JSON
+    object.
+    """
+    merged = {}
+    for payload in _usage_payloads(text):
+        try:
+            data = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            return extract_usage_from_sse(text)
+        _merge_chunk(merged, data)
+
+    if merged:
+        return normalize_usage(merged)
+    return None
+
+
 def extract_usage_from_sse(text):
+    """Full merge over every ``data:`` line (reference for :func:`scan_sse_usage`)."""
     merged = {}
     for line in text.split("\n"):
         line = line.strip()
@@ -116,36 +210,39 @@ def extract_usage_from_sse(text):
             data = orjson.loads(payload)
         except orjson.JSONDecodeError:
             continue
-
-        usage = None
-        if "usage" in data and data["usage"]:
-            usage = data["usage"]
-        msg = data.get("message")
-        if isinstance(msg, dict) and msg.get("usage"):
-            usage = msg["usage"]
-
-        if usage:
-            _merge_usage(merged, usage)
-
-        metrics = data.get("amazon-bedrock-invocationMetrics")
-        if isinstance(metrics, dict):
-            bedrock_usage = {}
-            if "inputTokenCount" in metrics:
-                bedrock_usage["input_tokens"] = metrics["inputTokenCount"]
-            if "outputTokenCount" in metrics:
-                bedrock_usage["output_tokens"] = metrics["outputTokenCount"]
-            if "cacheReadInputTokenCount" in metrics:
-                bedrock_usage["cache_read_input_tokens"] = metrics["cacheReadInputTokenCount"]
-            if "cacheWriteInputTokenCount" in metrics:
-                bedrock_usage["cache_creation_input_tokens"] = metrics["cacheWriteInputTokenCount"]
-            if bedrock_usage:
-                _merge_usage(merged, bedrock_usage)
+        _merge_chunk(merged, data)
 
     if merged:
         return normalize_usage(merged)
     return None
 
 
+def _merge_chunk(merged, data):
+    usage = None
+    if "usage" in data and data["usage"]:
+        usage = data["usage"]
+    msg = data.get("message")
+    if isinstance(msg, dict) and msg.get("usage"):
+        usage = msg["usage"]
+
+    if usage:
+        _merge_usage(merged, usage)
+
+    metrics = data.get("amazon-bedrock-invocationMetrics")
+    if isinstance(metrics, dict):
+        bedrock_usage = {}
+        if "inputTokenCount" in metrics:
+            bedrock_usage["input_tokens"] = metrics["inputTokenCount"]
+        if "outputTokenCount" in metrics:
+            bedrock_usage["output_tokens"] = metrics["outputTokenCount"]
+        if "cacheReadInputTokenCount" in metrics:
+            bedrock_usage["cache_read_input_tokens"] = metrics["cacheReadInputTokenCount"]
+        if "cacheWriteInputTokenCount" in metrics:
+            bedrock_usage["cache_creation_input_tokens"] = metrics["cacheWriteInputTokenCount"]
+        if bedrock_usage:
+            _merge_usage(merged, bedrock_usage)
+
+
 def _merge_usage(target, source):
     for k, v in source.items():
         if isinstance(v, dict):